@@ -40,7 +40,24 @@ async def doctor_command(args: argparse.Namespace) -> int:
 async def sessions_command(args: argparse.Namespace) -> int:
     import json
 
-    from app.cli.service import cli_db_runtime, inspect_session, list_sessions
+    from app.cli.service import (
+        backfill_session_tool_usage,
+        cli_db_runtime,
+        inspect_session,
+        list_sessions,
+    )
+
+    if args.sessions_command == "backfill-tool-usage":
+        async with cli_db_runtime(verbose=args.verbose) as cfg:
+            result = await backfill_session_tool_usage(
+                session_dir=cfg.session_dir, batch_size=args.batch_size
+            )
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+            return 0
+        print(f"session_dir: {result['session_dir']}")
+        print(f"synced_sessions: {result['synced_sessions']}")
+        return 0
 
     if args.sessions_command == "inspect":
         async with cli_db_runtime(verbose=args.verbose):
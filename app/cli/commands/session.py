@@ -243,6 +243,8 @@ async def run_command(
             stream_kwargs["sandbox_type"] = args.sandbox_type
         if getattr(args, "sandbox_approval_mode", None):
             stream_kwargs["sandbox_approval_mode"] = args.sandbox_approval_mode
+        if getattr(args, "profile", False):
+            stream_kwargs["profile_output"] = True
         await stream_request_fn(
             request,
             args.json,
@@ -348,6 +350,8 @@ async def chat_command(
                     stream_kwargs["sandbox_type"] = args.sandbox_type
                 if getattr(args, "sandbox_approval_mode", None):
                     stream_kwargs["sandbox_approval_mode"] = args.sandbox_approval_mode
+                if getattr(args, "profile", False):
+                    stream_kwargs["profile_output"] = True
                 await stream_request_fn(
                     request,
                     args.json,
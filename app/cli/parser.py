@@ -143,6 +143,11 @@ def build_argument_parser() -> argparse.ArgumentParser:
     run_parser.add_argument(
         "--stats", action="store_true", help="Print execution summary after completion"
     )
+    run_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-phase latency breakdown after completion",
+    )
     _add_goal_args(run_parser)
 
     chat_parser = subparsers.add_parser(
@@ -187,6 +192,11 @@ def build_argument_parser() -> argparse.ArgumentParser:
     chat_parser.add_argument(
         "--stats", action="store_true", help="Print execution summary for each turn"
     )
+    chat_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-phase latency breakdown for each turn",
+    )
     _add_goal_args(chat_parser)
 
     resume_parser = subparsers.add_parser(
@@ -233,6 +243,11 @@ def build_argument_parser() -> argparse.ArgumentParser:
     resume_parser.add_argument(
         "--stats", action="store_true", help="Print execution summary for each turn"
     )
+    resume_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-phase latency breakdown for each turn",
+    )
     _add_goal_args(resume_parser)
 
     doctor_parser = subparsers.add_parser(
@@ -288,6 +303,23 @@ def build_argument_parser() -> argparse.ArgumentParser:
         "--verbose", action="store_true", help="Show runtime logs"
     )
 
+    sessions_backfill_parser = sessions_subparsers.add_parser(
+        "backfill-tool-usage",
+        help="Index tool usage of sessions created before the usage table existed",
+    )
+    sessions_backfill_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=200,
+        help="Number of sessions read per batch",
+    )
+    sessions_backfill_parser.add_argument(
+        "--json", action="store_true", help="Print the backfill result as JSON"
+    )
+    sessions_backfill_parser.add_argument(
+        "--verbose", action="store_true", help="Show runtime logs"
+    )
+
     agents_parser = subparsers.add_parser("agents", help="List visible CLI agents")
     agents_parser.add_argument("--user-id", dest="user_id", default=default_user_id)
     agents_parser.add_argument(
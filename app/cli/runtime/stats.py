@@ -400,6 +400,52 @@ def _print_stats(stats: Dict[str, Any], *, json_output: bool) -> None:
     sys.stdout.flush()
 
 
+def _print_turn_profile(session_id: Optional[str], *, json_output: bool) -> None:
+    from sagents.utils.phase_timer import recent_turn_timings, slowest_turn_profiles
+
+    turns = recent_turn_timings(session_id, limit=1) if session_id else []
+    if not turns:
+        return
+    turn = turns[0]
+    profile = None
+    if turn.get("profiled"):
+        for captured in slowest_turn_profiles():
+            if captured.get("started_at") == turn.get("started_at"):
+                profile = captured.get("profile")
+                break
+
+    if json_output:
+        print(
+            json.dumps(
+                {"type": "cli_profile", **turn, "profile": profile},
+                ensure_ascii=False,
+            )
+        )
+        return
+
+    output_lines = [
+        "",
+        "[profile]",
+        f"turn: {turn.get('duration_ms', 0):.0f}ms ({turn.get('status')})",
+    ]
+    phases = turn.get("phases") or []
+    if phases:
+        width = max(len(str(item.get("phase"))) for item in phases)
+        output_lines.append("phases (inclusive, may overlap):")
+        for item in phases:
+            output_lines.append(
+                f"  - {str(item.get('phase')):<{width}}  "
+                f"{item.get('duration_ms', 0):>9.1f}ms  "
+                f"{item.get('share', 0) * 100:>5.1f}%  x{item.get('count', 0)}"
+            )
+    if profile:
+        output_lines.append("cprofile (slowest turns only):")
+        output_lines.append(profile.rstrip())
+
+    sys.stdout.write("\n".join(output_lines) + "\n")
+    sys.stdout.flush()
+
+
 def _tool_step_event_key(step: Dict[str, Any]) -> str:
     tool_call_id = step.get("tool_call_id")
     if isinstance(tool_call_id, str) and tool_call_id.strip():
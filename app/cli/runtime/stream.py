@@ -23,6 +23,7 @@ from app.cli.runtime.stats import (
     _empty_stats,
     _finalize_stats,
     _print_stats,
+    _print_turn_profile,
     _record_stats_event,
     _snapshot_tool_steps,
 )
@@ -116,7 +117,10 @@ def _extract_recent_session_issue_notice(
 
     try:
         from sagents.session_runtime import get_global_session_manager
+        from sagents.utils.logger import logger as sage_logger
 
+        # 会话日志由后台线程批量写入，读取尾部前先等队列落盘
+        sage_logger.flush_session_logs(timeout=1.0)
         manager = get_global_session_manager()
         tail = manager.storage.read_session_log_tail(
             session_id, max_bytes=SESSION_LOG_SCAN_BYTES
@@ -151,10 +155,15 @@ async def _stream_request(
     *,
     command_mode: str = "run",
     session_summary: Optional[Dict[str, Any]] = None,
+    profile_output: bool = False,
 ) -> int:
     from app.cli.service import get_session_summary, run_request_stream
 
     _ensure_request_session_id(request)
+    if profile_output:
+        from sagents.utils.phase_timer import enable_phase_timing
+
+        enable_phase_timing(True)
     event_queue: asyncio.Queue = asyncio.Queue()
 
     async def _pump_stream_events() -> None:
@@ -301,4 +310,8 @@ async def _stream_request(
     _finalize_stats(stats)
     if stats_output:
         _print_stats(stats, json_output=json_output)
+    if profile_output:
+        _print_turn_profile(
+            getattr(request, "session_id", None), json_output=json_output
+        )
     return 0
@@ -42,6 +42,7 @@ from app.cli.services.runtime import (
     build_run_request,
 )
 from app.cli.services.session_query import (
+    backfill_session_tool_usage,
     get_session_summary,
     inspect_session,
     list_available_skills,
@@ -307,6 +308,7 @@ __all__ = [
     "cli_runtime",
     "collect_config_info",
     "collect_doctor_info",
+    "backfill_session_tool_usage",
     "configure_cli_logging",
     "create_cli_provider",
     "delete_cli_provider",
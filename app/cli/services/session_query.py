@@ -16,26 +16,6 @@ async def list_sessions(
     from common.models.conversation import ConversationDao
     from common.schemas.conversation import ConversationInfo
 
-    def _normalize_messages(raw_messages: Any) -> List[Dict[str, Any]]:
-        if isinstance(raw_messages, str):
-            try:
-                raw_messages = json.loads(raw_messages)
-            except Exception:
-                return []
-        return raw_messages if isinstance(raw_messages, list) else []
-
-    def _build_last_message_preview(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
-        for message in reversed(messages):
-            role = (message or {}).get("role")
-            content = ((message or {}).get("content") or "").strip()
-            if role and content:
-                return {
-                    "role": role,
-                    "content": content,
-                    "type": (message or {}).get("type"),
-                }
-        return {}
-
     resolved_user_id = user_id or get_default_cli_user_id()
     dao = ConversationDao()
     conversations, total_count = await dao.get_conversations_paginated(
@@ -45,13 +25,12 @@ async def list_sessions(
         search=search,
         agent_id=agent_id,
         sort_by="date",
+        include_messages=False,
     )
 
     items: List[Dict[str, Any]] = []
     for conv in conversations:
         message_count = conv.get_message_count()
-        messages = _normalize_messages(conv.messages)
-        last_message = _build_last_message_preview(messages)
         items.append(
             {
                 **ConversationInfo(
@@ -66,8 +45,12 @@ async def list_sessions(
                     agent_count=message_count.get("agent_count", 0),
                     created_at=conv.created_at.isoformat() if conv.created_at else "",
                     updated_at=conv.updated_at.isoformat() if conv.updated_at else "",
+                    last_activity_at=conv.last_activity_at.isoformat()
+                    if conv.last_activity_at
+                    else None,
+                    total_tokens=conv.total_tokens,
                 ).model_dump(),
-                "last_message": last_message or None,
+                "last_message": conv.last_message_preview or None,
             }
         )
 
@@ -79,6 +62,17 @@ async def list_sessions(
     }
 
 
+async def backfill_session_tool_usage(
+    *, session_dir: str, batch_size: int = 200
+) -> Dict[str, Any]:
+    from common.services.conversation_service import backfill_tool_usage
+    from sagents.storage import create_session_store
+
+    storage = create_session_store(session_root=session_dir, initialize=False)
+    synced = await backfill_tool_usage(storage, batch_size=batch_size)
+    return {"session_dir": session_dir, "synced_sessions": synced}
+
+
 def _resolve_agent_mode_from_config(agent_config: Dict[str, Any]) -> str:
     raw_value = (
         str(agent_config.get("agentMode") or agent_config.get("agent_mode") or "")
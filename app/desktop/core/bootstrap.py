@@ -1,3 +1,5 @@
+import os
+
 from loguru import logger
 from sagents.skill import SkillManager, set_skill_manager
 from sagents.tool.tool_manager import ToolManager, get_tool_manager, set_tool_manager
@@ -112,6 +114,10 @@ async def initialize_skill_manager():
             skill_manager_instance.add_skill_dir(str(user_skills_dir))
             logger.info(f"已添加用户技能目录: {user_skills_dir}")
 
+        # 可选：监听技能目录，技能变化时增量刷新（需要安装 watchdog）
+        if os.getenv("SAGE_SKILL_WATCH", "").strip().lower() in ("1", "true", "yes"):
+            skill_manager_instance.watch()
+
         return skill_manager_instance
     except Exception as e:
         logger.error(f"技能管理器初始化失败: {e}")
@@ -551,6 +557,19 @@ async def initialize_im_service():
         logger.error(f"[IM] IM 服务初始化失败: {e}", exc_info=True)
 
 
+async def close_im_service():
+    """关闭 IM 数据库：刷出待写的活跃时间并关闭连接池"""
+    import asyncio
+
+    from mcp_servers.im_server.db import close_im_db
+
+    try:
+        await asyncio.to_thread(close_im_db)
+        logger.info("[IM] IM 数据库已关闭")
+    except Exception as e:
+        logger.error(f"[IM] IM 数据库关闭失败: {e}")
+
+
 async def validate_and_disable_mcp_servers():
     """验证数据库中的 MCP 服务器配置并注册到 ToolManager；清理不可用项。
 
@@ -7,6 +7,7 @@ from pathlib import Path
 from loguru import logger
 
 from .bootstrap import (
+    close_im_service,
     close_observability,
     close_skill_manager,
     close_tool_manager,
@@ -26,6 +27,7 @@ from .services.browser_capability import get_browser_capability_coordinator
 
 _memory_reporter_task = None
 _host_watchdog_task = None
+_token_usage_rollup_task = None
 _browser_capability_coordinator = None
 
 
@@ -72,6 +74,8 @@ async def _post_initialize():
     create_safe_task(
         _ensure_default_anytool_server_ready(), name="ensure_default_anytool_server"
     )
+    create_safe_task(_backfill_conversations(), name="conversation_backfill")
+    _start_token_usage_rollup()
     await _start_task_scheduler()
 
 
@@ -107,6 +111,47 @@ async def _ensure_default_anytool_server_ready():
             )
 
 
+async def _backfill_conversations():
+    """为升级前已存在的会话补算列表统计、补建全文索引与工具调用统计（只处理缺失部分，可重复执行）。"""
+    from common.models.conversation import ConversationDao
+    from common.services.conversation_service import backfill_tool_usage
+
+    dao = ConversationDao()
+    await dao.backfill_listing_stats()
+    await dao.backfill_search_index()
+    await backfill_tool_usage()
+
+
+async def _token_usage_rollup_loop(interval_seconds: float | None = None):
+    """桌面端没有 APScheduler，按服务端同样的间隔在后台压实 token 用量汇总表。"""
+    from common.models.token_usage import (
+        TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS,
+        TokenUsageDao,
+    )
+
+    interval = interval_seconds or TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS
+    dao = TokenUsageDao()
+    while True:
+        try:
+            compacted = await dao.compact_rollups()
+            if compacted:
+                logger.debug(f"sage-desktop：已汇总 {compacted} 条 token 用量明细")
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"sage-desktop：token 用量汇总失败: {exc}")
+        await asyncio.sleep(interval)
+
+
+def _start_token_usage_rollup():
+    global _token_usage_rollup_task
+    if _token_usage_rollup_task and not _token_usage_rollup_task.done():
+        return
+    _token_usage_rollup_task = create_safe_task(
+        _token_usage_rollup_loop(), name="token_usage_rollup"
+    )
+
+
 async def _start_task_scheduler():
     try:
         await asyncio.sleep(5)
@@ -301,6 +346,14 @@ def _start_memory_reporter():
 async def cleanup_system():
     logger.info("sage-desktop：正在清理资源...")
     global _memory_reporter_task, _host_watchdog_task, _browser_capability_coordinator
+    global _token_usage_rollup_task
+    if _token_usage_rollup_task:
+        _token_usage_rollup_task.cancel()
+        try:
+            await _token_usage_rollup_task
+        except asyncio.CancelledError:
+            pass
+        _token_usage_rollup_task = None
     if _host_watchdog_task:
         _host_watchdog_task.cancel()
         try:
@@ -323,6 +376,7 @@ async def cleanup_system():
 
     await shutdown_async_task_service()
     await shutdown_global_session_manager()
+    await close_im_service()
     await close_observability()
     # 关闭第三方客户端
     await shutdown_clients()
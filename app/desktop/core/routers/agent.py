@@ -495,6 +495,33 @@ async def get_workspace(
     return await Response.succ(message=result["message"], data=result["data"])
 
 
+@agent_router.post("/{agent_id}/file_workspace/entries")
+async def list_workspace_entries(
+    agent_id: str,
+    request: Request,
+    path: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 200,
+    max_depth: Optional[int] = 0,
+    sort_by: str = "name",
+    order: str = "asc",
+):
+    """分页获取Agent工作空间条目"""
+    result = await agent_router_service.build_workspace_listing_response(
+        agent_id=agent_id,
+        fetcher=lambda: agent_service.list_desktop_agent_entries(
+            agent_id,
+            path=path,
+            cursor=cursor,
+            limit=limit,
+            max_depth=max_depth,
+            sort_by=sort_by,
+            order=order,
+        ),
+    )
+    return await Response.succ(message=result["message"], data=result["data"])
+
+
 @agent_router.get("/{agent_id}/file_workspace/download")
 async def download_file(agent_id: str, request: Request):
     file_path = request.query_params.get("file_path")
@@ -504,12 +531,28 @@ async def download_file(agent_id: str, request: Request):
     sage_home / "agents" / agent_id  # pyright: ignore[reportUnusedExpression]
 
     try:
-        path, filename, media_type = await agent_service.download_desktop_agent_file(
+        download = await agent_service.download_desktop_agent_file(
             agent_id,
             file_path,  # pyright: ignore[reportArgumentType]
         )
-        logger.bind(agent_id=agent_id).info(f"Download resolved: path={path}")
-        return FileResponse(path=path, filename=filename, media_type=media_type)
+        logger.bind(agent_id=agent_id).info(f"Download resolved: path={download.path}")
+        if download.archive:
+            return StreamingResponse(
+                agent_service.stream_workspace_archive(
+                    download,
+                    include=request.query_params.getlist("include"),
+                    exclude=request.query_params.getlist("exclude"),
+                    compression=request.query_params.get("compression"),
+                    is_disconnected=request.is_disconnected,
+                ),
+                media_type=download.media_type,
+                headers={"Content-Disposition": download.content_disposition},
+            )
+        return FileResponse(
+            path=download.path,
+            filename=download.filename,
+            media_type=download.media_type,
+        )
     except Exception as e:
         logger.bind(agent_id=agent_id).error(f"Download failed: {e}")
         raise
@@ -537,13 +580,22 @@ async def stream_file(agent_id: str, request: Request):
     logger.bind(agent_id=agent_id).info(f"Stream request: file_path={file_path}")
 
     try:
-        path, filename, media_type = await agent_service.download_desktop_agent_file(
+        download = await agent_service.download_desktop_agent_file(
             agent_id,
             file_path,  # pyright: ignore[reportArgumentType]
         )
     except Exception as e:
         logger.bind(agent_id=agent_id).error(f"Stream resolve failed: {e}")
         raise
+    if download.archive:
+        # 目录只能打包下载，不能在线播放
+        raise SageHTTPException(
+            status_code=400,
+            message_key="agent.workspace_stream_directory",
+            message_params={"path": file_path},
+            error_detail=f"Cannot stream a directory: {file_path}",
+        )
+    path, filename, media_type = download.path, download.filename, download.media_type
 
     file_size = os.path.getsize(path)
     range_header = request.headers.get("range")
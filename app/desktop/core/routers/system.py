@@ -112,6 +112,7 @@ async def get_agent_usage_stats(req: AgentUsageStatsRequest, request: Request):
         days=req.days,
         user_id=get_desktop_user_id(request),
         agent_id=req.agent_id,
+        top_n=req.top_n,
     )
     return await Response.succ(
         message="system.agent_usage_loaded",
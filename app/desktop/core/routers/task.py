@@ -296,15 +296,23 @@ async def get_one_time_task_history(
 async def spawn_due_recurring_tasks(request: Request):
     user_id = _get_scheduler_scope_user_id(request)
     items = await task_service.spawn_due_recurring_tasks(user_id=user_id)
-    return {"items": _serialize_task_items(items)}
+    next_run_at = await task_service.get_next_recurring_run_at(user_id=user_id)
+    return {
+        "items": _serialize_task_items(items),
+        "next_run_at": next_run_at.isoformat() if next_run_at else None,
+    }
 
 
 @task_router.get("/internal/due")
 async def get_due_pending_tasks(
-    request: Request, limit: int = Query(100, ge=1, le=500)
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    horizon_seconds: int = Query(0, ge=0, le=86400),
 ):
     user_id = _get_scheduler_scope_user_id(request)
-    items = await task_service.get_due_pending_tasks(user_id=user_id, limit=limit)
+    items = await task_service.get_due_pending_tasks(
+        user_id=user_id, limit=limit, horizon_seconds=horizon_seconds
+    )
     return {"items": _serialize_task_items(items)}
 
 
@@ -9,6 +9,11 @@ const normalizeAgentMode = (mode) => {
   return ['simple', 'fibre', 'team'].includes(normalized) ? normalized : 'simple'
 }
 
+// 服务端回放合并后的增量时会带上 stream_offset（下一个游标），否则每行推进 1
+const nextStreamIndex = (data, current) => (
+  Number.isFinite(data?.stream_offset) ? data.stream_offset : current + 1
+)
+
 const stripControlTags = (text) => {
   if (typeof text !== 'string') return { text, enablePlan: false, enableDeepThinking: false, thinkingLevel: null }
   let remaining = text
@@ -224,7 +229,7 @@ export const useChatStream = ({
       await readStreamResponse(
         response,
         (data) => {
-          resumeLastIndex += 1
+          resumeLastIndex = nextStreamIndex(data, resumeLastIndex)
           updateActiveSessionLastIndex(sessionId, resumeLastIndex)
           if (resumeLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, resumeLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
@@ -343,7 +348,7 @@ export const useChatStream = ({
         response,
         (data) => {
           console.log('[ChatStream] onMessage callback called, data.type:', data.type)
-          streamLastIndex += 1
+          streamLastIndex = nextStreamIndex(data, streamLastIndex)
           updateActiveSessionLastIndex(sessionId, streamLastIndex)
           if (streamLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, streamLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
@@ -413,7 +418,7 @@ export const useChatStream = ({
       await readStreamResponse(
         response,
         (data) => {
-          streamLastIndex += 1
+          streamLastIndex = nextStreamIndex(data, streamLastIndex)
           updateActiveSessionLastIndex(sessionId, streamLastIndex)
           if (streamLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, streamLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
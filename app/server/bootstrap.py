@@ -90,6 +90,12 @@ def add_session_log_cleanup_job(sessions_root: str):
     return _add_session_log_cleanup_job(sessions_root)
 
 
+def add_token_usage_rollup_job():
+    from .scheduler import add_token_usage_rollup_job as _add_token_usage_rollup_job
+
+    return _add_token_usage_rollup_job()
+
+
 async def initialize_db_connection(cfg: StartupConfig):
     try:
         db_client = await init_db_client(cfg)
@@ -187,6 +193,10 @@ async def initialize_skill_manager(cfg: StartupConfig):
         # 2. 用户技能对话时，根据 user_id 注册用户技能目录 (users/{user_id}/skills/)
         # 3. Agent 技能对话时，根据 agent_id 注册 Agent 技能目录 (agents/{user_id}/{agent_id}/skills/)
 
+        # 可选：监听技能目录，技能变化时增量刷新（需要安装 watchdog）
+        if os.getenv("SAGE_SKILL_WATCH", "").strip().lower() in ("1", "true", "yes"):
+            skill_manager_instance.watch()
+
         return skill_manager_instance
     except Exception as e:
         logger.error(f"技能管理器初始化失败: {e}")
@@ -322,6 +332,7 @@ async def initialize_scheduler(cfg: StartupConfig):
     except Exception:
         logger.error("LLM request 日志清理任务初始化失败")
         raise
+    add_token_usage_rollup_job()
 
     # 3) 启动调度器（需在 DB 连接后）
     if cfg and cfg.es_url:
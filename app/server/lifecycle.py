@@ -65,6 +65,7 @@ async def _post_initialize():
     create_safe_task(
         _ensure_default_anytool_server_ready(), name="ensure_default_anytool_server"
     )
+    create_safe_task(_backfill_conversations(), name="conversation_backfill")
     await _start_task_scheduler()
 
 
@@ -83,6 +84,17 @@ async def _ensure_default_anytool_server_ready():
             )
 
 
+async def _backfill_conversations():
+    """为升级前已存在的会话补算列表统计、补建全文索引与工具调用统计（只处理缺失部分，可重复执行）。"""
+    from common.models.conversation import ConversationDao
+    from common.services.conversation_service import backfill_tool_usage
+
+    dao = ConversationDao()
+    await dao.backfill_listing_stats()
+    await dao.backfill_search_index()
+    await backfill_tool_usage()
+
+
 async def _start_task_scheduler():
     try:
         await asyncio.sleep(5)
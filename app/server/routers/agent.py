@@ -5,7 +5,7 @@ Agent 相关路由
 from typing import Optional
 
 from fastapi import APIRouter, File, Form, Request, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
 from common.core.request_identity import (
     get_request_role,
@@ -346,6 +346,45 @@ async def get_workspace(
     return await Response.succ(message=result["message"], data=result["data"])
 
 
+@agent_router.post("/{agent_id}/file_workspace/entries")
+async def list_workspace_entries(
+    agent_id: str,
+    request: Request,
+    session_id: Optional[str] = None,
+    path: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 200,
+    max_depth: Optional[int] = 0,
+    sort_by: str = "name",
+    order: str = "asc",
+):
+    """分页获取工作空间条目"""
+    user_id = get_request_user_id(request)
+    role = get_request_role(request)
+
+    if role == "admin" and session_id:
+        dao = ConversationDao()
+        conversation = await dao.get_by_session_id(session_id)
+        if conversation:
+            user_id = conversation.user_id
+
+    result = await agent_router_service.build_workspace_listing_response(
+        agent_id=agent_id,
+        user_id=user_id,
+        fetcher=lambda: agent_service.list_server_agent_entries(
+            agent_id,
+            user_id,
+            path=path,
+            cursor=cursor,
+            limit=limit,
+            max_depth=max_depth,
+            sort_by=sort_by,
+            order=order,
+        ),
+    )
+    return await Response.succ(message=result["message"], data=result["data"])
+
+
 @agent_router.get("/{agent_id}/file_workspace/download")
 async def download_file(
     agent_id: str, request: Request, session_id: Optional[str] = None
@@ -363,13 +402,29 @@ async def download_file(
     file_path = request.query_params.get("file_path")
     logger.info(f"Download request: file_path={file_path}")
     try:
-        path, filename, media_type = await agent_service.download_server_agent_file(
+        download = await agent_service.download_server_agent_file(
             agent_id,
             user_id,
             file_path,  # pyright: ignore[reportArgumentType]
         )
-        logger.info(f"Download resolved: path={path}")
-        return FileResponse(path=path, filename=filename, media_type=media_type)
+        logger.info(f"Download resolved: path={download.path}")
+        if download.archive:
+            return StreamingResponse(
+                agent_service.stream_workspace_archive(
+                    download,
+                    include=request.query_params.getlist("include"),
+                    exclude=request.query_params.getlist("exclude"),
+                    compression=request.query_params.get("compression"),
+                    is_disconnected=request.is_disconnected,
+                ),
+                media_type=download.media_type,
+                headers={"Content-Disposition": download.content_disposition},
+            )
+        return FileResponse(
+            path=download.path,
+            filename=download.filename,
+            media_type=download.media_type,
+        )
     except Exception as e:
         logger.error(f"Download failed: {e}")
         raise
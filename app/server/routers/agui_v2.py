@@ -279,7 +279,7 @@ def _sse_response(event_store: AguiV2RunStore, run: AguiRun, last_event_id: str
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
-            "X-Sage-AG-UI-Replay": "process-local",
+            "X-Sage-AG-UI-Replay": "shared" if event_store.shared else "process-local",
         },
     )
 
@@ -3,7 +3,7 @@
 """
 
 import os
-from typing import Any, Optional
+from typing import Any, List, Literal, Optional
 
 from fastapi import APIRouter, Query, Request
 from fastapi.responses import FileResponse
@@ -18,6 +18,12 @@ from common.services import conversation_router_service, conversation_service
 conversation_router = APIRouter()
 
 
+def _split_types(types: Optional[str]) -> Optional[List[str]]:
+    if not types:
+        return None
+    return [item.strip() for item in types.split(",") if item.strip()] or None
+
+
 def _cleanup_file(path: str) -> None:
     try:
         if os.path.exists(path):
@@ -172,7 +178,7 @@ async def list_conversations(
     search: Optional[str] = Query(None, description="搜索关键词"),
     agent_id: Optional[str] = Query(None, description="Agent ID过滤"),
     sort_by: Optional[str] = Query(
-        "date", description="排序方式: date, title, messages"
+        "date", description="排序方式: date, relevance, title, messages"
     ),
 ):
     current_user_id = get_request_user_id(request, user_id or "")
@@ -198,9 +204,24 @@ async def list_conversations(
 
 
 @conversation_router.get("/api/conversations/{session_id}/messages")
-async def get_messages(session_id: str, request: Request):
-    """获取指定对话的所有消息"""
-    data = await conversation_service.get_conversation_messages(session_id)
+async def get_messages(
+    session_id: str,
+    request: Request,
+    before: Optional[str] = Query(None, description="返回该 message_id 之前的消息"),
+    after: Optional[str] = Query(None, description="返回该 message_id 之后的消息"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="每页条数"),
+    types: Optional[str] = Query(None, description="按消息 type 过滤，逗号分隔"),
+    projection: Literal["full", "summary"] = Query("full"),
+):
+    """获取指定对话的消息；传入 before/after/limit 时按游标分页"""
+    data = await conversation_service.get_conversation_messages(
+        session_id,
+        before=before,
+        after=after,
+        limit=limit,
+        message_types=_split_types(types),
+        projection=projection,
+    )
     return await Response.succ(data=data, message="conversation.messages_loaded")
 
 
@@ -1,15 +1,30 @@
+import asyncio
+from typing import Annotated
 from urllib.parse import quote, urlparse
 
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Header, Request
 from fastapi.responses import RedirectResponse, Response
 
 from common.core import config
 from common.core.exceptions import SageHTTPException
 from common.models.user import User, UserDao
-from app.server.services.prometheus_metrics import render_prometheus_metrics
+from common.schemas.base import BaseResponse
+from app.server.services.prometheus_metrics import (
+    render_openmetrics_metrics,
+    render_prometheus_metrics,
+)
+from sagents.observability.metrics_registry import OPENMETRICS_CONTENT_TYPE
+from sagents.storage import StorageError
+from sagents.utils.phase_timer import (
+    phase_timing_enabled,
+    profile_top,
+    recent_turn_timings,
+    slowest_turn_profiles,
+)
 
 observability_router = APIRouter(prefix="/api/observability", tags=["Observability"])
 PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TURN_TIMINGS_MAX_LIMIT = 500
 
 
 def _build_public_jaeger_url(
@@ -88,13 +103,83 @@ async def login_jaeger(request: Request):
 
 
 @observability_router.get("/metrics")
-async def prometheus_metrics():
+async def prometheus_metrics(accept: Annotated[str | None, Header()] = None):
+    # Prometheus 开启 exemplar 抓取时会请求 OpenMetrics 格式
+    if accept and "application/openmetrics-text" in accept:
+        return Response(
+            content=render_openmetrics_metrics(),
+            media_type=OPENMETRICS_CONTENT_TYPE,
+        )
     return Response(
         content=render_prometheus_metrics(),
         media_type=PROMETHEUS_CONTENT_TYPE,
     )
 
 
+async def _require_admin(request: Request) -> User:
+    user = await _get_current_user(request)
+    if not user:
+        raise SageHTTPException(
+            status_code=401,
+            message_key="auth.unauthorized",
+            error_detail="observability requires login",
+        )
+    if user.role != "admin":
+        raise SageHTTPException(
+            status_code=403,
+            message_key="common.permission_denied",
+            error_detail="observability requires admin role",
+        )
+    return user
+
+
+def _load_turn_timings(session_id: str, limit: int) -> list:
+    from sagents.session_runtime import get_global_session_manager
+
+    stored = list(
+        get_global_session_manager().storage.load_turn_timings(
+            session_id, limit=limit
+        )
+    )
+    # 存储里还没有时（如落盘失败），退回本进程最近的记录
+    return stored or recent_turn_timings(session_id, limit)
+
+
+@observability_router.get(
+    "/sessions/{session_id}/turn-timings", response_model=BaseResponse[dict]
+)
+async def session_turn_timings(request: Request, session_id: str, limit: int = 50):
+    await _require_admin(request)
+    limit = max(1, min(limit, TURN_TIMINGS_MAX_LIMIT))
+    try:
+        turns = await asyncio.to_thread(_load_turn_timings, session_id, limit)
+    except StorageError as exc:
+        raise SageHTTPException(
+            status_code=400,
+            message_key="conversation.session_id_invalid",
+            error_detail=str(exc),
+        )
+    return BaseResponse(
+        data={
+            "session_id": session_id,
+            "enabled": phase_timing_enabled(),
+            "turns": turns,
+        }
+    )
+
+
+@observability_router.get("/turn-timings/slowest", response_model=BaseResponse[dict])
+async def slowest_turn_timings(request: Request):
+    await _require_admin(request)
+    return BaseResponse(
+        data={
+            "enabled": phase_timing_enabled(),
+            "profile_top": profile_top(),
+            "turns": slowest_turn_profiles(),
+        }
+    )
+
+
 @observability_router.get("/jaeger/auth")
 async def auth_jaeger(request: Request):
     user = await _get_current_user(request)
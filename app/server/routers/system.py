@@ -50,6 +50,7 @@ async def get_agent_usage_stats(request: Request, req: AgentUsageStatsRequest):
         days=req.days,
         user_id=get_request_user_id(request),
         agent_id=req.agent_id,
+        top_n=req.top_n,
     )
     return await Response.succ(
         data={"usage": usage},
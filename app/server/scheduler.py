@@ -34,3 +34,21 @@ def add_session_log_cleanup_job(sessions_root: str) -> None:
         max_instances=1,
         coalesce=True,
     )
+
+
+def add_token_usage_rollup_job() -> None:
+    from common.models.token_usage import (
+        TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS,
+        TokenUsageDao,
+    )
+
+    sched = get_scheduler()
+    sched.add_job(
+        TokenUsageDao().compact_rollups,
+        trigger="interval",
+        seconds=TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS,
+        id="compact_token_usage_rollups",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
@@ -1,5 +1,4 @@
 import gc
-import hashlib
 import os
 import re
 import resource
@@ -7,7 +6,16 @@ import sys
 import threading
 import time
 from collections.abc import Iterable
-from dataclasses import dataclass, field
+from typing import Any
+
+from sagents.observability.metrics_registry import (
+    REGISTRY,
+    MetricFamily,
+    Sample,
+    encode_openmetrics,
+    encode_prometheus_text,
+)
+from sagents.observability.prometheus_handler import build_session_trace_id
 
 
 _PROCESS_START_TIME = time.time()
@@ -15,86 +23,75 @@ _HTTP_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.
 _DYNAMIC_PATH_SEGMENT_RE = re.compile(
     r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
 )
+# 进程指标（/proc 解析、gc.get_objects()）的采样间隔；抓取频率再高也只按这个间隔真正采样
+PROCESS_SAMPLE_INTERVAL_SECONDS = float(
+    os.getenv("SAGE_METRICS_PROCESS_SAMPLE_SECONDS", "5")
+)
 
-
-@dataclass
-class _HttpMetricState:
-    lock: threading.Lock = field(default_factory=threading.Lock)
-    requests_total: dict[tuple[str, str, str], int] = field(default_factory=dict)
-    request_last_seen: dict[tuple[str, str, str], float] = field(default_factory=dict)
-    duration_sum: dict[tuple[str, str], float] = field(default_factory=dict)
-    duration_count: dict[tuple[str, str], int] = field(default_factory=dict)
-    duration_buckets: dict[tuple[str, str, float], int] = field(default_factory=dict)
-    in_progress: dict[tuple[str, str], int] = field(default_factory=dict)
-
-
-@dataclass
-class _OperationMetricState:
-    lock: threading.Lock = field(default_factory=threading.Lock)
-    total: dict[tuple[str, str, str], int] = field(default_factory=dict)
-    duration_sum: dict[tuple[str, str], float] = field(default_factory=dict)
-    duration_count: dict[tuple[str, str], int] = field(default_factory=dict)
-    duration_buckets: dict[tuple[str, str, float], int] = field(default_factory=dict)
-    active: dict[tuple[str, str], int] = field(default_factory=dict)
-
-
-@dataclass
-class _SseFailureMetricState:
-    lock: threading.Lock = field(default_factory=threading.Lock)
-    failures_total: dict[tuple[str, str, str, str], int] = field(default_factory=dict)
-
-
-_HTTP_STATE = _HttpMetricState()
-_OPERATION_STATE = _OperationMetricState()
-_SSE_FAILURE_STATE = _SseFailureMetricState()
+_HTTP_REQUESTS = REGISTRY.counter(
+    "sage_server_http_requests_total",
+    "Total HTTP requests handled by the Sage server.",
+    ("method", "path", "status"),
+)
+_HTTP_LAST_SEEN = REGISTRY.gauge(
+    "sage_server_http_request_last_seen_timestamp_seconds",
+    "Unix timestamp of the most recent completed HTTP request by method, path, and status.",
+    ("method", "path", "status"),
+)
+_HTTP_DURATION = REGISTRY.histogram(
+    "sage_server_http_request_duration_seconds",
+    "HTTP request duration in seconds.",
+    ("method", "path"),
+    buckets=_HTTP_DURATION_BUCKETS,
+)
+_HTTP_IN_PROGRESS = REGISTRY.gauge(
+    "sage_server_http_requests_in_progress",
+    "HTTP requests currently being processed.",
+    ("method", "path"),
+)
+_OPERATIONS = REGISTRY.counter(
+    "sage_server_operations_total",
+    "Total Sage server operations by category, name, and status.",
+    ("category", "name", "status"),
+)
+_OPERATION_DURATION = REGISTRY.histogram(
+    "sage_server_operation_duration_seconds",
+    "Sage server operation duration in seconds.",
+    ("category", "name"),
+    buckets=_HTTP_DURATION_BUCKETS,
+)
+_OPERATIONS_ACTIVE = REGISTRY.gauge(
+    "sage_server_operations_active",
+    "Sage server operations currently in progress.",
+    ("category", "name"),
+)
+_SSE_FAILURES = REGISTRY.counter(
+    "sage_server_sse_stream_failures_total",
+    "SSE stream failures with session_id for drilldown.",
+    ("stream", "session_id", "trace_id", "status"),
+)
+_SERVER_METRICS = (
+    _HTTP_REQUESTS,
+    _HTTP_LAST_SEEN,
+    _HTTP_DURATION,
+    _HTTP_IN_PROGRESS,
+    _OPERATIONS,
+    _OPERATION_DURATION,
+    _OPERATIONS_ACTIVE,
+    _SSE_FAILURES,
+)
 _SSE_FAILURE_STATUSES = frozenset({"error", "cancelled", "fallback_missing"})
 
-
-def _reset_prometheus_metrics_state() -> None:
-    with _HTTP_STATE.lock:
-        _HTTP_STATE.requests_total.clear()
-        _HTTP_STATE.request_last_seen.clear()
-        _HTTP_STATE.duration_sum.clear()
-        _HTTP_STATE.duration_count.clear()
-        _HTTP_STATE.duration_buckets.clear()
-        _HTTP_STATE.in_progress.clear()
-    with _OPERATION_STATE.lock:
-        _OPERATION_STATE.total.clear()
-        _OPERATION_STATE.duration_sum.clear()
-        _OPERATION_STATE.duration_count.clear()
-        _OPERATION_STATE.duration_buckets.clear()
-        _OPERATION_STATE.active.clear()
-    with _SSE_FAILURE_STATE.lock:
-        _SSE_FAILURE_STATE.failures_total.clear()
-
-
-def _metric_line(name: str, value: int | float) -> str:
-    return f"{name} {float(value):.6f}"
-
-
-def _labeled_metric_line(name: str, labels: dict[str, str], value: int | float) -> str:
-    rendered_labels = ",".join(
-        f'{key}="{_escape_label_value(val)}"' for key, val in labels.items()
-    )
-    return f"{name}{{{rendered_labels}}} {float(value):.6f}"
-
-
-def _metric_block(
-    name: str, description: str, metric_type: str, value: int | float
-) -> list[str]:
-    return [
-        f"# HELP {name} {description}",
-        f"# TYPE {name} {metric_type}",
-        _metric_line(name, value),
-    ]
-
-
-def _escape_label_value(value: str) -> str:
-    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+_PROCESS_SAMPLE_LOCK = threading.Lock()
+_process_sample: tuple[float, dict[str, Any]] | None = None
 
 
-def _session_trace_id(session_id: str) -> str:
-    return hashlib.md5(str(session_id or "unknown").encode("utf-8")).hexdigest()
+def _reset_prometheus_metrics_state() -> None:
+    global _process_sample
+    for metric in _SERVER_METRICS:
+        metric.clear()
+    with _PROCESS_SAMPLE_LOCK:
+        _process_sample = None
 
 
 def _route_template(path: str, route_path: str | None) -> str:
@@ -113,9 +110,7 @@ def start_http_request(
 ) -> tuple[float, str, str]:
     normalized_method = (method or "GET").upper()
     normalized_path = _route_template(path, route_path)
-    with _HTTP_STATE.lock:
-        key = (normalized_method, normalized_path)
-        _HTTP_STATE.in_progress[key] = _HTTP_STATE.in_progress.get(key, 0) + 1
+    _HTTP_IN_PROGRESS.inc((normalized_method, normalized_path))
     return time.perf_counter(), normalized_method, normalized_path
 
 
@@ -123,62 +118,26 @@ def finish_http_request(
     started_at: float, method: str, path: str, status_code: int | str
 ) -> None:
     duration = max(time.perf_counter() - started_at, 0.0)
-    status = str(status_code)
-    key = (method, path)
-    status_key = (method, path, status)
-
-    with _HTTP_STATE.lock:
-        _HTTP_STATE.requests_total[status_key] = (
-            _HTTP_STATE.requests_total.get(status_key, 0) + 1
-        )
-        _HTTP_STATE.request_last_seen[status_key] = time.time()
-        _HTTP_STATE.duration_sum[key] = (
-            _HTTP_STATE.duration_sum.get(key, 0.0) + duration
-        )
-        _HTTP_STATE.duration_count[key] = _HTTP_STATE.duration_count.get(key, 0) + 1
-        for bucket in _HTTP_DURATION_BUCKETS:
-            if duration <= bucket:
-                bucket_key = (method, path, bucket)
-                _HTTP_STATE.duration_buckets[bucket_key] = (
-                    _HTTP_STATE.duration_buckets.get(bucket_key, 0) + 1
-                )
-        in_progress = _HTTP_STATE.in_progress.get(key, 0)
-        _HTTP_STATE.in_progress[key] = max(in_progress - 1, 0)
+    status_key = (method, path, str(status_code))
+    _HTTP_REQUESTS.inc(status_key)
+    _HTTP_LAST_SEEN.set(status_key, time.time())
+    _HTTP_DURATION.observe((method, path), duration)
+    _HTTP_IN_PROGRESS.dec((method, path), floor=0)
 
 
 def start_operation(category: str, name: str) -> tuple[float, str, str]:
     normalized_category = (category or "unknown").strip() or "unknown"
     normalized_name = (name or "unknown").strip() or "unknown"
-    key = (normalized_category, normalized_name)
-    with _OPERATION_STATE.lock:
-        _OPERATION_STATE.active[key] = _OPERATION_STATE.active.get(key, 0) + 1
+    _OPERATIONS_ACTIVE.inc((normalized_category, normalized_name))
     return time.perf_counter(), normalized_category, normalized_name
 
 
 def finish_operation(started_at: float, category: str, name: str, status: str) -> None:
     duration = max(time.perf_counter() - started_at, 0.0)
     normalized_status = (status or "unknown").strip() or "unknown"
-    key = (category, name)
-    status_key = (category, name, normalized_status)
-
-    with _OPERATION_STATE.lock:
-        _OPERATION_STATE.total[status_key] = (
-            _OPERATION_STATE.total.get(status_key, 0) + 1
-        )
-        _OPERATION_STATE.duration_sum[key] = (
-            _OPERATION_STATE.duration_sum.get(key, 0.0) + duration
-        )
-        _OPERATION_STATE.duration_count[key] = (
-            _OPERATION_STATE.duration_count.get(key, 0) + 1
-        )
-        for bucket in _HTTP_DURATION_BUCKETS:
-            if duration <= bucket:
-                bucket_key = (category, name, bucket)
-                _OPERATION_STATE.duration_buckets[bucket_key] = (
-                    _OPERATION_STATE.duration_buckets.get(bucket_key, 0) + 1
-                )
-        active = _OPERATION_STATE.active.get(key, 0)
-        _OPERATION_STATE.active[key] = max(active - 1, 0)
+    _OPERATIONS.inc((category, name, normalized_status))
+    _OPERATION_DURATION.observe((category, name), duration)
+    _OPERATIONS_ACTIVE.dec((category, name), floor=0)
 
 
 def record_sse_stream_failure(stream: str, session_id: str, status: str) -> None:
@@ -187,16 +146,14 @@ def record_sse_stream_failure(stream: str, session_id: str, status: str) -> None
         return
     normalized_stream = (stream or "unknown").strip() or "unknown"
     normalized_session_id = (session_id or "unknown").strip() or "unknown"
-    key = (
-        normalized_stream,
-        normalized_session_id,
-        _session_trace_id(normalized_session_id),
-        normalized_status,
-    )
-    with _SSE_FAILURE_STATE.lock:
-        _SSE_FAILURE_STATE.failures_total[key] = (
-            _SSE_FAILURE_STATE.failures_total.get(key, 0) + 1
+    _SSE_FAILURES.inc(
+        (
+            normalized_stream,
+            normalized_session_id,
+            build_session_trace_id(normalized_session_id),
+            normalized_status,
         )
+    )
 
 
 def _parse_proc_status() -> dict[str, int]:
@@ -295,235 +252,40 @@ def _load_average() -> Iterable[tuple[str, float]]:
     )
 
 
-def _render_http_metrics() -> list[str]:
-    lines = [
-        "# HELP sage_server_http_requests_total Total HTTP requests handled by the Sage server.",
-        "# TYPE sage_server_http_requests_total counter",
-    ]
-    with _HTTP_STATE.lock:
-        requests_total = dict(_HTTP_STATE.requests_total)
-        request_last_seen = dict(_HTTP_STATE.request_last_seen)
-        duration_sum = dict(_HTTP_STATE.duration_sum)
-        duration_count = dict(_HTTP_STATE.duration_count)
-        duration_buckets = dict(_HTTP_STATE.duration_buckets)
-        in_progress = dict(_HTTP_STATE.in_progress)
-
-    for method, path, status in sorted(requests_total):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_requests_total",
-                {"method": method, "path": path, "status": status},
-                requests_total[(method, path, status)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sage_server_http_request_last_seen_timestamp_seconds Unix timestamp of the most recent completed HTTP request by method, path, and status.",
-            "# TYPE sage_server_http_request_last_seen_timestamp_seconds gauge",
-        ]
-    )
-    for method, path, status in sorted(request_last_seen):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_request_last_seen_timestamp_seconds",
-                {"method": method, "path": path, "status": status},
-                request_last_seen[(method, path, status)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sage_server_http_request_duration_seconds HTTP request duration in seconds.",
-            "# TYPE sage_server_http_request_duration_seconds histogram",
-        ]
-    )
-    duration_keys = sorted(set(duration_count) | set(duration_sum))
-    for method, path in duration_keys:
-        cumulative = 0
-        for bucket in _HTTP_DURATION_BUCKETS:
-            cumulative = duration_buckets.get((method, path, bucket), cumulative)
-            lines.append(
-                _labeled_metric_line(
-                    "sage_server_http_request_duration_seconds_bucket",
-                    {"method": method, "path": path, "le": str(bucket)},
-                    cumulative,
-                )
-            )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_request_duration_seconds_bucket",
-                {"method": method, "path": path, "le": "+Inf"},
-                duration_count.get((method, path), 0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_request_duration_seconds_sum",
-                {"method": method, "path": path},
-                duration_sum.get((method, path), 0.0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_request_duration_seconds_count",
-                {"method": method, "path": path},
-                duration_count.get((method, path), 0),
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sage_server_http_requests_in_progress HTTP requests currently being processed.",
-            "# TYPE sage_server_http_requests_in_progress gauge",
-        ]
-    )
-    for method, path in sorted(in_progress):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_http_requests_in_progress",
-                {"method": method, "path": path},
-                in_progress[(method, path)],
-            )
-        )
-    return lines
-
-
-def _render_python_metrics() -> list[str]:
-    lines: list[str] = []
-    lines.extend(
-        _metric_block(
-            "sage_server_python_objects",
-            "Objects currently tracked by the Python garbage collector.",
-            "gauge",
-            len(gc.get_objects()),
-        )
-    )
-    lines.extend(
-        [
-            "# HELP sage_server_python_gc_collections_total Python GC collections by generation.",
-            "# TYPE sage_server_python_gc_collections_total counter",
-        ]
-    )
-    for generation, stats in enumerate(gc.get_stats()):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_python_gc_collections_total",
-                {"generation": str(generation)},
-                stats.get("collections", 0),
-            )
-        )
-    return lines
-
-
-def _render_operation_metrics() -> list[str]:
-    lines = [
-        "# HELP sage_server_operations_total Total Sage server operations by category, name, and status.",
-        "# TYPE sage_server_operations_total counter",
-    ]
-    with _OPERATION_STATE.lock:
-        total = dict(_OPERATION_STATE.total)
-        duration_sum = dict(_OPERATION_STATE.duration_sum)
-        duration_count = dict(_OPERATION_STATE.duration_count)
-        duration_buckets = dict(_OPERATION_STATE.duration_buckets)
-        active = dict(_OPERATION_STATE.active)
-
-    for category, name, status in sorted(total):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_operations_total",
-                {"category": category, "name": name, "status": status},
-                total[(category, name, status)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sage_server_operation_duration_seconds Sage server operation duration in seconds.",
-            "# TYPE sage_server_operation_duration_seconds histogram",
-        ]
-    )
-    duration_keys = sorted(set(duration_count) | set(duration_sum))
-    for category, name in duration_keys:
-        cumulative = 0
-        for bucket in _HTTP_DURATION_BUCKETS:
-            cumulative = duration_buckets.get((category, name, bucket), cumulative)
-            lines.append(
-                _labeled_metric_line(
-                    "sage_server_operation_duration_seconds_bucket",
-                    {"category": category, "name": name, "le": str(bucket)},
-                    cumulative,
-                )
-            )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_operation_duration_seconds_bucket",
-                {"category": category, "name": name, "le": "+Inf"},
-                duration_count.get((category, name), 0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_operation_duration_seconds_sum",
-                {"category": category, "name": name},
-                duration_sum.get((category, name), 0.0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_operation_duration_seconds_count",
-                {"category": category, "name": name},
-                duration_count.get((category, name), 0),
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sage_server_operations_active Sage server operations currently in progress.",
-            "# TYPE sage_server_operations_active gauge",
-        ]
-    )
-    for category, name in sorted(active):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_operations_active",
-                {"category": category, "name": name},
-                active[(category, name)],
-            )
-        )
-    return lines
-
-
-def _render_sse_failure_metrics() -> list[str]:
-    lines = [
-        "# HELP sage_server_sse_stream_failures_total SSE stream failures with session_id for drilldown.",
-        "# TYPE sage_server_sse_stream_failures_total counter",
-    ]
-    with _SSE_FAILURE_STATE.lock:
-        failures_total = dict(_SSE_FAILURE_STATE.failures_total)
-
-    for stream, session_id, trace_id, status in sorted(failures_total):
-        lines.append(
-            _labeled_metric_line(
-                "sage_server_sse_stream_failures_total",
-                {
-                    "stream": stream,
-                    "session_id": session_id,
-                    "trace_id": trace_id,
-                    "status": status,
-                },
-                failures_total[(stream, session_id, trace_id, status)],
-            )
-        )
-    return lines
+def _sample_process_state() -> dict[str, Any]:
+    """按 PROCESS_SAMPLE_INTERVAL_SECONDS 缓存较贵的进程采样（/proc 解析与 GC 对象计数）。"""
+    global _process_sample
+    now = time.monotonic()
+    with _PROCESS_SAMPLE_LOCK:
+        cached = _process_sample
+        if cached is not None and now - cached[0] < PROCESS_SAMPLE_INTERVAL_SECONDS:
+            return cached[1]
+        proc_status = _parse_proc_status()
+        system_memory_total, system_memory_used = _system_memory_values()
+        sample = {
+            "resident_memory": _resident_memory_bytes(proc_status),
+            "virtual_memory": _virtual_memory_bytes(proc_status),
+            "threads": proc_status.get("Threads", threading.active_count()),
+            "open_fds": _open_fds(),
+            "max_fds": _max_fds(),
+            "system_memory_total": system_memory_total,
+            "system_memory_used": system_memory_used,
+            "load_average": tuple(_load_average()),
+            "python_objects": len(gc.get_objects()),
+        }
+        _process_sample = (now, sample)
+        return sample
+
+
+def _single_value_family(
+    name: str, description: str, metric_type: str, value: int | float
+) -> MetricFamily:
+    return MetricFamily(name, description, metric_type, [Sample(name, (), value)])
 
 
-def render_prometheus_metrics() -> str:
+def _collect_process_metrics() -> list[MetricFamily]:
     usage = resource.getrusage(resource.RUSAGE_SELF)
-    proc_status = _parse_proc_status()
-    system_memory_total, system_memory_used = _system_memory_values()
-
-    lines: list[str] = []
+    sample = _sample_process_state()
     metrics = [
         (
             "sage_server_process_cpu_seconds_total",
@@ -535,31 +297,31 @@ def render_prometheus_metrics() -> str:
             "sage_server_process_resident_memory_bytes",
             "Resident memory size used by the Sage server process.",
             "gauge",
-            _resident_memory_bytes(proc_status),
+            sample["resident_memory"],
         ),
         (
             "sage_server_process_virtual_memory_bytes",
             "Virtual memory size used by the Sage server process.",
             "gauge",
-            _virtual_memory_bytes(proc_status),
+            sample["virtual_memory"],
         ),
         (
             "sage_server_process_threads",
             "Number of threads in the Sage server process.",
             "gauge",
-            proc_status.get("Threads", threading.active_count()),
+            sample["threads"],
         ),
         (
             "sage_server_process_open_fds",
             "Number of open file descriptors in the Sage server process.",
             "gauge",
-            _open_fds(),
+            sample["open_fds"],
         ),
         (
             "sage_server_process_max_fds",
             "Soft limit for open file descriptors in the Sage server process.",
             "gauge",
-            _max_fds(),
+            sample["max_fds"],
         ),
         (
             "sage_server_process_start_time_seconds",
@@ -577,35 +339,53 @@ def render_prometheus_metrics() -> str:
             "sage_server_system_memory_total_bytes",
             "Total physical memory visible to the Sage server process.",
             "gauge",
-            system_memory_total,
+            sample["system_memory_total"],
         ),
         (
             "sage_server_system_memory_used_bytes",
             "Used physical memory visible to the Sage server process.",
             "gauge",
-            system_memory_used,
+            sample["system_memory_used"],
         ),
     ]
+    families = [_single_value_family(*metric) for metric in metrics]
+    for name, value in sample["load_average"]:
+        families.append(
+            _single_value_family(name, f"{name} from os.getloadavg().", "gauge", value)
+        )
+    families.append(
+        _single_value_family(
+            "sage_server_python_objects",
+            "Objects currently tracked by the Python garbage collector.",
+            "gauge",
+            sample["python_objects"],
+        )
+    )
+    families.append(
+        MetricFamily(
+            "sage_server_python_gc_collections_total",
+            "Python GC collections by generation.",
+            "counter",
+            [
+                Sample(
+                    "sage_server_python_gc_collections_total",
+                    (("generation", str(generation)),),
+                    stats.get("collections", 0),
+                )
+                for generation, stats in enumerate(gc.get_stats())
+            ],
+        )
+    )
+    return families
 
-    for name, description, metric_type, value in metrics:
-        lines.extend(_metric_block(name, description, metric_type, value))
 
-    for name, value in _load_average():
-        lines.extend(
-            _metric_block(name, f"{name} from os.getloadavg().", "gauge", value)
-        )
+REGISTRY.register_collector(_collect_process_metrics)
 
-    lines.extend(_render_python_metrics())
-    lines.extend(_render_http_metrics())
-    lines.extend(_render_operation_metrics())
-    lines.extend(_render_sse_failure_metrics())
-    try:
-        from sagents.observability.prometheus_handler import (
-            render_prometheus_trace_metrics,
-        )
 
-        lines.append(render_prometheus_trace_metrics().rstrip("\n"))
-    except Exception:
-        pass
+def render_prometheus_metrics() -> str:
+    return encode_prometheus_text(REGISTRY.collect())
+
 
-    return "\n".join(lines) + "\n"
+def render_openmetrics_metrics() -> str:
+    """OpenMetrics 格式，附带指向 trace_id 的 exemplar。"""
+    return encode_openmetrics(REGISTRY.collect())
@@ -5,6 +5,11 @@ const ENABLE_PLAN_TAG_RE = /^\s*<enable_plan>\s*(true|false)\s*<\/enable_plan>\s
 const ENABLE_DEEP_THINKING_TAG_RE = /^\s*<enable_deep_thinking>\s*(true|false)\s*<\/enable_deep_thinking>\s*/i
 const THINKING_LEVEL_TAG_RE = /^\s*<(?:thinking_level|deep_thinking_level)>\s*(minimal|low|medium|high|xhigh|max)\s*<\/(?:thinking_level|deep_thinking_level)>\s*/i
 
+// 服务端回放合并后的增量时会带上 stream_offset（下一个游标），否则每行推进 1
+const nextStreamIndex = (data, current) => (
+  Number.isFinite(data?.stream_offset) ? data.stream_offset : current + 1
+)
+
 const stripControlTags = (text) => {
   if (typeof text !== 'string') return { text, enablePlan: false, enableDeepThinking: false, thinkingLevel: null }
   let remaining = text
@@ -181,6 +186,8 @@ export const useChatStream = ({
           if (line.trim() === '') continue
           try {
             const messageData = JSON.parse(line)
+            // 空闲心跳只用于保活，不推进游标也不进入消息处理
+            if (messageData?.type === 'heartbeat') continue
             if (onMessage) onMessage(messageData)
           } catch (e) {
             console.error('JSON Parse Error', e)
@@ -216,7 +223,7 @@ export const useChatStream = ({
       await readStreamResponse(
         response,
         (data) => {
-          resumeLastIndex += 1
+          resumeLastIndex = nextStreamIndex(data, resumeLastIndex)
           updateActiveSessionLastIndex(sessionId, resumeLastIndex)
           if (resumeLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, resumeLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
@@ -333,7 +340,7 @@ export const useChatStream = ({
       await readStreamResponse(
         response,
         (data) => {
-          streamLastIndex += 1
+          streamLastIndex = nextStreamIndex(data, streamLastIndex)
           updateActiveSessionLastIndex(sessionId, streamLastIndex)
           if (streamLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, streamLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
@@ -402,7 +409,7 @@ export const useChatStream = ({
       await readStreamResponse(
         response,
         (data) => {
-          streamLastIndex += 1
+          streamLastIndex = nextStreamIndex(data, streamLastIndex)
           updateActiveSessionLastIndex(sessionId, streamLastIndex)
           if (streamLastIndex % 20 === 0) updateActiveSessionLastIndex(sessionId, streamLastIndex, true)
           if (isCurrentSessionStreamEnd(data, sessionId)) {
@@ -40,6 +40,21 @@ def _track_session_close_task(task: asyncio.Task) -> None:
     task.add_done_callback(_consume_result)
 
 
+def create_missing_indexes(sync_conn, table) -> None:
+    """为已存在的表补建模型中新增的索引（create_all 不会处理已存在的表）。"""
+    existing = {index["name"] for index in inspect(sync_conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if not index.name or index.name in existing:
+            continue
+        try:
+            index.create(sync_conn)
+            logger.info(f"[DB] 成功添加索引 '{index.name}' 到表 '{table.name}'")
+        except Exception as e:
+            logger.error(
+                f"[DB] 无法自动添加索引 '{index.name}' 到表 '{table.name}': {e}"
+            )
+
+
 def sync_database_schema(sync_conn, Base):
     inspector = inspect(sync_conn)
     existing_tables = set(inspector.get_table_names())
@@ -93,6 +108,8 @@ def sync_database_schema(sync_conn, Base):
         else:
             logger.debug(f"[DB] 表 '{table_name}' 结构正常")
 
+        create_missing_indexes(sync_conn, table)
+
 
 def db_retry(max_retries: int = 3, delay: float = 1.0):
     def decorator(func):
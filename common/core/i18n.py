@@ -145,9 +145,14 @@ MESSAGES: dict[str, dict[str, str]] = {
         "agent.workspace_file_not_found": "文件不存在: {path}",
         "agent.workspace_empty": "工作空间为空",
         "agent.workspace_max_depth_invalid": "max_depth 必须大于等于 0",
+        "agent.workspace_sort_invalid": "不支持的排序参数: {value}，可选值: {options}",
+        "agent.workspace_limit_invalid": "limit 必须在 1 到 {max} 之间",
+        "agent.workspace_cursor_invalid": "分页游标无效或与排序方式不匹配",
         "agent.workspace_not_directory": "路径不是目录: {path}",
         "agent.workspace_zip_failed": "创建压缩文件失败: {message}",
+        "agent.workspace_zip_invalid_compression": "不支持的压缩方式: {mode}，可选值: {modes}",
         "agent.workspace_not_file": "路径不是文件: {path}",
+        "agent.workspace_stream_directory": "目录不能在线播放，请下载: {path}",
         "agent.workspace_path_not_found": "路径不存在: {path}",
         "agent.workspace_delete_failed": "删除文件失败: {message}",
         "agent.workspace_invalid_filename": "非法文件名",
@@ -167,6 +172,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "conversation.folder_not_found": "会话文件夹 {session_id} 不存在",
         "conversation.download_admin_required": "仅管理员可以下载会话文件夹",
         "conversation.no_editable_user_message": "会话中不存在可编辑的用户消息",
+        "conversation.message_cursor_invalid": "消息游标 {cursor} 无效或不存在",
         "conversation.edit_forbidden": "无权编辑该会话",
         "conversation.edited_message_required": "编辑后的消息不能为空",
         "conversation.rerun_forbidden": "无权重跑该会话",
@@ -477,9 +483,14 @@ MESSAGES: dict[str, dict[str, str]] = {
         "agent.workspace_file_not_found": "File not found: {path}",
         "agent.workspace_empty": "Workspace is empty",
         "agent.workspace_max_depth_invalid": "max_depth must be greater than or equal to 0",
+        "agent.workspace_sort_invalid": "Unsupported sort option: {value}. Expected one of: {options}",
+        "agent.workspace_limit_invalid": "limit must be between 1 and {max}",
+        "agent.workspace_cursor_invalid": "Invalid page cursor or cursor does not match the sort order",
         "agent.workspace_not_directory": "Path is not a directory: {path}",
         "agent.workspace_zip_failed": "Failed to create zip file: {message}",
+        "agent.workspace_zip_invalid_compression": "Unsupported compression mode: {mode}. Expected one of: {modes}",
         "agent.workspace_not_file": "Path is not a file: {path}",
+        "agent.workspace_stream_directory": "A directory cannot be streamed, download it instead: {path}",
         "agent.workspace_path_not_found": "Path not found: {path}",
         "agent.workspace_delete_failed": "Failed to delete file: {message}",
         "agent.workspace_invalid_filename": "Invalid filename",
@@ -499,6 +510,7 @@ MESSAGES: dict[str, dict[str, str]] = {
         "conversation.folder_not_found": "Session folder {session_id} does not exist",
         "conversation.download_admin_required": "Only administrators can download session folders",
         "conversation.no_editable_user_message": "No editable user message exists in this conversation",
+        "conversation.message_cursor_invalid": "Message cursor {cursor} is invalid or does not exist",
         "conversation.edit_forbidden": "Not allowed to edit this conversation",
         "conversation.edited_message_required": "Edited message cannot be empty",
         "conversation.rerun_forbidden": "Not allowed to rerun this conversation",
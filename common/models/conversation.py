@@ -1,19 +1,103 @@
 """Conversation ORM + DAO (shared by server and desktop)."""
 
+import asyncio
+import os
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 import json
-from sqlalchemy import JSON, String, Text, func, or_, select, update
+from loguru import logger
+from sqlalchemy import (
+    JSON,
+    Index,
+    Integer,
+    String,
+    Text,
+    bindparam,
+    func,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.orm import Mapped, load_only, mapped_column
+from sqlalchemy.orm.attributes import set_committed_value
 
 from common.models.base import Base, BaseDao, get_local_now
+from common.models.conversation_search import (
+    ConversationSearchBackend,
+    SearchDocument,
+    build_match_query,
+    get_conversation_search_backend,
+)
+from common.models.token_usage import TokenUsage
+from common.models.tool_usage import (
+    ToolUsageDao,
+    ToolUsageSession,
+    replace_tool_usage,
+)
+
+# 列表预览保留的最后一条消息字符数
+LAST_MESSAGE_PREVIEW_CHARS = int(os.getenv("SAGE_CONVERSATION_PREVIEW_CHARS", "500"))
+
+
+def _normalize_messages(raw_messages: Any) -> List[Dict[str, Any]]:
+    if isinstance(raw_messages, str):
+        try:
+            raw_messages = json.loads(raw_messages)
+        except Exception:  # noqa: BLE001
+            return []
+    return raw_messages if isinstance(raw_messages, list) else []
+
+
+def _message_text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(
+            str(item.get("text") or "")
+            for item in content
+            if isinstance(item, dict) and item.get("type") == "text"
+        ).strip()
+    return content.strip() if isinstance(content, str) else ""
+
+
+def build_listing_stats(messages: Any) -> Dict[str, Any]:
+    """根据完整消息计算列表投影字段：消息计数与最后一条消息预览。"""
+    msgs = _normalize_messages(messages)
+    user_count = 0
+    agent_count = 0
+    for m in msgs:
+        role = (m or {}).get("role")
+        if role == "user":
+            user_count += 1
+        elif role in ("assistant", "agent"):
+            agent_count += 1
+
+    preview = None
+    for m in reversed(msgs):
+        role = (m or {}).get("role")
+        content = _message_text((m or {}).get("content"))
+        if role and content:
+            preview = {
+                "role": role,
+                "content": content[:LAST_MESSAGE_PREVIEW_CHARS],
+                "type": m.get("type"),
+            }
+            break
+    return {
+        "message_count": user_count + agent_count,
+        "user_count": user_count,
+        "agent_count": agent_count,
+        "last_message_preview": preview,
+    }
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
     # 长 pytest 进程中模型可能被多次 import，避免重复注册同一张表
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        Index("idx_conversations_user_updated_at", "user_id", "updated_at"),
+        Index("idx_conversations_agent_updated_at", "agent_id", "updated_at"),
+        {"extend_existing": True},
+    )
 
     session_id: Mapped[str] = mapped_column(String(255), primary_key=True)
     user_id: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -25,6 +109,17 @@ class Conversation(Base):
     updated_at: Mapped[datetime] = mapped_column(
         default=get_local_now, onupdate=get_local_now
     )
+    # 列表投影：随消息写入维护，列表查询无需读取 messages 大字段。
+    # message_count 为 NULL 表示历史数据尚未回填。
+    message_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    user_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    agent_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_message_preview: Mapped[Optional[Dict[str, Any]]] = mapped_column(
+        JSON, nullable=True
+    )
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # 由 token_usage 落库时累加
+    total_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     def __init__(
         self,
@@ -45,29 +140,26 @@ class Conversation(Base):
         self.messages = messages or []
         self.created_at = created_at or get_local_now()
         self.updated_at = updated_at or get_local_now()
+        for key, value in build_listing_stats(self.messages).items():
+            setattr(self, key, value)
+        self.last_activity_at = self.updated_at
 
     def get_message_count(self) -> Dict[str, int]:
-        """统计消息数量，区分用户与代理（assistant/agent）。"""
-        user_count = 0
-        agent_count = 0
-        msgs: List[Dict[str, Any]] = []
-        try:
-            if isinstance(self.messages, str):
-                msgs = json.loads(self.messages)
-            else:
-                msgs = self.messages or []
-        except Exception:  # noqa: BLE001
-            msgs = self.messages if isinstance(self.messages, list) else []
-
-        for m in msgs:
-            role = (m or {}).get("role")
-            if role == "user":
-                user_count += 1
-            elif role in ("assistant", "agent"):
-                agent_count += 1
+        """统计消息数量，区分用户与代理（assistant/agent）。
+
+        优先使用列表投影字段；历史数据尚未回填时才解析 messages。
+        """
+        if self.message_count is not None:
+            return {
+                "user_count": self.user_count or 0,
+                "agent_count": self.agent_count or 0,
+            }
+        if "messages" not in self.__dict__:
+            return {"user_count": 0, "agent_count": 0}
+        stats = build_listing_stats(self.messages)
         return {
-            "user_count": user_count,
-            "agent_count": agent_count,
+            "user_count": stats["user_count"],
+            "agent_count": stats["agent_count"],
         }
 
     @classmethod
@@ -84,6 +176,35 @@ class Conversation(Base):
         )
 
 
+# 不读取 messages 的列表查询需要加载的投影列
+LISTING_COLUMNS = (
+    Conversation.message_count,
+    Conversation.user_count,
+    Conversation.agent_count,
+    Conversation.last_message_preview,
+    Conversation.last_activity_at,
+    Conversation.total_tokens,
+)
+
+_conversations = Conversation.__table__
+# 回填只写入仍为 NULL 的行，避免覆盖并发写入的最新统计
+_FILL_LISTING_STATS = (
+    update(_conversations)
+    .where(
+        _conversations.c.session_id == bindparam("b_session_id"),
+        _conversations.c.message_count.is_(None),
+    )
+    .values(
+        message_count=bindparam("b_message_count"),
+        user_count=bindparam("b_user_count"),
+        agent_count=bindparam("b_agent_count"),
+        last_message_preview=bindparam("b_last_message_preview"),
+        last_activity_at=bindparam("b_last_activity_at"),
+        total_tokens=bindparam("b_total_tokens"),
+    )
+)
+
+
 class ConversationDao(BaseDao):
     """会话数据访问对象（共享 DAO）。"""
 
@@ -105,7 +226,185 @@ class ConversationDao(BaseDao):
             messages=messages or [],
         )
         conversation.updated_at = get_local_now()
-        return await BaseDao.save(self, conversation)
+        saved = await BaseDao.save(self, conversation)
+        await self._update_search_index(
+            "index",
+            session_id=session_id,
+            user_id=user_id,
+            agent_id=agent_id,
+            title=title,
+            messages=messages,
+            updated_at=conversation.updated_at,
+        )
+        return saved
+
+    async def _update_search_index(self, operation: str, **kwargs: Any) -> None:
+        """增量更新全文索引；索引失败只记录日志，不影响会话本身的落库。"""
+        db = await self._get_db()
+        backend = get_conversation_search_backend(db)
+        if backend is None:
+            return
+        try:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                await getattr(backend, operation)(session, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                f"[ConversationSearch] 更新索引失败 {operation} "
+                f"session_id={kwargs.get('session_id')}: {exc}"
+            )
+
+    async def backfill_search_index(self, batch_size: int = 200) -> int:
+        """为尚未建立索引的历史会话补建全文索引，返回补建数量。可重复执行。"""
+        db = await self._get_db()
+        backend = get_conversation_search_backend(db)
+        if backend is None:
+            return 0
+        indexed = 0
+        while True:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                session_ids = await backend.missing_session_ids(session, batch_size)
+                if not session_ids:
+                    break
+                res = await session.execute(
+                    select(Conversation).where(Conversation.session_id.in_(session_ids))
+                )
+                await backend.index_many(
+                    session,
+                    [
+                        SearchDocument(
+                            session_id=conversation.session_id,
+                            user_id=conversation.user_id,
+                            agent_id=conversation.agent_id,
+                            title=conversation.title,
+                            messages=conversation.messages,
+                            updated_at=conversation.updated_at,
+                        )
+                        for conversation in res.scalars().all()
+                    ],
+                )
+                indexed += len(session_ids)
+            # 分批提交并让出事件循环，避免长时间占用数据库写锁
+            await asyncio.sleep(0)
+        if indexed:
+            logger.info(f"[ConversationSearch] 回填全文索引完成，共 {indexed} 个会话")
+        return indexed
+
+    async def backfill_listing_stats(self, batch_size: int = 200) -> int:
+        """为列表投影字段尚未回填的历史会话补算统计，返回补算数量。可重复执行。"""
+        db = await self._get_db()
+        filled = 0
+        while True:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                res = await session.execute(
+                    select(Conversation.session_id)
+                    .where(Conversation.message_count.is_(None))
+                    .limit(batch_size)
+                )
+                session_ids = list(res.scalars().all())
+                if not session_ids:
+                    break
+                await self._fill_listing_stats(session, session_ids)
+                filled += len(session_ids)
+            await asyncio.sleep(0)
+        if filled:
+            logger.info(f"[Conversation] 回填列表统计完成，共 {filled} 个会话")
+        return filled
+
+    @staticmethod
+    async def _fill_listing_stats(
+        session: Any, session_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """读取一批会话的消息计算列表投影并写回，返回 session_id -> 投影字段。"""
+        rows = (
+            await session.execute(
+                select(
+                    Conversation.session_id,
+                    Conversation.messages,
+                    Conversation.updated_at,
+                ).where(Conversation.session_id.in_(session_ids))
+            )
+        ).all()
+        if not rows:
+            return {}
+        tokens = dict(
+            (
+                await session.execute(
+                    select(
+                        TokenUsage.session_id,
+                        func.coalesce(func.sum(TokenUsage.total_tokens), 0),
+                    )
+                    .where(TokenUsage.session_id.in_(session_ids))
+                    .group_by(TokenUsage.session_id)
+                )
+            ).all()
+        )
+        filled: Dict[str, Dict[str, Any]] = {}
+        for session_id, messages, updated_at in rows:
+            filled[session_id] = {
+                **build_listing_stats(messages),
+                "last_activity_at": updated_at,
+                "total_tokens": int(tokens.get(session_id) or 0),
+            }
+        await session.execute(
+            _FILL_LISTING_STATS,
+            [
+                {"b_session_id": session_id, **{f"b_{k}": v for k, v in stats.items()}}
+                for session_id, stats in filled.items()
+            ],
+        )
+        return filled
+
+    async def add_total_tokens(self, session_id: str, tokens: int) -> bool:
+        """累加会话的 token 用量，供列表直接展示。"""
+        if not session_id or not tokens:
+            return False
+        db = await self._get_db()
+        async with db.get_session() as session:  # type: ignore[attr-defined]
+            result = await session.execute(
+                update(Conversation)
+                .where(Conversation.session_id == session_id)
+                .values(
+                    total_tokens=func.coalesce(Conversation.total_tokens, 0) + tokens
+                )
+                .execution_options(synchronize_session=False)
+            )
+            return bool(result.rowcount)  # pyright: ignore[reportAttributeAccessIssue]
+
+    async def sync_tools_usage(self, usages: Dict[str, Dict[str, int]]) -> int:
+        """用会话最新的工具调用次数整体替换统计行，返回写入的会话数。"""
+        if not usages:
+            return 0
+        db = await self._get_db()
+        async with db.get_session() as session:  # type: ignore[attr-defined]
+            rows = (
+                await session.execute(
+                    select(
+                        Conversation.session_id,
+                        Conversation.user_id,
+                        Conversation.agent_id,
+                        Conversation.updated_at,
+                    ).where(Conversation.session_id.in_(list(usages)))
+                )
+            ).all()
+            owners = {row.session_id: row._asdict() for row in rows}
+            await replace_tool_usage(session, owners, usages)
+        return len(owners)
+
+    async def get_session_ids_missing_tool_usage(self, limit: int) -> List[str]:
+        """尚未同步工具统计的会话（升级前的历史会话）。"""
+        db = await self._get_db()
+        async with db.get_session() as session:  # type: ignore[attr-defined]
+            stmt = (
+                select(Conversation.session_id)
+                .outerjoin(
+                    ToolUsageSession,
+                    ToolUsageSession.session_id == Conversation.session_id,
+                )
+                .where(ToolUsageSession.session_id.is_(None))
+                .order_by(Conversation.session_id)
+                .limit(limit)
+            )
+            return list((await session.execute(stmt)).scalars().all())
 
     async def get_by_session_id(self, session_id: str) -> Optional[Conversation]:
         return await BaseDao.get_by_id(self, Conversation, session_id)
@@ -145,21 +444,51 @@ class ConversationDao(BaseDao):
             where.append(Conversation.user_id == user_id)
         if agent_id:
             where.append(Conversation.agent_id == agent_id)
-        if search:
-            like = f"%{search}%"
-            where.append(
-                or_(Conversation.title.like(like), Conversation.session_id.like(like))
-            )
 
         if sort_by == "title":
             order = Conversation.title.asc()
         elif sort_by == "messages":
-            order = func.length(Conversation.messages).desc()
+            order = func.coalesce(Conversation.message_count, 0).desc()
         else:
             order = Conversation.updated_at.desc()
 
         db = await self._get_db()
+        backend = get_conversation_search_backend(db) if search else None
         async with db.get_session() as session:  # type: ignore[attr-defined]
+            if search:
+                if backend is not None and (
+                    build_match_query(search) is None
+                    or not await backend.ready(session)
+                ):
+                    backend = None
+                like = f"%{search}%"
+                if backend is not None and sort_by == "relevance":
+                    return await self._search_ranked(
+                        session,
+                        backend,
+                        search,
+                        page=page,
+                        page_size=page_size,
+                        user_id=user_id,
+                        agent_id=agent_id,
+                        include_messages=include_messages,
+                    )
+                if backend is not None:
+                    # 全文索引负责标题与正文，会话 ID 仍按子串匹配
+                    where.append(
+                        or_(
+                            Conversation.session_id.in_(backend.match_clause(search)),
+                            Conversation.session_id.like(like),
+                        )
+                    )
+                else:
+                    where.append(
+                        or_(
+                            Conversation.title.like(like),
+                            Conversation.session_id.like(like),
+                        )
+                    )
+
             base_stmt = select(Conversation.session_id)
             if where:
                 for cond in where:
@@ -178,40 +507,144 @@ class ConversationDao(BaseDao):
             if not ids:
                 return [], total
 
-            data_stmt = select(Conversation).where(Conversation.session_id.in_(ids))
-            if not include_messages:
-                data_stmt = data_stmt.options(
-                    load_only(
-                        Conversation.session_id,
-                        Conversation.user_id,
-                        Conversation.agent_id,
-                        Conversation.agent_name,
-                        Conversation.title,
-                        Conversation.created_at,
-                        Conversation.updated_at,
-                    )
-                )
-            res = await session.execute(data_stmt)
-            items = list(res.scalars().all())
-            order_index = {sid: idx for idx, sid in enumerate(ids)}
-            items.sort(key=lambda x: order_index.get(x.session_id, len(order_index)))
+            items = await self._load_in_order(session, ids, include_messages)
+            if backend is not None:
+                snippets = await backend.snippets(session, search, ids)
+                for item in items:
+                    item.search_snippet = snippets.get(item.session_id) or None
             return items, total
 
+    @staticmethod
+    async def _load_in_order(
+        session: Any, ids: List[str], include_messages: bool
+    ) -> List[Conversation]:
+        data_stmt = select(Conversation).where(Conversation.session_id.in_(ids))
+        if not include_messages:
+            data_stmt = data_stmt.options(
+                load_only(
+                    Conversation.session_id,
+                    Conversation.user_id,
+                    Conversation.agent_id,
+                    Conversation.agent_name,
+                    Conversation.title,
+                    Conversation.created_at,
+                    Conversation.updated_at,
+                    *LISTING_COLUMNS,
+                )
+            )
+        res = await session.execute(data_stmt)
+        items = list(res.scalars().all())
+        if not include_messages:
+            stale = [item for item in items if item.message_count is None]
+            if stale:
+                # 尚未回填的历史会话在首次列出时就地补算
+                filled = await ConversationDao._fill_listing_stats(
+                    session, [item.session_id for item in stale]
+                )
+                for item in stale:
+                    for key, value in filled.get(item.session_id, {}).items():
+                        set_committed_value(item, key, value)
+        order_index = {sid: idx for idx, sid in enumerate(ids)}
+        items.sort(key=lambda x: order_index.get(x.session_id, len(order_index)))
+        return items
+
+    async def _search_ranked(
+        self,
+        session: Any,
+        backend: ConversationSearchBackend,
+        search: str,
+        *,
+        page: int,
+        page_size: int,
+        user_id: Optional[str],
+        agent_id: Optional[str],
+        include_messages: bool,
+    ) -> tuple[List[Conversation], int]:
+        """全文检索：按 BM25 与新近度排序，命中片段挂在 ``search_snippet`` 上。
+
+        会话 ID 子串匹配、但全文未命中的会话排在全文命中之后。
+        """
+        hits, total = await backend.search(
+            session,
+            search,
+            user_id=user_id,
+            agent_id=agent_id,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+            session_id_like=f"%{search}%",
+        )
+        if not hits:
+            return [], total
+        items = await self._load_in_order(
+            session, [hit.session_id for hit in hits], include_messages
+        )
+        snippets = {hit.session_id: hit.snippet for hit in hits}
+        for item in items:
+            item.search_snippet = snippets.get(item.session_id) or None
+        return items, total
+
     async def delete_conversation(self, session_id: str) -> bool:
-        return await BaseDao.delete_by_id(self, Conversation, session_id)
+        deleted = await BaseDao.delete_by_id(self, Conversation, session_id)
+        await self._update_search_index("remove", session_id=session_id)
+        await ToolUsageDao().delete_session(session_id)
+        return deleted
 
     async def update_conversation_messages(
         self, session_id: str, messages: List[Dict[str, Any]]
     ) -> bool:
         db = await self._get_db()
         async with db.get_session() as session:  # type: ignore[attr-defined]
+            now = get_local_now()
             stmt = (
                 update(Conversation)
                 .where(Conversation.session_id == session_id)
-                .values(messages=messages or [], updated_at=get_local_now())
+                .values(
+                    messages=messages or [],
+                    updated_at=now,
+                    last_activity_at=now,
+                    **build_listing_stats(messages),
+                )
             )
             result = await session.execute(stmt)
-            return bool(result.rowcount)  # pyright: ignore[reportAttributeAccessIssue]
+            updated = bool(result.rowcount)  # pyright: ignore[reportAttributeAccessIssue]
+        if updated:
+            await self._reindex_messages(session_id, messages)
+        return updated
+
+    async def _reindex_messages(
+        self, session_id: str, messages: List[Dict[str, Any]]
+    ) -> None:
+        db = await self._get_db()
+        backend = get_conversation_search_backend(db)
+        if backend is None:
+            return
+        try:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                row = (
+                    await session.execute(
+                        select(
+                            Conversation.user_id,
+                            Conversation.agent_id,
+                            Conversation.title,
+                            Conversation.updated_at,
+                        ).where(Conversation.session_id == session_id)
+                    )
+                ).first()
+                if row is None:
+                    return
+                await backend.index(
+                    session,
+                    session_id=session_id,
+                    user_id=row.user_id,
+                    agent_id=row.agent_id,
+                    title=row.title,
+                    messages=messages,
+                    updated_at=row.updated_at,
+                )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                f"[ConversationSearch] 更新索引失败 index session_id={session_id}: {exc}"
+            )
 
     async def update_title(self, session_id: str, title: str) -> bool:
         db = await self._get_db()
@@ -222,7 +655,12 @@ class ConversationDao(BaseDao):
                 .values(title=title, updated_at=get_local_now())
             )
             result = await session.execute(stmt)
-            return bool(result.rowcount)  # pyright: ignore[reportAttributeAccessIssue]
+            updated = bool(result.rowcount)  # pyright: ignore[reportAttributeAccessIssue]
+        if updated:
+            await self._update_search_index(
+                "update_title", session_id=session_id, title=title
+            )
+        return updated
 
     async def update_timestamp(self, session_id: str) -> bool:
         """仅更新会话的 updated_at 时间戳。"""
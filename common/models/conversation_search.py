@@ -0,0 +1,506 @@
+"""会话全文检索索引（共享给 server 和 desktop）。
+
+SQLite 使用与 ``conversations`` 同库的 FTS5 虚表，按标题、消息正文建立索引，
+在会话落库时增量更新；其它数据库可通过 ``register_conversation_search_backend``
+按方言注册实现，未注册时 DAO 回退到原有的 ``LIKE`` 查询。
+
+FTS5 自带的 unicode61 分词会把连续的中日韩文字当作一个词，无法检索其中的
+片段，因此写入与查询前都把 CJK 文本切成重叠的二元组（bigram）。
+"""
+
+from __future__ import annotations
+
+import html
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+
+from loguru import logger
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from sagents.context.messages.message import is_message_client_visible
+
+# 单个会话写入索引的正文字符上限，超长会话只索引前面的部分
+SEARCH_BODY_MAX_CHARS = int(os.getenv("SAGE_CONVERSATION_SEARCH_MAX_CHARS", "100000"))
+# 新近度加权的半衰期：更新于该时长之前的会话，新近度加成减半
+SEARCH_RECENCY_HALF_LIFE_SECONDS = (
+    float(os.getenv("SAGE_CONVERSATION_SEARCH_RECENCY_DAYS", "30")) * 86400
+)
+
+# 假名、CJK 统一表意文字（含扩展 A 与兼容区）、韩文音节
+_CJK_RUN = re.compile(
+    "[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+"
+)
+_WHITESPACE = re.compile(r"\s+")
+_SEARCH_ROLES = ("user", "assistant")
+
+
+def cjk_bigrams(value: str, *, query: bool = False) -> str:
+    """把 CJK 连续文本切成以空格分隔的重叠二元组，其余文本保持不变。
+
+    写入时额外保留每段的末字，使任意单字都是某个词元的前缀；查询时不保留，
+    以便多字查询作为短语匹配连续的二元组。
+    """
+
+    def split(match: "re.Match[str]") -> str:
+        run = match.group(0)
+        if len(run) == 1:
+            return f" {run} "
+        grams = [run[i : i + 2] for i in range(len(run) - 1)]
+        if not query:
+            grams.append(run[-1])
+        return " " + " ".join(grams) + " "
+
+    return _CJK_RUN.sub(split, value)
+
+
+def extract_search_text(messages: Optional[Sequence[Any]]) -> str:
+    """提取用户与助手可见消息的文本，作为会话的检索正文。"""
+    parts: List[str] = []
+    size = 0
+    for message in messages or []:
+        if not isinstance(message, dict) or message.get("role") not in _SEARCH_ROLES:
+            continue
+        if not is_message_client_visible(message):
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(
+                str(item.get("text") or "")
+                for item in content
+                if isinstance(item, dict) and item.get("type") == "text"
+            )
+        if not isinstance(content, str) or not content.strip():
+            continue
+        parts.append(content)
+        size += len(content) + 1
+        if size >= SEARCH_BODY_MAX_CHARS:
+            break
+    return "\n".join(parts)[:SEARCH_BODY_MAX_CHARS]
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """把用户输入转换为 FTS5 查询：每个词一个前缀短语，词之间为 AND。
+
+    输入中没有任何可检索字符时返回 ``None``，调用方应回退到 ``LIKE``。
+    """
+    phrases = []
+    for term in search.split():
+        tokens = cjk_bigrams(term, query=True).strip()
+        if not any(char.isalnum() for char in tokens):
+            continue
+        phrases.append('"' + tokens.replace('"', '""') + '"*')
+    return " ".join(phrases) or None
+
+
+def build_snippet(body: str, search: str, *, width: int = 96) -> str:
+    """围绕首个命中位置截取正文片段，命中词用 ``<mark>`` 包裹，其余内容做 HTML 转义。"""
+    terms = sorted({term for term in search.split() if term}, key=len, reverse=True)
+    if not body or not terms:
+        return ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(body)
+    start = max(0, first.start() - width // 4) if first else 0
+    end = min(len(body), start + width)
+    segment = body[start:end]
+
+    pieces: List[str] = []
+    cursor = 0
+    for match in pattern.finditer(segment):
+        pieces.append(html.escape(segment[cursor : match.start()]))
+        pieces.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        cursor = match.end()
+    pieces.append(html.escape(segment[cursor:]))
+    snippet = _WHITESPACE.sub(" ", "".join(pieces)).strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(body):
+        snippet += "…"
+    return snippet
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    return value.timestamp() if isinstance(value, datetime) else time.time()
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    session_id: str
+    snippet: str
+    score: float
+
+
+@dataclass(frozen=True)
+class SearchDocument:
+    session_id: str
+    user_id: str
+    agent_id: str
+    title: str
+    messages: Optional[Sequence[Any]]
+    updated_at: Optional[datetime] = None
+
+
+class ConversationSearchBackend(ABC):
+    """会话检索后端。所有方法都在调用方提供的数据库会话中执行。"""
+
+    @abstractmethod
+    async def ready(self, session: AsyncSession) -> bool:
+        """准备索引结构；后端在当前数据库不可用时返回 False。"""
+
+    @abstractmethod
+    async def index_many(
+        self, session: AsyncSession, documents: Sequence[SearchDocument]
+    ) -> None:
+        """写入或覆盖一批会话的索引。"""
+
+    async def index(self, session: AsyncSession, **fields: Any) -> None:
+        await self.index_many(session, [SearchDocument(**fields)])
+
+    @abstractmethod
+    async def update_title(
+        self, session: AsyncSession, session_id: str, title: str
+    ) -> None: ...
+
+    @abstractmethod
+    async def remove(self, session: AsyncSession, session_id: str) -> None: ...
+
+    @abstractmethod
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        *,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        session_id_like: Optional[str] = None,
+    ) -> Tuple[List[SearchHit], int]:
+        """按相关度（BM25 叠加新近度）排序返回一页命中及命中总数。
+
+        ``session_id_like`` 非空时，会话 ID 匹配该 ``LIKE`` 模式、但全文未命中的
+        会话也计入结果，按更新时间排在全文命中之后。
+        """
+
+    @abstractmethod
+    def match_clause(self, query: str) -> Any:
+        """返回可用于 ``Conversation.session_id.in_()`` 的命中子查询。"""
+
+    async def snippets(
+        self, session: AsyncSession, query: str, session_ids: Sequence[str]
+    ) -> Dict[str, str]:
+        """为一组会话生成命中片段；不支持的后端返回空字典。"""
+        return {}
+
+    @abstractmethod
+    async def missing_session_ids(self, session: AsyncSession, limit: int) -> List[str]:
+        """返回尚未建立索引的会话，供回填任务使用。"""
+
+
+_FTS_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS conversation_search_docs (
+        doc_id INTEGER PRIMARY KEY,
+        session_id TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversation_search USING fts5(
+        session_id,
+        title,
+        body,
+        scope,
+        updated_ts UNINDEXED,
+        body_text UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+)
+
+# bm25 列权重依次对应 session_id、title、body、scope（scope 只用于过滤）
+_FTS_SCORE = (
+    "bm25(conversation_search, 1.0, 8.0, 1.0, 0.0)"
+    " * (1.0 + 1.0 / (1.0 + max(:now - updated_ts, 0) / :half_life))"
+)
+_FTS_TEXT_COLUMNS = "{session_id title body}"
+
+
+def _scope_token(prefix: str, value: str) -> str:
+    # 十六进制编码保证任意 ID 都是单个词元，且只能被精确匹配
+    return prefix + (value or "").encode("utf-8").hex()
+
+
+class SqliteFtsConversationSearch(ConversationSearchBackend):
+    """基于 SQLite FTS5 的会话检索。
+
+    ``conversation_search_docs`` 为每个会话分配稳定的整数 rowid，增量更新按
+    rowid 定位 FTS 行。用户与 Agent 以编码后的词元写入 ``scope`` 列，过滤时与
+    查询词一起走倒排索引，而不是在全部命中上逐行比较。``body_text`` 保存原文，
+    仅用于生成命中片段。
+    """
+
+    def __init__(self) -> None:
+        self._available: Optional[bool] = None
+
+    async def ready(self, session: AsyncSession) -> bool:
+        if self._available is None:
+            try:
+                for statement in _FTS_SCHEMA:
+                    await session.execute(text(statement))
+                self._available = True
+            except OperationalError as exc:
+                logger.warning(f"[ConversationSearch] FTS5 不可用，回退 LIKE: {exc}")
+                self._available = False
+        return self._available
+
+    async def _doc_id(self, session: AsyncSession, session_id: str) -> Optional[int]:
+        return (
+            await session.execute(
+                text(
+                    "SELECT doc_id FROM conversation_search_docs WHERE session_id = :sid"
+                ),
+                {"sid": session_id},
+            )
+        ).scalar()
+
+    async def index_many(
+        self, session: AsyncSession, documents: Sequence[SearchDocument]
+    ) -> None:
+        if not documents or not await self.ready(session):
+            return
+        session_ids = [document.session_id for document in documents]
+        await session.execute(
+            text(
+                "INSERT OR IGNORE INTO conversation_search_docs (session_id) VALUES (:sid)"
+            ),
+            [{"sid": session_id} for session_id in session_ids],
+        )
+        doc_ids = dict(
+            (
+                await session.execute(
+                    text(
+                        "SELECT session_id, doc_id FROM conversation_search_docs "
+                        "WHERE session_id IN :sids"
+                    ).bindparams(bindparam("sids", expanding=True)),
+                    {"sids": session_ids},
+                )
+            ).all()
+        )
+        await session.execute(
+            text("DELETE FROM conversation_search WHERE rowid = :doc_id"),
+            [{"doc_id": doc_ids[session_id]} for session_id in session_ids],
+        )
+        rows = []
+        for document in documents:
+            body = extract_search_text(document.messages)
+            rows.append(
+                {
+                    "doc_id": doc_ids[document.session_id],
+                    "sid": document.session_id,
+                    "title": cjk_bigrams(document.title or ""),
+                    "body": cjk_bigrams(body),
+                    "scope": _scope_token("u", document.user_id)
+                    + " "
+                    + _scope_token("a", document.agent_id),
+                    "ts": _timestamp(document.updated_at),
+                    "body_text": body,
+                }
+            )
+        await session.execute(
+            text(
+                "INSERT INTO conversation_search "
+                "(rowid, session_id, title, body, scope, updated_ts, body_text) "
+                "VALUES (:doc_id, :sid, :title, :body, :scope, :ts, :body_text)"
+            ),
+            rows,
+        )
+
+    async def update_title(
+        self, session: AsyncSession, session_id: str, title: str
+    ) -> None:
+        if not await self.ready(session):
+            return
+        doc_id = await self._doc_id(session, session_id)
+        if doc_id is None:
+            return
+        await session.execute(
+            text(
+                "UPDATE conversation_search SET title = :title, updated_ts = :ts "
+                "WHERE rowid = :doc_id"
+            ),
+            {"title": cjk_bigrams(title or ""), "ts": time.time(), "doc_id": doc_id},
+        )
+
+    async def remove(self, session: AsyncSession, session_id: str) -> None:
+        if not await self.ready(session):
+            return
+        doc_id = await self._doc_id(session, session_id)
+        if doc_id is None:
+            return
+        await session.execute(
+            text("DELETE FROM conversation_search WHERE rowid = :doc_id"),
+            {"doc_id": doc_id},
+        )
+        await session.execute(
+            text("DELETE FROM conversation_search_docs WHERE doc_id = :doc_id"),
+            {"doc_id": doc_id},
+        )
+
+    @staticmethod
+    def _match_expression(
+        query: str, user_id: Optional[str] = None, agent_id: Optional[str] = None
+    ) -> Optional[str]:
+        match = build_match_query(query)
+        if match is None:
+            return None
+        expression = f"{_FTS_TEXT_COLUMNS} : ({match})"
+        if user_id:
+            expression = f"scope : {_scope_token('u', user_id)} AND {expression}"
+        if agent_id:
+            expression = f"scope : {_scope_token('a', agent_id)} AND {expression}"
+        return expression
+
+    async def search(
+        self,
+        session: AsyncSession,
+        query: str,
+        *,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        session_id_like: Optional[str] = None,
+    ) -> Tuple[List[SearchHit], int]:
+        match = self._match_expression(query, user_id, agent_id)
+        if match is None or not await self.ready(session):
+            return [], 0
+        params: Dict[str, Any] = {
+            "match": match,
+            "now": time.time(),
+            "half_life": SEARCH_RECENCY_HALF_LIFE_SECONDS,
+            "limit": limit,
+            "offset": offset,
+        }
+        hits_sql = (
+            f"SELECT session_id, body_text, {_FTS_SCORE} AS score "
+            "FROM conversation_search WHERE conversation_search MATCH :match"
+        )
+        if session_id_like is None:
+            count_sql = (
+                "SELECT count(*) FROM conversation_search "
+                "WHERE conversation_search MATCH :match"
+            )
+            page_sql = f"{hits_sql} ORDER BY score LIMIT :limit OFFSET :offset"
+        else:
+            # 会话 ID 的子串匹配不在倒排索引里，单独查会话表后接在全文命中之后
+            id_sql = (
+                "SELECT c.session_id, "
+                "ROW_NUMBER() OVER (ORDER BY c.updated_at DESC) AS score "
+                "FROM conversations c WHERE c.session_id LIKE :id_like"
+            )
+            if user_id:
+                id_sql += " AND c.user_id = :user_id"
+                params["user_id"] = user_id
+            if agent_id:
+                id_sql += " AND c.agent_id = :agent_id"
+                params["agent_id"] = agent_id
+            params["id_like"] = session_id_like
+            count_sql = (
+                "SELECT count(*) FROM (SELECT session_id FROM conversation_search "
+                "WHERE conversation_search MATCH :match "
+                f"UNION SELECT session_id FROM ({id_sql}))"
+            )
+            page_sql = (
+                f"SELECT session_id, body_text, score, 0 AS id_only FROM ({hits_sql}) "
+                "UNION ALL "
+                "SELECT i.session_id, s.body_text, i.score, 1 AS id_only "
+                f"FROM ({id_sql}) i "
+                "LEFT JOIN conversation_search_docs d ON d.session_id = i.session_id "
+                "LEFT JOIN conversation_search s ON s.rowid = d.doc_id "
+                "WHERE i.session_id NOT IN (SELECT session_id FROM "
+                "conversation_search WHERE conversation_search MATCH :match) "
+                "ORDER BY id_only, score LIMIT :limit OFFSET :offset"
+            )
+        total = (await session.execute(text(count_sql), params)).scalar()
+        rows = (await session.execute(text(page_sql), params)).all()
+        hits = [
+            SearchHit(session_id, build_snippet(body_text or "", query), score)
+            for session_id, body_text, score, *_ in rows
+        ]
+        return hits, int(total or 0)
+
+    async def snippets(
+        self, session: AsyncSession, query: str, session_ids: Sequence[str]
+    ) -> Dict[str, str]:
+        if not session_ids or not await self.ready(session):
+            return {}
+        rows = await session.execute(
+            text(
+                "SELECT d.session_id, s.body_text FROM conversation_search_docs d "
+                "JOIN conversation_search s ON s.rowid = d.doc_id "
+                "WHERE d.session_id IN :sids"
+            ).bindparams(bindparam("sids", expanding=True)),
+            {"sids": list(session_ids)},
+        )
+        return {
+            session_id: build_snippet(body_text or "", query)
+            for session_id, body_text in rows.all()
+        }
+
+    def match_clause(self, query: str) -> Any:
+        return text(
+            "SELECT session_id FROM conversation_search "
+            "WHERE conversation_search MATCH :search_match"
+        ).bindparams(search_match=self._match_expression(query) or "")
+
+    async def missing_session_ids(self, session: AsyncSession, limit: int) -> List[str]:
+        if not await self.ready(session):
+            return []
+        rows = await session.execute(
+            text(
+                "SELECT c.session_id FROM conversations c "
+                "WHERE NOT EXISTS (SELECT 1 FROM conversation_search_docs d "
+                "WHERE d.session_id = c.session_id) LIMIT :limit"
+            ),
+            {"limit": limit},
+        )
+        return list(rows.scalars().all())
+
+
+_BACKEND_FACTORIES: Dict[str, Callable[[], ConversationSearchBackend]] = {
+    "sqlite": SqliteFtsConversationSearch,
+}
+_backends: "WeakKeyDictionary[Any, ConversationSearchBackend]" = WeakKeyDictionary()
+
+
+def register_conversation_search_backend(
+    dialect: str, factory: Optional[Callable[[], ConversationSearchBackend]]
+) -> None:
+    """为某个数据库方言注册（或用 ``None`` 取消）检索后端。"""
+    if factory is None:
+        _BACKEND_FACTORIES.pop(dialect, None)
+    else:
+        _BACKEND_FACTORIES[dialect] = factory
+    _backends.clear()
+
+
+def get_conversation_search_backend(db: Any) -> Optional[ConversationSearchBackend]:
+    """返回 DB 客户端对应的检索后端；方言未注册时返回 None。"""
+    engine = getattr(db, "_engine", None)
+    if engine is None:
+        return None
+    backend = _backends.get(db)
+    if backend is None:
+        factory = _BACKEND_FACTORIES.get(engine.dialect.name)
+        if factory is None:
+            return None
+        backend = factory()
+        _backends[db] = backend
+    return backend
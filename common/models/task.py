@@ -374,8 +374,12 @@ class TaskDao(BaseDao):
         *,
         user_id: Optional[str] = None,
         limit: int = 100,
+        due_before: Optional[datetime] = None,
     ) -> List[Task]:
-        where = [Task.status == "pending", Task.execute_at <= get_local_now()]
+        where = [
+            Task.status == "pending",
+            Task.execute_at <= (due_before or get_local_now()),
+        ]
         if user_id:
             where.append(Task.user_id == user_id)
         return await self.get_list(
@@ -1,15 +1,57 @@
-"""Token usage ORM + DAO (shared by server and desktop)."""
+"""Token usage ORM + DAO (shared by server and desktop).
+
+明细表 ``token_usage`` 之外维护按小时、按天的汇总表。压实任务按写入时间
+（``created_at``）增量把明细累加进汇总，并推进水位线；统计查询把完整覆盖的
+天/小时桶取自汇总表，区间边缘与水位线之后的明细仍取自原始表，两者按水位线
+互斥拼接，因此结果与直接聚合明细一致。
+"""
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import DateTime, Index, Integer, String, func, select
+from loguru import logger
+from sqlalchemy import (
+    DateTime,
+    Index,
+    Integer,
+    String,
+    and_,
+    bindparam,
+    case,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Mapped, mapped_column
 
 from common.models.base import Base, BaseDao, get_local_now
 
+# 压实只处理写入超过该秒数的明细，给并发中尚未提交的写入留出余量
+TOKEN_USAGE_ROLLUP_LAG_SECONDS = int(
+    os.getenv("SAGE_TOKEN_USAGE_ROLLUP_LAG_SECONDS", "60")
+)
+# 服务端定时压实的间隔
+TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS = int(
+    os.getenv("SAGE_TOKEN_USAGE_ROLLUP_INTERVAL_SECONDS", "300")
+)
+# 单个压实事务处理的写入时间跨度
+TOKEN_USAGE_ROLLUP_CHUNK = timedelta(
+    hours=float(os.getenv("SAGE_TOKEN_USAGE_ROLLUP_CHUNK_HOURS", "24"))
+)
+_ROLLUP_STATE_NAME = "token_usage"
+# 水位线为空时的下界，早于任何明细的写入时间
+_EPOCH = datetime(1970, 1, 1)
+_UPSERT_CHUNK = 500
+
 
 class TokenUsage(Base):
     __tablename__ = "token_usage"
@@ -18,6 +60,7 @@ class TokenUsage(Base):
         Index("idx_token_usage_agent_finished_at", "agent_id", "finished_at"),
         Index("idx_token_usage_session_finished_at", "session_id", "finished_at"),
         Index("idx_token_usage_finished_at", "finished_at"),
+        Index("idx_token_usage_created_at", "created_at"),
     )
 
     id: Mapped[str] = mapped_column(String(64), primary_key=True)
@@ -84,10 +127,371 @@ class TokenUsage(Base):
         self.created_at = created_at or get_local_now()
 
 
+class _TokenUsageRollup:
+    """汇总表公共列。``started_at``/``finished_at`` 为桶内最早开始、最晚结束时间。"""
+
+    # 由桶起点与维度组合计算的摘要，避免超长联合主键
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    session_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    user_id: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    agent_id: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    request_source: Mapped[str] = mapped_column(String(128), nullable=False, default="")
+    input_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    step_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class TokenUsageHourly(_TokenUsageRollup, Base):
+    __tablename__ = "token_usage_hourly"
+    __table_args__ = (
+        Index("idx_token_usage_hourly_bucket_user", "bucket_start", "user_id"),
+        Index("idx_token_usage_hourly_bucket_agent", "bucket_start", "agent_id"),
+    )
+
+
+class TokenUsageDaily(_TokenUsageRollup, Base):
+    __tablename__ = "token_usage_daily"
+    __table_args__ = (
+        Index("idx_token_usage_daily_bucket_user", "bucket_start", "user_id"),
+        Index("idx_token_usage_daily_bucket_agent", "bucket_start", "agent_id"),
+    )
+
+
+class TokenUsageRollupState(Base):
+    """压实水位线：``created_at`` 不晚于水位线的明细已计入汇总表。"""
+
+    __tablename__ = "token_usage_rollup_state"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    watermark: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+_ROLLUPS = (
+    (TokenUsageHourly, timedelta(hours=1)),
+    (TokenUsageDaily, timedelta(days=1)),
+)
+
+
+def _floor(value: datetime, unit: timedelta) -> datetime:
+    if unit >= timedelta(days=1):
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil(value: datetime, unit: timedelta) -> datetime:
+    floored = _floor(value, unit)
+    return floored if floored == value else floored + unit
+
+
+def _rollup_id(bucket_start: datetime, key: Tuple[str, ...]) -> str:
+    raw = "\x1f".join((bucket_start.isoformat(), *key))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _rollup_increment(table: Any) -> Any:
+    """把一批增量累加到已有汇总行的 executemany 语句（参数名带 ``b_`` 前缀）。"""
+    started_at = bindparam("b_started_at")
+    finished_at = bindparam("b_finished_at")
+    values: Dict[str, Any] = {
+        column: table.c[column] + bindparam(f"b_{column}")
+        for column in (
+            "input_tokens",
+            "output_tokens",
+            "total_tokens",
+            "step_count",
+            "record_count",
+        )
+    }
+    values["started_at"] = case(
+        (table.c.started_at <= started_at, table.c.started_at), else_=started_at
+    )
+    values["finished_at"] = case(
+        (table.c.finished_at >= finished_at, table.c.finished_at), else_=finished_at
+    )
+    return update(table).where(table.c.id == bindparam("b_id")).values(values)
+
+
+def _between(column: Any, lower: Optional[datetime], upper: Optional[datetime]) -> Any:
+    """半开区间 [lower, upper)，None 表示不设界。"""
+    conditions = []
+    if lower is not None:
+        conditions.append(column >= lower)
+    if upper is not None:
+        conditions.append(column < upper)
+    return and_(*conditions) if conditions else literal(True)
+
+
+def _usage_source(
+    filters: Dict[str, Optional[str]],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Any:
+    """拼接汇总桶与明细，返回与 ``token_usage`` 同名列的子查询。"""
+    # 原接口的 end_time 是闭区间，这里统一换成半开区间
+    end = end_time + timedelta(microseconds=1) if end_time is not None else None
+    watermark = func.coalesce(
+        select(TokenUsageRollupState.watermark)
+        .where(TokenUsageRollupState.name == _ROLLUP_STATE_NAME)
+        .scalar_subquery(),
+        _EPOCH,
+    )
+
+    def part(model: Any, *conditions: Any) -> Any:
+        where = [
+            getattr(model, key) == value
+            for key, value in filters.items()
+            if value is not None
+        ]
+        return select(
+            model.session_id,
+            model.user_id,
+            model.agent_id,
+            model.input_tokens,
+            model.output_tokens,
+            model.total_tokens,
+            model.step_count,
+            model.started_at,
+            model.finished_at,
+        ).where(*where, *conditions)
+
+    # 水位线之后写入的明细：尚未计入任何汇总。先按 created_at 索引取出这批
+    # 明细，避免查询计划沿 finished_at 索引扫描整个时间范围
+    parts = [
+        part(
+            TokenUsage,
+            TokenUsage.id.in_(
+                select(TokenUsage.id).where(TokenUsage.created_at > watermark)
+            ),
+            _between(TokenUsage.finished_at, start_time, end),
+        )
+    ]
+    hour_lo = _ceil(start_time, timedelta(hours=1)) if start_time else None
+    hour_hi = _floor(end, timedelta(hours=1)) if end else None
+    compacted = TokenUsage.created_at <= watermark
+    if hour_lo is not None and hour_hi is not None and hour_lo >= hour_hi:
+        # 区间内没有完整的小时桶，已压实部分也直接取明细
+        parts.append(
+            part(
+                TokenUsage,
+                compacted,
+                _between(TokenUsage.finished_at, start_time, end),
+            )
+        )
+    else:
+        day_lo = _ceil(start_time, timedelta(days=1)) if start_time else None
+        day_hi = _floor(end, timedelta(days=1)) if end else None
+        if day_lo is not None and day_hi is not None and day_lo >= day_hi:
+            parts.append(
+                part(
+                    TokenUsageHourly,
+                    _between(TokenUsageHourly.bucket_start, hour_lo, hour_hi),
+                )
+            )
+        else:
+            parts.append(
+                part(
+                    TokenUsageDaily,
+                    _between(TokenUsageDaily.bucket_start, day_lo, day_hi),
+                )
+            )
+            if start_time is not None:
+                parts.append(
+                    part(
+                        TokenUsageHourly,
+                        _between(TokenUsageHourly.bucket_start, hour_lo, day_lo),
+                    )
+                )
+            if end is not None:
+                parts.append(
+                    part(
+                        TokenUsageHourly,
+                        _between(TokenUsageHourly.bucket_start, day_hi, hour_hi),
+                    )
+                )
+        if start_time is not None:
+            parts.append(
+                part(
+                    TokenUsage,
+                    compacted,
+                    _between(TokenUsage.finished_at, start_time, hour_lo),
+                )
+            )
+        if end is not None:
+            parts.append(
+                part(
+                    TokenUsage,
+                    compacted,
+                    _between(TokenUsage.finished_at, hour_hi, end),
+                )
+            )
+    return union_all(*parts).subquery("usage")
+
+
 class TokenUsageDao(BaseDao):
     async def save_usage(self, token_usage: TokenUsage) -> bool:
         return await BaseDao.save(self, token_usage)
 
+    async def compact_rollups(
+        self, *, lag_seconds: Optional[int] = None, now: Optional[datetime] = None
+    ) -> int:
+        """把水位线之后写入的明细累加进小时/天汇总表，返回处理的明细条数。
+
+        按 ``created_at`` 分段推进水位线，每段一个事务；迟到的明细（``finished_at``
+        早于已汇总的桶）同样按写入时间被拾取并累加进对应的旧桶。多个进程同时压实
+        时通过水位线的比较更新保证同一段只会被处理一次。
+        """
+        lag = TOKEN_USAGE_ROLLUP_LAG_SECONDS if lag_seconds is None else lag_seconds
+        # MySQL 的 DATETIME 只保存到秒（小数部分四舍五入），分段边界取整秒，
+        # 否则 12:00:00.6 写入的明细存为 12:00:01，会落在 upper=12:00:00.7
+        # 与水位线 12:00:01 之间，永远不会被汇总
+        cutoff = ((now or get_local_now()) - timedelta(seconds=lag)).replace(
+            microsecond=0
+        )
+        db = await self._get_db()
+        try:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                if await session.get(TokenUsageRollupState, _ROLLUP_STATE_NAME) is None:
+                    session.add(TokenUsageRollupState(name=_ROLLUP_STATE_NAME))
+        except IntegrityError:
+            pass
+
+        compacted = 0
+        while True:
+            async with db.get_session() as session:  # type: ignore[attr-defined]
+                watermark = (
+                    await session.execute(
+                        select(TokenUsageRollupState.watermark).where(
+                            TokenUsageRollupState.name == _ROLLUP_STATE_NAME
+                        )
+                    )
+                ).scalar()
+                lower = watermark or _EPOCH
+                if lower >= cutoff:
+                    break
+                next_created = (
+                    await session.execute(
+                        select(func.min(TokenUsage.created_at)).where(
+                            TokenUsage.created_at > lower
+                        )
+                    )
+                ).scalar()
+                if next_created is None or next_created > cutoff:
+                    upper = cutoff
+                else:
+                    upper = min(
+                        (next_created + TOKEN_USAGE_ROLLUP_CHUNK).replace(
+                            microsecond=0
+                        ),
+                        cutoff,
+                    )
+
+                claimed = await session.execute(
+                    update(TokenUsageRollupState)
+                    .where(
+                        TokenUsageRollupState.name == _ROLLUP_STATE_NAME,
+                        TokenUsageRollupState.watermark.is_(None)
+                        if watermark is None
+                        else TokenUsageRollupState.watermark == watermark,
+                    )
+                    .values(watermark=upper)
+                    .execution_options(synchronize_session=False)
+                )
+                if not claimed.rowcount:  # pyright: ignore[reportAttributeAccessIssue]
+                    # 其它进程已推进水位线
+                    break
+                rows = (
+                    await session.execute(
+                        select(
+                            TokenUsage.session_id,
+                            TokenUsage.user_id,
+                            TokenUsage.agent_id,
+                            TokenUsage.request_source,
+                            TokenUsage.input_tokens,
+                            TokenUsage.output_tokens,
+                            TokenUsage.total_tokens,
+                            TokenUsage.step_count,
+                            TokenUsage.started_at,
+                            TokenUsage.finished_at,
+                        ).where(
+                            TokenUsage.created_at > lower,
+                            TokenUsage.created_at <= upper,
+                        )
+                    )
+                ).all()
+                for model, unit in _ROLLUPS:
+                    await self._merge_rollup(session, model, unit, rows)
+                compacted += len(rows)
+            await asyncio.sleep(0)
+        if compacted:
+            logger.info(f"[TokenUsage] 汇总压实完成，处理 {compacted} 条明细")
+        return compacted
+
+    @staticmethod
+    async def _merge_rollup(
+        session: Any, model: Any, unit: timedelta, rows: List[Any]
+    ) -> None:
+        buckets: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            bucket_start = _floor(row.finished_at, unit)
+            key = (row.session_id, row.user_id, row.agent_id, row.request_source)
+            rollup_id = _rollup_id(bucket_start, key)
+            acc = buckets.get(rollup_id)
+            if acc is None:
+                buckets[rollup_id] = {
+                    "id": rollup_id,
+                    "bucket_start": bucket_start,
+                    "session_id": row.session_id,
+                    "user_id": row.user_id,
+                    "agent_id": row.agent_id,
+                    "request_source": row.request_source,
+                    "input_tokens": row.input_tokens,
+                    "output_tokens": row.output_tokens,
+                    "total_tokens": row.total_tokens,
+                    "step_count": row.step_count,
+                    "record_count": 1,
+                    "started_at": row.started_at,
+                    "finished_at": row.finished_at,
+                }
+                continue
+            acc["input_tokens"] += row.input_tokens
+            acc["output_tokens"] += row.output_tokens
+            acc["total_tokens"] += row.total_tokens
+            acc["step_count"] += row.step_count
+            acc["record_count"] += 1
+            acc["started_at"] = min(acc["started_at"], row.started_at)
+            acc["finished_at"] = max(acc["finished_at"], row.finished_at)
+
+        table = model.__table__
+        ids = list(buckets)
+        existing: set = set()
+        for offset in range(0, len(ids), _UPSERT_CHUNK):
+            chunk = ids[offset : offset + _UPSERT_CHUNK]
+            existing.update(
+                (
+                    await session.execute(
+                        select(table.c.id).where(table.c.id.in_(chunk))
+                    )
+                ).scalars()
+            )
+        if existing:
+            await session.execute(
+                _rollup_increment(table),
+                [
+                    {f"b_{key}": value for key, value in buckets[rollup_id].items()}
+                    for rollup_id in existing
+                ],
+            )
+        inserts = [
+            acc for rollup_id, acc in buckets.items() if rollup_id not in existing
+        ]
+        if inserts:
+            await session.execute(insert(table), inserts)
+
     async def get_stats(
         self,
         *,
@@ -99,83 +503,72 @@ class TokenUsageDao(BaseDao):
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
     ) -> Dict[str, Any]:
+        usage = _usage_source(
+            {
+                "user_id": user_id,
+                "agent_id": agent_id,
+                "session_id": session_id,
+                "request_source": request_source,
+            },
+            start_time,
+            end_time,
+        )
         dimension_map = {
-            "agent": ("agent_id", TokenUsage.agent_id),
-            "user": ("user_id", TokenUsage.user_id),
-            "session": ("session_id", TokenUsage.session_id),
+            "agent": ("agent_id", usage.c.agent_id),
+            "user": ("user_id", usage.c.user_id),
+            "session": ("session_id", usage.c.session_id),
         }
         if dimension not in dimension_map:
             raise ValueError(f"Unsupported dimension: {dimension}")
 
         dimension_key, dimension_column = dimension_map[dimension]
-        where = []
-        if user_id is not None:
-            where.append(TokenUsage.user_id == user_id)
-        if agent_id is not None:
-            where.append(TokenUsage.agent_id == agent_id)
-        if session_id is not None:
-            where.append(TokenUsage.session_id == session_id)
-        if request_source is not None:
-            where.append(TokenUsage.request_source == request_source)
-        if start_time is not None:
-            where.append(TokenUsage.finished_at >= start_time)
-        if end_time is not None:
-            where.append(TokenUsage.finished_at <= end_time)
 
         db = await self._get_db()
         async with db.get_session() as session:  # type: ignore[attr-defined]
             summary_stmt = select(
-                func.coalesce(func.sum(TokenUsage.input_tokens), 0).label(
-                    "input_tokens"
-                ),
-                func.coalesce(func.sum(TokenUsage.output_tokens), 0).label(
+                func.coalesce(func.sum(usage.c.input_tokens), 0).label("input_tokens"),
+                func.coalesce(func.sum(usage.c.output_tokens), 0).label(
                     "output_tokens"
                 ),
-                func.coalesce(func.sum(TokenUsage.total_tokens), 0).label(
-                    "total_tokens"
-                ),
-                func.count(func.distinct(TokenUsage.session_id)).label("session_count"),
-                func.coalesce(func.sum(TokenUsage.step_count), 0).label(
+                func.coalesce(func.sum(usage.c.total_tokens), 0).label("total_tokens"),
+                func.count(func.distinct(usage.c.session_id)).label("session_count"),
+                func.coalesce(func.sum(usage.c.step_count), 0).label(
                     "model_call_count"
                 ),
             )
-            for cond in where:
-                summary_stmt = summary_stmt.where(cond)
             summary_row = (await session.execute(summary_stmt)).mappings().one()
 
             items_stmt = (
                 select(
                     dimension_column.label(dimension_key),
-                    func.coalesce(func.sum(TokenUsage.input_tokens), 0).label(
+                    func.coalesce(func.sum(usage.c.input_tokens), 0).label(
                         "input_tokens"
                     ),
-                    func.coalesce(func.sum(TokenUsage.output_tokens), 0).label(
+                    func.coalesce(func.sum(usage.c.output_tokens), 0).label(
                         "output_tokens"
                     ),
-                    func.coalesce(func.sum(TokenUsage.total_tokens), 0).label(
+                    func.coalesce(func.sum(usage.c.total_tokens), 0).label(
                         "total_tokens"
                     ),
-                    func.count(func.distinct(TokenUsage.session_id)).label(
+                    func.count(func.distinct(usage.c.session_id)).label(
                         "session_count"
                     ),
-                    func.coalesce(func.sum(TokenUsage.step_count), 0).label(
+                    func.coalesce(func.sum(usage.c.step_count), 0).label(
                         "model_call_count"
                     ),
-                    func.min(TokenUsage.started_at).label("started_at"),
-                    func.max(TokenUsage.finished_at).label("finished_at"),
-                    func.min(TokenUsage.user_id).label("resolved_user_id"),
-                    func.count(func.distinct(TokenUsage.user_id)).label("user_count"),
-                    func.min(TokenUsage.agent_id).label("resolved_agent_id"),
-                    func.count(func.distinct(TokenUsage.agent_id)).label("agent_count"),
+                    func.min(usage.c.started_at).label("started_at"),
+                    func.max(usage.c.finished_at).label("finished_at"),
+                    func.min(usage.c.user_id).label("resolved_user_id"),
+                    func.count(func.distinct(usage.c.user_id)).label("user_count"),
+                    func.min(usage.c.agent_id).label("resolved_agent_id"),
+                    func.count(func.distinct(usage.c.agent_id)).label("agent_count"),
                 )
                 .group_by(dimension_column)
                 .order_by(
-                    func.coalesce(func.sum(TokenUsage.total_tokens), 0).desc(),
-                    func.max(TokenUsage.finished_at).desc(),
+                    func.coalesce(func.sum(usage.c.total_tokens), 0).desc(),
+                    func.max(usage.c.finished_at).desc(),
                 )
             )
-            for cond in where:
-                items_stmt = items_stmt.where(cond)
             item_rows = (await session.execute(items_stmt)).mappings().all()
 
         items: List[Dict[str, Any]] = []
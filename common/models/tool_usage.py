@@ -0,0 +1,143 @@
+"""Tool usage ORM + DAO (shared by server and desktop).
+
+``tool_usage`` 按（会话, 工具）保存调用次数，冗余会话的 user_id / agent_id /
+updated_at，会话落库时整体替换该会话的行；统计接口因此是一次按索引过滤的
+聚合，不再逐个读取会话目录下的 ``tools_usage.json``。
+``tool_usage_sessions`` 记录已同步过的会话（包括没有任何工具调用的会话），
+用于补建升级前的历史数据。
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import DateTime, Index, Integer, String, delete, func, insert, select
+from sqlalchemy.orm import Mapped, mapped_column
+
+from common.models.base import Base, BaseDao, get_local_now
+
+
+class ToolUsage(Base):
+    __tablename__ = "tool_usage"
+    __table_args__ = (
+        Index("idx_tool_usage_user_updated_at", "user_id", "updated_at"),
+        Index("idx_tool_usage_agent_updated_at", "agent_id", "updated_at"),
+        Index("idx_tool_usage_updated_at", "updated_at"),
+    )
+
+    session_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    tool_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    agent_id: Mapped[str] = mapped_column(String(255), nullable=False, default="")
+    call_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=get_local_now
+    )
+
+
+class ToolUsageSession(Base):
+    """已同步工具统计的会话；没有工具调用的会话也会记录，避免重复补建。"""
+
+    __tablename__ = "tool_usage_sessions"
+
+    session_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    synced_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=get_local_now
+    )
+
+
+def count_tool_calls(messages: Iterable[Mapping[str, Any]]) -> Dict[str, int]:
+    """统计消息里各工具的调用次数，口径与 ``tools_usage.json`` 一致。"""
+    usage: Dict[str, int] = {}
+    for message in messages or []:
+        for tool_call in (message or {}).get("tool_calls", []) or []:
+            tool_name = (tool_call or {}).get("function", {}).get("name")
+            if tool_name:
+                usage[tool_name] = usage.get(tool_name, 0) + 1
+    return usage
+
+
+async def replace_tool_usage(
+    session,
+    owners: Mapping[str, Mapping[str, Any]],
+    usages: Mapping[str, Mapping[str, int]],
+) -> None:
+    """在给定事务内整体替换会话的工具统计。
+
+    ``owners`` 为 session_id -> {user_id, agent_id, updated_at}，只有出现在其中的
+    会话会被写入；``usages`` 为 session_id -> {tool_name: count}。
+    """
+    session_ids = list(owners)
+    if not session_ids:
+        return
+    await session.execute(
+        delete(ToolUsage).where(ToolUsage.session_id.in_(session_ids))
+    )
+    await session.execute(
+        delete(ToolUsageSession).where(ToolUsageSession.session_id.in_(session_ids))
+    )
+    rows: List[Dict[str, Any]] = []
+    for session_id in session_ids:
+        owner = owners[session_id]
+        for tool_name, count in (usages.get(session_id) or {}).items():
+            if not tool_name or int(count or 0) <= 0:
+                continue
+            rows.append(
+                {
+                    "session_id": session_id,
+                    "tool_name": str(tool_name)[:255],
+                    "user_id": owner.get("user_id") or "",
+                    "agent_id": owner.get("agent_id") or "",
+                    "call_count": int(count),
+                    "updated_at": owner.get("updated_at") or get_local_now(),
+                }
+            )
+    if rows:
+        await session.execute(insert(ToolUsage), rows)
+    now = get_local_now()
+    await session.execute(
+        insert(ToolUsageSession),
+        [{"session_id": session_id, "synced_at": now} for session_id in session_ids],
+    )
+
+
+class ToolUsageDao(BaseDao):
+    """工具调用统计数据访问对象（共享 DAO）。"""
+
+    async def get_usage_stats(
+        self,
+        *,
+        updated_after: Optional[datetime] = None,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """按工具聚合调用次数，按次数降序返回；``limit`` 只保留前 N 个工具。"""
+        total = func.sum(ToolUsage.call_count).label("total")
+        stmt = select(ToolUsage.tool_name, total).group_by(ToolUsage.tool_name)
+        if user_id:
+            stmt = stmt.where(ToolUsage.user_id == user_id)
+        if agent_id:
+            stmt = stmt.where(ToolUsage.agent_id == agent_id)
+        if updated_after:
+            stmt = stmt.where(ToolUsage.updated_at >= updated_after)
+        stmt = stmt.order_by(total.desc(), ToolUsage.tool_name)
+        if limit:
+            stmt = stmt.limit(limit)
+        db = await self._get_db()
+        async with db.get_session() as session:  # type: ignore[attr-defined]
+            rows = (await session.execute(stmt)).all()
+        return {row.tool_name: int(row.total or 0) for row in rows}
+
+    async def delete_session(self, session_id: str) -> None:
+        db = await self._get_db()
+        async with db.get_session() as session:  # type: ignore[attr-defined]
+            await session.execute(
+                delete(ToolUsage).where(ToolUsage.session_id == session_id)
+            )
+            await session.execute(
+                delete(ToolUsageSession).where(
+                    ToolUsageSession.session_id == session_id
+                )
+            )
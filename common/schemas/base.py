@@ -100,6 +100,7 @@ class TauriUpdateResponse(BaseModel):
 class AgentUsageStatsRequest(BaseModel):
     days: int
     agent_id: Optional[str] = None
+    top_n: Optional[int] = Field(default=None, ge=1, le=1000)
 
 
 class AgentUsageStatsResponse(BaseModel):
@@ -14,3 +14,7 @@ class ConversationInfo(BaseModel):
     user_id: str | None = None
     trace_id: str | None = None
     trace_url: str | None = None
+    snippet: str | None = None
+    last_message: dict | None = None
+    last_activity_at: str | None = None
+    total_tokens: int | None = None
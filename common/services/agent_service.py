@@ -12,10 +12,21 @@ import threading
 import uuid
 import zipfile
 from contextlib import contextmanager
+from dataclasses import dataclass
 from io import BytesIO, StringIO
 from pathlib import Path
-from typing import Any, Dict, Iterator, List, Optional, Tuple
-from urllib.parse import urlparse
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import quote, urlparse
 
 from loguru import logger
 
@@ -33,6 +44,15 @@ from common.services.agent_workspace import (
 )
 from common.schemas.agent import AgentAbilityItem
 from common.utils.agent_mode import normalize_persisted_agent_mode
+from common.services.workspace_index import (
+    SORT_FIELDS,
+    SORT_ORDERS,
+    WORKSPACE_LISTING_DEFAULT_LIMIT,
+    WORKSPACE_LISTING_MAX_LIMIT,
+    InvalidCursorError,
+    get_workspace_index,
+)
+from common.utils.zip_stream import COMPRESSION_MODES, aiter_zip_stream
 
 try:
     import fcntl
@@ -1192,11 +1212,24 @@ async def get_server_file_workspace(
     )
 
 
+async def list_server_agent_entries(
+    agent_id: str,
+    user_id: str,
+    **options: Any,
+) -> Dict[str, Any]:
+    return await asyncio.to_thread(
+        list_workspace_entries,
+        get_server_agent_workspace_path(agent_id, user_id),
+        agent_id,
+        **options,
+    )
+
+
 async def download_server_agent_file(
     agent_id: str,
     user_id: str,
     file_path: str,
-) -> Tuple[str, str, str]:
+) -> "WorkspaceDownload":
     return await asyncio.to_thread(
         prepare_workspace_download,
         get_server_agent_workspace_path(agent_id, user_id),
@@ -1288,9 +1321,18 @@ async def get_desktop_file_workspace(
     )
 
 
+async def list_desktop_agent_entries(agent_id: str, **options: Any) -> Dict[str, Any]:
+    return await asyncio.to_thread(
+        list_workspace_entries,
+        get_desktop_agent_workspace_path(agent_id),
+        agent_id,
+        **options,
+    )
+
+
 async def download_desktop_agent_file(
     agent_id: str, file_path: str
-) -> Tuple[str, str, str]:
+) -> "WorkspaceDownload":
     return await asyncio.to_thread(
         prepare_workspace_download,
         get_desktop_agent_workspace_path(agent_id),
@@ -1676,6 +1718,94 @@ def list_workspace_files(
     }
 
 
+def list_workspace_entries(
+    workspace_path: str | Path,
+    agent_id: str,
+    path: Optional[str] = None,
+    *,
+    cursor: Optional[str] = None,
+    limit: int = WORKSPACE_LISTING_DEFAULT_LIMIT,
+    max_depth: Optional[int] = 0,
+    sort_by: str = "name",
+    order: str = "asc",
+) -> Dict[str, Any]:
+    """分页列出工作空间条目，目录元数据走 WorkspaceIndex 缓存。
+
+    ``max_depth`` 默认 0（只列直接子项），``None`` 表示不限深度；
+    翻页时把上一页返回的 ``next_cursor`` 原样传回。
+    """
+    if max_depth is not None and max_depth < 0:
+        raise SageHTTPException(
+            message_key="agent.workspace_max_depth_invalid",
+            error_detail="max_depth must be greater than or equal to 0",
+        )
+    for value, options in ((sort_by, SORT_FIELDS), (order, SORT_ORDERS)):
+        if value not in options:
+            raise SageHTTPException(
+                status_code=400,
+                message_key="agent.workspace_sort_invalid",
+                message_params={"value": value, "options": ", ".join(options)},
+                error_detail=f"Unsupported sort option: {value}",
+            )
+    if not 1 <= limit <= WORKSPACE_LISTING_MAX_LIMIT:
+        raise SageHTTPException(
+            status_code=400,
+            message_key="agent.workspace_limit_invalid",
+            message_params={"max": WORKSPACE_LISTING_MAX_LIMIT},
+            error_detail=f"limit must be between 1 and {WORKSPACE_LISTING_MAX_LIMIT}",
+        )
+
+    workspace_str = os.fspath(workspace_path)
+    listing_root = ""
+    listing_path = os.fspath(path or "").strip()
+    if workspace_str:
+        listing_root, listing_path = _resolve_workspace_listing_path(
+            workspace_str, path
+        )
+    result: Dict[str, Any] = {
+        "agent_id": agent_id,
+        "workspace_path": workspace_str,
+        "path": listing_path,
+        "max_depth": max_depth,
+        "sort_by": sort_by,
+        "order": order,
+    }
+    if not listing_root or not os.path.exists(listing_root):
+        return {
+            **result,
+            "entries": [],
+            "total": 0,
+            "truncated_by_depth": False,
+            "has_more": False,
+            "next_cursor": None,
+            "message": t("agent.workspace_empty", get_request_locale()),
+        }
+    if not os.path.isdir(listing_root):
+        raise SageHTTPException(
+            message_key="agent.workspace_not_directory",
+            message_params={"path": listing_path or "."},
+            error_detail=f"Path is not a directory: {listing_path or '.'}",
+        )
+
+    try:
+        page = get_workspace_index().list_page(
+            workspace_str,
+            listing_root,
+            max_depth=max_depth,
+            sort_by=sort_by,
+            order=order,
+            cursor=cursor,
+            limit=limit,
+        )
+    except InvalidCursorError as exc:
+        raise SageHTTPException(
+            status_code=400,
+            message_key="agent.workspace_cursor_invalid",
+            error_detail=f"Invalid cursor: {exc}",
+        ) from exc
+    return {**result, **page, "message": "获取文件列表成功"}
+
+
 def _workspace_stat_error_item(
     path: str,
     *,
@@ -1901,47 +2031,45 @@ def stat_workspace_files(
             "content_type": content_type,
         }
         if include_content_hash and not is_directory:
-            item["content_hash"] = _hash_workspace_file(full_path)
+            item["content_hash"] = get_workspace_index().content_hash(
+                full_path, file_stat
+            )
             item["hash_algorithm"] = _WORKSPACE_FILE_HASH_ALGORITHM
         files.append(item)
 
     return {"files": files}
 
 
-def _hash_workspace_file(file_path: str | Path) -> str:
-    digest = hashlib.md5()
-    with open(file_path, "rb") as file:
-        for chunk in iter(lambda: file.read(1024 * 1024), b""):
-            digest.update(chunk)
-    return digest.hexdigest()
+@dataclass(frozen=True)
+class WorkspaceDownload:
+    """下载目标：普通文件直接返回路径；目录以 zip 流式打包（``archive=True``）。"""
+
+    path: str
+    filename: str
+    media_type: str
+    archive: bool = False
+
+    @property
+    def content_disposition(self) -> str:
+        quoted = quote(self.filename)
+        if quoted != self.filename:
+            return f"attachment; filename*=utf-8''{quoted}"
+        return f'attachment; filename="{self.filename}"'
 
 
 def prepare_workspace_download(
     workspace_path: str | Path,
     file_path: str,
-) -> Tuple[str, str, str]:
+) -> WorkspaceDownload:
     full_path = resolve_workspace_file_path(workspace_path, file_path)
 
     if os.path.isdir(full_path):
-        try:
-            temp_dir = tempfile.gettempdir()
-            zip_filename = f"{os.path.basename(full_path)}.zip"
-            zip_path = os.path.join(temp_dir, zip_filename)
-
-            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-                for root, _, files in os.walk(full_path):
-                    for file in files:
-                        file_abs_path = os.path.join(root, file)
-                        rel_path = os.path.relpath(file_abs_path, full_path)
-                        zipf.write(file_abs_path, rel_path)
-
-            return zip_path, zip_filename, "application/zip"
-        except Exception as e:
-            raise SageHTTPException(
-                message_key="agent.workspace_zip_failed",
-                message_params={"message": str(e)},
-                error_detail=f"Failed to create zip file: {str(e)}",
-            )
+        return WorkspaceDownload(
+            path=full_path,
+            filename=f"{os.path.basename(full_path)}.zip",
+            media_type="application/zip",
+            archive=True,
+        )
 
     if not os.path.isfile(full_path):
         raise SageHTTPException(
@@ -1954,7 +2082,42 @@ def prepare_workspace_download(
     if mime_type is None:
         mime_type = "application/octet-stream"
 
-    return full_path, os.path.basename(full_path), mime_type
+    return WorkspaceDownload(full_path, os.path.basename(full_path), mime_type)
+
+
+def _split_patterns(patterns: Optional[List[str]]) -> List[str]:
+    return [
+        item.strip()
+        for pattern in patterns or []
+        for item in str(pattern).split(",")
+        if item.strip()
+    ]
+
+
+def stream_workspace_archive(
+    download: WorkspaceDownload,
+    *,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    compression: Optional[str] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[bytes]:
+    """按需生成目录的 zip 字节流；include/exclude 为 glob，可逗号分隔。"""
+    mode = (compression or "auto").strip().lower()
+    if mode not in COMPRESSION_MODES:
+        raise SageHTTPException(
+            status_code=400,
+            message_key="agent.workspace_zip_invalid_compression",
+            message_params={"mode": compression, "modes": ", ".join(COMPRESSION_MODES)},
+            error_detail=f"Unsupported compression mode: {compression}",
+        )
+    return aiter_zip_stream(
+        download.path,
+        include=_split_patterns(include),
+        exclude=_split_patterns(exclude),
+        compression=mode,
+        is_disconnected=is_disconnected,
+    )
 
 
 def delete_workspace_entry(
@@ -1,18 +1,28 @@
-"""Process-local delivery buffer for the Sage AG-UI V2 endpoint.
+"""Delivery buffer for the Sage AG-UI V2 endpoint.
 
 This is deliberately not business storage. Conversation messages remain owned by
 Sage's existing session and conversation persistence. The buffer only supports
-same-process SSE replay for a bounded time.
+SSE replay for a bounded time. Runs and their events live on a stream bus: the
+default in-process bus replays within one worker, a shared bus (see
+``common.services.stream_bus``) lets a reconnect resume on any worker.
 """
 
 from __future__ import annotations
 
-import asyncio
 import json
 import time
 from dataclasses import dataclass, field
 from typing import Any, AsyncIterator, Literal, Mapping
 
+from common.services.stream_bus import (
+    TOPIC_OPEN,
+    InProcessStreamBus,
+    StreamBus,
+    TopicInfo,
+    TopicNotFound,
+    get_stream_bus,
+)
+
 
 RunStatus = Literal["running", "completed", "failed", "stopped"]
 _TERMINAL_EVENT_TYPES = frozenset({"RUN_FINISHED", "RUN_ERROR"})
@@ -45,9 +55,10 @@ class AguiRun:
     thread_id: str
     status: RunStatus = "running"
     updated_at: float = field(default_factory=time.monotonic)
-    next_sequence: int = 1
-    events: list[AguiStoredEvent] = field(default_factory=list)
-    subscribers: set[asyncio.Queue[AguiStoredEvent | None]] = field(default_factory=set)
+
+    @property
+    def topic(self) -> str:
+        return _run_topic(self.user_id, self.run_id)
 
 
 @dataclass(frozen=True, slots=True)
@@ -57,7 +68,7 @@ class AguiRunClaim:
 
 
 class AguiV2RunStore:
-    """Bounded same-process idempotency and replay buffer."""
+    """Bounded idempotency and replay buffer backed by a stream bus."""
 
     def __init__(
         self,
@@ -65,12 +76,18 @@ class AguiV2RunStore:
         ttl_seconds: float = 24 * 60 * 60,
         max_events: int = 2_000,
         heartbeat_seconds: float = 20.0,
+        bus: StreamBus | None = None,
     ) -> None:
-        self._ttl_seconds = max(float(ttl_seconds), 1.0)
-        self._max_events = max(int(max_events), 1)
         self._heartbeat_seconds = max(float(heartbeat_seconds), 0.01)
-        self._runs: dict[tuple[str, str], AguiRun] = {}
-        self._lock = asyncio.Lock()
+        self._bus = bus or InProcessStreamBus(
+            max_events=max_events,
+            ttl_seconds=ttl_seconds,
+        )
+
+    @property
+    def shared(self) -> bool:
+        """Whether a reconnect can resume on another worker process."""
+        return self._bus.shared
 
     async def claim_run(
         self,
@@ -91,25 +108,14 @@ class AguiV2RunStore:
         ):
             raise ValueError("user_id, thread_id and run_id are required")
 
-        async with self._lock:
-            self._gc_locked()
-            key = (normalized_user_id, normalized_run_id)
-            run = self._runs.get(key)
-            if run is not None:
-                if run.thread_id != normalized_thread_id:
-                    raise AguiRunConflict(
-                        "runId is already bound to another AG-UI thread"
-                    )
-                run.updated_at = time.monotonic()
-                return AguiRunClaim(run=run, created=False)
-
-            run = AguiRun(
-                run_id=normalized_run_id,
-                user_id=normalized_user_id,
-                thread_id=normalized_thread_id,
-            )
-            self._runs[key] = run
-            return AguiRunClaim(run=run, created=True)
+        info, created = await self._bus.open_topic(
+            _run_topic(normalized_user_id, normalized_run_id),
+            {"thread_id": normalized_thread_id},
+        )
+        if not created and info.meta.get("thread_id") != normalized_thread_id:
+            raise AguiRunConflict("runId is already bound to another AG-UI thread")
+        run = _run_from_topic(info, normalized_user_id, normalized_run_id)
+        return AguiRunClaim(run=run, created=created)
 
     async def require_run(
         self,
@@ -118,13 +124,14 @@ class AguiV2RunStore:
         thread_id: str,
         run_id: str,
     ) -> AguiRun:
-        async with self._lock:
-            self._gc_locked()
-            run = self._runs.get((user_id.strip(), run_id.strip()))
-            if run is None or run.thread_id != thread_id.strip():
-                raise AguiRunNotFound(run_id)
-            run.updated_at = time.monotonic()
-            return run
+        normalized_user_id = user_id.strip()
+        normalized_run_id = run_id.strip()
+        info = await self._bus.get_topic(
+            _run_topic(normalized_user_id, normalized_run_id)
+        )
+        if info is None or info.meta.get("thread_id") != thread_id.strip():
+            raise AguiRunNotFound(run_id)
+        return _run_from_topic(info, normalized_user_id, normalized_run_id)
 
     async def publish(
         self,
@@ -132,35 +139,34 @@ class AguiV2RunStore:
         event: Mapping[str, Any],
     ) -> str:
         payload = dict(event)
-        async with self._lock:
-            self._require_identity_locked(run)
-            stored = AguiStoredEvent(sequence=run.next_sequence, payload=payload)
-            run.next_sequence += 1
-            run.events.append(stored)
-            if len(run.events) > self._max_events:
-                del run.events[: len(run.events) - self._max_events]
-            run.updated_at = time.monotonic()
-            subscribers = tuple(run.subscribers)
-
-        for queue in subscribers:
-            queue.put_nowait(stored)
-        return stored.event_id
+        try:
+            sequence = await self._bus.publish(run.topic, payload)
+        except TopicNotFound:
+            raise AguiRunNotFound(run.run_id) from None
+        run.updated_at = time.monotonic()
+        return AguiStoredEvent(sequence=sequence, payload=payload).event_id
 
     async def finish(self, run: AguiRun, *, status: RunStatus) -> None:
         if status not in _TERMINAL_STATUSES:
             raise ValueError(f"Unsupported terminal AG-UI run status: {status}")
-        async with self._lock:
-            self._require_identity_locked(run)
-            run.status = status
-            run.updated_at = time.monotonic()
-            subscribers = tuple(run.subscribers)
-        for queue in subscribers:
-            queue.put_nowait(None)
+        try:
+            await self._bus.close_topic(run.topic, status)
+        except TopicNotFound:
+            raise AguiRunNotFound(run.run_id) from None
+        run.status = status
+        run.updated_at = time.monotonic()
 
     async def list_events(self, run: AguiRun) -> list[AguiStoredEvent]:
-        async with self._lock:
-            self._require_identity_locked(run)
-            return list(run.events)
+        if await self._bus.get_topic(run.topic) is None:
+            raise AguiRunNotFound(run.run_id)
+        events: list[AguiStoredEvent] = []
+        cursor = 0
+        while True:
+            batch = await self._bus.read(run.topic, cursor)
+            if not batch:
+                return events
+            events.extend(AguiStoredEvent(e.seq, e.payload) for e in batch)
+            cursor = batch[-1].seq
 
     async def subscribe(
         self,
@@ -168,55 +174,45 @@ class AguiV2RunStore:
         *,
         last_event_id: str | None,
     ) -> AsyncIterator[str]:
-        cursor = _parse_event_id(last_event_id)
-        queue: asyncio.Queue[AguiStoredEvent | None] = asyncio.Queue()
-        async with self._lock:
-            self._require_identity_locked(run)
-            replay = [event for event in run.events if event.sequence > cursor]
-            terminal = run.status in _TERMINAL_STATUSES
-            if not terminal:
-                run.subscribers.add(queue)
-            run.updated_at = time.monotonic()
-
-        try:
-            for event in replay:
-                yield _format_sse(event)
-                if _is_terminal_event(event):
-                    return
-            if terminal:
+        if await self._bus.get_topic(run.topic) is None:
+            raise AguiRunNotFound(run.run_id)
+        subscription = self._bus.subscribe(
+            run.topic,
+            after_seq=_parse_event_id(last_event_id),
+            heartbeat_seconds=self._heartbeat_seconds,
+        )
+        async for event in subscription:
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            stored = AguiStoredEvent(sequence=event.seq, payload=event.payload)
+            yield _format_sse(stored)
+            if _is_terminal_event(stored):
                 return
 
-            while True:
-                try:
-                    event = await asyncio.wait_for(
-                        queue.get(),
-                        timeout=self._heartbeat_seconds,
-                    )
-                except asyncio.TimeoutError:
-                    yield ": heartbeat\n\n"
-                    continue
-                if event is None:
-                    return
-                yield _format_sse(event)
-                if _is_terminal_event(event):
-                    return
-        finally:
-            async with self._lock:
-                run.subscribers.discard(queue)
-
-    def _require_identity_locked(self, run: AguiRun) -> None:
-        if self._runs.get((run.user_id, run.run_id)) is not run:
-            raise AguiRunNotFound(run.run_id)
 
-    def _gc_locked(self) -> None:
-        cutoff = time.monotonic() - self._ttl_seconds
-        expired = [
-            key
-            for key, run in self._runs.items()
-            if run.updated_at < cutoff and not run.subscribers
-        ]
-        for key in expired:
-            del self._runs[key]
+def _run_topic(user_id: str, run_id: str) -> str:
+    return "agui:" + json.dumps([user_id, run_id], ensure_ascii=False)
+
+
+def _run_from_topic(info: TopicInfo, user_id: str, run_id: str) -> AguiRun:
+    return AguiRun(
+        run_id=run_id,
+        user_id=user_id,
+        thread_id=str(info.meta.get("thread_id") or ""),
+        status=_run_status(info.status),
+    )
+
+
+def _run_status(topic_status: str) -> RunStatus:
+    if topic_status == "completed":
+        return "completed"
+    if topic_status == "stopped":
+        return "stopped"
+    if topic_status == TOPIC_OPEN:
+        return "running"
+    # finish() only writes terminal statuses; anything else is a broken run
+    return "failed"
 
 
 def _parse_event_id(value: str | None) -> int:
@@ -245,7 +241,7 @@ _RUN_STORE: AguiV2RunStore | None = None
 def get_agui_v2_run_store() -> AguiV2RunStore:
     global _RUN_STORE
     if _RUN_STORE is None:
-        _RUN_STORE = AguiV2RunStore()
+        _RUN_STORE = AguiV2RunStore(bus=get_stream_bus())
     return _RUN_STORE
 
 
@@ -1,18 +1,42 @@
 import asyncio
+import json
 import time
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Set
 
 from loguru import logger
+from common.services.stream_bus import StreamBus, get_stream_bus
+from common.services.stream_replay_buffer import (
+    StreamReplayBuffer,
+    get_default_replay_pool,
+    with_stream_offset,
+)
 from sagents.context.session_context import delete_session_run_lock
+from sagents.observability.metrics_registry import REGISTRY
+from sagents.observability.prometheus_handler import build_session_trace_id
 from sagents.utils.lock_manager import safe_release
 
+# chunk 入队到订阅者取出之间的等待，反映事件循环繁忙或订阅者消费过慢
+_FANOUT_LAG = REGISTRY.histogram(
+    "sage_server_sse_fanout_lag_seconds",
+    "Delay between publishing a stream chunk and a subscriber dequeuing it.",
+    schema=3,
+)
+# 每个桶只保留最新的 exemplar，按 chunk 抽样附带即可
+_FANOUT_EXEMPLAR_EVERY = 64
+
+
+def _heartbeat_chunk(offset: int) -> str:
+    """空闲心跳：与其它 chunk 一样是一行 JSON，stream_offset 保持客户端游标不变。"""
+    return json.dumps({"type": "heartbeat", "stream_offset": offset}) + "\n"
+
 
 @dataclass
 class SessionState:
     session_id: str
     query: str = ""
-    history: List[str] = field(default_factory=list)
+    # 按偏移记录的回放缓冲，供断线重连从 last_index 继续
+    replay: Optional[StreamReplayBuffer] = None
     subscribers: Set[asyncio.Queue] = field(default_factory=set)
     task: Optional[asyncio.Task] = None
     created_at: float = field(default_factory=time.time)
@@ -20,6 +44,15 @@ class SessionState:
     status: str = "running"
     is_completed: bool = False
     lock: Optional[asyncio.Lock] = None
+    # 多 worker 部署时镜像到共享流总线的 topic，便于在其他 worker 上断线续传
+    shared_topic: Optional[str] = None
+    # 等待镜像的 chunk 与负责批量写入的任务
+    mirror_pending: List[str] = field(default_factory=list)
+    mirror_task: Optional[asyncio.Task] = None
+
+    def __post_init__(self):
+        if self.replay is None:
+            self.replay = get_default_replay_pool().create(self.session_id)
 
 
 class StreamManager:
@@ -43,7 +76,7 @@ class StreamManager:
         session = self._sessions.get(session_id)
         if not session:
             return 0
-        return len(session.history)
+        return session.replay.next_offset
 
     async def _notify_session_list_changed(self):
         if not self._session_list_subscribers:
@@ -76,6 +109,7 @@ class StreamManager:
         session.query = query
         session.status = "running"
         self._sessions[session_id] = session
+        await self._open_shared_topic(session)
         await self._notify_session_list_changed()
         return session
 
@@ -84,11 +118,11 @@ class StreamManager:
         if not session:
             return
 
-        session.history.append(chunk)
-        chunk_index = len(session.history) - 1
+        chunk_index = session.replay.append(chunk)
         session.last_activity = time.time()
+        self._mirror_chunk(session, chunk)
         for queue in list(session.subscribers):
-            await queue.put((chunk_index, chunk))
+            await queue.put((chunk_index, chunk, time.perf_counter()))
 
     async def finish_publisher(self, session_id: str):
         session = self._sessions.get(session_id)
@@ -96,11 +130,13 @@ class StreamManager:
             return
 
         session.is_completed = True
+        await self._close_shared_topic(session)
         for queue in list(session.subscribers):
             await queue.put(None)
 
         if self._sessions.get(session_id) is session:
             del self._sessions[session_id]
+        self._release_replay(session)
 
         await self._notify_session_list_changed()
 
@@ -121,6 +157,7 @@ class StreamManager:
         session = SessionState(session_id=session_id, lock=lock)
         session.query = query
         self._sessions[session_id] = session
+        await self._open_shared_topic(session)
         await self._notify_session_list_changed()
 
         session.task = asyncio.create_task(self._background_worker(session, generator))
@@ -129,11 +166,11 @@ class StreamManager:
     async def _background_worker(self, session: SessionState, generator):
         try:
             async for chunk in generator:
-                session.history.append(chunk)
-                chunk_index = len(session.history) - 1
+                chunk_index = session.replay.append(chunk)
                 session.last_activity = time.time()
+                self._mirror_chunk(session, chunk)
                 for queue in list(session.subscribers):
-                    await queue.put((chunk_index, chunk))
+                    await queue.put((chunk_index, chunk, time.perf_counter()))
                 await asyncio.sleep(0)
         except asyncio.CancelledError:
             session.status = "interrupted"
@@ -142,10 +179,10 @@ class StreamManager:
         except Exception as e:
             logger.error(f"Background worker error for {session.session_id}: {e}")
             error_json = '{"type":"error","content":"Internal Server Error during stream processing"}\n'
-            session.history.append(error_json)
-            error_index = len(session.history) - 1
+            error_index = session.replay.append(error_json)
+            self._mirror_chunk(session, error_json)
             for queue in list(session.subscribers):
-                await queue.put((error_index, error_json))
+                await queue.put((error_index, error_json, time.perf_counter()))
         finally:
             try:
                 if hasattr(generator, "aclose"):
@@ -161,8 +198,9 @@ class StreamManager:
             except Exception as e:
                 logger.warning(f"Error closing generator for {session.session_id}: {e}")
             session.is_completed = True
+            await self._close_shared_topic(session)
             logger.debug(
-                f"Session {session.session_id} completed. Total chunks: {len(session.history)}"
+                f"Session {session.session_id} completed. Total chunks: {session.replay.next_offset}"
             )
             for queue in list(session.subscribers):
                 await queue.put(None)
@@ -180,13 +218,108 @@ class StreamManager:
 
             if self._sessions.get(session.session_id) is session:
                 del self._sessions[session.session_id]
+                self._release_replay(session)
                 await self._notify_session_list_changed()
 
     async def cleanup_session(self, session_id: str):
         if session_id in self._sessions:
-            del self._sessions[session_id]
+            session = self._sessions.pop(session_id)
+            # 新一轮会替换同名 topic，旧流积压的镜像必须先写完
+            await self._drain_mirror(session)
+            self._release_replay(session)
             await self._notify_session_list_changed()
 
+    @staticmethod
+    def _shared_bus() -> Optional[StreamBus]:
+        # 进程内总线只是本地回放缓冲的重复，只有共享总线才需要镜像
+        bus = get_stream_bus()
+        return bus if bus.shared else None
+
+    @staticmethod
+    def _shared_topic_name(session_id: str) -> str:
+        return f"chat:{session_id}"
+
+    async def _open_shared_topic(self, session: SessionState) -> None:
+        bus = self._shared_bus()
+        if bus is None:
+            return
+        topic = self._shared_topic_name(session.session_id)
+        try:
+            # 同一会话的新一轮流从偏移 0 重新开始，旧 topic 直接替换
+            await bus.open_topic(topic, {"query": session.query}, replace=True)
+            session.shared_topic = topic
+        except Exception as e:
+            logger.warning(f"打开共享流 topic 失败 {session.session_id}: {e}")
+
+    def _mirror_chunk(self, session: SessionState, chunk: str) -> None:
+        if not session.shared_topic:
+            return
+        session.mirror_pending.append(chunk)
+        if session.mirror_task is None or session.mirror_task.done():
+            session.mirror_task = asyncio.create_task(self._flush_mirror(session))
+
+    async def _flush_mirror(self, session: SessionState) -> None:
+        """一次事务写入积压的全部 chunk；写入期间新到的 chunk 留给下一批。"""
+        while session.mirror_pending and session.shared_topic:
+            batch, session.mirror_pending = session.mirror_pending, []
+            try:
+                await self._shared_bus().publish_many(session.shared_topic, batch)
+            except Exception as e:
+                # 镜像失败只影响跨 worker 续传，本 worker 的流照常进行
+                logger.warning(f"共享流镜像失败，停止镜像 {session.session_id}: {e}")
+                session.shared_topic = None
+                session.mirror_pending = []
+
+    async def _drain_mirror(self, session: SessionState) -> None:
+        task = session.mirror_task
+        if task is not None and not task.done():
+            await task
+
+    async def _close_shared_topic(self, session: SessionState) -> None:
+        await self._drain_mirror(session)
+        topic, session.shared_topic = session.shared_topic, None
+        if not topic:
+            return
+        status = "completed" if session.status == "running" else session.status
+        try:
+            await self._shared_bus().close_topic(topic, status)
+        except Exception as e:
+            logger.warning(f"关闭共享流 topic 失败 {session.session_id}: {e}")
+
+    async def _subscribe_shared(self, session_id: str, last_index: int):
+        """本 worker 没有该会话时，从共享总线续传（seq = 偏移 + 1）。"""
+        bus = self._shared_bus()
+        if bus is None:
+            return
+        topic = self._shared_topic_name(session_id)
+        if await bus.get_topic(topic) is None:
+            return
+        logger.info(
+            f"Client subscribed to shared stream {session_id}, offset={last_index}"
+        )
+        cursor = max(0, last_index)
+        subscription = bus.subscribe(
+            topic, after_seq=cursor, heartbeat_seconds=self._HEARTBEAT_SECONDS
+        )
+        dropped = 0
+        async for event in subscription:
+            if event is None:
+                yield _heartbeat_chunk(cursor)
+                continue
+            cursor = event.seq
+            chunk = event.payload
+            if subscription.dropped != dropped:
+                # 跳过了已被淘汰的事件：告诉客户端新的游标，避免之后重复回放
+                dropped = subscription.dropped
+                chunk = with_stream_offset(chunk, event.seq)
+            yield chunk
+
+    def _release_replay(self, session: SessionState) -> None:
+        # 会话已移除且没有订阅者仍在回放时才释放缓冲（含溢写文件）
+        if session.subscribers or self._sessions.get(session.session_id) is session:
+            return
+        session.replay.close()
+
     def has_running_session(self, session_id: Optional[str]) -> bool:
         if not session_id:
             return False
@@ -205,6 +338,8 @@ class StreamManager:
     # 防御性兜底：即使下层 generator 的 aclose / 持久化路径仍可能偶发卡住，
     # 这里也不应该让 stop_session 无限期 await，否则会顶住整条会话中断链路。
     _STOP_SESSION_TIMEOUT = 5.0
+    # 订阅者空闲多久发一次心跳行，避免代理断开空闲连接
+    _HEARTBEAT_SECONDS = 20.0
 
     async def stop_session(self, session_id: Optional[str]) -> None:
         if not session_id:
@@ -232,36 +367,52 @@ class StreamManager:
     async def subscribe(self, session_id: str, last_index: int = 0):
         session = self._sessions.get(session_id)
         if not session:
+            async for chunk in self._subscribe_shared(session_id, last_index):
+                yield chunk
             return
 
         queue = asyncio.Queue()
         session.subscribers.add(queue)
         logger.info(f"Client subscribed to session {session_id}, offset={last_index}")
+        exemplar = {"trace_id": build_session_trace_id(session_id)}
+        observed = 0
 
         try:
-            history_len = len(session.history)
-            start_index = max(0, last_index)
-            next_index = start_index
-
-            if start_index < history_len:
-                for i in range(start_index, history_len):
-                    yield session.history[i]
-                    next_index = i + 1
+            # 只回放订阅时已有的偏移，之后的 chunk 从队列读取；
+            # 合并记录可能越过 replay_end，队列里已回放过的偏移会被跳过
+            replay_end = session.replay.next_offset
+            next_index = max(0, last_index)
+
+            while next_index < replay_end:
+                items = session.replay.read(next_index)
+                if not items:
+                    break
+                for next_cursor, chunk in items:
+                    yield chunk
+                    next_index = next_cursor
 
             if session.is_completed:
                 return
 
             while True:
                 try:
-                    payload = await asyncio.wait_for(queue.get(), timeout=20.0)
+                    payload = await asyncio.wait_for(
+                        queue.get(), timeout=self._HEARTBEAT_SECONDS
+                    )
                 except asyncio.TimeoutError:
-                    yield ": heartbeat\n\n"
+                    yield _heartbeat_chunk(next_index)
                     continue
 
                 if payload is None:
                     break
 
-                idx, chunk = payload
+                idx, chunk, enqueued_at = payload
+                _FANOUT_LAG.observe(
+                    (),
+                    time.perf_counter() - enqueued_at,
+                    exemplar if observed % _FANOUT_EXEMPLAR_EVERY == 0 else None,
+                )
+                observed += 1
                 if idx < next_index:
                     continue
 
@@ -271,6 +422,7 @@ class StreamManager:
             raise
         finally:
             session.subscribers.discard(queue)
+            self._release_replay(session)
 
     def get_active_sessions(self):
         if not self._sessions:
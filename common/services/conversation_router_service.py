@@ -120,8 +120,9 @@ async def build_list_conversations_response(
     sort_by: Optional[str],
     include_user_id: bool = False,
     context_user_id: Optional[str] = None,
-    include_message_counts: bool = False,
+    include_message_counts: bool = True,
 ) -> Dict[str, Any]:
+    # 计数与预览来自列表投影字段，无需加载 messages
     conversations, total_count = await conversation_service.get_conversations_paginated(
         page=page,
         page_size=page_size,
@@ -129,7 +130,7 @@ async def build_list_conversations_response(
         search=search,
         agent_id=agent_id,
         sort_by=sort_by or "date",
-        include_messages=include_message_counts,
+        include_messages=False,
     )
     return conversation_service.build_conversation_list_result(
         conversations=conversations,
@@ -4,15 +4,16 @@ Conversation shared service-layer entry points for server and desktop routers.
 
 import asyncio
 import hashlib
-from collections import Counter
 from datetime import timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from loguru import logger
 from sagents.session_runtime import (
+    build_conversation_messages_page,
     build_conversation_messages_view,
     get_global_session_manager,
+    summarize_conversation_message,
 )
 from sagents.context.messages.message import is_message_client_visible
 
@@ -22,12 +23,15 @@ from common.core.exceptions import SageHTTPException
 from common.core.i18n import t
 from common.models.base import get_local_now
 from common.models.conversation import Conversation, ConversationDao
+from common.models.tool_usage import ToolUsageDao, count_tool_calls
 from common.schemas.conversation import ConversationInfo
 from common.services.chat_processor import ContentProcessor
 from common.services.chat_utils import get_sessions_root
 
 _SESSION_PERSISTENCE_TASKS: Dict[str, asyncio.Task] = {}
 
+DEFAULT_MESSAGE_PAGE_SIZE = 50
+
 
 def _get_cfg() -> config.StartupConfig:
     cfg = config.get_startup_config()
@@ -292,11 +296,26 @@ async def persist_session_state(session_id: str) -> None:
         logger.bind(session_id=session_id).info(
             f"会话状态已同步到 conversations 表，message_count={len(messages)}"
         )
-        return
+    else:
+        updated = await dao.update_timestamp(session_id)
+        if updated:
+            logger.bind(session_id=session_id).info(
+                "会话状态已刷新 conversation 时间戳"
+            )
+    await _sync_tools_usage(session_id)
+
 
-    updated = await dao.update_timestamp(session_id)
-    if updated:
-        logger.bind(session_id=session_id).info("会话状态已刷新 conversation 时间戳")
+async def _sync_tools_usage(session_id: str) -> None:
+    """把 SessionContext 刚写入的 tools_usage 同步到 tool_usage 统计表。"""
+    manager = get_global_session_manager()
+    storage = getattr(manager, "storage", None) if manager else None
+    if storage is None:
+        return
+    try:
+        tools_usage = await asyncio.to_thread(storage.load_tools_usage, session_id)
+        await ConversationDao().sync_tools_usage({session_id: dict(tools_usage)})
+    except Exception as exc:
+        logger.bind(session_id=session_id).warning(f"同步工具调用统计失败: {exc}")
 
 
 async def _run_single_session_persistence(session_id: str) -> None:
@@ -422,6 +441,12 @@ def build_conversation_list_result(
                 updated_at=conv.updated_at.isoformat() if conv.updated_at else "",
                 trace_id=trace_id,
                 trace_url=trace_url,
+                snippet=getattr(conv, "search_snippet", None),
+                last_message=conv.last_message_preview,
+                last_activity_at=conv.last_activity_at.isoformat()
+                if conv.last_activity_at
+                else None,
+                total_tokens=conv.total_tokens,
             )
         )
 
@@ -442,7 +467,20 @@ def build_conversation_list_result(
 
 async def get_conversation_messages(
     session_id: str,
+    *,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    message_types: Optional[List[str]] = None,
+    projection: str = "full",
 ) -> Dict[str, Any]:
+    """Return conversation messages.
+
+    Without ``before``/``after``/``limit`` the whole history is returned as
+    before. With any of them the response is one cursor page (see
+    ``build_conversation_messages_page``) plus ``has_more_*`` and cursors.
+    ``projection="summary"`` truncates long tool outputs.
+    """
     dao = ConversationDao()
     conversation = await dao.get_by_session_id(session_id)
     session_manager = get_global_session_manager()
@@ -471,7 +509,50 @@ async def get_conversation_messages(
             }
         )
 
-    view = build_conversation_messages_view(session_id)
+    type_filter = set(message_types) if message_types else None
+    page: Dict[str, Any] = {}
+    if before is not None or after is not None or limit is not None:
+        try:
+            view = build_conversation_messages_page(
+                session_id,
+                before=before,
+                after=after,
+                limit=limit or DEFAULT_MESSAGE_PAGE_SIZE,
+                message_types=type_filter,
+                summary=projection == "summary",
+            )
+        except (KeyError, ValueError) as exc:
+            raise SageHTTPException(
+                **{
+                    **_conversation_error_kwargs(
+                        message_key="conversation.message_cursor_invalid",
+                        message_params={"cursor": before or after},
+                        error_detail=f"Invalid message cursor for '{session_id}': {exc}",
+                    ),
+                    "status_code": 400,
+                }
+            )
+        page = {
+            key: view[key]
+            for key in (
+                "has_more_before",
+                "has_more_after",
+                "before_cursor",
+                "after_cursor",
+            )
+        }
+    else:
+        view = build_conversation_messages_view(session_id)
+        if type_filter:
+            view["messages"] = [
+                message
+                for message in view["messages"]
+                if message.get("type") in type_filter
+            ]
+        if projection == "summary":
+            view["messages"] = [
+                summarize_conversation_message(message) for message in view["messages"]
+            ]
     messages: List[Dict[str, Any]] = []
     for message in view["messages"]:
         messages.append(ContentProcessor.clean_content(message))
@@ -514,6 +595,7 @@ async def get_conversation_messages(
         "message_count": len(messages),
         "next_stream_index": next_stream_index,
         "conversation_info": conversation_info,
+        **page,
     }
 
 
@@ -729,14 +811,7 @@ def _write_session_files(session_id: str, messages: List[Dict[str, Any]]) -> Non
             system_context.pop("custom_sub_agents", None)
         storage.save_session_snapshot(session_id, context_data)
 
-    tools_usage: Dict[str, int] = {}
-    for message in messages:
-        for tool_call in (message or {}).get("tool_calls", []) or []:
-            tool_name = (tool_call or {}).get("function", {}).get("name")
-            if tool_name:
-                tools_usage[tool_name] = tools_usage.get(tool_name, 0) + 1
-
-    storage.save_tools_usage(session_id, tools_usage)
+    storage.save_tools_usage(session_id, count_tool_calls(messages))
 
 
 async def edit_last_user_message(
@@ -802,6 +877,7 @@ async def edit_last_user_message(
         title_source[:50] + "..." if len(title_source) > 50 else title_source,
     )
     await asyncio.to_thread(_write_session_files, session_id, truncated_messages)
+    await dao.sync_tools_usage({session_id: count_tool_calls(truncated_messages)})
 
     manager = get_global_session_manager()
     if manager:
@@ -876,32 +952,43 @@ async def get_rerun_conversation_payload(
     }
 
 
-def _load_tools_usage_counts_sync(
-    conversations: List[Conversation],
-    storage=None,
-) -> Dict[str, int]:
-    usage_counter: Counter[str] = Counter()
-
-    for conversation in conversations:
-        session_id = str(conversation.session_id or "").strip()
-        if not session_id:
-            continue
-
+def _load_tools_usage_batch_sync(
+    session_ids: List[str],
+    storage,
+) -> Dict[str, Dict[str, int]]:
+    usages: Dict[str, Dict[str, int]] = {}
+    for session_id in session_ids:
         try:
-            if storage is None:
-                raise RuntimeError("session storage is not initialized")
             tools_usage = storage.load_tools_usage(session_id)
-            if not isinstance(tools_usage, dict):
-                continue
-            for tool_name, count in tools_usage.items():
-                if tool_name:
-                    usage_counter[str(tool_name)] += int(count or 0)
         except Exception as e:
             logger.warning(
-                f"读取 tools_usage.json 失败，跳过该会话统计: session_id={session_id}, error={e}"
+                f"读取 tools_usage.json 失败，按无工具调用补建: session_id={session_id}, error={e}"
             )
+            tools_usage = {}
+        usages[session_id] = dict(tools_usage) if isinstance(tools_usage, dict) else {}
+    return usages
 
-    return dict(usage_counter)
+
+async def backfill_tool_usage(storage=None, batch_size: int = 200) -> int:
+    """把升级前会话目录里的 tools_usage.json 补建进 tool_usage 表，返回补建会话数。可重复执行。"""
+    if storage is None:
+        manager = get_global_session_manager()
+        storage = getattr(manager, "storage", None) if manager else None
+    if storage is None:
+        return 0
+    dao = ConversationDao()
+    synced = 0
+    while True:
+        session_ids = await dao.get_session_ids_missing_tool_usage(batch_size)
+        if not session_ids:
+            break
+        usages = await asyncio.to_thread(
+            _load_tools_usage_batch_sync, session_ids, storage
+        )
+        synced += await dao.sync_tools_usage(usages)
+    if synced:
+        logger.info(f"[ToolUsage] 补建工具调用统计完成: sessions={synced}")
+    return synced
 
 
 async def get_agent_usage_stats(
@@ -909,17 +996,12 @@ async def get_agent_usage_stats(
     days: int,
     user_id: Optional[str] = None,
     agent_id: Optional[str] = None,
+    top_n: Optional[int] = None,
 ) -> Dict[str, int]:
     safe_days = max(1, min(int(days or 1), 365))
-    updated_after = get_local_now() - timedelta(days=safe_days)
-    conversations = await ConversationDao().get_recent_conversations(
+    return await ToolUsageDao().get_usage_stats(
+        updated_after=get_local_now() - timedelta(days=safe_days),
         user_id=user_id,
-        updated_after=updated_after,
         agent_id=agent_id,
-    )
-
-    manager = get_global_session_manager()
-    storage = getattr(manager, "storage", None) if manager else None
-    return await asyncio.to_thread(
-        _load_tools_usage_counts_sync, conversations, storage
+        limit=max(1, int(top_n)) if top_n else None,
     )
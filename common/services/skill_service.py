@@ -6,7 +6,6 @@ import tempfile
 import threading
 import time
 import zipfile
-import hashlib
 from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
@@ -16,6 +15,7 @@ import httpx
 import yaml
 from fastapi import UploadFile
 from loguru import logger
+from sagents.skill.skill_catalog import get_skill_catalog
 from sagents.skill.skill_manager import SkillManager, get_skill_manager
 from sagents.skill.skill_schema import SkillSchema
 
@@ -35,50 +35,6 @@ _server_skills_cache: Dict[Tuple[str, str, str], List[SkillSchema]] = {}
 _server_skills_cache_lru: "OrderedDict[Tuple[str, str, str], None]" = OrderedDict()
 
 
-def _calculate_skill_hash(skill_path: str) -> str:
-    """
-    计算技能文件夹的哈希值，用于检测技能是否发生变化。
-
-    计算所有文件的哈希值（排除隐藏文件和缓存文件），
-    返回一个包含所有文件哈希的复合哈希值。
-    """
-    try:
-        if not os.path.exists(skill_path):
-            return ""
-
-        # 收集所有文件及其哈希值
-        file_hashes = {}
-        for root, dirs, files in os.walk(skill_path):
-            # 排除隐藏文件和缓存文件
-            dirs[:] = [
-                d
-                for d in dirs
-                if not d.startswith(".") and d not in ["__pycache__", "node_modules"]
-            ]
-
-            for file in sorted(files):
-                if file.startswith("."):
-                    continue
-
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, skill_path)
-
-                try:
-                    with open(file_path, "rb") as f:
-                        file_hash = hashlib.md5(f.read()).hexdigest()
-                    file_hashes[rel_path] = file_hash
-                except Exception as e:
-                    logger.warning(f"计算文件哈希失败 {file_path}: {e}")
-
-        # 按文件路径排序后生成复合哈希
-        sorted_items = sorted(file_hashes.items())
-        composite = "|".join([f"{path}:{hash}" for path, hash in sorted_items])
-        return hashlib.md5(composite.encode("utf-8")).hexdigest()
-    except Exception as e:
-        logger.warning(f"计算技能哈希失败 {skill_path}: {e}")
-        return ""
-
-
 def _is_skill_need_update(source_skill_path: str, agent_skill_path: str) -> bool:
     """
     判断Agent工作空间的技能是否需要更新。
@@ -88,6 +44,8 @@ def _is_skill_need_update(source_skill_path: str, agent_skill_path: str) -> bool
     - 如果广场的文件内容与Agent本地不同 → 需要更新
     - 如果Agent本地有多余的文件 → 不需要更新（忽略）
 
+    文件哈希由 SkillCatalog 按 stat 签名缓存，未变化的文件不会重复读取。
+
     Args:
         source_skill_path: 广场技能路径
         agent_skill_path: Agent本地技能路径
@@ -98,48 +56,20 @@ def _is_skill_need_update(source_skill_path: str, agent_skill_path: str) -> bool
     try:
         logger.info(f"对比技能: 广场={source_skill_path}, Agent={agent_skill_path}")
 
-        # 获取广场技能的所有文件
-        source_files = {}
-        for root, dirs, files in os.walk(source_skill_path):
-            dirs[:] = [
-                d
-                for d in dirs
-                if not d.startswith(".") and d not in ["__pycache__", "node_modules"]
-            ]
-
-            for file in sorted(files):
-                if file.startswith("."):
-                    continue
-
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, source_skill_path)
-
-                try:
-                    with open(file_path, "rb") as f:
-                        source_files[rel_path] = hashlib.md5(f.read()).hexdigest()
-                except Exception as e:
-                    logger.warning(f"读取广场技能文件失败 {file_path}: {e}")
-
+        catalog = get_skill_catalog()
+        source_files = catalog.file_hashes(source_skill_path)
         logger.info(f"广场技能文件: {list(source_files.keys())}")
+        agent_files = catalog.file_hashes(agent_skill_path)
 
-        # 对比Agent本地技能的对应文件
         for rel_path, source_hash in source_files.items():
-            agent_file_path = os.path.join(agent_skill_path, rel_path)
-
+            agent_hash = agent_files.get(rel_path)
             # 如果Agent本地不存在该文件 → 需要更新
-            if not os.path.exists(agent_file_path):
+            if agent_hash is None:
                 logger.info(f"技能需要更新: Agent缺少文件 {rel_path}")
                 return True
-
             # 如果Agent本地文件内容不同 → 需要更新
-            try:
-                with open(agent_file_path, "rb") as f:
-                    agent_hash = hashlib.md5(f.read()).hexdigest()
-                if agent_hash != source_hash:
-                    logger.info(f"技能需要更新: 文件 {rel_path} 内容不同")
-                    return True
-            except Exception as e:
-                logger.warning(f"读取Agent技能文件失败 {agent_file_path}: {e}")
+            if agent_hash != source_hash:
+                logger.info(f"技能需要更新: 文件 {rel_path} 内容不同")
                 return True
 
         # 所有广场文件都存在且内容相同 → 不需要更新
@@ -761,7 +691,6 @@ def _get_agent_available_skills_sync(
                     "description": skill.description,
                     "source_dimension": "system",
                     "path": skill.path,
-                    "hash": _calculate_skill_hash(skill.path),
                 }
         except Exception as e:
             logger.warning(f"加载系统技能失败: {e}")
@@ -782,7 +711,6 @@ def _get_agent_available_skills_sync(
                         "description": skill.description,
                         "source_dimension": "user",
                         "path": skill.path,
-                        "hash": _calculate_skill_hash(skill.path),
                     }
             except Exception as e:
                 logger.warning(f"加载用户技能失败: {e}")
@@ -825,7 +753,6 @@ def _get_agent_available_skills_sync(
                     "name": skill.name,
                     "description": skill.description,
                     "path": skill.path,
-                    "hash": _calculate_skill_hash(skill.path),
                 }
         except Exception as e:
             logger.warning(f"加载Agent技能失败: {e}")
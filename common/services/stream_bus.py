@@ -0,0 +1,785 @@
+"""Pluggable fan-out bus for replayable stream events.
+
+Publishers append events to a topic and receive a per-topic sequence number
+(1, 2, 3, ...). Subscribers read by cursor, so a client that reconnects can
+resume after the last sequence it saw. Two backends are provided:
+
+- ``InProcessStreamBus`` keeps topics in process memory (single worker).
+- ``SqliteStreamBus`` keeps topics in an SQLite WAL database shared by every
+  worker on the host. Publishers wake subscribers in other processes through
+  per-process named pipes; without pipe support subscribers fall back to
+  polling.
+
+Subscribers pull from the event log rather than owning a queue, so a slow
+consumer never makes the publisher wait. Wakeups coalesce, and events that
+fall out of retention before a subscriber reads them are skipped and counted
+in ``BusSubscription.dropped``.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import errno
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Sequence
+
+from loguru import logger
+
+
+TOPIC_OPEN = "open"
+_READ_BATCH = 256
+
+
+class TopicNotFound(LookupError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class BusEvent:
+    seq: int
+    payload: Any
+
+
+@dataclass(frozen=True, slots=True)
+class TopicInfo:
+    topic: str
+    meta: dict[str, Any]
+    status: str
+    last_seq: int
+    # Oldest sequence still retained; ``last_seq + 1`` when nothing is retained.
+    first_seq: int
+    # Changes whenever the topic is replaced, so stale cursors can be detected.
+    epoch: str
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == TOPIC_OPEN
+
+
+@dataclass(eq=False, slots=True)
+class _Waiter:
+    topic: str
+    cursor: int
+    event: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class StreamBus(abc.ABC):
+    """Topic log with per-topic sequences, bounded retention and cursor reads."""
+
+    # Whether other worker processes see the same topics.
+    shared = False
+
+    def __init__(
+        self,
+        *,
+        max_events: int = 2_000,
+        ttl_seconds: float = 24 * 60 * 60,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.max_events = max(int(max_events), 1)
+        self.ttl_seconds = max(float(ttl_seconds), 1.0)
+        self.poll_interval = max(float(poll_interval), 0.01)
+        self._waiters: dict[str, set[_Waiter]] = {}
+
+    @abc.abstractmethod
+    async def open_topic(
+        self,
+        topic: str,
+        meta: dict[str, Any] | None = None,
+        *,
+        replace: bool = False,
+    ) -> tuple[TopicInfo, bool]:
+        """Create ``topic`` unless it exists; return ``(info, created)``.
+
+        ``replace=True`` discards an existing topic and starts again from
+        sequence 1.
+        """
+
+    @abc.abstractmethod
+    async def get_topic(self, topic: str) -> TopicInfo | None: ...
+
+    @abc.abstractmethod
+    async def publish(self, topic: str, payload: Any) -> int:
+        """Append ``payload`` (JSON-serialisable) and return its sequence."""
+
+    async def publish_many(self, topic: str, payloads: Sequence[Any]) -> int:
+        """Append ``payloads`` in order and return the last sequence."""
+        seq = 0
+        for payload in payloads:
+            seq = await self.publish(topic, payload)
+        return seq
+
+    @abc.abstractmethod
+    async def close_topic(self, topic: str, status: str) -> None:
+        """Mark the topic terminal; subscribers stop once they have drained it."""
+
+    @abc.abstractmethod
+    async def read(
+        self,
+        topic: str,
+        after_seq: int,
+        limit: int = _READ_BATCH,
+        *,
+        epoch: str | None = None,
+    ) -> list[BusEvent]:
+        """Return up to ``limit`` retained events with ``seq > after_seq``.
+
+        With ``epoch`` set, nothing is returned once the topic has been replaced.
+        """
+
+    async def aclose(self) -> None:
+        return None
+
+    def subscribe(
+        self,
+        topic: str,
+        *,
+        after_seq: int = 0,
+        heartbeat_seconds: float | None = None,
+    ) -> BusSubscription:
+        return BusSubscription(
+            self, topic, after_seq=after_seq, heartbeat_seconds=heartbeat_seconds
+        )
+
+    async def wait(
+        self,
+        topic: str,
+        cursor: int,
+        timeout: float | None,
+        *,
+        epoch: str | None = None,
+    ) -> bool:
+        """Wait until ``topic`` has events after ``cursor``, is closed or replaced.
+
+        Returns False on timeout. Wakeups are level-triggered against the log,
+        so any number of publishes while a subscriber is busy collapse into a
+        single wakeup.
+        """
+        waiter = _Waiter(topic, cursor)
+        self._waiters.setdefault(topic, set()).add(waiter)
+        self._on_wait_registered()
+        try:
+            # Re-check after registering so a publish in between is not missed.
+            if _moved(await self.get_topic(topic), cursor, epoch):
+                return True
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                slice_timeout = self._wait_slice(remaining)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), timeout=slice_timeout)
+                    return True
+                except asyncio.TimeoutError:
+                    if slice_timeout == remaining:
+                        return False
+                    if _moved(await self.get_topic(topic), cursor, epoch):
+                        return True
+        finally:
+            waiters = self._waiters.get(topic)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[topic]
+
+    def _wait_slice(self, remaining: float | None) -> float | None:
+        return remaining
+
+    def _on_wait_registered(self) -> None:
+        return None
+
+    def _wake(self, topic: str, last_seq: int | None = None) -> None:
+        for waiter in tuple(self._waiters.get(topic, ())):
+            if last_seq is None or last_seq > waiter.cursor:
+                waiter.event.set()
+
+
+def _moved(info: TopicInfo | None, cursor: int, epoch: str | None) -> bool:
+    if info is None or not info.is_open or info.last_seq > cursor:
+        return True
+    return epoch is not None and info.epoch != epoch
+
+
+class BusSubscription:
+    """Cursor over one topic: replays retained events, then follows live ones.
+
+    Iterating yields ``BusEvent`` objects, or ``None`` as a heartbeat when
+    ``heartbeat_seconds`` pass without events. Iteration ends once the topic is
+    closed (or removed) and every retained event has been delivered.
+    """
+
+    def __init__(
+        self,
+        bus: StreamBus,
+        topic: str,
+        *,
+        after_seq: int = 0,
+        heartbeat_seconds: float | None = None,
+    ) -> None:
+        self.bus = bus
+        self.topic = topic
+        self.cursor = max(int(after_seq), 0)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.dropped = 0
+
+    async def __aiter__(self) -> AsyncIterator[BusEvent | None]:
+        info = await self.bus.get_topic(self.topic)
+        if info is None:
+            return
+        epoch = info.epoch
+        while True:
+            events = await self.bus.read(self.topic, self.cursor, epoch=epoch)
+            if events:
+                gap = events[0].seq - self.cursor - 1
+                if gap > 0:
+                    self.dropped += gap
+                for event in events:
+                    self.cursor = event.seq
+                    yield event
+                continue
+            info = await self.bus.get_topic(self.topic)
+            if info is None or info.epoch != epoch:
+                # Removed, or replaced by a new stream that restarted its sequence.
+                return
+            if info.last_seq > self.cursor:
+                if info.first_seq > self.cursor + 1:
+                    # Retention moved past the cursor before it was read.
+                    self.dropped += info.first_seq - self.cursor - 1
+                    self.cursor = info.first_seq - 1
+                continue
+            if not info.is_open:
+                return
+            if not await self.bus.wait(
+                self.topic, self.cursor, self.heartbeat_seconds, epoch=epoch
+            ):
+                yield None
+
+
+@dataclass(slots=True)
+class _MemoryTopic:
+    meta: dict[str, Any]
+    status: str = TOPIC_OPEN
+    last_seq: int = 0
+    events: deque[BusEvent] = field(default_factory=deque)
+    updated_at: float = field(default_factory=time.monotonic)
+    epoch: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+
+class InProcessStreamBus(StreamBus):
+    """Topics in process memory; only subscribers in this worker can resume."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._topics: dict[str, _MemoryTopic] = {}
+
+    async def open_topic(
+        self,
+        topic: str,
+        meta: dict[str, Any] | None = None,
+        *,
+        replace: bool = False,
+    ) -> tuple[TopicInfo, bool]:
+        self._gc()
+        existing = self._topics.get(topic)
+        if existing is not None and not replace:
+            existing.updated_at = time.monotonic()
+            return self._info(topic, existing), False
+        state = _MemoryTopic(meta=dict(meta or {}))
+        self._topics[topic] = state
+        if existing is not None:
+            self._wake(topic)
+        return self._info(topic, state), True
+
+    async def get_topic(self, topic: str) -> TopicInfo | None:
+        state = self._topics.get(topic)
+        return self._info(topic, state) if state is not None else None
+
+    async def publish(self, topic: str, payload: Any) -> int:
+        state = self._topics.get(topic)
+        if state is None:
+            raise TopicNotFound(topic)
+        state.last_seq += 1
+        state.events.append(BusEvent(state.last_seq, payload))
+        if len(state.events) > self.max_events:
+            state.events.popleft()
+        state.updated_at = time.monotonic()
+        self._wake(topic, state.last_seq)
+        return state.last_seq
+
+    async def close_topic(self, topic: str, status: str) -> None:
+        state = self._topics.get(topic)
+        if state is None:
+            raise TopicNotFound(topic)
+        state.status = status
+        state.updated_at = time.monotonic()
+        self._wake(topic)
+
+    async def read(
+        self,
+        topic: str,
+        after_seq: int,
+        limit: int = _READ_BATCH,
+        *,
+        epoch: str | None = None,
+    ) -> list[BusEvent]:
+        state = self._topics.get(topic)
+        if state is None or not state.events:
+            return []
+        if epoch is not None and state.epoch != epoch:
+            return []
+        start = max(after_seq - state.events[0].seq + 1, 0)
+        return [
+            state.events[i] for i in range(start, min(start + limit, len(state.events)))
+        ]
+
+    def _info(self, topic: str, state: _MemoryTopic) -> TopicInfo:
+        first = state.events[0].seq if state.events else state.last_seq + 1
+        return TopicInfo(
+            topic, dict(state.meta), state.status, state.last_seq, first, state.epoch
+        )
+
+    def _gc(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [
+            topic
+            for topic, state in self._topics.items()
+            if state.updated_at < cutoff and topic not in self._waiters
+        ]
+        for topic in expired:
+            del self._topics[topic]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_bus_topics (
+    topic TEXT PRIMARY KEY,
+    meta TEXT NOT NULL,
+    status TEXT NOT NULL,
+    last_seq INTEGER NOT NULL,
+    epoch TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stream_bus_topics_updated
+    ON stream_bus_topics(updated_at);
+CREATE TABLE IF NOT EXISTS stream_bus_events (
+    topic TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (topic, seq)
+) WITHOUT ROWID;
+"""
+
+_SELECT_TOPIC_SQL = """
+SELECT meta, status, last_seq,
+       (SELECT MIN(seq) FROM stream_bus_events e WHERE e.topic = t.topic),
+       epoch
+FROM stream_bus_topics t WHERE topic = ?
+"""
+
+_READ_EVENTS_SQL = """
+SELECT seq, payload FROM stream_bus_events
+WHERE topic = ? AND seq > ?
+  AND (? IS NULL OR ? = (SELECT epoch FROM stream_bus_topics WHERE topic = ?))
+ORDER BY seq LIMIT ?
+"""
+
+
+class _NotifyPipes:
+    """One named pipe per process; a publish writes a byte to every other pipe.
+
+    A full pipe already has a wakeup pending, so writes that would block are
+    simply dropped. Pipes left behind by dead processes have no reader and are
+    removed the next time someone publishes. The directory listing is cached
+    and only re-read when the directory's mtime changes, i.e. when a pipe is
+    created or removed.
+    """
+
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(
+            directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.fifo"
+        )
+        os.mkfifo(self.path, 0o600)
+        self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        # Holding our own write end keeps the read end from reporting EOF.
+        self._keepalive = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        self._writers: dict[str, int] = {}
+        self._names: set[str] = set()
+        self._listed_mtime: int | None = None
+        self._lock = threading.Lock()
+
+    def drain(self) -> None:
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def notify(self) -> None:
+        with self._lock:
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+                if mtime != self._listed_mtime:
+                    self._names = set(os.listdir(self.directory))
+                    self._listed_mtime = mtime
+            except FileNotFoundError:
+                return
+            names = self._names
+            for path in list(self._writers):
+                if os.path.basename(path) not in names:
+                    os.close(self._writers.pop(path))
+            for name in names:
+                path = os.path.join(self.directory, name)
+                if path == self.path or not name.endswith(".fifo"):
+                    continue
+                self._notify_one(path)
+
+    def _notify_one(self, path: str) -> None:
+        fd = self._writers.get(path)
+        if fd is None:
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as exc:
+                if exc.errno == errno.ENXIO:
+                    # No reader: the owning process is gone.
+                    _unlink_quietly(path)
+                return
+            self._writers[path] = fd
+        try:
+            os.write(fd, b"\0")
+        except BlockingIOError:
+            pass
+        except OSError:
+            os.close(self._writers.pop(path))
+
+    def close(self) -> None:
+        with self._lock:
+            for fd in self._writers.values():
+                os.close(fd)
+            self._writers.clear()
+            os.close(self._keepalive)
+            os.close(self.fd)
+            _unlink_quietly(self.path)
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class SqliteStreamBus(StreamBus):
+    """Topics in an SQLite WAL database shared by all workers on one host."""
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        notify_dir: str | None = None,
+        use_pipes: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.path = str(path)
+        self._conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pipes: _NotifyPipes | None = None
+        if use_pipes and hasattr(os, "mkfifo"):
+            try:
+                self._pipes = _NotifyPipes(notify_dir or f"{self.path}.notify")
+            except OSError as exc:
+                logger.warning(f"Stream bus notify pipe unavailable, polling: {exc}")
+        self._reader_loop: asyncio.AbstractEventLoop | None = None
+        self._dispatch_task: asyncio.Task[None] | None = None
+
+    async def open_topic(
+        self,
+        topic: str,
+        meta: dict[str, Any] | None = None,
+        *,
+        replace: bool = False,
+    ) -> tuple[TopicInfo, bool]:
+        meta_json = json.dumps(meta or {}, ensure_ascii=False)
+        info, created = await asyncio.to_thread(
+            self._open_topic_sync, topic, meta_json, replace
+        )
+        if created and replace:
+            self._wake(topic)
+            await asyncio.to_thread(self._notify_others)
+        return info, created
+
+    async def get_topic(self, topic: str) -> TopicInfo | None:
+        return await asyncio.to_thread(self._get_topic_sync, topic)
+
+    async def publish(self, topic: str, payload: Any) -> int:
+        return await self.publish_many(topic, [payload])
+
+    async def publish_many(self, topic: str, payloads: Sequence[Any]) -> int:
+        # One transaction and one cross-process wakeup for the whole batch.
+        data = [json.dumps(payload, ensure_ascii=False) for payload in payloads]
+        seq = await asyncio.to_thread(self._publish_sync, topic, data)
+        self._wake(topic, seq)
+        return seq
+
+    async def close_topic(self, topic: str, status: str) -> None:
+        await asyncio.to_thread(self._close_topic_sync, topic, status)
+        self._wake(topic)
+
+    async def read(
+        self,
+        topic: str,
+        after_seq: int,
+        limit: int = _READ_BATCH,
+        *,
+        epoch: str | None = None,
+    ) -> list[BusEvent]:
+        return await asyncio.to_thread(self._read_sync, topic, after_seq, limit, epoch)
+
+    async def aclose(self) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._reader_loop is not None and self._pipes is not None:
+            try:
+                self._reader_loop.remove_reader(self._pipes.fd)
+            except Exception:
+                pass
+            self._reader_loop = None
+        if self._pipes is not None:
+            self._pipes.close()
+            self._pipes = None
+        with self._db_lock:
+            self._conn.close()
+
+    def _open_topic_sync(
+        self, topic: str, meta_json: str, replace: bool
+    ) -> tuple[TopicInfo, bool]:
+        now = time.time()
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._gc_locked(now)
+                if replace:
+                    conn.execute(
+                        "DELETE FROM stream_bus_events WHERE topic = ?", (topic,)
+                    )
+                    conn.execute(
+                        "DELETE FROM stream_bus_topics WHERE topic = ?", (topic,)
+                    )
+                created = (
+                    conn.execute(
+                        "INSERT OR IGNORE INTO stream_bus_topics "
+                        "(topic, meta, status, last_seq, epoch, updated_at) "
+                        "VALUES (?, ?, ?, 0, ?, ?)",
+                        (topic, meta_json, TOPIC_OPEN, uuid.uuid4().hex, now),
+                    ).rowcount
+                    == 1
+                )
+                if not created:
+                    conn.execute(
+                        "UPDATE stream_bus_topics SET updated_at = ? WHERE topic = ?",
+                        (now, topic),
+                    )
+                info = self._get_topic_locked(topic)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return info, created
+
+    def _get_topic_sync(self, topic: str) -> TopicInfo | None:
+        with self._db_lock:
+            return self._get_topic_locked(topic)
+
+    def _get_topic_locked(self, topic: str) -> TopicInfo | None:
+        row = self._conn.execute(_SELECT_TOPIC_SQL, (topic,)).fetchone()
+        if row is None:
+            return None
+        meta, status, last_seq, first_seq, epoch = row
+        return TopicInfo(
+            topic,
+            json.loads(meta),
+            status,
+            last_seq,
+            first_seq if first_seq is not None else last_seq + 1,
+            epoch,
+        )
+
+    def _publish_sync(self, topic: str, data: list[str]) -> int:
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last_seq FROM stream_bus_topics WHERE topic = ?", (topic,)
+                ).fetchone()
+                if row is None:
+                    raise TopicNotFound(topic)
+                first = row[0] + 1
+                seq = row[0] + len(data)
+                conn.execute(
+                    "UPDATE stream_bus_topics SET last_seq = ?, updated_at = ? "
+                    "WHERE topic = ?",
+                    (seq, time.time(), topic),
+                )
+                conn.executemany(
+                    "INSERT INTO stream_bus_events (topic, seq, payload) VALUES (?, ?, ?)",
+                    [(topic, first + i, item) for i, item in enumerate(data)],
+                )
+                if seq > self.max_events:
+                    conn.execute(
+                        "DELETE FROM stream_bus_events WHERE topic = ? AND seq <= ?",
+                        (topic, seq - self.max_events),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._notify_others()
+        return seq
+
+    def _close_topic_sync(self, topic: str, status: str) -> None:
+        with self._db_lock:
+            updated = self._conn.execute(
+                "UPDATE stream_bus_topics SET status = ?, updated_at = ? WHERE topic = ?",
+                (status, time.time(), topic),
+            ).rowcount
+        if not updated:
+            raise TopicNotFound(topic)
+        self._notify_others()
+
+    def _read_sync(
+        self, topic: str, after_seq: int, limit: int, epoch: str | None
+    ) -> list[BusEvent]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                _READ_EVENTS_SQL, (topic, after_seq, epoch, epoch, topic, limit)
+            ).fetchall()
+        return [BusEvent(seq, json.loads(payload)) for seq, payload in rows]
+
+    def _gc_locked(self, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        expired = [
+            row[0]
+            for row in self._conn.execute(
+                "SELECT topic FROM stream_bus_topics WHERE updated_at < ?", (cutoff,)
+            )
+        ]
+        for topic in expired:
+            self._conn.execute(
+                "DELETE FROM stream_bus_events WHERE topic = ?", (topic,)
+            )
+            self._conn.execute(
+                "DELETE FROM stream_bus_topics WHERE topic = ?", (topic,)
+            )
+
+    def _notify_others(self) -> None:
+        if self._pipes is not None:
+            self._pipes.notify()
+
+    def _wait_slice(self, remaining: float | None) -> float | None:
+        # Without a notify pipe (or if a wakeup is ever lost) fall back to polling.
+        if remaining is None:
+            return self.poll_interval
+        return min(remaining, self.poll_interval)
+
+    def _on_wait_registered(self) -> None:
+        if self._pipes is None:
+            return
+        loop = asyncio.get_running_loop()
+        if self._reader_loop is loop:
+            return
+        if self._reader_loop is not None and not self._reader_loop.is_closed():
+            self._reader_loop.remove_reader(self._pipes.fd)
+        loop.add_reader(self._pipes.fd, self._on_pipe_readable)
+        self._reader_loop = loop
+
+    def _on_pipe_readable(self) -> None:
+        if self._pipes is None:
+            return
+        self._pipes.drain()
+        if self._dispatch_task is None or self._dispatch_task.done():
+            self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        """Wake local waiters whose topic moved, using one query for all of them."""
+        topics = list(self._waiters)
+        if not topics:
+            return
+        states = await asyncio.to_thread(self._topic_states_sync, topics)
+        for topic in topics:
+            last_seq, status = states.get(topic, (None, None))
+            if status is None or status != TOPIC_OPEN:
+                self._wake(topic)
+            else:
+                self._wake(topic, last_seq)
+
+    def _topic_states_sync(self, topics: list[str]) -> dict[str, tuple[int, str]]:
+        placeholders = ",".join("?" for _ in topics)
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT topic, last_seq, status FROM stream_bus_topics "
+                f"WHERE topic IN ({placeholders})",
+                topics,
+            ).fetchall()
+        return {topic: (last_seq, status) for topic, last_seq, status in rows}
+
+
+_STREAM_BUS: StreamBus | None = None
+
+
+def create_stream_bus_from_env() -> StreamBus:
+    backend = (os.getenv("SAGE_STREAM_BUS") or "memory").strip().lower()
+    kwargs = {
+        "max_events": int(os.getenv("SAGE_STREAM_BUS_MAX_EVENTS", "2000")),
+        "ttl_seconds": float(
+            os.getenv("SAGE_STREAM_BUS_TTL_SECONDS", str(24 * 60 * 60))
+        ),
+    }
+    if backend == "sqlite":
+        path = os.getenv("SAGE_STREAM_BUS_PATH") or os.path.join(
+            tempfile.gettempdir(), "sage_stream_bus.db"
+        )
+        return SqliteStreamBus(path, **kwargs)
+    if backend != "memory":
+        logger.warning(f"Unknown SAGE_STREAM_BUS={backend!r}, using in-process bus")
+    return InProcessStreamBus(**kwargs)
+
+
+def get_stream_bus() -> StreamBus:
+    global _STREAM_BUS
+    if _STREAM_BUS is None:
+        _STREAM_BUS = create_stream_bus_from_env()
+    return _STREAM_BUS
+
+
+__all__ = [
+    "BusEvent",
+    "BusSubscription",
+    "InProcessStreamBus",
+    "SqliteStreamBus",
+    "StreamBus",
+    "TopicInfo",
+    "TopicNotFound",
+    "create_stream_bus_from_env",
+    "get_stream_bus",
+]
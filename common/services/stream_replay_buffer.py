@@ -0,0 +1,583 @@
+"""StreamManager 的有界回放缓冲。
+
+每个会话的流式 chunk 按偏移量（即客户端的 ``last_index`` 游标）顺序记录，
+断线重连时从客户端已收到的偏移继续回放：
+
+- 同一条 assistant 消息连续的增量 chunk 合并成一条记录，回放合并记录时附带
+  ``stream_offset``（回放后的下一个游标），客户端据此推进游标；
+- 单会话和全局的内存占用都有上限，超出后把较早的记录成批溢写到会话自己的环形文件；
+- 环形文件写满后覆盖最早的批次，更早的偏移不再可回放，回放从仍保留的最早偏移开始；
+- 溢写只在内存里登记批次位置，落盘交给单线程的写入器合并执行，不阻塞事件循环；
+  尚未落盘的批次直接从内存回放。
+"""
+
+from array import array
+import bisect
+import json
+import os
+import tempfile
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+DEFAULT_SESSION_MAX_BYTES = int(
+    os.getenv("SAGE_STREAM_REPLAY_SESSION_MAX_BYTES", str(4 * 1024 * 1024))
+)
+DEFAULT_TOTAL_MAX_BYTES = int(
+    os.getenv("SAGE_STREAM_REPLAY_TOTAL_MAX_BYTES", str(256 * 1024 * 1024))
+)
+DEFAULT_SPILL_MAX_BYTES = int(
+    os.getenv("SAGE_STREAM_REPLAY_SPILL_MAX_BYTES", str(64 * 1024 * 1024))
+)
+DEFAULT_SPILL_DIR = os.getenv("SAGE_STREAM_REPLAY_DIR") or os.path.join(
+    tempfile.gettempdir(), "sage_stream_replay"
+)
+
+# 合并时会累加的增量字段；其余字段（timestamp 除外）必须完全一致才允许合并
+_DELTA_FIELDS = ("content", "reasoning_content")
+_VOLATILE_FIELDS = frozenset(_DELTA_FIELDS) | {"timestamp"}
+# 这些类型由客户端单独处理，不能与普通增量合并
+_NON_DELTA_TYPES = frozenset(
+    {
+        "stream_end",
+        "error",
+        "token_usage",
+        "tool_progress",
+        "trace_info",
+        "chunk_start",
+        "json_chunk",
+        "chunk_end",
+    }
+)
+# 单条合并记录的上限，避免一条超长消息变成无法溢写的大块
+_MAX_RUN_BYTES = 64 * 1024
+_READ_BATCH = 256
+
+# 单线程保证同一个环形文件的写入按提交顺序落盘
+_spill_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replay-spill")
+
+
+def flush_spill_writes() -> None:
+    """等待已提交的溢写全部落盘（测试与进程退出时使用）。"""
+    _spill_writer.submit(lambda: None).result()
+
+
+def _parse_delta(chunk: str) -> Optional[Dict[str, Any]]:
+    """可合并的增量 chunk 返回解析后的 dict，否则返回 None。"""
+    if not chunk.startswith("{"):
+        return None
+    try:
+        payload = json.loads(chunk)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or not payload.get("message_id"):
+        return None
+    if payload.get("role") != "assistant" or payload.get("type") in _NON_DELTA_TYPES:
+        return None
+    if payload.get("tool_calls") or payload.get("tool_call_id"):
+        return None
+    if "stream_offset" in payload:
+        return None
+    for name in _DELTA_FIELDS:
+        value = payload.get(name)
+        if value is not None and not isinstance(value, str):
+            return None
+    return payload
+
+
+def _dump(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+def with_stream_offset(chunk: str, offset: int) -> str:
+    """给 JSON chunk 附上 ``stream_offset``（回放后的下一个游标）。"""
+    try:
+        payload = json.loads(chunk)
+    except ValueError:
+        return chunk
+    if not isinstance(payload, dict):
+        return chunk
+    payload["stream_offset"] = offset
+    return _dump(payload)
+
+
+def _suffix(chunk: str, cuts: Sequence[int], index: int, end: int) -> str:
+    """从合并记录中取出第 index 个分片及之后的部分。"""
+    payload = json.loads(chunk)
+    base = index * len(_DELTA_FIELDS)
+    for i, name in enumerate(_DELTA_FIELDS):
+        if isinstance(payload.get(name), str):
+            payload[name] = payload[name][cuts[base + i] :]
+    payload["stream_offset"] = end
+    return _dump(payload)
+
+
+@dataclass
+class _Record:
+    """内存中的一条回放记录，覆盖偏移 [start, end)。"""
+
+    start: int
+    end: int
+    chunk: str
+    nbytes: int
+    # 合并记录中每个分片起点在各增量字段里的字符位置（按分片依次平铺），单条记录为 None
+    cuts: Optional[Sequence[int]] = None
+
+
+class _OpenRun:
+    """尚在增长的合并记录：分片先放在列表里，定型时再拼接。"""
+
+    def __init__(self, start: int, payload: Dict[str, Any], nbytes: int):
+        self.start = start
+        self.end = start + 1
+        self.base = {k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS}
+        self.timestamp = payload.get("timestamp")
+        self.present = [name in payload for name in _DELTA_FIELDS]
+        self.pieces: List[List[str]] = [[] for _ in _DELTA_FIELDS]
+        self.lengths = [0] * len(_DELTA_FIELDS)
+        self.cuts = array("l")
+        self.nbytes = 0
+        self.add(payload, nbytes)
+
+    def accepts(self, payload: Dict[str, Any], nbytes: int) -> bool:
+        if self.nbytes + nbytes > _MAX_RUN_BYTES:
+            return False
+        base = {k: v for k, v in payload.items() if k not in _VOLATILE_FIELDS}
+        return base == self.base
+
+    def add(self, payload: Dict[str, Any], nbytes: int) -> None:
+        self.cuts.extend(self.lengths)
+        for i, name in enumerate(_DELTA_FIELDS):
+            value = payload.get(name)
+            if name in payload:
+                self.present[i] = True
+            if value:
+                self.pieces[i].append(value)
+                self.lengths[i] += len(value)
+        if "timestamp" in payload:
+            self.timestamp = payload["timestamp"]
+        self.nbytes += nbytes
+
+    def render(self) -> str:
+        payload = dict(self.base)
+        for i, name in enumerate(_DELTA_FIELDS):
+            if self.present[i]:
+                payload[name] = "".join(self.pieces[i])
+        if self.timestamp is not None:
+            payload["timestamp"] = self.timestamp
+        if self.end - self.start > 1:
+            payload["stream_offset"] = self.end
+        return _dump(payload)
+
+    def seal(self) -> _Record:
+        chunk = self.render()
+        if self.end - self.start == 1:
+            return _Record(self.start, self.end, chunk, self.nbytes)
+        return _Record(
+            self.start,
+            self.end,
+            chunk,
+            len(chunk.encode("utf-8")) + self.cuts.itemsize * len(self.cuts),
+            cuts=self.cuts,
+        )
+
+
+class _SpillRing:
+    """会话级环形溢写文件：按批次顺序写入，写满后回到文件头覆盖最早的批次。
+
+    批次位置在调用线程里同步登记，数据交给写入线程批量落盘；写入完成前
+    ``_unwritten`` 保留数据，回放直接读内存。
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        self._file = None
+        self._reader = None
+        self._write_pos = 0
+        # (文件位置, 长度, 起始偏移, 结束偏移)，按写入顺序排列
+        self._batches: deque = deque()
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[int, bytes]] = []
+        self._unwritten: Dict[int, bytes] = {}
+        self._scheduled = False
+        self._closed = False
+
+    @property
+    def floor(self) -> Optional[int]:
+        return self._batches[0][2] if self._batches else None
+
+    @property
+    def end(self) -> Optional[int]:
+        return self._batches[-1][3] if self._batches else None
+
+    def append(self, records: List[_Record]) -> None:
+        data = "\n".join(
+            json.dumps(
+                [r.start, r.end, r.chunk, r.cuts.tolist() if r.cuts else None],
+                ensure_ascii=False,
+            )
+            for r in records
+        ).encode("utf-8")
+        if len(data) > self.capacity:
+            # 单批就超过容量：整个环都被覆盖，只能丢弃
+            self._batches.clear()
+            self._write_pos = 0
+            return
+        if self._write_pos + len(data) > self.capacity:
+            # 回绕前，上一圈尚未被覆盖的尾部批次（最老的一批）一并淘汰
+            while self._batches and self._batches[0][0] >= self._write_pos:
+                self._batches.popleft()
+            self._write_pos = 0
+        pos = self._write_pos
+        # 顺序写入保证被覆盖的总是队首（最早）的批次
+        while self._batches:
+            first_pos, first_len = self._batches[0][0], self._batches[0][1]
+            if first_pos >= pos + len(data) or first_pos + first_len <= pos:
+                break
+            self._batches.popleft()
+        self._batches.append((pos, len(data), records[0].start, records[-1].end))
+        self._write_pos = pos + len(data)
+        self.bytes_written += len(data)
+        with self._lock:
+            self._pending.append((pos, data))
+            self._unwritten[pos] = data
+            if self._scheduled:
+                return
+            self._scheduled = True
+        _spill_writer.submit(self._drain)
+
+    def _drain(self) -> None:
+        """写入线程：把积压的批次一次写完再 flush。"""
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if not pending or self._closed:
+                    self._scheduled = False
+                    return
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    self._file = open(self.path, "w+b")
+                for pos, data in pending:
+                    self._file.seek(pos)
+                    self._file.write(data)
+                self._file.flush()
+            except OSError as exc:
+                logger.warning(f"Replay spill write failed for {self.path}: {exc}")
+            with self._lock:
+                for pos, data in pending:
+                    if self._unwritten.get(pos) is data:
+                        del self._unwritten[pos]
+
+    def read(self, offset: int) -> List[_Record]:
+        """返回覆盖 offset 的批次里 end > offset 的记录。"""
+        for pos, length, start, end in self._batches:
+            if end <= offset:
+                continue
+            with self._lock:
+                data = self._unwritten.get(pos)
+            if data is None:
+                if self._reader is None:
+                    self._reader = open(self.path, "rb")
+                self._reader.seek(pos)
+                data = self._reader.read(length)
+            records = []
+            for line in data.decode("utf-8").split("\n"):
+                s, e, chunk, cuts = json.loads(line)
+                if e > offset:
+                    cuts = array("l", cuts) if cuts else None
+                    records.append(_Record(s, e, chunk, 0, cuts))
+            return records
+        return []
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._pending = []
+            self._unwritten.clear()
+        self._batches.clear()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        # 排在已提交的写入之后执行，不会与写入线程争用文件
+        _spill_writer.submit(self._remove)
+
+    def _remove(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class StreamReplayBuffer:
+    """单个会话的回放缓冲，偏移从 0 开始连续递增。"""
+
+    def __init__(
+        self,
+        session_id: str,
+        *,
+        pool: Optional["ReplayBufferPool"] = None,
+        max_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+        spill_dir: str = DEFAULT_SPILL_DIR,
+        spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES,
+    ):
+        self.session_id = session_id
+        self.max_bytes = max_bytes
+        self._pool = pool
+        self._records: List[_Record] = []
+        self._starts: List[int] = []
+        self._open: Optional[_OpenRun] = None
+        self._next_offset = 0
+        self._dropped_until = 0
+        self.memory_bytes = 0
+        self.spill_max_bytes = spill_max_bytes
+        self._ring: Optional[_SpillRing] = None
+        self._spill_dir = spill_dir
+        self.closed = False
+
+    def __len__(self) -> int:
+        return self._next_offset
+
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    @property
+    def floor(self) -> int:
+        """仍可回放的最早偏移。"""
+        if self._ring is not None and self._ring.floor is not None:
+            return self._ring.floor
+        if self._records:
+            return self._records[0].start
+        if self._open is not None:
+            return self._open.start
+        return max(self._dropped_until, 0) if self._next_offset else 0
+
+    @property
+    def sealed_bytes(self) -> int:
+        """内存中已定型、可以溢写的字节数（不含仍在合并的记录）。"""
+        return self.memory_bytes - (self._open.nbytes if self._open is not None else 0)
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._ring.bytes_written if self._ring is not None else 0
+
+    def append(self, chunk: str) -> int:
+        """追加一个 chunk，返回它的偏移。"""
+        offset = self._next_offset
+        self._next_offset += 1
+        nbytes = len(chunk.encode("utf-8"))
+        payload = _parse_delta(chunk)
+        if (
+            payload is not None
+            and self._open is not None
+            and self._open.accepts(payload, nbytes)
+        ):
+            self._open.add(payload, nbytes)
+            self._open.end = offset + 1
+        else:
+            self._seal_open()
+            if payload is not None:
+                self._open = _OpenRun(offset, payload, nbytes)
+            else:
+                self._push(_Record(offset, offset + 1, chunk, nbytes))
+        self._grow(nbytes)
+        return offset
+
+    def read(self, offset: int, limit: int = _READ_BATCH) -> List[Tuple[int, str]]:
+        """从 offset 起读取至多 limit 条回放记录，返回 (下一个游标, chunk) 列表。"""
+        if offset >= self._next_offset:
+            return []
+        floor = self.floor
+        skipped = offset < floor
+        if skipped:
+            logger.warning(
+                f"Replay offset {offset} for {self.session_id} already evicted, "
+                f"resuming from {floor}"
+            )
+            offset = floor
+        memory_start = self._memory_start()
+        if offset < memory_start and self._ring is not None:
+            records = self._ring.read(offset)
+        else:
+            index = max(bisect.bisect_right(self._starts, offset) - 1, 0)
+            records = self._records[index : index + limit]
+        items: List[Tuple[int, str]] = []
+        for record in records[:limit]:
+            if record.end <= offset:
+                continue
+            items.append((record.end, self._render(record, offset)))
+            offset = record.end
+        if len(items) < limit and self._open is not None and offset < self._open.end:
+            if not items or items[-1][0] >= self._open.start:
+                run = self._open
+                if offset <= run.start:
+                    items.append((run.end, run.render()))
+                else:
+                    items.append(
+                        (
+                            run.end,
+                            _suffix(
+                                run.render(), run.cuts, offset - run.start, run.end
+                            ),
+                        )
+                    )
+        if skipped and items:
+            # 跳过了被淘汰的偏移：第一条带上游标，客户端据此校正
+            items[0] = (items[0][0], with_stream_offset(items[0][1], items[0][0]))
+        return items
+
+    def spill(self, target_bytes: int) -> int:
+        """把最早的已定型记录移出内存，直到内存占用不超过 target_bytes，返回释放的字节数。"""
+        freed = 0
+        count = 0
+        while self.memory_bytes - freed > target_bytes and count < len(self._records):
+            freed += self._records[count].nbytes
+            count += 1
+        if not count:
+            return 0
+        batch = self._records[:count]
+        del self._records[:count]
+        del self._starts[:count]
+        if self.spill_max_bytes > 0:
+            if self._ring is None:
+                self._ring = _SpillRing(
+                    os.path.join(self._spill_dir, f"{uuid.uuid4().hex}.ring"),
+                    self.spill_max_bytes,
+                )
+            self._ring.append(batch)
+        self._dropped_until = batch[-1].end
+        self.memory_bytes -= freed
+        if self._pool is not None:
+            self._pool._account(-freed)
+        return freed
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._ring is not None:
+            self._ring.close()
+        if self._pool is not None:
+            self._pool._account(-self.memory_bytes)
+            self._pool._discard(self)
+        self.memory_bytes = 0
+        self._records = []
+        self._starts = []
+        self._open = None
+
+    def _render(self, record: _Record, offset: int) -> str:
+        if offset <= record.start or not record.cuts:
+            return record.chunk
+        return _suffix(record.chunk, record.cuts, offset - record.start, record.end)
+
+    def _memory_start(self) -> int:
+        if self._records:
+            return self._records[0].start
+        if self._open is not None:
+            return self._open.start
+        return self._next_offset
+
+    def _seal_open(self) -> None:
+        if self._open is None:
+            return
+        run, self._open = self._open, None
+        record = run.seal()
+        # 合并后只保留拼接结果，按定型后的大小重新计量
+        delta = record.nbytes - run.nbytes
+        self._push(record)
+        self.memory_bytes += delta
+        if self._pool is not None:
+            self._pool._account(delta)
+
+    def _push(self, record: _Record) -> None:
+        self._records.append(record)
+        self._starts.append(record.start)
+
+    def _grow(self, nbytes: int) -> None:
+        self.memory_bytes += nbytes
+        if self.memory_bytes > self.max_bytes:
+            # 溢写到一半，避免每个 chunk 都触发一次小批量写盘
+            self._seal_if_large()
+            self.spill(self.max_bytes // 2)
+        if self._pool is not None:
+            self._pool._account(nbytes)
+            self._pool._enforce()
+
+    def _seal_if_large(self) -> None:
+        if self._open is not None and self._open.nbytes * 2 > self.max_bytes:
+            self._seal_open()
+
+
+class ReplayBufferPool:
+    """管理所有会话的回放缓冲并维护全局内存上限。"""
+
+    def __init__(
+        self,
+        *,
+        max_total_bytes: int = DEFAULT_TOTAL_MAX_BYTES,
+        session_max_bytes: int = DEFAULT_SESSION_MAX_BYTES,
+        spill_dir: str = DEFAULT_SPILL_DIR,
+        spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES,
+    ):
+        self.max_total_bytes = max_total_bytes
+        self.session_max_bytes = session_max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+        self.memory_bytes = 0
+        self._buffers: Dict[int, StreamReplayBuffer] = {}
+        self.stats = {"global_spills": 0}
+
+    def create(self, session_id: str) -> StreamReplayBuffer:
+        buffer = StreamReplayBuffer(
+            session_id,
+            pool=self,
+            max_bytes=self.session_max_bytes,
+            spill_dir=self.spill_dir,
+            spill_max_bytes=self.spill_max_bytes,
+        )
+        self._buffers[id(buffer)] = buffer
+        return buffer
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def _account(self, delta: int) -> None:
+        self.memory_bytes += delta
+
+    def _discard(self, buffer: StreamReplayBuffer) -> None:
+        self._buffers.pop(id(buffer), None)
+
+    def _enforce(self) -> None:
+        while self.memory_bytes > self.max_total_bytes and self._buffers:
+            # 优先溢写已定型数据最多的会话，它通常也是最早开始、最不可能被完整回放的
+            largest = max(self._buffers.values(), key=lambda b: b.sealed_bytes)
+            if not largest.sealed_bytes:
+                # 只剩仍在合并的记录：把占用最多的一条定型后再溢写
+                largest = max(self._buffers.values(), key=lambda b: b.memory_bytes)
+                largest._seal_open()
+            # 一次溢写约一半的已定型数据，避免每个 chunk 都触发一次小批量写盘
+            release = max(1, largest.sealed_bytes // 2)
+            if not largest.spill(largest.memory_bytes - release):
+                break
+            self.stats["global_spills"] += 1
+
+
+_default_pool: Optional[ReplayBufferPool] = None
+
+
+def get_default_replay_pool() -> ReplayBufferPool:
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ReplayBufferPool()
+    return _default_pool
@@ -51,11 +51,13 @@ async def get_agent_usage_stats_data(
     days: int,
     user_id: Optional[str] = None,
     agent_id: Optional[str] = None,
+    top_n: Optional[int] = None,
 ) -> Dict[str, int]:
     return await conversation_service.get_agent_usage_stats(
         days=days,
         user_id=user_id,
         agent_id=agent_id,
+        top_n=top_n,
     )
 
 
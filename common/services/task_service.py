@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional, Tuple
 import time
 
@@ -342,9 +342,18 @@ class TaskService:
         *,
         user_id: str = "",
         limit: int = 100,
+        horizon_seconds: int = 0,
     ) -> List[Task]:
+        """
+        返回 execute_at 早于 now + horizon_seconds 的 pending 任务（按 execute_at 排序）。
+
+        horizon_seconds > 0 时调度器可以提前把即将到点的任务装入本地时间轮。
+        """
+        due_before = None
+        if horizon_seconds > 0:
+            due_before = get_local_now() + timedelta(seconds=horizon_seconds)
         items = await self.dao.get_due_pending_tasks(
-            user_id=user_id or None, limit=limit
+            user_id=user_id or None, limit=limit, due_before=due_before
         )
         return items
 
@@ -530,5 +539,27 @@ class TaskService:
                 continue
         return spawned
 
+    async def get_next_recurring_run_at(
+        self,
+        *,
+        user_id: str = "",
+    ) -> Optional[datetime]:
+        """所有启用的 recurring task 中最早的下一次 cron 触发时间"""
+        if croniter is None:
+            return None
+
+        now = get_local_now()
+        next_run_at: Optional[datetime] = None
+        recurring_tasks = await self.dao.get_enabled_recurring_tasks(
+            user_id=user_id or None
+        )
+        for recurring_task in recurring_tasks:
+            if not croniter.is_valid(recurring_task.cron_expression):
+                continue
+            candidate = croniter(recurring_task.cron_expression, now).get_next(datetime)
+            if next_run_at is None or candidate < next_run_at:
+                next_run_at = candidate
+        return next_run_at
+
 
 task_service = TaskService()
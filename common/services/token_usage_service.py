@@ -8,6 +8,7 @@ from typing import Any, Dict, Optional
 from loguru import logger
 
 from common.models.base import get_local_now
+from common.models.conversation import ConversationDao
 from common.models.token_usage import TokenUsage, TokenUsageDao
 
 
@@ -131,6 +132,7 @@ async def record_session_execution(
         finished_at=resolved_finished_at,
     )
     await TokenUsageDao().save_usage(record)
+    await ConversationDao().add_total_tokens(record.session_id, record.total_tokens)
     logger.bind(
         session_id=record.session_id,
         agent_id=record.agent_id,
@@ -196,6 +198,7 @@ async def record_execution_payload(
         finished_at=resolved_finished_at,
     )
     await TokenUsageDao().save_usage(record)
+    await ConversationDao().add_total_tokens(record.session_id, record.total_tokens)
     logger.bind(
         session_id=record.session_id,
         agent_id=record.agent_id,
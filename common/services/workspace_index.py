@@ -0,0 +1,361 @@
+"""工作空间文件元数据缓存（server / desktop 共用）。
+
+按目录缓存一级子项的名称、类型、大小与修改时间：
+- 读取目录时先 ``stat`` 目录本身，目录 mtime 未变且未超过 TTL 就复用快照，
+  否则重新 ``scandir``。目录 mtime 只反映增删改名，原地修改的文件由 TTL 兜底；
+  分页返回的条目会重新 ``stat``，保证页面上的大小与时间是最新的。
+- 文件内容哈希按（大小, mtime_ns, inode）缓存，元数据不变时直接复用。
+- 刚修改过（mtime 距今不足 1 秒）的目录与文件不缓存，避免同一时间戳内的
+  连续修改被漏掉。
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sagents.utils.stat_cache import (
+    dirs_unchanged,
+    is_racy,
+    lru_put,
+    md5_file,
+    stat_signature,
+)
+
+WORKSPACE_INDEX_TTL_SECONDS = float(os.getenv("SAGE_WORKSPACE_INDEX_TTL_SECONDS", "5"))
+# 所有目录快照合计保留的条目上限，超出后按最近最少使用淘汰目录
+WORKSPACE_INDEX_MAX_ENTRIES = int(
+    os.getenv("SAGE_WORKSPACE_INDEX_MAX_ENTRIES", "500000")
+)
+WORKSPACE_HASH_CACHE_SIZE = int(os.getenv("SAGE_WORKSPACE_HASH_CACHE_SIZE", "100000"))
+# 缓存的排序结果（按 目录 + 深度 + 排序字段）数量上限
+WORKSPACE_LISTING_CACHE_SIZE = int(os.getenv("SAGE_WORKSPACE_LISTING_CACHE_SIZE", "16"))
+WORKSPACE_LISTING_DEFAULT_LIMIT = 200
+WORKSPACE_LISTING_MAX_LIMIT = 1000
+SORT_FIELDS = ("name", "size", "modified_time")
+SORT_ORDERS = ("asc", "desc")
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析或与排序方式不匹配。"""
+
+
+class WorkspaceEntry(NamedTuple):
+    name: str
+    is_directory: bool
+    is_symlink: bool
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class _DirSnapshot:
+    mtime_ns: int
+    scanned_at: float
+    entries: Tuple[WorkspaceEntry, ...]
+
+
+@dataclass
+class _Listing:
+    """一次遍历的排序结果，以及遍历到的每个目录的 mtime。"""
+
+    dir_mtimes: List[Tuple[str, int]]
+    scanned_at: float
+    items: List[Tuple[Tuple[Any, str], str, WorkspaceEntry]]
+    keys: List[Tuple[Any, str]]
+    truncated_by_depth: bool
+
+
+def _encode_cursor(sort_by: str, key: Tuple[Any, str]) -> str:
+    raw = json.dumps([sort_by, *key], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        field, value, path = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError(cursor) from exc
+    if field != sort_by or not isinstance(path, str):
+        raise InvalidCursorError(cursor)
+    if sort_by == "name":
+        if not isinstance(value, str):
+            raise InvalidCursorError(cursor)
+    elif not isinstance(value, int):
+        raise InvalidCursorError(cursor)
+    return value, path
+
+
+def _sort_key(sort_by: str, path: str, entry: WorkspaceEntry) -> Tuple[Any, str]:
+    if sort_by == "size":
+        return entry.size, path
+    if sort_by == "modified_time":
+        return entry.mtime_ns, path
+    return path, path
+
+
+class WorkspaceIndex:
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = WORKSPACE_INDEX_TTL_SECONDS,
+        max_entries: int = WORKSPACE_INDEX_MAX_ENTRIES,
+        hash_cache_size: int = WORKSPACE_HASH_CACHE_SIZE,
+        listing_cache_size: int = WORKSPACE_LISTING_CACHE_SIZE,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hash_cache_size = hash_cache_size
+        self.listing_cache_size = listing_cache_size
+        self._lock = threading.Lock()
+        self._dirs: OrderedDict[str, _DirSnapshot] = OrderedDict()
+        self._entry_count = 0
+        self._listings: OrderedDict[Tuple[Any, ...], _Listing] = OrderedDict()
+        self._hashes: OrderedDict[str, Tuple[Tuple[int, int, int], str]] = OrderedDict()
+        self.stats = {
+            "dir_hits": 0,
+            "dir_scans": 0,
+            "listing_hits": 0,
+            "hash_hits": 0,
+            "hash_misses": 0,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dirs.clear()
+            self._listings.clear()
+            self._hashes.clear()
+            self._entry_count = 0
+
+    def list_dir(self, directory: str) -> Tuple[WorkspaceEntry, ...]:
+        """返回目录的一级子项（跳过隐藏文件），按名称排序。"""
+        return self._read_dir(os.path.abspath(directory), check_ttl=True)[1]
+
+    def _read_dir(
+        self, directory: str, *, check_ttl: bool
+    ) -> Tuple[int, Tuple[WorkspaceEntry, ...]]:
+        """``check_ttl=False`` 时只比较目录 mtime：只关心增删改名时不必受 TTL 约束。"""
+        dir_stat = os.stat(directory)
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._dirs.get(directory)
+            if (
+                snapshot is not None
+                and snapshot.mtime_ns == dir_stat.st_mtime_ns
+                and (not check_ttl or now - snapshot.scanned_at < self.ttl_seconds)
+            ):
+                self._dirs.move_to_end(directory)
+                self.stats["dir_hits"] += 1
+                return snapshot.mtime_ns, snapshot.entries
+
+        entries: List[WorkspaceEntry] = []
+        with os.scandir(directory) as iterator:
+            for item in iterator:
+                if item.name.startswith("."):
+                    continue
+                try:
+                    item_stat = item.stat()
+                    is_directory = item.is_dir()
+                    is_symlink = item.is_symlink()
+                except OSError:
+                    continue
+                entries.append(
+                    WorkspaceEntry(
+                        item.name,
+                        is_directory,
+                        is_symlink,
+                        0 if is_directory else item_stat.st_size,
+                        item_stat.st_mtime_ns,
+                    )
+                )
+        entries.sort()
+        result = tuple(entries)
+
+        with self._lock:
+            self.stats["dir_scans"] += 1
+            previous = self._dirs.pop(directory, None)
+            if previous is not None:
+                self._entry_count -= len(previous.entries)
+            if not is_racy(dir_stat.st_mtime_ns):
+                self._dirs[directory] = _DirSnapshot(dir_stat.st_mtime_ns, now, result)
+                self._entry_count += len(result)
+                while self._entry_count > self.max_entries and len(self._dirs) > 1:
+                    _, evicted = self._dirs.popitem(last=False)
+                    self._entry_count -= len(evicted.entries)
+        return dir_stat.st_mtime_ns, result
+
+    def walk(
+        self,
+        workspace_root: str,
+        listing_root: str,
+        max_depth: Optional[int],
+    ) -> Iterator[Tuple[str, WorkspaceEntry, int]]:
+        """遍历 ``listing_root`` 下 ``max_depth`` 层以内的条目。
+
+        产出（工作空间相对路径, 条目, 所在目录深度），``listing_root`` 深度为 0。
+        ``max_depth=0`` 只返回直接子项，``None`` 不限深度；不进入符号链接目录。
+        """
+        return self._walk(workspace_root, listing_root, max_depth, True, [])
+
+    def _walk(
+        self,
+        workspace_root: str,
+        listing_root: str,
+        max_depth: Optional[int],
+        check_ttl: bool,
+        dir_mtimes: List[Tuple[str, int]],
+    ) -> Iterator[Tuple[str, WorkspaceEntry, int]]:
+        workspace_root = os.path.abspath(workspace_root)
+        pending = [(os.path.abspath(listing_root), 0)]
+        while pending:
+            directory, depth = pending.pop()
+            try:
+                mtime_ns, entries = self._read_dir(directory, check_ttl=check_ttl)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            dir_mtimes.append((directory, mtime_ns))
+            relative = os.path.relpath(directory, workspace_root)
+            prefix = "" if relative == "." else relative + os.sep
+            descend = max_depth is None or depth < max_depth
+            for entry in entries:
+                yield prefix + entry.name, entry, depth
+                if descend and entry.is_directory and not entry.is_symlink:
+                    pending.append((os.path.join(directory, entry.name), depth + 1))
+
+    def _collect(
+        self,
+        workspace_root: str,
+        listing_root: str,
+        max_depth: Optional[int],
+        sort_by: str,
+    ) -> _Listing:
+        """遍历并排序；结果按目录 mtime 校验后复用，按名称排序时不受 TTL 约束。"""
+        key = (
+            os.path.abspath(workspace_root),
+            os.path.abspath(listing_root),
+            max_depth,
+            sort_by,
+        )
+        check_ttl = sort_by != "name"
+        now = time.monotonic()
+        with self._lock:
+            listing = self._listings.get(key)
+        if (
+            listing is not None
+            and (not check_ttl or now - listing.scanned_at < self.ttl_seconds)
+            and dirs_unchanged(listing.dir_mtimes)
+        ):
+            with self._lock:
+                if key in self._listings:
+                    self._listings.move_to_end(key)
+                self.stats["listing_hits"] += 1
+            return listing
+
+        dir_mtimes: List[Tuple[str, int]] = []
+        items = []
+        truncated_by_depth = False
+        for path, entry, depth in self._walk(
+            workspace_root, listing_root, max_depth, check_ttl, dir_mtimes
+        ):
+            items.append((_sort_key(sort_by, path, entry), path, entry))
+            if entry.is_directory and depth == max_depth:
+                truncated_by_depth = True
+        # 排序键末尾是唯一的路径，元组比较不会落到 entry 上
+        items.sort()
+        listing = _Listing(
+            dir_mtimes, now, items, [item[0] for item in items], truncated_by_depth
+        )
+        if not any(is_racy(mtime_ns) for _, mtime_ns in dir_mtimes):
+            with self._lock:
+                lru_put(self._listings, key, listing, self.listing_cache_size)
+        return listing
+
+    def list_page(
+        self,
+        workspace_root: str,
+        listing_root: str,
+        *,
+        max_depth: Optional[int] = 0,
+        sort_by: str = "name",
+        order: str = "asc",
+        cursor: Optional[str] = None,
+        limit: int = WORKSPACE_LISTING_DEFAULT_LIMIT,
+    ) -> Dict[str, Any]:
+        """按游标分页列出条目；排序键相同时按路径排序，保证翻页稳定。"""
+        cursor_key = _decode_cursor(cursor, sort_by) if cursor else None
+        listing = self._collect(workspace_root, listing_root, max_depth, sort_by)
+        items, keys = listing.items, listing.keys
+
+        if order == "desc":
+            end = (
+                bisect_left(keys, cursor_key) if cursor_key is not None else len(items)
+            )
+            start = max(0, end - limit)
+            page = items[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = bisect_right(keys, cursor_key) if cursor_key is not None else 0
+            page = items[start : start + limit]
+            has_more = start + limit < len(items)
+
+        workspace_root = os.path.abspath(workspace_root)
+        entries = []
+        for _, path, entry in page:
+            try:
+                current = os.stat(os.path.join(workspace_root, path))
+            except OSError:
+                continue
+            entries.append(
+                {
+                    "name": entry.name,
+                    "path": path,
+                    "size": 0 if entry.is_directory else current.st_size,
+                    "modified_time": current.st_mtime,
+                    "is_directory": entry.is_directory,
+                }
+            )
+        return {
+            "entries": entries,
+            "total": len(items),
+            "truncated_by_depth": listing.truncated_by_depth,
+            "has_more": has_more,
+            "next_cursor": _encode_cursor(sort_by, page[-1][0])
+            if page and has_more
+            else None,
+        }
+
+    def content_hash(
+        self, path: str, file_stat: Optional[os.stat_result] = None
+    ) -> str:
+        """文件内容 MD5；大小、mtime、inode 都未变时直接返回缓存值。"""
+        path = os.path.abspath(path)
+        file_stat = file_stat or os.stat(path)
+        signature = stat_signature(file_stat)
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached is not None and cached[0] == signature:
+                self._hashes.move_to_end(path)
+                self.stats["hash_hits"] += 1
+                return cached[1]
+            self.stats["hash_misses"] += 1
+
+        digest = md5_file(path)
+        if stat_signature(os.stat(path)) == signature and not is_racy(signature[1]):
+            with self._lock:
+                lru_put(self._hashes, path, (signature, digest), self.hash_cache_size)
+        return digest
+
+
+_WORKSPACE_INDEX = WorkspaceIndex()
+
+
+def get_workspace_index() -> WorkspaceIndex:
+    return _WORKSPACE_INDEX
@@ -0,0 +1,384 @@
+"""流式 zip 打包。
+
+边遍历目录边产出 zip 字节，不落临时文件，第一个字节在读到第一个文件时就能发出。
+
+设计要点：
+- 每个条目写本地文件头时还不知道 CRC 与大小，置位 bit 3，在文件数据之后补
+  data descriptor；中央目录在末尾按实际值写出。
+- 单个文件大小、偏移量或条目数超出 32 位上限时使用 ZIP64 扩展字段与
+  ZIP64 结束记录，普通文件仍写标准格式，兼容旧解压工具。
+- 文件大小以打包开始时 ``stat`` 的结果为准，打包过程中继续增长的部分不会写入。
+- 每次最多读取 ``chunk_size`` 字节并随即交出已产生的输出，小文件的头部、
+  中央目录按 ``chunk_size`` 攒批；同一时刻最多缓冲一个分片。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from loguru import logger
+
+ZIP_CHUNK_SIZE = int(os.getenv("SAGE_WORKSPACE_ZIP_CHUNK_BYTES", str(1024 * 1024)))
+
+# auto 模式下直接存储（不再压缩）的扩展名：本身已压缩，deflate 只会白耗 CPU
+STORED_SUFFIXES = frozenset(
+    {
+        ".7z", ".aac", ".avi", ".br", ".bz2", ".docx", ".epub", ".flac",
+        ".gif", ".gz", ".heic", ".jar", ".jpeg", ".jpg", ".m4a", ".mkv",
+        ".mov", ".mp3", ".mp4", ".ogg", ".pdf", ".png", ".pptx", ".rar",
+        ".tgz", ".webm", ".webp", ".whl", ".xlsx", ".xz", ".zip", ".zst",
+    }
+)  # fmt: skip
+COMPRESSION_MODES = ("auto", "deflate", "store")
+
+_STORED = 0
+_DEFLATED = 8
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+_CREATE_SYSTEM_UNIX = 3
+# 超过阈值改用 ZIP64；标准字段中写入全 1 占位，实际值放在扩展字段
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+_UINT32_MAX = 0xFFFFFFFF
+_UINT16_MAX = 0xFFFF
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+_DATA_DESCRIPTOR64 = struct.Struct("<IIQQ")
+_CENTRAL_DIR = struct.Struct("<IBBBBHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_END_RECORD64 = struct.Struct("<IQHHIIQQQQ")
+_END_LOCATOR64 = struct.Struct("<IIQI")
+
+
+@dataclass
+class _Entry:
+    name: bytes
+    flags: int
+    method: int
+    dos_time: int
+    dos_date: int
+    external_attr: int
+    offset: int
+    zip64: bool
+    crc: int = 0
+    compressed_size: int = 0
+    size: int = 0
+
+
+def _dos_datetime(mtime: float) -> tuple[int, int]:
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    return (
+        (hour << 11) | (minute << 5) | (second // 2),
+        ((year - 1980) << 9) | (month << 5) | day,
+    )
+
+
+def _matches(rel_path: str, patterns: Sequence[str]) -> bool:
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(
+        fnmatch.fnmatchcase(rel_path, pattern) or fnmatch.fnmatchcase(name, pattern)
+        for pattern in patterns
+    )
+
+
+def iter_workspace_files(
+    root: str,
+    *,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+) -> Iterator[tuple[str, str]]:
+    """按稳定顺序遍历 ``root`` 下的文件，产出 ``(绝对路径, 相对路径)``。
+
+    ``exclude`` 命中的目录整棵跳过；指定 ``include`` 时只保留命中的文件。
+    模式同时与相对路径（``/`` 分隔）和文件名匹配。
+    """
+    for current, dirs, files in os.walk(root):
+        rel_dir = os.path.relpath(current, root).replace(os.sep, "/")
+        prefix = "" if rel_dir == "." else f"{rel_dir}/"
+        dirs[:] = sorted(d for d in dirs if not _matches(prefix + d, exclude))
+        for file_name in sorted(files):
+            rel_path = prefix + file_name
+            if _matches(rel_path, exclude):
+                continue
+            if include and not _matches(rel_path, include):
+                continue
+            yield os.path.join(current, file_name), rel_path
+
+
+class _ZipStreamWriter:
+    def __init__(self, chunk_size: int):
+        self.chunk_size = max(1, chunk_size)
+        self.buffer = bytearray()
+        self.offset = 0
+        self.entries: List[_Entry] = []
+
+    def write(self, data: bytes) -> Optional[bytes]:
+        self.buffer += data
+        self.offset += len(data)
+        if len(self.buffer) >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes:
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+    def add_file(self, stream, arcname: str, st: os.stat_result, method: int):
+        name = arcname.encode("utf-8")
+        flags = _FLAG_DATA_DESCRIPTOR | (0 if name.isascii() else _FLAG_UTF8)
+        dos_time, dos_date = _dos_datetime(st.st_mtime)
+        # deflate 对不可压缩数据略有膨胀，按 1% 余量判断是否需要 ZIP64
+        zip64 = st.st_size + (st.st_size >> 7) + 1024 >= _ZIP64_LIMIT
+        entry = _Entry(
+            name=name,
+            flags=flags,
+            method=method,
+            dos_time=dos_time,
+            dos_date=dos_date,
+            external_attr=(st.st_mode & 0xFFFF) << 16,
+            offset=self.offset,
+            zip64=zip64,
+        )
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if zip64 else b""
+        placeholder = _UINT32_MAX if zip64 else 0
+        yield self.write(
+            _LOCAL_HEADER.pack(
+                0x04034B50,
+                _VERSION_ZIP64 if zip64 else _VERSION_DEFAULT,
+                flags,
+                method,
+                dos_time,
+                dos_date,
+                0,
+                placeholder,
+                placeholder,
+                len(name),
+                len(extra),
+            )
+            + name
+            + extra
+        )
+
+        compressor = (
+            zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            if method == _DEFLATED
+            else None
+        )
+        crc = 0
+        remaining = st.st_size
+        while remaining > 0:
+            data = stream.read(min(self.chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            entry.size += len(data)
+            crc = zlib.crc32(data, crc)
+            if compressor is not None:
+                data = compressor.compress(data)
+            entry.compressed_size += len(data)
+            # 每读完一块就交出已有输出：高压缩率文件也不会长时间没有字节发出
+            yield self.write(data) or self.flush()
+        if compressor is not None:
+            tail = compressor.flush()
+            entry.compressed_size += len(tail)
+            yield self.write(tail)
+        entry.crc = crc
+
+        if zip64:
+            descriptor = _DATA_DESCRIPTOR64.pack(
+                0x08074B50, crc, entry.compressed_size, entry.size
+            )
+        else:
+            descriptor = _DATA_DESCRIPTOR.pack(
+                0x08074B50, crc, entry.compressed_size, entry.size
+            )
+        self.entries.append(entry)
+        yield self.write(descriptor)
+
+    def finish(self) -> Iterator[Optional[bytes]]:
+        central_offset = self.offset
+        for entry in self.entries:
+            zip64_fields = []
+            size = entry.size
+            compressed_size = entry.compressed_size
+            offset = entry.offset
+            if size >= _ZIP64_LIMIT:
+                zip64_fields.append(size)
+                size = _UINT32_MAX
+            if compressed_size >= _ZIP64_LIMIT:
+                zip64_fields.append(compressed_size)
+                compressed_size = _UINT32_MAX
+            if offset >= _ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset = _UINT32_MAX
+            extra = b""
+            if zip64_fields:
+                extra = struct.pack(
+                    f"<HH{len(zip64_fields)}Q",
+                    0x0001,
+                    8 * len(zip64_fields),
+                    *zip64_fields,
+                )
+            version = (
+                _VERSION_ZIP64 if entry.zip64 or zip64_fields else _VERSION_DEFAULT
+            )
+            yield self.write(
+                _CENTRAL_DIR.pack(
+                    0x02014B50,
+                    _VERSION_ZIP64,
+                    _CREATE_SYSTEM_UNIX,
+                    version,
+                    0,
+                    entry.flags,
+                    entry.method,
+                    entry.dos_time,
+                    entry.dos_date,
+                    entry.crc,
+                    compressed_size,
+                    size,
+                    len(entry.name),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    entry.external_attr,
+                    offset,
+                )
+                + entry.name
+                + extra
+            )
+
+        count = len(self.entries)
+        central_size = self.offset - central_offset
+        zip64_end = (
+            count >= _ZIP64_COUNT_LIMIT
+            or central_size >= _ZIP64_LIMIT
+            or central_offset >= _ZIP64_LIMIT
+        )
+        if zip64_end:
+            end64_offset = self.offset
+            yield self.write(
+                _END_RECORD64.pack(
+                    0x06064B50,
+                    _END_RECORD64.size - 12,
+                    (_CREATE_SYSTEM_UNIX << 8) | _VERSION_ZIP64,
+                    _VERSION_ZIP64,
+                    0,
+                    0,
+                    count,
+                    count,
+                    central_size,
+                    central_offset,
+                )
+                + _END_LOCATOR64.pack(0x07064B50, 0, end64_offset, 1)
+            )
+        yield self.write(
+            _END_RECORD.pack(
+                0x06054B50,
+                0,
+                0,
+                _UINT16_MAX if zip64_end else count,
+                _UINT16_MAX if zip64_end else count,
+                _UINT32_MAX if zip64_end else central_size,
+                _UINT32_MAX if zip64_end else central_offset,
+                0,
+            )
+        )
+
+
+def _compression_method(rel_path: str, compression: str) -> int:
+    if compression == "store":
+        return _STORED
+    if compression == "auto" and os.path.splitext(rel_path)[1].lower() in (
+        STORED_SUFFIXES
+    ):
+        return _STORED
+    return _DEFLATED
+
+
+def iter_zip_stream(
+    root: str,
+    *,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    compression: str = "auto",
+    chunk_size: int = ZIP_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """把 ``root`` 目录打包成 zip，按分片产出字节。
+
+    ``compression``：``auto`` 对已压缩格式直接存储、其余 deflate；``deflate``
+    全部压缩；``store`` 全部只存储。打包期间消失或无法读取的文件会跳过。
+    """
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f"unsupported compression mode: {compression}")
+    writer = _ZipStreamWriter(chunk_size)
+    for abs_path, rel_path in iter_workspace_files(
+        root, include=include, exclude=exclude
+    ):
+        try:
+            stream = open(abs_path, "rb")
+        except OSError as exc:
+            logger.warning(f"[ZipStream] 跳过无法读取的文件 {rel_path}: {exc}")
+            continue
+        with stream:
+            st = os.fstat(stream.fileno())
+            method = _compression_method(rel_path, compression)
+            for chunk in writer.add_file(stream, rel_path, st, method):
+                if chunk:
+                    yield chunk
+    for chunk in writer.finish():
+        if chunk:
+            yield chunk
+    tail = writer.flush()
+    if tail:
+        yield tail
+
+
+async def aiter_zip_stream(
+    root: str,
+    *,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    **options,
+) -> AsyncIterator[bytes]:
+    """``iter_zip_stream`` 的异步版本：分片在工作线程中生成，逐片交给调用方。
+
+    同一时刻只有一个分片在生成或等待发送；``is_disconnected`` 返回 True 或
+    迭代被取消时停止打包并关闭已打开的文件。
+    """
+    chunks = iter_zip_stream(root, **options)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            if is_disconnected is not None and await is_disconnected():
+                logger.info(f"[ZipStream] 客户端已断开，停止打包: {root}")
+                return
+            yield chunk
+    finally:
+        try:
+            chunks.close()
+        except ValueError:
+            # 工作线程仍在生成当前分片；生成器随后被回收时会关闭文件
+            pass
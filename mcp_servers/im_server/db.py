@@ -3,30 +3,246 @@ IM Server Database Module
 
 Persistent storage for IM session bindings.
 Reference: local sqlite helper pattern used by IM server only.
+
+Connections are pooled instead of opened per call:
+- one writer connection in WAL mode, serialized by a lock
+- a bounded pool of reader connections (WAL readers never block the writer)
+- SQL text is kept constant so each pooled connection reuses its prepared statements
+- last-active updates for incoming messages are coalesced and written in batches
+- hot lookups (bindings by session / user, user configs) go through a small LRU
+  cache that is invalidated on every write made through this class
 """
 
-import sqlite3
+import copy
 import json
-from pathlib import Path
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+
+_UPSERT_BINDING_SQL = """
+    INSERT INTO im_session_bindings
+    (session_id, provider, user_id, user_name, chat_id, agent_id,
+     updated_at, last_message_at, metadata)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET
+        user_name = excluded.user_name,
+        chat_id = excluded.chat_id,
+        agent_id = excluded.agent_id,
+        updated_at = excluded.updated_at,
+        last_message_at = excluded.last_message_at,
+        metadata = excluded.metadata
+"""
+_TOUCH_BINDING_SQL = """
+    UPDATE im_session_bindings
+    SET updated_at = ?, last_message_at = ?
+    WHERE session_id = ?
+"""
+_GET_BINDING_SQL = "SELECT * FROM im_session_bindings WHERE session_id = ?"
+_FIND_BINDING_BY_CHAT_SQL = """
+    SELECT * FROM im_session_bindings
+    WHERE provider = ? AND user_id = ? AND chat_id = ?
+    ORDER BY updated_at DESC LIMIT 1
+"""
+_FIND_BINDING_BY_USER_SQL = """
+    SELECT * FROM im_session_bindings
+    WHERE provider = ? AND user_id = ?
+    ORDER BY updated_at DESC LIMIT 1
+"""
+_DELETE_BINDING_SQL = "DELETE FROM im_session_bindings WHERE session_id = ?"
+_UPSERT_USER_CONFIG_SQL = """
+    INSERT INTO im_user_configs
+    (sage_user_id, provider, config, enabled, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(sage_user_id, provider) DO UPDATE SET
+        config = excluded.config,
+        enabled = excluded.enabled,
+        updated_at = excluded.updated_at
+"""
+_GET_USER_CONFIG_SQL = """
+    SELECT * FROM im_user_configs
+    WHERE sage_user_id = ? AND provider = ? AND enabled = 1
+"""
+_LIST_USER_CONFIGS_SQL = """
+    SELECT * FROM im_user_configs
+    WHERE sage_user_id = ? AND enabled = 1
+    ORDER BY updated_at DESC
+"""
+_DELETE_USER_CONFIG_SQL = """
+    DELETE FROM im_user_configs
+    WHERE sage_user_id = ? AND provider = ?
+"""
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a TTL bound on staleness.
+
+    The TTL only matters for rows written by another process (e.g. the desktop
+    router saving a config); writes through IMServerDB invalidate immediately.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or ``_MISSING`` (cached ``None`` is a valid hit)."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or self._clock() - item[0] >= self.ttl:
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Store a value; skipped if an invalidation happened since ``generation``."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+def _row_to_binding(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    binding = dict(row)
+    if binding.get("metadata"):
+        binding["metadata"] = json.loads(binding["metadata"])
+    return binding
+
+
+def _row_to_config(row: sqlite3.Row) -> Dict[str, Any]:
+    config = dict(row)
+    if config.get("config"):
+        config["config"] = json.loads(config["config"])
+    return config
 
 
 class IMServerDB:
     """Database for IM session bindings."""
 
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        reader_pool_size: int = 4,
+        cache_size: int = 1024,
+        cache_ttl: float = 30.0,
+        touch_batch_size: int = 200,
+        touch_flush_interval: float = 0.2,
+    ):
         self.db_path = db_path
         if not self.db_path.parent.exists():
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.reader_pool_size = max(1, reader_pool_size)
+        self.touch_batch_size = max(1, touch_batch_size)
+        self.touch_flush_interval = touch_flush_interval
+
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._all_readers: List[sqlite3.Connection] = []
+
+        self._binding_cache = LRUCache(cache_size, cache_ttl)
+        self._user_binding_cache = LRUCache(cache_size, cache_ttl)
+        self._config_cache = LRUCache(cache_size, cache_ttl)
+
+        self._pending_touches: Dict[str, str] = {}
+        self._touch_lock = threading.Lock()
+        self._touch_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats: Dict[str, int] = {
+            "touches": 0,
+            "touch_batches": 0,
+            "touch_rows": 0,
+        }
         self._init_db()
 
-    def _get_conn(self):
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=30.0,
+            cached_statements=64,
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run one transaction on the single writer connection."""
+        with self._write_lock:
+            with self._writer:
+                yield self._writer
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a reader connection; blocks when all pooled readers are busy."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._reader_lock:
+                if self._reader_count < self.reader_pool_size:
+                    self._reader_count += 1
+                    conn = self._connect()
+                    self._all_readers.append(conn)
+            if conn is None:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
 
     def _init_db(self):
         """Initialize database with session bindings table."""
-        with self._get_conn() as conn:
+        with self._write() as conn:
             cursor = conn.cursor()
 
             # Session bindings table
@@ -48,11 +264,11 @@ class IMServerDB:
 
             # Create indexes for performance
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_bindings_session 
+                CREATE INDEX IF NOT EXISTS idx_bindings_session
                 ON im_session_bindings(session_id)
             """)
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_bindings_user 
+                CREATE INDEX IF NOT EXISTS idx_bindings_user
                 ON im_session_bindings(provider, user_id)
             """)
 
@@ -72,11 +288,38 @@ class IMServerDB:
 
             # Create index for user configs
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_user_configs 
+                CREATE INDEX IF NOT EXISTS idx_user_configs
                 ON im_user_configs(sage_user_id, provider)
             """)
 
-            conn.commit()
+    def close(self) -> None:
+        """Flush pending writes and close pooled connections."""
+        self._closed = True
+        self._touch_event.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        with self._write_lock:
+            self._writer.close()
+        with self._reader_lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses}
+            for name, cache in (
+                ("bindings", self._binding_cache),
+                ("user_bindings", self._user_binding_cache),
+                ("user_configs", self._config_cache),
+            )
+        }
+
+    def _invalidate_user_bindings(self, provider: str, user_id: str) -> None:
+        self._user_binding_cache.invalidate_where(
+            lambda key: key[0] == provider and key[1] == user_id  # pyright: ignore[reportIndexIssue]
+        )
 
     # === Session Bindings ===
 
@@ -92,25 +335,13 @@ class IMServerDB:
     ) -> bool:
         """Create or update session binding."""
         try:
-            with self._get_conn() as conn:
-                cursor = conn.cursor()
-                now = datetime.now().isoformat()
-                metadata_json = json.dumps(metadata) if metadata else None
-
-                cursor.execute(
-                    """
-                    INSERT INTO im_session_bindings 
-                    (session_id, provider, user_id, user_name, chat_id, agent_id, 
-                     updated_at, last_message_at, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ON CONFLICT(session_id) DO UPDATE SET
-                        user_name = excluded.user_name,
-                        chat_id = excluded.chat_id,
-                        agent_id = excluded.agent_id,
-                        updated_at = excluded.updated_at,
-                        last_message_at = excluded.last_message_at,
-                        metadata = excluded.metadata
-                """,
+            now = datetime.now().isoformat()
+            metadata_json = json.dumps(metadata) if metadata else None
+            with self._write() as conn:
+                with self._touch_lock:
+                    self._pending_touches.pop(session_id, None)
+                conn.execute(
+                    _UPSERT_BINDING_SQL,
                     (
                         session_id,
                         provider,
@@ -123,35 +354,92 @@ class IMServerDB:
                         metadata_json,
                     ),
                 )
-
-                conn.commit()
-                return True
+            # Invalidate after commit so a concurrent reader cannot re-cache old rows.
+            self._binding_cache.invalidate(session_id)
+            self._invalidate_user_bindings(provider, user_id)
+            return True
         except Exception as e:
             print(f"[IM DB] Error creating binding: {e}")
             return False
 
+    def touch_binding(self, session_id: str) -> None:
+        """Mark a binding as active now.
+
+        Called once per incoming message, so the UPDATE is buffered and written
+        in batches by a background flusher instead of one transaction per message.
+        """
+        now = datetime.now().isoformat()
+        cached = self._binding_cache.get(session_id)
+        if cached is not _MISSING and cached is not None:
+            cached["updated_at"] = now
+            cached["last_message_at"] = now
+            # The touched binding is now the most recent one for its user (and for
+            # its chat), so those lookups can be answered without a DB round trip.
+            provider, user_id = cached["provider"], cached["user_id"]
+            self._invalidate_user_bindings(provider, user_id)
+            self._user_binding_cache.put((provider, user_id, None), cached)
+            if cached.get("chat_id"):
+                self._user_binding_cache.put(
+                    (provider, user_id, cached["chat_id"]), cached
+                )
+        else:
+            self._user_binding_cache.clear()
+        with self._touch_lock:
+            self._pending_touches[session_id] = now
+            self.stats["touches"] += 1
+            pending = len(self._pending_touches)
+        self._ensure_flusher()
+        if pending >= self.touch_batch_size:
+            self._touch_event.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None or self._closed:
+            return
+        with self._touch_lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="IMServerDB-flusher", daemon=True
+                )
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._touch_event.wait(self.touch_flush_interval)
+            self._touch_event.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered last-active updates in a single transaction."""
+        with self._touch_lock:
+            if not self._pending_touches:
+                return 0
+            batch, self._pending_touches = self._pending_touches, {}
+        try:
+            with self._write() as conn:
+                conn.executemany(
+                    _TOUCH_BINDING_SQL,
+                    [(ts, ts, session_id) for session_id, ts in batch.items()],
+                )
+        except Exception as e:
+            print(f"[IM DB] Error flushing binding activity: {e}")
+            return 0
+        self.stats["touch_batches"] += 1
+        self.stats["touch_rows"] += len(batch)
+        return len(batch)
+
     def get_binding(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get session binding by session_id."""
+        cached = self._binding_cache.get(session_id)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
         try:
-            with self._get_conn() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    SELECT * FROM im_session_bindings 
-                    WHERE session_id = ?
-                """,
-                    (session_id,),
+            generation = self._binding_cache.generation
+            with self._read() as conn:
+                binding = _row_to_binding(
+                    conn.execute(_GET_BINDING_SQL, (session_id,)).fetchone()
                 )
-
-                row = cursor.fetchone()
-                if row:
-                    binding = dict(row)
-                    if binding.get("metadata"):
-                        binding["metadata"] = json.loads(binding["metadata"])
-                    return binding
-                return None
+            self._binding_cache.put(session_id, binding, generation)
+            return copy.deepcopy(binding)
         except Exception as e:
             print(f"[IM DB] Error getting binding: {e}")
             return None
@@ -160,37 +448,26 @@ class IMServerDB:
         self, provider: str, user_id: str, chat_id: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """Find session binding by provider and user_id."""
+        key = (provider, user_id, chat_id or None)
+        cached = self._user_binding_cache.get(key)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
         try:
-            with self._get_conn() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
+            generation = self._user_binding_cache.generation
+            # Ordering is by updated_at, so buffered activity must land first.
+            self.flush()
+            with self._read() as conn:
                 if chat_id:
-                    cursor.execute(
-                        """
-                        SELECT * FROM im_session_bindings 
-                        WHERE provider = ? AND user_id = ? AND chat_id = ?
-                        ORDER BY updated_at DESC LIMIT 1
-                    """,
-                        (provider, user_id, chat_id),
-                    )
+                    row = conn.execute(
+                        _FIND_BINDING_BY_CHAT_SQL, (provider, user_id, chat_id)
+                    ).fetchone()
                 else:
-                    cursor.execute(
-                        """
-                        SELECT * FROM im_session_bindings 
-                        WHERE provider = ? AND user_id = ?
-                        ORDER BY updated_at DESC LIMIT 1
-                    """,
-                        (provider, user_id),
-                    )
-
-                row = cursor.fetchone()
-                if row:
-                    binding = dict(row)
-                    if binding.get("metadata"):
-                        binding["metadata"] = json.loads(binding["metadata"])
-                    return binding
-                return None
+                    row = conn.execute(
+                        _FIND_BINDING_BY_USER_SQL, (provider, user_id)
+                    ).fetchone()
+            binding = _row_to_binding(row)
+            self._user_binding_cache.put(key, binding, generation)
+            return copy.deepcopy(binding)
         except Exception as e:
             print(f"[IM DB] Error finding binding: {e}")
             return None
@@ -203,34 +480,24 @@ class IMServerDB:
     ) -> List[Dict[str, Any]]:
         """List session bindings with optional filters."""
         try:
-            with self._get_conn() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                query = "SELECT * FROM im_session_bindings WHERE 1=1"
-                params = []
-
-                if provider:
-                    query += " AND provider = ?"
-                    params.append(provider)
-
-                if agent_id:
-                    query += " AND agent_id = ?"
-                    params.append(agent_id)
-
-                query += " ORDER BY updated_at DESC LIMIT ?"
-                params.append(limit)
-
-                cursor.execute(query, params)
-
-                rows = cursor.fetchall()
-                bindings = []
-                for row in rows:
-                    binding = dict(row)
-                    if binding.get("metadata"):
-                        binding["metadata"] = json.loads(binding["metadata"])
-                    bindings.append(binding)
-                return bindings
+            query = "SELECT * FROM im_session_bindings WHERE 1=1"
+            params = []
+
+            if provider:
+                query += " AND provider = ?"
+                params.append(provider)
+
+            if agent_id:
+                query += " AND agent_id = ?"
+                params.append(agent_id)
+
+            query += " ORDER BY updated_at DESC LIMIT ?"
+            params.append(limit)
+
+            self.flush()
+            with self._read() as conn:
+                rows = conn.execute(query, params).fetchall()
+            return [_row_to_binding(row) for row in rows]  # pyright: ignore[reportReturnType]
         except Exception as e:
             print(f"[IM DB] Error listing bindings: {e}")
             return []
@@ -238,17 +505,17 @@ class IMServerDB:
     def delete_binding(self, session_id: str) -> bool:
         """Delete session binding."""
         try:
-            with self._get_conn() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    DELETE FROM im_session_bindings 
-                    WHERE session_id = ?
-                """,
-                    (session_id,),
-                )
-                conn.commit()
-                return cursor.rowcount > 0
+            binding = self.get_binding(session_id)
+            with self._write() as conn:
+                with self._touch_lock:
+                    self._pending_touches.pop(session_id, None)
+                cursor = conn.execute(_DELETE_BINDING_SQL, (session_id,))
+            self._binding_cache.invalidate(session_id)
+            if binding:
+                self._invalidate_user_bindings(binding["provider"], binding["user_id"])
+            else:
+                self._user_binding_cache.clear()
+            return cursor.rowcount > 0
         except Exception as e:
             print(f"[IM DB] Error deleting binding: {e}")
             return False
@@ -264,27 +531,16 @@ class IMServerDB:
     ) -> bool:
         """Save or update user's IM configuration for a provider."""
         try:
-            with self._get_conn() as conn:
-                cursor = conn.cursor()
-                now = datetime.now().isoformat()
-                config_json = json.dumps(config, ensure_ascii=False)
-                enabled_flag = 1 if enabled else 0
-
-                cursor.execute(
-                    """
-                    INSERT INTO im_user_configs 
-                    (sage_user_id, provider, config, enabled, updated_at)
-                    VALUES (?, ?, ?, ?, ?)
-                    ON CONFLICT(sage_user_id, provider) DO UPDATE SET
-                        config = excluded.config,
-                        enabled = excluded.enabled,
-                        updated_at = excluded.updated_at
-                """,
+            now = datetime.now().isoformat()
+            config_json = json.dumps(config, ensure_ascii=False)
+            enabled_flag = 1 if enabled else 0
+            with self._write() as conn:
+                conn.execute(
+                    _UPSERT_USER_CONFIG_SQL,
                     (sage_user_id, provider, config_json, enabled_flag, now),
                 )
-
-                conn.commit()
-                return True
+            self._config_cache.invalidate((sage_user_id, provider))
+            return True
         except Exception as e:
             print(f"[IM DB] Error saving user config: {e}")
             return False
@@ -293,26 +549,19 @@ class IMServerDB:
         self, sage_user_id: str, provider: str
     ) -> Optional[Dict[str, Any]]:
         """Get user's IM configuration for a provider."""
+        key = (sage_user_id, provider)
+        cached = self._config_cache.get(key)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
         try:
-            with self._get_conn() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    SELECT * FROM im_user_configs 
-                    WHERE sage_user_id = ? AND provider = ? AND enabled = 1
-                """,
-                    (sage_user_id, provider),
-                )
-
-                row = cursor.fetchone()
-                if row:
-                    config = dict(row)
-                    if config.get("config"):
-                        config["config"] = json.loads(config["config"])
-                    return config
-                return None
+            generation = self._config_cache.generation
+            with self._read() as conn:
+                row = conn.execute(
+                    _GET_USER_CONFIG_SQL, (sage_user_id, provider)
+                ).fetchone()
+            config = _row_to_config(row) if row else None
+            self._config_cache.put(key, config, generation)
+            return copy.deepcopy(config)
         except Exception as e:
             print(f"[IM DB] Error getting user config: {e}")
             return None
@@ -320,27 +569,9 @@ class IMServerDB:
     def list_user_configs(self, sage_user_id: str) -> List[Dict[str, Any]]:
         """List all IM configurations for a user."""
         try:
-            with self._get_conn() as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    SELECT * FROM im_user_configs 
-                    WHERE sage_user_id = ? AND enabled = 1
-                    ORDER BY updated_at DESC
-                """,
-                    (sage_user_id,),
-                )
-
-                rows = cursor.fetchall()
-                configs = []
-                for row in rows:
-                    config = dict(row)
-                    if config.get("config"):
-                        config["config"] = json.loads(config["config"])
-                    configs.append(config)
-                return configs
+            with self._read() as conn:
+                rows = conn.execute(_LIST_USER_CONFIGS_SQL, (sage_user_id,)).fetchall()
+            return [_row_to_config(row) for row in rows]
         except Exception as e:
             print(f"[IM DB] Error listing user configs: {e}")
             return []
@@ -348,17 +579,10 @@ class IMServerDB:
     def delete_user_config(self, sage_user_id: str, provider: str) -> bool:
         """Delete user's IM configuration for a provider."""
         try:
-            with self._get_conn() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    """
-                    DELETE FROM im_user_configs 
-                    WHERE sage_user_id = ? AND provider = ?
-                """,
-                    (sage_user_id, provider),
-                )
-                conn.commit()
-                return cursor.rowcount > 0
+            with self._write() as conn:
+                cursor = conn.execute(_DELETE_USER_CONFIG_SQL, (sage_user_id, provider))
+            self._config_cache.invalidate((sage_user_id, provider))
+            return cursor.rowcount > 0
         except Exception as e:
             print(f"[IM DB] Error deleting user config: {e}")
             return False
@@ -377,3 +601,11 @@ def get_im_db(db_path: Optional[Path] = None) -> IMServerDB:
             db_path = Path.home() / ".sage" / "sage.db"
         _im_db = IMServerDB(db_path)
     return _im_db
+
+
+def close_im_db() -> None:
+    """Flush and close the global IM database instance, if one was opened."""
+    global _im_db
+    db, _im_db = _im_db, None
+    if db is not None:
+        db.close()
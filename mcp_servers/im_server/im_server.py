@@ -634,9 +634,11 @@ async def send_message_through_im(
     if not target_chat_id and target_user_id:
         try:
             session_mgr = get_session_manager()
-            session_id = session_mgr.find_session_by_user(provider, target_user_id)
+            session_id = await session_mgr.afind_session_by_user(
+                provider, target_user_id
+            )
             if session_id:
-                binding = session_mgr.get_binding(session_id)
+                binding = await session_mgr.aget_binding(session_id)
                 if binding:
                     target_chat_id = binding.get("chat_id")
         except Exception:
@@ -700,9 +702,11 @@ async def _send_message_through_im_impl(
         try:
             session_mgr = get_session_manager()
             # Try to find session by user
-            session_id = session_mgr.find_session_by_user(provider_name, target_user_id)
+            session_id = await session_mgr.afind_session_by_user(
+                provider_name, target_user_id
+            )
             if session_id:
-                binding = session_mgr.get_binding(session_id)
+                binding = await session_mgr.aget_binding(session_id)
                 if binding:
                     target_chat_id = binding.get("chat_id")
                     logger.info(
@@ -834,7 +838,7 @@ async def handle_incoming_message(
     session_mgr = get_session_manager()
 
     # Find or create session
-    session_id = session_mgr.find_or_create_session(
+    session_id = await session_mgr.afind_or_create_session(
         provider=provider,
         user_id=user_id,
         agent_id=default_agent_id,  # pyright: ignore[reportArgumentType]
@@ -871,7 +875,7 @@ async def handle_incoming_message(
             )
         elif response:
             try:
-                binding = session_mgr.get_binding(session_id)
+                binding = await session_mgr.aget_binding(session_id)
                 logger.info(
                     f"[IM] Sending response back to {provider}: chat_id={chat_id}, user_id={user_id}"
                 )
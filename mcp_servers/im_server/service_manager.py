@@ -1414,11 +1414,11 @@ class IMServiceManager:
 
         session_mgr = get_session_manager()
 
-        session_id = session_mgr.find_session_by_user("unknown", user_id)
+        session_id = await session_mgr.afind_session_by_user("unknown", user_id)
         if not session_id:
             return "📊 **会话状态**\n\n状态：未创建\n💬 发送消息开始新对话"
 
-        binding = session_mgr.get_binding(session_id)
+        binding = await session_mgr.aget_binding(session_id)
         if binding:
             return f"📊 **会话状态**\n\n会话ID: `{session_id[:8]}...`\n状态: 活跃\n💡 发送 /reset 重置会话"
         return "📊 **会话状态**\n\n状态：未绑定\n💬 发送消息开始新对话"
@@ -1430,9 +1430,9 @@ class IMServiceManager:
         session_mgr = get_session_manager()
 
         # Find and unbind user's session
-        session_id = session_mgr.find_session_by_user("unknown", user_id)
+        session_id = await session_mgr.afind_session_by_user("unknown", user_id)
         if session_id:
-            session_mgr.unbind_session(session_id)
+            await session_mgr.aunbind_session(session_id)
 
         return "🔄 **会话已重置**\n\n✅ 上下文已清空\n💬 发送消息开始新对话"
 
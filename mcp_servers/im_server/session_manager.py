@@ -3,6 +3,7 @@
 Manages bidirectional conversation state and session bindings using SQLite database.
 """
 
+import asyncio
 import logging
 import threading
 from typing import Dict, Any, Optional, List
@@ -22,7 +23,8 @@ class SessionManager:
         Args:
             db: IMServerDB instance (optional, will use global instance if not provided)
         """
-        self._lock = threading.Lock()
+        # Re-entrant: find_or_create_session holds it while calling bind_session.
+        self._lock = threading.RLock()
 
         # Use provided db or get global instance
         self._db = db or get_im_db()
@@ -89,16 +91,8 @@ class SessionManager:
         binding = self._db.get_binding(session_id)
 
         if binding:
-            # Update last active time
-            self._db.create_or_update_binding(
-                session_id=session_id,
-                provider=binding["provider"],
-                user_id=binding["user_id"],
-                user_name=binding.get("user_name"),
-                chat_id=binding.get("chat_id"),
-                agent_id=binding.get("agent_id"),
-                metadata=binding.get("metadata"),
-            )
+            # Update last active time (buffered, written in batches)
+            self._db.touch_binding(session_id)
 
         return binding
 
@@ -128,6 +122,21 @@ class SessionManager:
         Returns:
             session_id
         """
+        # Serialize lookup + create so concurrent messages from a new user
+        # (handled in worker threads by afind_or_create_session) share one session.
+        with self._lock:
+            return self._find_or_create_session_locked(
+                provider, user_id, agent_id, chat_id, user_name
+            )
+
+    def _find_or_create_session_locked(
+        self,
+        provider: str,
+        user_id: str,
+        agent_id: str,
+        chat_id: Optional[str],
+        user_name: Optional[str],
+    ) -> str:
         # Providers where chat_id is volatile and should not be used for session matching
         volatile_chat_id_providers = {"wechat_personal"}
 
@@ -190,17 +199,42 @@ class SessionManager:
 
     def update_last_active(self, session_id: str):
         """Update last active timestamp."""
-        binding = self._db.get_binding(session_id)
-        if binding:
-            self._db.create_or_update_binding(
-                session_id=session_id,
-                provider=binding["provider"],
-                user_id=binding["user_id"],
-                user_name=binding.get("user_name"),
-                chat_id=binding.get("chat_id"),
-                agent_id=binding.get("agent_id"),
-                metadata=binding.get("metadata"),
-            )
+        if self._db.get_binding(session_id):
+            self._db.touch_binding(session_id)
+
+    # --- Async variants ---
+    # The database calls are blocking sqlite I/O; run them in worker threads so
+    # IM message handlers do not stall the event loop.
+
+    async def aget_binding(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_binding, session_id)
+
+    async def afind_session_by_user(
+        self, provider: str, user_id: str, chat_id: Optional[str] = None
+    ) -> Optional[str]:
+        return await asyncio.to_thread(
+            self.find_session_by_user, provider, user_id, chat_id
+        )
+
+    async def afind_or_create_session(
+        self,
+        provider: str,
+        user_id: str,
+        agent_id: str,
+        chat_id: Optional[str] = None,
+        user_name: Optional[str] = None,
+    ) -> str:
+        return await asyncio.to_thread(
+            self.find_or_create_session,
+            provider,
+            user_id,
+            agent_id,
+            chat_id,
+            user_name,
+        )
+
+    async def aunbind_session(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self.unbind_session, session_id)
 
     def cleanup_expired_sessions(self, max_age_hours: int = 24):
         """Clean up expired sessions (not implemented for DB version - use SQL query if needed)."""
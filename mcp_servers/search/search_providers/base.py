@@ -33,6 +33,8 @@ class BaseSearchProvider:
     env_key: str = ""
     supports_images: bool = False  # 是否支持图片搜索
     supports_time_range: bool = False  # 是否支持时间范围筛选
+    rate_limit_per_second: float = 5.0  # 令牌桶速率，<=0 表示不限流
+    rate_limit_burst: float = 10.0  # 令牌桶容量
 
     def __init__(self, api_key: str):
         self.api_key = api_key
@@ -0,0 +1,385 @@
+"""
+搜索路由：多搜索引擎对冲请求 + 结果缓存
+
+- 按 provider 统计延迟（最近 N 次的 p50/p95）与成功/失败次数
+- 对冲请求：主 provider 超过其 p95 延迟仍未返回时，并发发起下一个 provider
+- 任一 provider 返回非空结果即采用，并取消其余进行中的请求
+- 失败（异常/空结果）时立即切换到下一个 provider，不等待对冲延迟
+- 查询归一化后的 TTL 缓存，过期后在 stale 窗口内先返回旧结果并后台刷新
+- 每个 provider 一个令牌桶限流，额度耗尽时跳过该 provider
+"""
+
+import asyncio
+import math
+import re
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sagents.utils.logger import logger
+
+from .search_providers.base import BaseSearchProvider
+
+
+def normalize_query(query: str) -> str:
+    """缓存键用的查询归一化：NFKC、小写、合并空白"""
+    normalized = unicodedata.normalize("NFKC", query or "")
+    return re.sub(r"\s+", " ", normalized).strip().lower()
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """最近邻法百分位数（values 为空时返回 0）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class ProviderStats:
+    """单个 provider 的延迟与结果统计"""
+
+    window: int = 100
+    latencies: Deque[float] = field(default_factory=deque)
+    successes: int = 0
+    failures: int = 0
+    empty: int = 0
+    cancelled: int = 0
+    hedges: int = 0
+    wins: int = 0
+    rate_limited: int = 0
+
+    def record(self, latency: float, outcome: str) -> None:
+        self.latencies.append(latency)
+        while len(self.latencies) > self.window:
+            self.latencies.popleft()
+        if outcome == "success":
+            self.successes += 1
+        elif outcome == "empty":
+            self.empty += 1
+        else:
+            self.failures += 1
+
+    def p50(self) -> float:
+        return percentile(self.latencies, 50)
+
+    def p95(self) -> float:
+        return percentile(self.latencies, 95)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "samples": len(self.latencies),
+            "p50": round(self.p50(), 4),
+            "p95": round(self.p95(), 4),
+            "successes": self.successes,
+            "failures": self.failures,
+            "empty": self.empty,
+            "cancelled": self.cancelled,
+            "hedges": self.hedges,
+            "wins": self.wins,
+            "rate_limited": self.rate_limited,
+        }
+
+
+class TokenBucket:
+    """非阻塞令牌桶：rate 个/秒，最多累积 burst 个"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def try_acquire(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    stored_at: float
+
+
+class SearchResultCache:
+    """查询归一化的 TTL 缓存，支持 stale-while-revalidate"""
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        stale_ttl: float = 600.0,
+        max_entries: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: Dict[Tuple, _CacheEntry] = {}
+
+    def get(self, key: Tuple) -> Tuple[Any, Optional[str]]:
+        """返回 (value, state)，state 为 "fresh" / "stale" / None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        age = self._clock() - entry.stored_at
+        if age < self.ttl:
+            state = "fresh"
+        elif age < self.ttl + self.stale_ttl:
+            state = "stale"
+        else:
+            del self._entries[key]
+            return None, None
+        # 维持插入顺序即 LRU 顺序
+        self._entries[key] = self._entries.pop(key)
+        return entry.value, state
+
+    def put(self, key: Tuple, value: Any) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = _CacheEntry(value=value, stored_at=self._clock())
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+@dataclass
+class SearchOutcome:
+    results: List[Any]
+    error: Optional[str] = None
+    provider: Optional[str] = None
+    from_cache: bool = False
+    stale: bool = False
+
+
+SearchCall = Callable[[BaseSearchProvider], Awaitable[List[Any]]]
+
+
+class SearchRouter:
+    """多 provider 对冲搜索路由"""
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[SearchResultCache] = None,
+        max_parallel: int = 2,
+        default_hedge_delay: float = 1.5,
+        min_hedge_delay: float = 0.05,
+        max_hedge_delay: float = 5.0,
+        min_samples: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cache = cache if cache is not None else SearchResultCache()
+        self.max_parallel = max(1, max_parallel)
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self._clock = clock
+        self._stats: Dict[str, ProviderStats] = {}
+        self._limiters: Dict[str, TokenBucket] = {}
+        self._inflight: Dict[Tuple, "asyncio.Task[SearchOutcome]"] = {}
+        self._background: set = set()
+
+    def stats(self, provider_name: str) -> ProviderStats:
+        if provider_name not in self._stats:
+            self._stats[provider_name] = ProviderStats()
+        return self._stats[provider_name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def _limiter(self, provider: BaseSearchProvider) -> TokenBucket:
+        limiter = self._limiters.get(provider.name)
+        if limiter is None:
+            limiter = TokenBucket(
+                provider.rate_limit_per_second,
+                provider.rate_limit_burst,
+                clock=self._clock,
+            )
+            self._limiters[provider.name] = limiter
+        return limiter
+
+    def hedge_delay(self, provider_name: str) -> float:
+        """对冲延迟：该 provider 最近延迟的 p95，样本不足时使用默认值"""
+        stats = self.stats(provider_name)
+        if len(stats.latencies) < self.min_samples:
+            delay = self.default_hedge_delay
+        else:
+            delay = stats.p95()
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    async def search(
+        self,
+        kind: str,
+        query: str,
+        count: int,
+        time_range: str,
+        providers: Sequence[BaseSearchProvider],
+        call: SearchCall,
+    ) -> SearchOutcome:
+        """带缓存的对冲搜索；call(provider) 执行一次具体的 provider 请求"""
+        key = (kind, normalize_query(query), count, time_range or "")
+        cached, state = self.cache.get(key)
+        if state == "fresh":
+            return SearchOutcome(results=cached[1], provider=cached[0], from_cache=True)
+        if state == "stale":
+            if key not in self._inflight:
+                self._start_refresh(key, providers, call, background=True)
+            return SearchOutcome(
+                results=cached[1], provider=cached[0], from_cache=True, stale=True
+            )
+
+        task = self._inflight.get(key) or self._start_refresh(
+            key, providers, call, background=False
+        )
+        return await asyncio.shield(task)
+
+    def _start_refresh(
+        self,
+        key: Tuple,
+        providers: Sequence[BaseSearchProvider],
+        call: SearchCall,
+        background: bool,
+    ) -> "asyncio.Task[SearchOutcome]":
+        task = asyncio.create_task(self._search_and_store(key, providers, call))
+        self._inflight[key] = task
+
+        def _done(finished: "asyncio.Task[SearchOutcome]") -> None:
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+            self._background.discard(finished)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning(f"搜索刷新失败: {finished.exception()}")
+
+        task.add_done_callback(_done)
+        if background:
+            self._background.add(task)
+        return task
+
+    async def _search_and_store(
+        self,
+        key: Tuple,
+        providers: Sequence[BaseSearchProvider],
+        call: SearchCall,
+    ) -> SearchOutcome:
+        outcome = await self.hedged_search(providers, call)
+        if outcome.results:
+            self.cache.put(key, (outcome.provider, outcome.results))
+        return outcome
+
+    async def hedged_search(
+        self, providers: Sequence[BaseSearchProvider], call: SearchCall
+    ) -> SearchOutcome:
+        """按顺序对冲调用 providers，返回第一个非空结果"""
+        queue = list(providers)
+        pending: Dict["asyncio.Task[List[Any]]", Tuple[BaseSearchProvider, float]] = {}
+        errors: List[str] = []
+        last_launch: Optional[Tuple[str, float]] = None
+
+        def launch_next(is_hedge: bool) -> bool:
+            nonlocal last_launch
+            while queue:
+                provider = queue.pop(0)
+                stats = self.stats(provider.name)
+                if not self._limiter(provider).try_acquire():
+                    stats.rate_limited += 1
+                    errors.append(f"{provider.name}: 超出限流")
+                    continue
+                if is_hedge:
+                    stats.hedges += 1
+                started = self._clock()
+                pending[asyncio.create_task(call(provider))] = (provider, started)
+                last_launch = (provider.name, started)
+                return True
+            return False
+
+        if not launch_next(is_hedge=False):
+            return SearchOutcome(results=[], error=self._format_error(errors))
+
+        try:
+            while pending:
+                timeout = None
+                if queue and len(pending) < self.max_parallel and last_launch:
+                    name, started = last_launch
+                    timeout = max(0.0, started + self.hedge_delay(name) - self._clock())
+
+                done, _ = await asyncio.wait(
+                    pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch_next(is_hedge=True)
+                    continue
+
+                failed = 0
+                for task in done:
+                    provider, started = pending.pop(task)
+                    stats = self.stats(provider.name)
+                    elapsed = self._clock() - started
+                    error = task.exception()
+                    if error is not None:
+                        stats.record(elapsed, "failure")
+                        errors.append(f"{provider.name}: {error}")
+                        logger.warning(f"搜索引擎 {provider.name} 失败: {error}")
+                        failed += 1
+                        continue
+                    results = task.result()
+                    if not results:
+                        stats.record(elapsed, "empty")
+                        errors.append(f"{provider.name}: 无结果")
+                        failed += 1
+                        continue
+                    stats.record(elapsed, "success")
+                    stats.wins += 1
+                    logger.info(
+                        f"使用 {provider.name} 搜索成功，返回 {len(results)} 条结果"
+                        f"（{elapsed * 1000:.0f}ms）"
+                    )
+                    return SearchOutcome(results=results, provider=provider.name)
+
+                # 失败立即切换，不等待对冲延迟
+                for _ in range(failed):
+                    if not launch_next(is_hedge=False):
+                        break
+        finally:
+            for task, (provider, _) in pending.items():
+                task.cancel()
+                self.stats(provider.name).cancelled += 1
+            if pending:
+                await asyncio.gather(*pending.keys(), return_exceptions=True)
+
+        return SearchOutcome(results=[], error=self._format_error(errors))
+
+    @staticmethod
+    def _format_error(errors: List[str]) -> str:
+        error_msg = "所有搜索引擎都失败了"
+        if errors:
+            error_msg += f"。最后一个错误: {errors[-1]}"
+        return error_msg
@@ -3,6 +3,7 @@
 统一搜索引擎服务
 支持多个搜索引擎：SerpApi, Serper, Tavily, Brave, Zhipu(智谱), Bocha(博查), Shuyan(数眼)
 自动根据环境变量选择可用的搜索引擎
+多个引擎之间通过 SearchRouter 对冲请求，并缓存查询结果
 """
 
 import os
@@ -24,12 +25,16 @@ from .search_providers import (
     ShuyanProvider,
 )
 from .search_providers.base import BaseSearchProvider
+from .search_router import SearchRouter
 from sagents.tool.mcp_tool_base import sage_mcp_tool
 from sagents.utils.logger import logger
 
 # 初始化 MCP 服务器
 mcp = FastMCP("Unified Search Service")
 
+# 进程内共享：延迟统计、限流与结果缓存都按 provider 名称累计
+search_router = SearchRouter()
+
 
 # Provider 类映射
 PROVIDER_CLASSES = {
@@ -145,25 +150,17 @@ async def search_web(
     if not available_providers:
         return [], get_config_error()
 
-    # 尝试每个可用的搜索引擎
-    last_error = None
-    for provider in available_providers:
-        try:
-            results = await provider.search_web(query, count, time_range)
-            if results:
-                logger.info(
-                    f"使用 {provider.name} 搜索成功，返回 {len(results)} 条结果"
-                )
-                return results, None  # pyright: ignore[reportReturnType]
-        except Exception as e:
-            logger.warning(f"搜索引擎 {provider.name} 失败: {e}")
-            last_error = str(e)
-            continue
-
-    error_msg = "所有搜索引擎都失败了"
-    if last_error:
-        error_msg += f"。最后一个错误: {last_error}"
-    return [], error_msg
+    outcome = await search_router.search(
+        "web",
+        query,
+        count,
+        time_range,
+        available_providers,
+        lambda provider: provider.search_web(query, count, time_range),
+    )
+    if outcome.results:
+        return outcome.results, None
+    return [], outcome.error
 
 
 async def search_images(
@@ -195,25 +192,17 @@ async def search_images(
             "- BOCHA_API_KEY: 博查 (bochaai.com)"
         )
 
-    # 尝试每个可用的搜索引擎
-    last_error = None
-    for provider in image_providers:
-        try:
-            results = await provider.search_images(query, count, time_range)
-            if results:
-                logger.info(
-                    f"使用 {provider.name} 图片搜索成功，返回 {len(results)} 条结果"
-                )
-                return results, None  # pyright: ignore[reportReturnType]
-        except Exception as e:
-            logger.warning(f"搜索引擎 {provider.name} 图片搜索失败: {e}")
-            last_error = str(e)
-            continue
-
-    error_msg = "所有搜索引擎都失败了"
-    if last_error:
-        error_msg += f"。最后一个错误: {last_error}"
-    return [], error_msg
+    outcome = await search_router.search(
+        "image",
+        query,
+        count,
+        time_range,
+        image_providers,
+        lambda provider: provider.search_images(query, count, time_range),
+    )
+    if outcome.results:
+        return outcome.results, None
+    return [], outcome.error
 
 
 @mcp.tool(
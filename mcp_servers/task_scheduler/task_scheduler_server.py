@@ -57,6 +57,11 @@ except ImportError:
 from mcp.server.fastmcp import FastMCP
 from sagents.tool.mcp_tool_base import sage_mcp_tool
 
+from mcp_servers.task_scheduler.timer_wheel import (
+    TimerWheelScheduler,
+    parse_execute_at,
+)
+
 # Initialize FastMCP server
 mcp = FastMCP("Task Scheduler Service")
 
@@ -66,7 +71,6 @@ RECURRING_TASK_PREFIX = "rec_"
 SCHEDULER_USER_ID = os.getenv("SAGE_TASK_SCHEDULER_USER_ID", "task_scheduler")
 _scheduler_thread: Optional[threading.Thread] = None
 _scheduler_lock = threading.Lock()
-_background_tasks: set[asyncio.Task[Any]] = set()
 _LOCAL_TIME_GUIDANCE = (
     "时间必须以当前会话的本地时区解释和输出，优先使用带时区偏移的 ISO 8601 格式，"
     "例如 '2026-04-13T18:37:42+08:00'。不要主动转换成 UTC，不要主动查询 UTC 时间。"
@@ -185,27 +189,6 @@ def _request_json_sync(
     )
 
 
-def _track_background_task(task: asyncio.Task[Any]) -> None:
-    _background_tasks.add(task)
-
-    def _on_done(done_task: asyncio.Task[Any]) -> None:
-        _background_tasks.discard(done_task)
-        try:
-            exc = done_task.exception()
-        except asyncio.CancelledError:
-            return
-        except Exception as e:
-            logger.error(f"[SCHEDULER] Background task inspection failed: {e}")
-            return
-        if exc is not None:
-            logger.error(
-                f"[SCHEDULER] Background task failed: {exc}",
-                exc_info=(type(exc), exc, exc.__traceback__),
-            )
-
-    task.add_done_callback(_on_done)
-
-
 async def _is_api_ready(timeout: float = 5.0) -> bool:
     url = f"{_get_api_base_url()}/active"
     try:
@@ -463,89 +446,63 @@ async def _execute_task_claimed(task: Dict[str, Any]) -> None:
         raise
 
 
-async def _check_and_spawn_recurring_tasks():
-    """
-    Check recurring tasks and spawn one-time task instances if needed.
-    This should be called before processing pending tasks.
-    """
-    try:
-        result = await _request_json("POST", "/tasks/internal/spawn-due")
-        spawned_count = len((result or {}).get("items") or [])
-        if spawned_count > 0:
-            logger.debug(f"Spawned {spawned_count} tasks from recurring tasks")
-        return spawned_count
-    except Exception as e:
-        logger.error(f"Error spawning recurring tasks: {e}")
-        return 0
+class _BackendTaskSource:
+    """TimerWheelScheduler 的任务来源：通过后端 /tasks 内部接口读写数据库"""
+
+    async def load_pending(
+        self, horizon_seconds: int, limit: int
+    ) -> list[Dict[str, Any]]:
+        result = await _request_json(
+            "GET",
+            "/tasks/internal/due",
+            params={"limit": min(limit, 500), "horizon_seconds": horizon_seconds},
+        )
+        return (result or {}).get("items") or []
+
+    async def spawn_due(self) -> tuple[list[Dict[str, Any]], Optional[float]]:
+        """
+        Check recurring tasks and spawn one-time task instances if needed.
+        Also returns the next cron fire time so the wheel can wake up exactly then.
+        """
+        try:
+            result = await _request_json("POST", "/tasks/internal/spawn-due")
+        except Exception as e:
+            logger.error(f"Error spawning recurring tasks: {e}")
+            return [], None
+        items = (result or {}).get("items") or []
+        if items:
+            logger.debug(f"Spawned {len(items)} tasks from recurring tasks")
+        next_run_at = (result or {}).get("next_run_at")
+        return items, parse_execute_at(next_run_at) if next_run_at else None
+
+    async def execute(self, task: Dict[str, Any]) -> None:
+        await _execute_task_claimed(task)
+
+
+task_scheduler = TimerWheelScheduler(
+    _BackendTaskSource(),
+    max_concurrency=int(os.getenv("SAGE_TASK_SCHEDULER_MAX_CONCURRENCY", "8")),
+    per_agent_limit=int(os.getenv("SAGE_TASK_SCHEDULER_PER_AGENT_CONCURRENCY", "2")),
+    horizon_seconds=int(os.getenv("SAGE_TASK_SCHEDULER_HORIZON_SECONDS", "3600")),
+)
+
+
+def _notify_tasks_changed() -> None:
+    task_scheduler.notify_changed()
 
 
 async def scheduler_loop_async():
     """
-    Background loop to check for pending tasks.
+    Background loop that drives the timer wheel scheduler.
 
     Logic:
-    1. First, check recurring tasks and spawn one-time instances if needed
-    2. Then, process pending tasks grouped by session_id (sequential execution per session)
+    1. Load pending tasks due within the horizon (and the next recurring fire time)
+    2. Sleep until the next wheel deadline, a resync interval, or a write notification
+    3. Due tasks are claimed and executed through a bounded, per-agent worker pool
     """
     logger.info("[SCHEDULER] Task scheduler started.")
     logger.info(f"[SCHEDULER] API Base URL: {_get_api_base_url()}")
-    await _wait_for_api_ready()
-
-    loop_count = 0
-
-    while True:
-        loop_count += 1
-        sleep_seconds = 5
-        try:
-            # Step 1: Check recurring tasks and spawn instances
-            spawned_count = await _check_and_spawn_recurring_tasks()
-
-            # Step 2: Get all pending tasks that are due
-            due_result = await _request_json(
-                "GET", "/tasks/internal/due", params={"limit": 200}
-            )
-            pending_tasks = (due_result or {}).get("items") or []
-
-            if pending_tasks:
-                logger.debug(
-                    f"[SCHEDULER] due returned {len(pending_tasks)} pending tasks"
-                )
-                logger.debug(
-                    f"[SCHEDULER] Found {len(pending_tasks)} pending tasks to execute"
-                )
-
-                # Process all pending tasks concurrently
-                # (no session-level locking needed since backend auto-generates session_id)
-                for task in pending_tasks:
-                    try:
-                        task_id = task["id"]
-                        logger.debug(
-                            f"[SCHEDULER] Starting task {task_id} in new thread"
-                        )
-
-                        # Start task in separate thread
-                        task_future = asyncio.create_task(
-                            _execute_task_claimed(task), name=f"TaskExecutor-{task_id}"
-                        )
-                        _track_background_task(task_future)
-                        logger.debug(
-                            f"[SCHEDULER] Task {task_id} started in async task {task_future.get_name()}"
-                        )
-                    except Exception as e:
-                        logger.error(
-                            f"[SCHEDULER] Failed to start task {task['id']}: {e}",
-                            exc_info=True,
-                        )
-            else:
-                if spawned_count == 0:
-                    sleep_seconds = 30
-
-        except Exception as e:
-            logger.error(
-                f"[SCHEDULER] Scheduler error in loop {loop_count}: {e}", exc_info=True
-            )
-
-        await asyncio.sleep(sleep_seconds)
+    await task_scheduler.run_forever(before_start=_wait_for_api_ready)
 
 
 def scheduler_loop():
@@ -845,6 +802,7 @@ async def add_task(
                     "enabled": True,
                 },
             )
+            _notify_tasks_changed()
             task_id = int(task["id"])
             encoded_id = _encode_task_id(task_id, is_recurring=True)
             elapsed = time.time() - start_time
@@ -869,6 +827,7 @@ async def add_task(
                     "execute_at": execute_at,
                 },
             )
+            _notify_tasks_changed()
             task_id = int(task["id"])
             encoded_id = _encode_task_id(task_id, is_recurring=False)
             elapsed = time.time() - start_time
@@ -951,6 +910,7 @@ async def delete_task(task_id: str, user_id: Optional[str] = None) -> str:
                 f"/tasks/recurring/{raw_id}",
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             elapsed = time.time() - start_time
             logger.info(
                 f"[delete_task] SUCCESS | task_id={task_id} | time={elapsed:.3f}s"
@@ -972,6 +932,7 @@ async def delete_task(task_id: str, user_id: Optional[str] = None) -> str:
                 f"/tasks/one-time/{raw_id}",
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             elapsed = time.time() - start_time
             logger.info(
                 f"[delete_task] SUCCESS | task_id={task_id} | time={elapsed:.3f}s"
@@ -1041,6 +1002,7 @@ async def complete_task(task_id: str, user_id: Optional[str] = None) -> str:
                 f"/tasks/internal/recurring/{raw_id}/complete",
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             elapsed = time.time() - start_time
             logger.info(
                 f"[complete_task] SUCCESS | task_id={task_id} | time={elapsed:.3f}s"
@@ -1067,6 +1029,7 @@ async def complete_task(task_id: str, user_id: Optional[str] = None) -> str:
                 json_body={"response": None},
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             elapsed = time.time() - start_time
             logger.info(
                 f"[complete_task] SUCCESS | task_id={task_id} | time={elapsed:.3f}s"
@@ -1149,6 +1112,7 @@ async def enable_task(
             json_body={"enabled": enabled},
             user_id=_tool_visible_user_id(user_id),
         )
+        _notify_tasks_changed()
         status = "enabled" if enabled else "disabled"
         elapsed = time.time() - start_time
         logger.info(
@@ -1408,6 +1372,7 @@ async def update_task(
                 json_body=update_kwargs,
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             updated_fields = ", ".join(update_kwargs.keys())
             elapsed = time.time() - start_time
             logger.info(
@@ -1473,6 +1438,7 @@ async def update_task(
                 json_body=update_kwargs,
                 user_id=_tool_visible_user_id(user_id),
             )
+            _notify_tasks_changed()
             updated_fields = ", ".join(update_kwargs.keys())
             elapsed = time.time() - start_time
             logger.info(
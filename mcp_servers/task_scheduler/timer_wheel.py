@@ -0,0 +1,475 @@
+"""
+定时任务调度核心：分层时间轮 + 有界执行池
+
+- HierarchicalTimerWheel：按 tick 离散化的多级时间轮，插入/取消 O(1)，
+  推进时只扫描非空槽位，空闲时直接跳到目标 tick
+- TimerWheelScheduler：从后端加载未来 horizon 内的 pending 任务放入时间轮，
+  到点后进入按 agent 分组的就绪队列，由有界执行池按全局并发上限与
+  每个 agent 的并发配额轮询取出执行
+- 写操作后调用 notify_changed() 立即重新同步；同时保留周期性全量同步兜底
+  （任务也可能通过 Web 界面直接写入数据库）
+- 任务只在真正开始执行时才在后端 claim，未执行的任务始终保持 pending，
+  进程重启后重新加载即可；已错过执行时间的任务按 execute_at 先后补执行，
+  并计入 misfired 统计
+
+调度器本身不依赖真实时间：clock 可注入，测试中使用模拟时钟。
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+logger = logging.getLogger("TaskScheduler")
+
+SPAWN_TIMER_KEY = "__spawn_recurring__"
+
+
+class _TimerEntry:
+    __slots__ = ("key", "when", "due_tick", "payload", "cancelled")
+
+    def __init__(self, key: Hashable, when: float, due_tick: int, payload: Any):
+        self.key = key
+        self.when = when
+        self.due_tick = due_tick
+        self.payload = payload
+        self.cancelled = False
+
+
+class HierarchicalTimerWheel:
+    """
+    多级时间轮。
+
+    第 L 级每个槽位覆盖 slots**L 个 tick，槽位下标取到期 tick 的对应位段；
+    推进到某一级的边界时把该级当前槽位的条目下沉到更低的级别。
+    超出所有级别范围的条目放在 overflow 中，每次最高级进位时重新放置。
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = 1.0,
+        slot_bits: int = 6,
+        levels: int = 4,
+        start: float = 0.0,
+    ):
+        if tick_seconds <= 0:
+            raise ValueError("tick_seconds must be positive")
+        self.tick_seconds = float(tick_seconds)
+        self._bits = slot_bits
+        self._slots = 1 << slot_bits
+        self._mask = self._slots - 1
+        self._levels = levels
+        self._wheels: List[List[List[_TimerEntry]]] = [
+            [[] for _ in range(self._slots)] for _ in range(levels)
+        ]
+        self._overflow: List[_TimerEntry] = []
+        self._expired: List[_TimerEntry] = []
+        self._entries: Dict[Hashable, _TimerEntry] = {}
+        self._tick = int(math.floor(start / self.tick_seconds))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def when(self, key: Hashable) -> Optional[float]:
+        entry = self._entries.get(key)
+        return entry.when if entry else None
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def schedule(self, key: Hashable, when: float, payload: Any = None) -> None:
+        """登记（或重新登记）key 在 when 时刻到期；when 已过去则下次推进立即到期"""
+        self.cancel(key)
+        due_tick = int(math.ceil(when / self.tick_seconds))
+        entry = _TimerEntry(key, when, due_tick, payload)
+        self._entries[key] = entry
+        self._place(entry)
+
+    def cancel(self, key: Hashable) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        # 惰性删除：槽位中的条目在下沉或到期时被丢弃
+        entry.cancelled = True
+        return True
+
+    def _place(self, entry: _TimerEntry) -> None:
+        delta = entry.due_tick - self._tick
+        if delta <= 0:
+            self._expired.append(entry)
+            return
+        for level in range(self._levels):
+            if delta < 1 << (self._bits * (level + 1)):
+                slot = (entry.due_tick >> (self._bits * level)) & self._mask
+                self._wheels[level][slot].append(entry)
+                return
+        self._overflow.append(entry)
+
+    def _cascade(self, level: int) -> None:
+        slot = (self._tick >> (self._bits * level)) & self._mask
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = []
+        for entry in bucket:
+            if not entry.cancelled:
+                self._place(entry)
+
+    def _advance_one(self) -> None:
+        self._tick += 1
+        if (
+            self._overflow
+            and self._tick & ((1 << (self._bits * self._levels)) - 1) == 0
+        ):
+            overflow, self._overflow = self._overflow, []
+            for entry in overflow:
+                if not entry.cancelled:
+                    self._place(entry)
+        for level in range(self._levels - 1, 0, -1):
+            if self._tick & ((1 << (self._bits * level)) - 1) == 0:
+                self._cascade(level)
+        slot = self._tick & self._mask
+        bucket = self._wheels[0][slot]
+        if bucket:
+            self._wheels[0][slot] = []
+            self._expired.extend(bucket)
+
+    def _next_busy_tick(self, target: int) -> int:
+        """当前 tick 之后、target 之前第一个需要处理的 tick（非空槽位或进位边界）"""
+        if not self._entries:
+            return target
+        boundary = (self._tick | self._mask) + 1
+        limit = min(boundary, target)
+        for tick in range(self._tick + 1, limit):
+            if self._wheels[0][tick & self._mask]:
+                return tick
+        return limit
+
+    def advance(self, now: float) -> List[Tuple[Hashable, float, Any]]:
+        """推进到 now，返回按到期时间排序的 (key, when, payload) 列表"""
+        target = int(math.floor(now / self.tick_seconds))
+        while self._tick < target:
+            next_tick = self._next_busy_tick(target)
+            self._tick = next_tick - 1
+            self._advance_one()
+
+        fired: List[_TimerEntry] = []
+        for entry in self._expired:
+            if entry.cancelled or self._entries.get(entry.key) is not entry:
+                continue
+            del self._entries[entry.key]
+            fired.append(entry)
+        self._expired = []
+        fired.sort(key=lambda entry: entry.when)
+        return [(entry.key, entry.when, entry.payload) for entry in fired]
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        下一次需要推进的时间（不晚于最早条目的到期时间）。
+
+        只扫描第 0 级到下一个进位边界；更高级别的条目在进位时才会下沉，
+        所以返回值可能早于实际到期时间，调用方推进后再次查询即可。
+        """
+        if not self._entries:
+            return None
+        if any(not entry.cancelled for entry in self._expired):
+            return self._tick * self.tick_seconds
+        boundary = (self._tick | self._mask) + 1
+        for tick in range(self._tick + 1, boundary):
+            if self._wheels[0][tick & self._mask]:
+                return tick * self.tick_seconds
+        return boundary * self.tick_seconds
+
+
+def parse_execute_at(value: Any) -> float:
+    """把后端返回的 execute_at（本地时间 ISO 字符串或 datetime）转换为时间戳"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if " " in text and "T" not in text:
+        text = text.replace(" ", "T", 1)
+    return datetime.fromisoformat(text).timestamp()
+
+
+class TaskSource(Protocol):
+    """调度器依赖的任务存储接口（生产环境由后端 /tasks API 实现）"""
+
+    async def load_pending(
+        self, horizon_seconds: int, limit: int
+    ) -> List[Dict[str, Any]]: ...
+
+    async def spawn_due(self) -> Tuple[List[Dict[str, Any]], Optional[float]]: ...
+
+    async def execute(self, task: Dict[str, Any]) -> None: ...
+
+
+class TimerWheelScheduler:
+    """时间轮驱动的定时任务调度器，带全局并发上限和每个 agent 的并发配额"""
+
+    def __init__(
+        self,
+        source: TaskSource,
+        *,
+        max_concurrency: int = 8,
+        per_agent_limit: int = 2,
+        horizon_seconds: int = 3600,
+        max_tracked: int = 500,
+        resync_interval: float = 30.0,
+        misfire_grace_seconds: float = 60.0,
+        tick_seconds: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.source = source
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_agent_limit = max(1, per_agent_limit)
+        self.horizon_seconds = horizon_seconds
+        self.max_tracked = max_tracked
+        self.resync_interval = resync_interval
+        self.misfire_grace_seconds = misfire_grace_seconds
+        self.clock = clock
+        self.wheel = HierarchicalTimerWheel(tick_seconds=tick_seconds, start=clock())
+        self._ready: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._ready_ids: set = set()
+        self._running: Dict[int, "asyncio.Task[None]"] = {}
+        self._running_by_agent: Counter = Counter()
+        self._dirty = True
+        self._next_sync_at = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.stats: Dict[str, int] = {
+            "syncs": 0,
+            "loaded": 0,
+            "cancelled": 0,
+            "fired": 0,
+            "started": 0,
+            "finished": 0,
+            "errors": 0,
+            "misfired": 0,
+            "throttled": 0,
+            "notifications": 0,
+        }
+
+    # --- 状态 ---
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    @property
+    def ready_count(self) -> int:
+        return len(self._ready_ids)
+
+    def running_for_agent(self, agent_id: str) -> int:
+        return self._running_by_agent[agent_id]
+
+    def _is_tracked(self, task_id: int) -> bool:
+        return (
+            task_id in self._running
+            or task_id in self._ready_ids
+            or task_id in self.wheel
+        )
+
+    def _tracked_count(self) -> int:
+        return len(self.wheel) + len(self._ready_ids) + len(self._running)
+
+    # --- 变更通知 ---
+
+    def notify_changed(self) -> None:
+        """任务写入后调用；可从任意线程调用，调度线程会尽快重新同步"""
+        self._dirty = True
+        self.stats["notifications"] += 1
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+    # --- 同步 ---
+
+    async def sync(self) -> None:
+        """从后端重新加载 horizon 内的 pending 任务与下一次循环任务触发时间"""
+        self._dirty = False
+        self._next_sync_at = self.clock() + self.resync_interval
+        self.stats["syncs"] += 1
+
+        spawned, next_run_at = await self.source.spawn_due()
+        self._schedule_spawn(next_run_at)
+
+        limit = max(1, self.max_tracked - len(self._running) - len(self._ready_ids))
+        tasks = await self.source.load_pending(self.horizon_seconds, limit)
+        seen = set()
+        for task in list(spawned) + list(tasks):
+            seen.add(int(task["id"]))
+            self._track(task)
+
+        # 快照完整（未被 limit 截断）时，时间轮中不在快照里的任务已被删除/修改
+        if len(tasks) < limit:
+            for key in self.wheel.keys():
+                if key != SPAWN_TIMER_KEY and key not in seen:
+                    self.wheel.cancel(key)
+                    self.stats["cancelled"] += 1
+
+    def _schedule_spawn(self, next_run_at: Optional[float]) -> None:
+        if next_run_at is None:
+            self.wheel.cancel(SPAWN_TIMER_KEY)
+        else:
+            self.wheel.schedule(SPAWN_TIMER_KEY, next_run_at)
+
+    def _track(self, task: Dict[str, Any]) -> None:
+        task_id = int(task["id"])
+        if task_id in self._running or task_id in self._ready_ids:
+            return
+        due_at = parse_execute_at(task["execute_at"])
+        if self.wheel.when(task_id) == due_at:
+            return
+        if task_id not in self.wheel:
+            if self._tracked_count() >= self.max_tracked:
+                return
+            self.stats["loaded"] += 1
+            if due_at < self.clock() - self.misfire_grace_seconds:
+                self.stats["misfired"] += 1
+                logger.warning(
+                    f"[SCHEDULER] Task {task_id} missed its schedule by "
+                    f"{self.clock() - due_at:.0f}s, running it now"
+                )
+        self.wheel.schedule(task_id, due_at, task)
+
+    # --- 推进与执行 ---
+
+    async def poll(self) -> None:
+        """推进时间轮到当前时间，把到期任务放入就绪队列并按配额启动"""
+        spawned_this_poll = False
+        while True:
+            fired = self.wheel.advance(self.clock())
+            if not fired:
+                break
+            for key, _, task in fired:
+                if key != SPAWN_TIMER_KEY:
+                    self._enqueue(task)
+                elif spawned_this_poll:
+                    # 防止后端返回的下一次触发时间不在未来时在同一轮里反复派生
+                    self.wheel.schedule(
+                        SPAWN_TIMER_KEY, self.clock() + self.wheel.tick_seconds
+                    )
+                else:
+                    spawned_this_poll = True
+                    spawned, next_run_at = await self.source.spawn_due()
+                    self._schedule_spawn(next_run_at)
+                    for spawned_task in spawned:
+                        self._track(spawned_task)
+        self._pump()
+
+    def _enqueue(self, task: Dict[str, Any]) -> None:
+        self.stats["fired"] += 1
+        agent_id = str(task.get("agent_id") or "")
+        self._ready.setdefault(agent_id, deque()).append(task)
+        self._ready_ids.add(int(task["id"]))
+
+    def _pump(self) -> None:
+        """按 agent 轮询启动就绪任务，直到达到全局并发上限或没有可用配额"""
+        progressed = True
+        while progressed and len(self._running) < self.max_concurrency:
+            progressed = False
+            for agent_id in list(self._ready):
+                if len(self._running) >= self.max_concurrency:
+                    break
+                if self._running_by_agent[agent_id] >= self.per_agent_limit:
+                    continue
+                queue = self._ready[agent_id]
+                task = queue.popleft()
+                if queue:
+                    self._ready.move_to_end(agent_id)
+                else:
+                    del self._ready[agent_id]
+                self._start(agent_id, task)
+                progressed = True
+        if self._ready:
+            self.stats["throttled"] += 1
+
+    def _start(self, agent_id: str, task: Dict[str, Any]) -> None:
+        task_id = int(task["id"])
+        self._ready_ids.discard(task_id)
+        self._running_by_agent[agent_id] += 1
+        self.stats["started"] += 1
+        runner = asyncio.create_task(
+            self._run(agent_id, task), name=f"TaskExecutor-{task_id}"
+        )
+        self._running[task_id] = runner
+
+    async def _run(self, agent_id: str, task: Dict[str, Any]) -> None:
+        task_id = int(task["id"])
+        try:
+            await self.source.execute(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(
+                f"[SCHEDULER] Task {task_id} execution failed: {e}", exc_info=True
+            )
+        finally:
+            self._running.pop(task_id, None)
+            self._running_by_agent[agent_id] -= 1
+            if self._running_by_agent[agent_id] <= 0:
+                del self._running_by_agent[agent_id]
+            self.stats["finished"] += 1
+            self._pump()
+
+    async def drain(self) -> None:
+        """等待所有正在执行的任务结束（测试与关闭时使用）"""
+        while self._running:
+            await asyncio.gather(*list(self._running.values()), return_exceptions=True)
+
+    # --- 主循环 ---
+
+    def _sleep_timeout(self) -> float:
+        deadline = self._next_sync_at
+        wheel_deadline = self.wheel.next_deadline()
+        if wheel_deadline is not None:
+            deadline = min(deadline, wheel_deadline)
+        return max(0.0, deadline - self.clock())
+
+    async def run_forever(
+        self, before_start: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if before_start is not None:
+            await before_start()
+
+        while True:
+            try:
+                if self._dirty or self.clock() >= self._next_sync_at:
+                    await self.sync()
+                await self.poll()
+            except Exception as e:
+                logger.error(f"[SCHEDULER] Scheduler error: {e}", exc_info=True)
+                self._next_sync_at = self.clock() + self.resync_interval
+
+            self._wake.clear()
+            if self._dirty:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._sleep_timeout())
+            except asyncio.TimeoutError:
+                pass
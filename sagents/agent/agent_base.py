@@ -44,6 +44,8 @@ from sagents.context.messages.token_accounting import (
 from sagents.llm.sage_openai import SageAsyncOpenAI
 from sagents.llm.capabilities import create_chat_completion_with_fallback
 from sagents.llm.model_capabilities import build_llm_extra_body
+from sagents.utils.phase_timer import phase, record_phase, timed_phase
+from sagents.flow.concurrency import report_llm_call
 from sagents.utils.llm_request_utils import (
     coalesce_reasoning_content_messages,
     format_api_error_details,
@@ -478,6 +480,7 @@ class AgentBase(ABC):
             preserve_tool_reasoning=preserve_reasoning,
         )
 
+    @timed_phase("multimodal")
     async def _process_multimodal_content(self, msg: Dict[str, Any]) -> Dict[str, Any]:
         """处理多模态消息内容（本地图片转 base64、压缩到最大 512x512）。详见
         ``sagents.utils.multimodal_image.process_multimodal_content``。
@@ -1180,6 +1183,7 @@ class AgentBase(ABC):
         except Exception:
             return None
 
+    @timed_phase("context_prep")
     async def _prepare_context_messages_for_llm(
         self,
         messages_input: List[MessageChunk],
@@ -1664,6 +1668,7 @@ class AgentBase(ABC):
         while retry_count < max_retries:
             attempt_yielded_chunks = False
             retrying_logical_request = False
+            llm_wait_started = time.monotonic()
             try:
                 attempt_chunks = []
                 first_token_time = None
@@ -2003,6 +2008,7 @@ class AgentBase(ABC):
                     ),
                 )
 
+                llm_wait_started = time.monotonic()
                 stream = await create_chat_completion_with_fallback(
                     self.model,
                     model=model_name,
@@ -2020,6 +2026,7 @@ class AgentBase(ABC):
                     # 记录首token时间
                     if first_token_time is None:
                         first_token_time = time.time()
+                        record_phase("llm_wait", time.monotonic() - llm_wait_started)
                     attempt_chunks.append(chunk)
 
                     # 显式让出控制权，确保在高吞吐量时不会饿死事件循环（如心跳检测）
@@ -2029,6 +2036,7 @@ class AgentBase(ABC):
                     yield chunk
 
                 # 成功完成，跳出重试循环
+                report_llm_call(True, time.monotonic() - llm_wait_started)
                 all_chunks = attempt_chunks
                 if session_id and pending_next_request_message_ids:
                     session_context = self._get_live_session_context(session_id)
@@ -2101,6 +2109,9 @@ class AgentBase(ABC):
                     isinstance(e, httpx.ReadError) or "read error" in error_message
                 )
                 is_token_limit_error = _is_context_length_error(e)
+                if is_rate_limit or is_connection_error or is_timeout or is_read_error:
+                    # 被重试吞掉的限流/超时也要让 flow 资源池收缩
+                    report_llm_call(False, time.monotonic() - llm_wait_started)
 
                 if attempt_yielded_chunks:
                     message = (
@@ -2202,6 +2213,10 @@ class AgentBase(ABC):
                     ),
                 )
 
+                is_rate_limit = _is_rate_limit_error(e)
+                if is_rate_limit or is_network_error or is_httpx_error:
+                    report_llm_call(False, time.monotonic() - llm_wait_started)
+
                 if attempt_yielded_chunks:
                     message = (
                         f"{self.__class__.__name__}: 流式响应已向上游输出部分 chunk，"
@@ -2210,7 +2225,6 @@ class AgentBase(ABC):
                     logger.warning(message)
                     raise PartialStreamConsumedError(message, e) from e
 
-                is_rate_limit = _is_rate_limit_error(e)
                 if _is_context_length_error(e):
                     logger.error(
                         f"{self.__class__.__name__}: provider 上下文超限，"
@@ -2456,6 +2470,7 @@ class AgentBase(ABC):
                 f"stage and continue the main flow: {exc}"
             )
 
+    @timed_phase("system_segments")
     async def _build_system_segments(
         self,
         session_id: Optional[str] = None,
@@ -3316,12 +3331,13 @@ class AgentBase(ABC):
 
             with _bind_tool_progress_context(session_id, tool_call["id"]):
                 try:
-                    tool_response = await tool_manager.run_tool_async(
-                        tool_name,
-                        session_id=session_id,
-                        tool_call_id=tool_call["id"],
-                        **call_kwargs,
-                    )
+                    with phase("tool_exec"):
+                        tool_response = await tool_manager.run_tool_async(
+                            tool_name,
+                            session_id=session_id,
+                            tool_call_id=tool_call["id"],
+                            **call_kwargs,
+                        )
                 finally:
                     try:
                         await _emit_tool_progress_closed()
@@ -17,6 +17,7 @@ import uuid
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Union, AsyncGenerator, TYPE_CHECKING
 import copy
+import functools
 
 if TYPE_CHECKING:
     from sagents.session_runtime import Session
@@ -29,6 +30,7 @@ from sagents.tool import ToolManager
 from sagents.agent.fibre.tools import FibreTools
 from sagents.agent.fibre.agent_definition import AgentDefinition
 from sagents.agent.fibre.backend_client import FibreBackendClient
+from sagents.agent.fibre.scheduler import SubAgentJob, get_subagent_scheduler
 from sagents.agent.fibre.delegate_stream import (
     consume_backend_child_stream,
     merge_history_with_fallback,
@@ -38,6 +40,7 @@ from sagents.utils.subtask_summary import summarize_subtask_history
 from sagents.utils.logger import logger
 
 StreamPayload = Union[MessageChunk, Dict[str, Any]]
+FIBRE_TASK_TOKEN_RESERVE = int(os.getenv("SAGE_FIBRE_TASK_TOKEN_RESERVE", "8000"))
 
 
 @dataclass
@@ -969,6 +972,24 @@ class FibreOrchestrator:
 
         return final_agent_id
 
+    def _get_root_session_id(self, session_id: str) -> str:
+        """Walk parent links up to the top-level session."""
+        root_session_id = session_id
+        current_session = self.sub_session_manager.get_live_session(session_id)
+        for _ in range(100):
+            if not current_session or not current_session.session_context:
+                break
+            parent_session_id = current_session.session_context.system_context.get(
+                "parent_session_id"
+            )
+            if not parent_session_id:
+                break
+            root_session_id = parent_session_id
+            current_session = self.sub_session_manager.get_live_session(
+                parent_session_id
+            )
+        return root_session_id
+
     def _get_session_depth(self, session_id: str) -> int:
         """
         Get the depth of a session in the hierarchy.
@@ -997,14 +1018,14 @@ class FibreOrchestrator:
         self, tasks: List[Dict[str, Any]], caller_session_id: str
     ) -> str:
         """
-        Execute multiple tasks in parallel using SubSession.run().
+        Execute multiple tasks in parallel through the sub-agent scheduler,
+        which bounds concurrency globally and per parent session.
 
         Args:
-            tasks: List of tasks with 'agent_id', 'content', 'session_id'
+            tasks: List of tasks with 'agent_id', 'content', 'session_id' and
+                an optional 'priority' (lower runs first when slots are scarce)
             caller_session_id: The session ID of the calling agent
         """
-        import asyncio
-
         # Get caller's session to determine parent-child relationship
         caller_session = self.sub_session_manager.get_live_session(caller_session_id)
         if not caller_session or not caller_session.session_context:
@@ -1137,16 +1158,64 @@ class FibreOrchestrator:
                 original_task,
             )
 
-        results = await asyncio.gather(*[_run_single_task(t) for t in tasks])
+        # 交给调度器限流：全局 / 每个父会话并发上限、优先级与 token 预算
+        scheduler = get_subagent_scheduler()
+        root_session_id = self._get_root_session_id(caller_session_id)
+        jobs = [
+            SubAgentJob(
+                run=functools.partial(_run_single_task, task),
+                parent_session_id=caller_session_id,
+                session_id=task["session_id"],
+                root_session_id=root_session_id,
+                priority=self._task_priority(task),
+                token_cost=self._estimate_task_tokens(task),
+                name=task.get("task_name") or task.get("agent_id", ""),
+                on_cancel=functools.partial(self.interrupt_session, task["session_id"]),
+            )
+            for task in tasks
+        ]
+        results: Dict[int, str] = {}
+        with scheduler.waiting_on_children(caller_session_id):
+            batch = scheduler.submit(jobs)
+            try:
+                # 按完成顺序收集，某个子任务失败时协作式取消其余兄弟任务
+                async for job in batch.as_completed():
+                    index = jobs.index(job)
+                    if job.future.cancelled():
+                        results[index] = "Error: Task was cancelled"
+                        continue
+                    results[index] = job.future.result()
+                    logger.info(
+                        f"FibreOrchestrator: task '{job.name}' finished "
+                        f"({len(results)}/{len(jobs)}, queued {job.queue_wait:.2f}s)"
+                    )
+            except BaseException as e:
+                batch.cancel(f"sibling task failed: {e!r}")
+                raise
 
         # Format results
         final_output = []
-        for i, result in enumerate(results):
+        for i in range(len(tasks)):
             agent_id = tasks[i].get("agent_id")
-            final_output.append(f"=== Result from {agent_id} ===\n{result}")
+            final_output.append(f"=== Result from {agent_id} ===\n{results[i]}")
 
         return "\n\n".join(final_output)
 
+    @staticmethod
+    def _task_priority(task: Dict[str, Any]) -> int:
+        try:
+            return int(task.get("priority") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _estimate_task_tokens(task: Dict[str, Any]) -> int:
+        # 子任务会带着完整的系统提示与工具描述运行，内容之外再预留固定开销
+        return (
+            MessageManager.calculate_str_token_length(task.get("content") or "")
+            + FIBRE_TASK_TOKEN_RESERVE
+        )
+
     def _sanitize_task_name(self, name: str) -> str:
         """清理任务名，使其适合作为文件夹名"""
         import re
@@ -0,0 +1,319 @@
+"""
+Bounded scheduler for Fibre sub-agent tasks.
+
+``FibreOrchestrator.delegate_tasks`` submits every delegated task here instead
+of starting them all at once. A job is admitted when:
+
+- fewer than ``max_concurrency`` jobs run in this event loop,
+- its parent session runs fewer than ``per_parent_limit`` jobs, and
+- its estimated token cost fits the in-flight ``token_budget`` (a job is always
+  admitted when nothing else is running, so large tasks cannot starve).
+
+Queued jobs are grouped by root session. Each time a slot frees up, the root
+session with the fewest running jobs goes first, and inside a session the
+lowest ``priority`` value wins (FIFO among equals). A parent that waits on its
+own children gives its slot back for the duration, so nested delegation cannot
+deadlock on the global limit.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from sagents.observability.metrics_registry import REGISTRY
+from sagents.utils.logger import logger
+
+
+FIBRE_MAX_CONCURRENT_SUBAGENTS = int(
+    os.getenv("SAGE_FIBRE_MAX_CONCURRENT_SUBAGENTS", "8")
+)
+FIBRE_MAX_CONCURRENT_PER_PARENT = int(
+    os.getenv("SAGE_FIBRE_MAX_CONCURRENT_PER_PARENT", "4")
+)
+# 同时在跑的子任务预估 token 总量上限，0 表示不限制
+FIBRE_TOKEN_BUDGET = int(os.getenv("SAGE_FIBRE_TOKEN_BUDGET", "0"))
+
+_QUEUE_WAIT = REGISTRY.histogram(
+    "sagents_fibre_subagent_queue_wait_seconds",
+    "Time a delegated Fibre task waited for a scheduler slot.",
+    schema=3,
+)
+_SUBAGENTS_RUNNING = REGISTRY.gauge(
+    "sagents_fibre_subagents_running",
+    "Fibre sub-agent tasks currently holding a scheduler slot.",
+)
+_SUBAGENTS_QUEUED = REGISTRY.gauge(
+    "sagents_fibre_subagents_queued",
+    "Fibre sub-agent tasks waiting for a scheduler slot.",
+)
+
+
+@dataclass
+class SubAgentJob:
+    """One delegated task as seen by the scheduler."""
+
+    run: Callable[[], Awaitable[Any]]
+    parent_session_id: str
+    session_id: str = ""
+    root_session_id: str = ""
+    priority: int = 0
+    token_cost: int = 0
+    name: str = ""
+    # 协作式取消：运行中的兄弟任务通过它收到中断信号（例如 interrupt_session）
+    on_cancel: Optional[Callable[[], Any]] = None
+    state: str = field(default="pending", init=False)
+    enqueued_at: float = field(default=0.0, init=False)
+    started_at: float = field(default=0.0, init=False)
+    finished_at: float = field(default=0.0, init=False)
+    future: Optional[asyncio.Future] = field(default=None, init=False, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    @property
+    def queue_wait(self) -> float:
+        if not self.started_at:
+            return 0.0
+        return self.started_at - self.enqueued_at
+
+
+class SubAgentBatch:
+    """Jobs submitted together by one ``delegate_tasks`` call."""
+
+    def __init__(self, scheduler: "SubAgentScheduler", jobs: List[SubAgentJob]):
+        self.scheduler = scheduler
+        self.jobs = jobs
+
+    async def as_completed(self) -> AsyncIterator[SubAgentJob]:
+        """Yield jobs as they finish, in completion order."""
+        pending = {job.future: job for job in self.jobs}
+        while pending:
+            done, _ = await asyncio.wait(
+                list(pending), return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in sorted(done, key=lambda f: pending[f].finished_at):
+                yield pending.pop(future)
+
+    def cancel(self, reason: str = "") -> None:
+        """Drop queued jobs and ask running ones to stop."""
+        for job in self.jobs:
+            self.scheduler.cancel(job, reason)
+
+
+class SubAgentScheduler:
+    """Admission control for sub-agent jobs within one event loop."""
+
+    def __init__(
+        self,
+        max_concurrency: int = FIBRE_MAX_CONCURRENT_SUBAGENTS,
+        per_parent_limit: int = FIBRE_MAX_CONCURRENT_PER_PARENT,
+        token_budget: int = FIBRE_TOKEN_BUDGET,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_parent_limit = max(1, per_parent_limit)
+        self.token_budget = max(0, token_budget)
+        self._seq = itertools.count()
+        self._queues: Dict[str, List[Tuple[int, int, SubAgentJob]]] = {}
+        self._running = 0
+        self._tokens_in_flight = 0
+        self._running_by_parent: Counter = Counter()
+        self._running_by_root: Counter = Counter()
+        self._running_by_session: Dict[str, SubAgentJob] = {}
+        self._served_at: Dict[str, int] = {}
+        self._counters = {
+            "submitted": 0,
+            "started": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+        }
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": self._running,
+            "queued": self.queued,
+            "tokens_in_flight": self._tokens_in_flight,
+            **self._counters,
+        }
+
+    def submit(self, jobs: List[SubAgentJob]) -> SubAgentBatch:
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        for job in jobs:
+            job.root_session_id = job.root_session_id or job.parent_session_id
+            job.future = loop.create_future()
+            job.enqueued_at = now
+            job.state = "queued"
+            heapq.heappush(
+                self._queues.setdefault(job.root_session_id, []),
+                (job.priority, next(self._seq), job),
+            )
+            self._counters["submitted"] += 1
+        self._pump()
+        return SubAgentBatch(self, jobs)
+
+    def cancel(self, job: SubAgentJob, reason: str = "") -> None:
+        if job.state == "queued":
+            queue = self._queues.get(job.root_session_id, [])
+            queue[:] = [entry for entry in queue if entry[2] is not job]
+            heapq.heapify(queue)
+            if not queue:
+                self._queues.pop(job.root_session_id, None)
+            job.state = "cancelled"
+            job.finished_at = time.monotonic()
+            self._counters["cancelled"] += 1
+            if job.future is not None and not job.future.done():
+                job.future.cancel()
+            _SUBAGENTS_QUEUED.set((), self.queued)
+        elif job.state == "running":
+            logger.info(
+                f"SubAgentScheduler: cancelling running task {job.name or job.session_id}: {reason}"
+            )
+            if job.on_cancel is not None:
+                try:
+                    job.on_cancel()
+                    return
+                except Exception as e:
+                    logger.warning(f"SubAgentScheduler: cancel callback failed: {e}")
+            if job.task is not None:
+                job.task.cancel()
+
+    @contextmanager
+    def waiting_on_children(self, session_id: str) -> Iterator[None]:
+        """Release the slot of a running job while it waits on its own sub-tasks."""
+        job = self._running_by_session.get(session_id)
+        if job is None or job.state != "running":
+            yield
+            return
+        self._running -= 1
+        self._pump()
+        try:
+            yield
+        finally:
+            # 直接收回槽位：可能暂时超过上限，但不会让父任务再排队
+            self._running += 1
+
+    def _admissible(self, job: SubAgentJob) -> bool:
+        if self._running_by_parent[job.parent_session_id] >= self.per_parent_limit:
+            return False
+        if self.token_budget and self._running:
+            return self._tokens_in_flight + job.token_cost <= self.token_budget
+        return True
+
+    def _next_job(self) -> Optional[SubAgentJob]:
+        # 运行数最少的根会话优先，同等条件下最久未被调度的优先
+        roots = sorted(
+            self._queues,
+            key=lambda root: (
+                self._running_by_root[root],
+                self._served_at.get(root, -1),
+            ),
+        )
+        for root in roots:
+            queue = self._queues[root]
+            for entry in sorted(queue):
+                job = entry[2]
+                if not self._admissible(job):
+                    continue
+                queue.remove(entry)
+                heapq.heapify(queue)
+                if not queue:
+                    del self._queues[root]
+                self._served_at[root] = next(self._seq)
+                return job
+        return None
+
+    def _pump(self) -> None:
+        while self._running < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                break
+            self._start(job)
+        _SUBAGENTS_QUEUED.set((), self.queued)
+        _SUBAGENTS_RUNNING.set((), self._running)
+
+    def _start(self, job: SubAgentJob) -> None:
+        job.state = "running"
+        job.started_at = time.monotonic()
+        self._running += 1
+        self._tokens_in_flight += job.token_cost
+        self._running_by_parent[job.parent_session_id] += 1
+        self._running_by_root[job.root_session_id] += 1
+        if job.session_id:
+            self._running_by_session[job.session_id] = job
+        self._counters["started"] += 1
+        _QUEUE_WAIT.observe((), job.queue_wait)
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: SubAgentJob) -> None:
+        future = job.future
+        try:
+            result = await job.run()
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            self._counters["cancelled"] += 1
+            if not future.done():
+                future.cancel()
+        except Exception as e:
+            job.state = "failed"
+            self._counters["failed"] += 1
+            if not future.done():
+                future.set_exception(e)
+        else:
+            job.state = "done"
+            self._counters["completed"] += 1
+            if not future.done():
+                future.set_result(result)
+        finally:
+            job.finished_at = time.monotonic()
+            self._release(job)
+
+    def _release(self, job: SubAgentJob) -> None:
+        self._running -= 1
+        self._tokens_in_flight -= job.token_cost
+        self._running_by_parent[job.parent_session_id] -= 1
+        if self._running_by_parent[job.parent_session_id] <= 0:
+            del self._running_by_parent[job.parent_session_id]
+        self._running_by_root[job.root_session_id] -= 1
+        if self._running_by_root[job.root_session_id] <= 0:
+            del self._running_by_root[job.root_session_id]
+        if self._running_by_session.get(job.session_id) is job:
+            del self._running_by_session[job.session_id]
+        self._pump()
+
+
+_SCHEDULERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SubAgentScheduler]" = weakref.WeakKeyDictionary()
+
+
+def get_subagent_scheduler() -> SubAgentScheduler:
+    """Scheduler shared by every orchestrator running in the current event loop."""
+    loop = asyncio.get_running_loop()
+    scheduler = _SCHEDULERS.get(loop)
+    if scheduler is None:
+        scheduler = SubAgentScheduler()
+        _SCHEDULERS[loop] = scheduler
+    return scheduler
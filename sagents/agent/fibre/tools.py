@@ -118,6 +118,13 @@ class FibreTools:
                                 "zh": "详细的子任务描述。必须包含以下部分：\n1. **任务背景**：说明这个子任务的上下文和目的\n2. **具体目标**：明确要完成的具体目标\n3. **输入资源**：提供必要的输入文件路径、数据或参考资料。**重要：所有文件路径必须是绝对路径，不能使用相对路径或仅文件名**\n4. **具体要求**：\n   - 功能要求：需要实现什么功能\n   - 质量要求：代码规范、性能要求等\n   - 格式要求：输出格式、命名规范等\n5. **约束条件**：时间限制、技术限制、不能做的事\n6. **期望输出**：\n   - 产出物清单（文件、代码、报告等）\n   - 验收标准（如何判断任务完成）\n7. **注意事项**：特殊说明、潜在风险、依赖关系"
                             },
                         },
+                        "priority": {
+                            "type": "integer",
+                            "description": "Optional: scheduling priority when many tasks are queued; lower values start first. Defaults to 0.",
+                            "description_i18n": {
+                                "zh": "可选：排队时的调度优先级，数值越小越先执行，默认 0。"
+                            },
+                        },
                         "session_id": {
                             "type": "string",
                             "description": "Optional: Session ID of an existing child-agent conversation to continue. Do not pass the current parent session ID. Leave empty for new tasks and the system will create a new session automatically. IMPORTANT: If the sub-agent did not complete the task successfully (failed, incomplete, or needs correction), you MUST reuse the same session_id to continue the conversation context.",
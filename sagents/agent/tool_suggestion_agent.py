@@ -5,12 +5,13 @@
 将推荐结果存入 session_context.audit_status 中供后续使用。
 """
 
+import asyncio
 import json
 import os
 import traceback
 import uuid
 from copy import copy
-from typing import Any, Dict, List, Optional, AsyncGenerator
+from typing import Any, Dict, List, Optional, AsyncGenerator, Tuple
 
 from sagents.agent.agent_base import AgentBase
 from sagents.context.messages.message import MessageChunk, MessageRole, MessageType
@@ -18,6 +19,11 @@ from sagents.context.messages.message_manager import MessageManager
 from sagents.context.session_context import SessionContext
 from sagents.tool.tool_proxy import ToolProxy
 from sagents.tool.tool_baseline import augment_with_baseline_tools
+from sagents.tool.tool_ranker import (
+    TOOL_CO_USAGE,
+    get_tool_ranker,
+    tool_specs_for_ranking,
+)
 from sagents.utils.llm_request_utils import redact_base64_data_urls_in_value
 from sagents.utils.logger import logger
 from sagents.utils.prompt_manager import PromptManager
@@ -25,6 +31,11 @@ from sagents.utils.prompt_manager import PromptManager
 DEFAULT_TOOL_SUGGESTION_DIRECT_THRESHOLD = 15
 TOOL_SUGGESTION_DIRECT_THRESHOLD_ENV = "SAGE_TOOL_SUGGESTION_DIRECT_THRESHOLD"
 TOOL_SUGGESTION_CONTEXT_TURNS = 5
+# llm: 始终调用 LLM；gated: 本地预排序置信时跳过 LLM；local: 只用本地预排序
+TOOL_SUGGESTION_MODE_ENV = "SAGE_TOOL_SUGGESTION_MODE"
+TOOL_SUGGESTION_MODES = ("llm", "gated", "local")
+TOOL_SUGGESTION_LOCAL_TOP_K = int(os.getenv("SAGE_TOOL_SUGGESTION_LOCAL_TOP_K", "8"))
+_TOOLS_USED_PREFIX = "[tools used: "
 
 
 def get_tool_suggestion_direct_threshold() -> int:
@@ -48,6 +59,16 @@ def get_tool_suggestion_direct_threshold() -> int:
     return threshold
 
 
+def get_tool_suggestion_mode() -> str:
+    mode = (os.environ.get(TOOL_SUGGESTION_MODE_ENV) or "llm").strip().lower()
+    if mode not in TOOL_SUGGESTION_MODES:
+        logger.warning(
+            f"ToolSuggestionAgent: invalid {TOOL_SUGGESTION_MODE_ENV}={mode!r}, using llm"
+        )
+        return "llm"
+    return mode
+
+
 class ToolSuggestionAgent(AgentBase):
     """
     工具使用推荐 Agent
@@ -145,7 +166,7 @@ class ToolSuggestionAgent(AgentBase):
                     compact_messages.append(
                         MessageChunk(
                             role=MessageRole.ASSISTANT.value,
-                            content="[tools used: " + ", ".join(tool_names) + "]",
+                            content=_TOOLS_USED_PREFIX + ", ".join(tool_names) + "]",
                             message_type=MessageType.ASSISTANT_TEXT.value,
                         )
                     )
@@ -210,7 +231,9 @@ class ToolSuggestionAgent(AgentBase):
                         name = function.get("name")
                         if isinstance(name, str) and name:
                             tool_call_names[call_id] = name
-                lines.append("assistant: [tools used: " + ", ".join(tool_names) + "]")
+                lines.append(
+                    "assistant: " + _TOOLS_USED_PREFIX + ", ".join(tool_names) + "]"
+                )
                 continue
 
             if msg.role == MessageRole.TOOL.value:
@@ -279,6 +302,52 @@ class ToolSuggestionAgent(AgentBase):
 
         return "\n".join(lines)
 
+    @classmethod
+    def _ranking_query(cls, messages: List[MessageChunk]) -> Tuple[str, List[str]]:
+        """最近一条用户输入作为检索词，之前用过的工具用于共现加权"""
+        query = ""
+        used_tools: List[str] = []
+        for msg in messages:
+            text = cls._extract_text_content(msg.get_content()).strip()
+            if msg.role == MessageRole.USER.value:
+                query = text
+            elif text.startswith(_TOOLS_USED_PREFIX):
+                used_tools.extend(
+                    name.strip()
+                    for name in text[len(_TOOLS_USED_PREFIX) : -1].split(",")
+                    if name.strip()
+                )
+        return query, used_tools
+
+    async def _rank_tools_locally(
+        self,
+        messages_input: List[MessageChunk],
+        session_context: SessionContext,
+        mode: str,
+    ) -> Optional[List[str]]:
+        """本地预排序；gated 模式下得分不够明确时返回 None，交给 LLM"""
+        query, used_tools = self._ranking_query(messages_input)
+        if not query:
+            return None
+        storage = getattr(session_context, "storage", None)
+        if storage is not None and not TOOL_CO_USAGE.bootstrapped:
+            await asyncio.to_thread(TOOL_CO_USAGE.bootstrap, storage)
+        ranker = get_tool_ranker(
+            tool_specs_for_ranking(
+                session_context.tool_manager, session_context.get_language()
+            )
+        )
+        selected, confident = ranker.select(
+            query, used_tools, top_k=TOOL_SUGGESTION_LOCAL_TOP_K
+        )
+        if mode == "gated" and not confident:
+            logger.info("ToolSuggestionAgent: 本地预排序得分不够明确，回退到 LLM 推荐")
+            return None
+        logger.info(
+            f"ToolSuggestionAgent: 本地预排序推荐 {selected}（confident={confident}），跳过 LLM 调用"
+        )
+        return selected
+
     async def run_stream(
         self,
         session_context: SessionContext,
@@ -371,6 +440,16 @@ class ToolSuggestionAgent(AgentBase):
             available_tools = session_context.tool_manager.list_tools_simplified(  # pyright: ignore[reportOptionalMemberAccess]
                 lang=session_context.get_language()
             )
+            mode = get_tool_suggestion_mode()
+            if mode != "llm":
+                local_tool_names = await self._rank_tools_locally(
+                    messages_input, session_context, mode
+                )
+                if local_tool_names is not None:
+                    return self._finalize_suggested_tools(
+                        local_tool_names, available_tools, session_context
+                    )
+
             # 准备工具列表字符串，包含ID和名称，以及描述的前100个字符
             available_tools_str = (
                 "\n".join(
@@ -458,55 +537,65 @@ class ToolSuggestionAgent(AgentBase):
                 except (ValueError, IndexError):
                     pass
 
-            # 确保有必要的工具
-            sm = session_context.effective_skill_manager
-            if sm is not None and sm.list_skills():
-                necessary_tools = [
-                    "file_read",
-                    "execute_shell_command",
-                    "file_write",
-                    "file_update",
-                    "load_skill",
-                ]
-                for tool_name in necessary_tools:
-                    if tool_name not in suggested_tool_names:
-                        suggested_tool_names.append(tool_name)
+            return self._finalize_suggested_tools(
+                suggested_tool_names, available_tools, session_context
+            )
 
-            # 添加系统工具
-            system_tools = [
-                "sys_spawn_agent",
-                "sys_delegate_task",
-                "sys_team_delegate_task",
-                "send_message_through_im",
-                "search_memory",
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            logger.error(f"ToolSuggestionAgent: 分析工具推荐时发生错误: {str(e)}")
+            return []
+
+    @staticmethod
+    def _finalize_suggested_tools(
+        suggested_tool_names: List[str],
+        available_tools: List[Dict[str, Any]],
+        session_context: SessionContext,
+    ) -> List[str]:
+        """补齐技能、系统与基线工具，去掉 complete_task 并去重"""
+        suggested_tool_names = list(suggested_tool_names)
+        # 确保有必要的工具
+        sm = session_context.effective_skill_manager
+        if sm is not None and sm.list_skills():
+            necessary_tools = [
+                "file_read",
+                "execute_shell_command",
+                "file_write",
+                "file_update",
+                "load_skill",
             ]
-            for tool_name in system_tools:
+            for tool_name in necessary_tools:
                 if tool_name not in suggested_tool_names:
-                    for tool in available_tools:
-                        if tool["name"] == tool_name:
-                            suggested_tool_names.append(tool_name)
-                            break
-
-            suggested_tool_names = augment_with_baseline_tools(
-                suggested_tool_names, [tool["name"] for tool in available_tools]
-            )
+                    suggested_tool_names.append(tool_name)
+
+        # 添加系统工具
+        system_tools = [
+            "sys_spawn_agent",
+            "sys_delegate_task",
+            "sys_team_delegate_task",
+            "send_message_through_im",
+            "search_memory",
+        ]
+        for tool_name in system_tools:
+            if tool_name not in suggested_tool_names:
+                for tool in available_tools:
+                    if tool["name"] == tool_name:
+                        suggested_tool_names.append(tool_name)
+                        break
 
-            # 移除complete_task工具
-            if "complete_task" in suggested_tool_names:
-                suggested_tool_names.remove("complete_task")
+        suggested_tool_names = augment_with_baseline_tools(
+            suggested_tool_names, [tool["name"] for tool in available_tools]
+        )
 
-            # 去重
-            suggested_tool_names = list(set(suggested_tool_names))
+        # 移除complete_task工具
+        if "complete_task" in suggested_tool_names:
+            suggested_tool_names.remove("complete_task")
 
-            logger.info(
-                f"ToolSuggestionAgent: 分析完成，推荐工具: {suggested_tool_names}"
-            )
-            return suggested_tool_names
+        # 去重
+        suggested_tool_names = list(set(suggested_tool_names))
 
-        except Exception as e:
-            logger.error(traceback.format_exc())
-            logger.error(f"ToolSuggestionAgent: 分析工具推荐时发生错误: {str(e)}")
-            return []
+        logger.info(f"ToolSuggestionAgent: 分析完成，推荐工具: {suggested_tool_names}")
+        return suggested_tool_names
 
     async def _get_tool_suggestions(
         self,
@@ -17,7 +17,9 @@ from sagents.utils.prompt_manager import prompt_manager
 from sagents.context.workflows import WorkflowManager
 
 from sagents.utils.logger import logger
+from sagents.utils.phase_timer import timed_phase
 from sagents.storage import SessionStore, create_session_store
+from sagents.tool.tool_ranker import TOOL_CO_USAGE
 from sagents.utils.lock_manager import lock_manager, UnifiedLock
 from sagents.utils.serialization import make_serializable
 import json
@@ -2321,6 +2323,15 @@ class SessionContext:
         with self._request_lock:
             return self._finalize_current_request(status)
 
+    def record_turn_timing(self, record: Dict[str, Any]) -> Optional[str]:
+        """把一轮的阶段耗时记录追加到会话存储（turn_timings.jsonl）。"""
+        try:
+            self._bind_storage_workspace()
+            return self.storage.append_turn_timing(self.session_id, record)
+        except Exception as exc:
+            logger.warning(f"SessionContext: 落盘 turn timing 失败: {exc}")
+            return None
+
     def _finalize_current_request(self, status: str) -> Optional[str]:
         cur = self._current_request
         if cur is None:
@@ -2542,6 +2553,7 @@ class SessionContext:
             tokens_info["total_info"]["models"] = models_seen
         return tokens_info
 
+    @timed_phase("session_save")
     def save(
         self,
         session_status: Optional[SessionStatus] = None,
@@ -2699,6 +2711,7 @@ class SessionContext:
                                 )
 
                 self.storage.save_tools_usage(self.session_id, tools_usage)
+                TOOL_CO_USAGE.update(self.session_id, tools_usage)
             except Exception as e:
                 logger.error(f"SessionContext: Failed to save tools_usage.json: {e}")
 
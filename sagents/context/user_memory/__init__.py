@@ -10,10 +10,12 @@
 - UserMemoryManager: 用户记忆管理器（集成工具管理器）
 - IMemoryDriver: 记忆驱动接口
 - ToolMemoryDriver: 基于工具的记忆驱动实现
+- UserMemoryRecallCache: 按用户代数失效的系统级记忆检索缓存
 """
 
 from .schemas import MemoryType, MemoryBackend, MemoryEntry
 from .manager import UserMemoryManager
+from .cache import UserMemoryRecallCache, invalidate_user_memory_cache
 from .interfaces import IMemoryDriver
 from .drivers.tool import ToolMemoryDriver
 from .drivers.vector import VectorMemoryDriver
@@ -25,6 +27,8 @@ __all__ = [
     "MemoryBackend",
     "MemoryEntry",
     "UserMemoryManager",
+    "UserMemoryRecallCache",
+    "invalidate_user_memory_cache",
     "IMemoryDriver",
     "ToolMemoryDriver",
     "VectorMemoryDriver",
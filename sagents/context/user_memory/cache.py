@@ -0,0 +1,111 @@
+"""用户记忆检索缓存
+
+用户记忆在一个会话内很少变化，但 ``get_system_memories`` 每次都要按类型查询后端。
+这里按 (驱动实例, 用户, 记忆类型, 代数) 缓存 ``recall_by_type`` 的结果：
+
+- 每次写入/删除记忆都会让该用户的代数 +1，旧代数的缓存自然失效；
+- 有结果的缓存保留较长时间，空结果只缓存很短时间，避免别的进程写入后长期看不到；
+- 进程内所有 ``UserMemoryManager`` 共享同一份缓存，跨会话也能命中；
+  驱动由 ``IMemoryDriver.cache_scope()`` 区分，不同后端的结果互不可见。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from sagents.observability.metrics_registry import REGISTRY
+
+
+USER_MEMORY_CACHE_TTL = float(os.getenv("SAGE_USER_MEMORY_CACHE_TTL", "300"))
+USER_MEMORY_NEGATIVE_CACHE_TTL = float(
+    os.getenv("SAGE_USER_MEMORY_NEGATIVE_CACHE_TTL", "30")
+)
+USER_MEMORY_CACHE_MAX_ENTRIES = int(
+    os.getenv("SAGE_USER_MEMORY_CACHE_MAX_ENTRIES", "4096")
+)
+
+_LOOKUPS = REGISTRY.counter(
+    "sagents_user_memory_cache_lookups_total",
+    "User memory recall cache lookups by result (hit, negative_hit, miss).",
+    ("result",),
+)
+
+
+class UserMemoryRecallCache:
+    """按用户代数失效的记忆检索缓存"""
+
+    def __init__(
+        self,
+        ttl: float = USER_MEMORY_CACHE_TTL,
+        negative_ttl: float = USER_MEMORY_NEGATIVE_CACHE_TTL,
+        max_entries: int = USER_MEMORY_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._generations: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple[str, str, str, int], Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def bump(self, user_id: str) -> int:
+        """用户记忆发生写入后调用，使该用户所有已缓存结果失效"""
+        with self._lock:
+            generation = self._generations.get(user_id, 0) + 1
+            self._generations[user_id] = generation
+            stale = [key for key in self._entries if key[1] == user_id]
+            for key in stale:
+                del self._entries[key]
+            return generation
+
+    def get(self, scope: str, user_id: str, memory_type: str) -> Tuple[bool, Any]:
+        """返回 ``(是否命中, 缓存值)``，空结果以 None 缓存"""
+        with self._lock:
+            key = (scope, user_id, memory_type, self._generations.get(user_id, 0))
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                _LOOKUPS.inc(("miss",))
+                return False, None
+            self._entries.move_to_end(key)
+        _LOOKUPS.inc(("negative_hit" if entry[1] is None else "hit",))
+        return True, entry[1]
+
+    def put(
+        self, scope: str, user_id: str, memory_type: str, generation: int, value: Any
+    ) -> None:
+        """写入查询结果；``generation`` 是发起查询时的代数，查询期间有写入则丢弃"""
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generations.get(user_id, 0):
+                return
+            key = (scope, user_id, memory_type, generation)
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+USER_MEMORY_RECALL_CACHE = UserMemoryRecallCache()
+
+
+def invalidate_user_memory_cache(user_id: str) -> int:
+    """绕过 UserMemoryManager 直接写记忆后端的调用方用它让缓存失效"""
+    return USER_MEMORY_RECALL_CACHE.bump(user_id)
@@ -72,6 +72,13 @@ class ToolMemoryDriver(IMemoryDriver):
 
         return True
 
+    def cache_scope(self) -> str:
+        """同一个工具管理器与记忆目录视为同一后端，每次新建的驱动实例共享缓存"""
+        return (
+            f"{self.__class__.__name__}:{id(self.tool_manager)}:"
+            f"{os.getenv('MEMORY_ROOT_PATH') or ''}"
+        )
+
     async def remember(
         self,
         user_id: str,
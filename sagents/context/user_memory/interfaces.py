@@ -6,6 +6,7 @@ Author: Eric ZZ
 Date: 2024-12-21
 """
 
+import uuid
 from abc import ABC, abstractmethod
 from typing import List, Optional, Any
 from .schemas import MemoryEntry
@@ -121,3 +122,18 @@ class IMemoryDriver(ABC):
             是否可用
         """
         pass
+
+    def cache_scope(self) -> str:
+        """检索缓存的作用域标识
+
+        进程内共享的检索缓存按它区分后端，同一用户在不同后端的记忆互不可见。
+        默认每个驱动实例一个作用域；多个实例读写同一后端时可覆盖以共享缓存。
+
+        Returns:
+            作用域标识
+        """
+        scope = getattr(self, "_cache_scope", None)
+        if scope is None:
+            scope = f"{self.__class__.__name__}:{uuid.uuid4().hex}"
+            self._cache_scope = scope
+        return scope
@@ -10,6 +10,7 @@ from typing import List, Any, Optional
 from sagents.utils.logger import logger
 from .schemas import MemoryEntry
 from .interfaces import IMemoryDriver
+from .cache import USER_MEMORY_RECALL_CACHE, UserMemoryRecallCache
 from .drivers.tool import ToolMemoryDriver
 
 
@@ -25,6 +26,7 @@ class UserMemoryManager:
         workspace: str,
         driver: Optional[IMemoryDriver] = None,
         model: Any = None,
+        recall_cache: Optional[UserMemoryRecallCache] = None,
     ):
         """
         初始化用户记忆管理器
@@ -33,7 +35,9 @@ class UserMemoryManager:
             driver: 自定义的记忆驱动实例（可选，如果提供则优先使用）
             model: LLM模型实例（用于记忆提取）
             workspace: 工作空间根目录
+            recall_cache: 系统级记忆检索缓存（默认使用进程共享缓存）
         """
+        self.recall_cache = recall_cache or USER_MEMORY_RECALL_CACHE
         self.memory_root = os.environ.get("MEMORY_ROOT_PATH")
         if not self.memory_root:
             self.memory_root = os.path.join(workspace, "user_memory")
@@ -197,6 +201,9 @@ class UserMemoryManager:
         except Exception as e:
             logger.error(f"记住记忆失败: {e}")
             return f"Failed to remember memory: {str(e)}"
+        finally:
+            # 写入失败也可能已部分落盘，统一让缓存失效
+            self.recall_cache.bump(user_id)
 
     async def recall(
         self,
@@ -279,6 +286,8 @@ class UserMemoryManager:
         except Exception as e:
             logger.error(f"忘记记忆失败: {e}")
             return f"Failed to forget memory: {str(e)}"
+        finally:
+            self.recall_cache.bump(user_id)
 
     async def _fetch_single_memory_type(
         self,
@@ -288,7 +297,12 @@ class UserMemoryManager:
         session_id: str,
         session_context: Any,
     ) -> Optional[tuple[str, str]]:
-        """辅助方法：获取单个类型的记忆"""
+        """辅助方法：获取单个类型的记忆（经过检索缓存）"""
+        scope = driver.cache_scope()
+        hit, cached = self.recall_cache.get(scope, user_id, memory_type)
+        if hit:
+            return (memory_type, cached) if cached is not None else None
+        generation = self.recall_cache.generation(user_id)
         try:
             memories = await driver.recall_by_type(
                 user_id=user_id,
@@ -299,14 +313,16 @@ class UserMemoryManager:
                 session_context=session_context,
             )
 
+            content = None
             if memories:
                 formatted_memories = []
                 for memory in memories:
                     formatted_memories.append(f"- {memory.key}: {memory.content}")
 
                 if formatted_memories:
-                    return memory_type, "\n".join(formatted_memories)
-            return None
+                    content = "\n".join(formatted_memories)
+            self.recall_cache.put(scope, user_id, memory_type, generation, content)
+            return (memory_type, content) if content is not None else None
 
         except Exception as e:
             logger.error(traceback.format_exc())
@@ -365,6 +381,23 @@ class UserMemoryManager:
             logger.error(f"获取系统级记忆失败: {e}")
             return {}
 
+    def prefetch_system_memories(
+        self,
+        user_id: str,
+        session_id: Optional[str] = None,
+        session_context: Optional[Any] = None,
+    ) -> "asyncio.Task[dict]":
+        """会话开始时在后台预取系统级记忆，首轮对话直接命中缓存
+
+        Returns:
+            预取任务，调用方可以不等待
+        """
+        return asyncio.create_task(
+            self.get_system_memories(
+                user_id, session_id=session_id, session_context=session_context
+            )
+        )
+
     def format_system_memories_for_context(self, system_memories: dict) -> str:
         """将系统级记忆格式化为适合注入system_context的字符串
 
@@ -0,0 +1,231 @@
+"""
+ParallelNode 分支的资源池与自适应并发控制。
+
+每次 flow 运行（一个 FlowExecutor）为每类资源（llm / sandbox / io）持有一个
+``AdaptiveLimiter``，不同会话的并行分支互不挤占槽位；全局的供应商限流仍由 429
+反馈兜底。上限按 AIMD 调整：成功时每轮加 1，出错（含限流 429）时乘以 ``backoff`` 收缩。
+
+llm 分支内部的每次模型调用由 agent 的重试循环通过 ``report_llm_call`` 上报，
+被重试吞掉的 429 也会让资源池收缩；没有上报的分支才按整段分支的成败反馈。
+分支的工作量差别很大，耗时只记入直方图，不作为收缩信号。
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, FrozenSet, Optional
+
+from sagents.observability.metrics_registry import REGISTRY
+
+
+FLOW_RESOURCES = ("llm", "sandbox", "io")
+
+# 资源 -> (初始并发, 并发上限)
+_POOL_DEFAULTS = {
+    "llm": (4, 16),
+    "sandbox": (2, 4),
+    "io": (8, 32),
+}
+
+_RESOURCE_LIMIT = REGISTRY.gauge(
+    "sagents_flow_resource_limit",
+    "Current adaptive concurrency limit of a flow resource pool.",
+    ("resource",),
+)
+_RESOURCE_IN_FLIGHT = REGISTRY.gauge(
+    "sagents_flow_resource_in_flight",
+    "Parallel flow branches currently holding a resource pool slot.",
+    ("resource",),
+)
+_LLM_CALL_SECONDS = REGISTRY.histogram(
+    "sagents_flow_llm_call_seconds",
+    "Latency of LLM calls made while holding a flow llm pool slot.",
+    ("outcome",),
+)
+
+# 当前任务已持有的资源；嵌套 ParallelNode 不再重复申请，避免父分支占槽等子分支
+_HELD_RESOURCES: contextvars.ContextVar[FrozenSet[str]] = contextvars.ContextVar(
+    "sagents_flow_held_resources", default=frozenset()
+)
+
+
+class _CallFeedback:
+    """分支持有的 llm 槽位；记录分支内是否已有逐次调用的反馈"""
+
+    __slots__ = ("limiter", "reported")
+
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        self.limiter = limiter
+        self.reported = False
+
+
+_LLM_CALL_FEEDBACK: contextvars.ContextVar[Optional[_CallFeedback]] = (
+    contextvars.ContextVar("sagents_flow_llm_call_feedback", default=None)
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class AdaptiveLimiter:
+    """上限可变的异步信号量，按分支成败做 AIMD 调整"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        backoff: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or initial)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff = backoff
+        self._clock = clock
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = float("-inf")
+        self._report()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self) -> float:
+        """拿到一个槽位，返回开始时间，交给 ``release`` 判断是否属于已收缩过的一批"""
+        if not self._waiters and self._in_flight < int(self.limit):
+            self._add_in_flight(1)
+            return self._clock()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已被唤醒但随后取消，把槽位交还给下一个
+                self._add_in_flight(-1)
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return self._clock()
+
+    def release(self, started_at: float, ok: Optional[bool] = True) -> None:
+        """归还槽位；``ok`` 为 None 表示没有可用信号（例如被提前取消）"""
+        self._add_in_flight(-1)
+        if ok is not None:
+            self._feedback(started_at, ok)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        started_at = await self.acquire()
+        ok: Optional[bool] = False
+        try:
+            yield
+            ok = True
+        except asyncio.CancelledError:
+            ok = None
+            raise
+        finally:
+            self.release(started_at, ok)
+
+    def record_call(self, ok: bool, seconds: float) -> None:
+        """持有槽位期间一次调用的结果；调用开始时间由耗时倒推"""
+        self._feedback(self._clock() - seconds, ok)
+
+    def _feedback(self, started_at: float, ok: bool) -> None:
+        if ok:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        elif started_at >= self._last_decrease:
+            # 同一批在收缩前发出的请求只收缩一次
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_decrease = self._clock()
+        self._report()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._add_in_flight(1)
+            waiter.set_result(None)
+
+    def _add_in_flight(self, delta: int) -> None:
+        # 每次 flow 运行各有一组资源池，在途数按资源汇总
+        self._in_flight += delta
+        _RESOURCE_IN_FLIGHT.inc((self.name,), delta)
+
+    def _report(self) -> None:
+        _RESOURCE_LIMIT.set((self.name,), int(self.limit))
+
+
+class ResourcePools:
+    """按资源标签划分的一组 ``AdaptiveLimiter``"""
+
+    def __init__(self, limiters: Optional[Dict[str, AdaptiveLimiter]] = None):
+        if limiters is None:
+            limiters = {}
+            for resource, (initial, maximum) in _POOL_DEFAULTS.items():
+                prefix = f"SAGE_FLOW_{resource.upper()}"
+                limiters[resource] = AdaptiveLimiter(
+                    resource,
+                    initial=_env_int(f"{prefix}_CONCURRENCY", initial),
+                    max_limit=_env_int(f"{prefix}_MAX_CONCURRENCY", maximum),
+                )
+        self.limiters = limiters
+
+    def get(self, resource: Optional[str]) -> Optional[AdaptiveLimiter]:
+        if not resource:
+            return None
+        return self.limiters.get(resource)
+
+    @asynccontextmanager
+    async def hold(self, resource: Optional[str]) -> AsyncIterator[None]:
+        """占用资源池槽位；当前任务已持有同一资源时直接放行"""
+        limiter = self.get(resource)
+        held = _HELD_RESOURCES.get()
+        if limiter is None or resource in held:
+            yield
+            return
+        feedback = _CallFeedback(limiter) if resource == "llm" else None
+        started_at = await limiter.acquire()
+        ok: Optional[bool] = False
+        held_token = _HELD_RESOURCES.set(held | {resource})
+        feedback_token = _LLM_CALL_FEEDBACK.set(feedback)
+        try:
+            yield
+            ok = True
+        except asyncio.CancelledError:
+            ok = None
+            raise
+        finally:
+            _LLM_CALL_FEEDBACK.reset(feedback_token)
+            _HELD_RESOURCES.reset(held_token)
+            if feedback is not None and feedback.reported:
+                # 逐次调用已经反馈过，分支整体成败不再重复计入
+                ok = None
+            limiter.release(started_at, ok)
+
+
+def report_llm_call(ok: bool, seconds: float) -> None:
+    """agent 重试循环中每次 LLM 调用的结果（含被重试吞掉的 429/超时）
+
+    不在 ParallelNode 的 llm 分支内时只记录耗时。
+    """
+    _LLM_CALL_SECONDS.observe(("ok" if ok else "error",), seconds)
+    feedback = _LLM_CALL_FEEDBACK.get()
+    if feedback is None:
+        return
+    feedback.reported = True
+    feedback.limiter.record_call(ok, seconds)
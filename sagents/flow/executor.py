@@ -1,6 +1,6 @@
 import asyncio
 import time
-from typing import AsyncGenerator, List, Any, Optional
+from typing import AsyncGenerator, List, Any, Optional, Tuple
 from sagents.flow.schema import (
     FlowNode,
     AgentNode,
@@ -10,6 +10,7 @@ from sagents.flow.schema import (
     IfNode,
     SwitchNode,
 )
+from sagents.flow.concurrency import ResourcePools
 from sagents.flow.conditions import ConditionRegistry
 from sagents.utils.logger import logger
 from sagents.context.messages.message import MessageChunk, is_message_client_visible
@@ -103,11 +104,14 @@ class FlowExecutor:
         session_runtime: Any,
         session_id: str,
         session_manager: Any,
+        resource_pools: Optional[ResourcePools] = None,
     ):
         self.tool_manager = tool_manager
         self.runtime = session_runtime
         self.session_id = session_id
         self.session_manager = session_manager
+        # 资源池按 flow 运行划分，一个会话的大扇出不会挤占其他会话的槽位
+        self.resource_pools = resource_pools or ResourcePools()
 
         # 注册 ToDoTool 用于多智能体任务检查
         # self._todo_tool = ToDoTool()
@@ -138,6 +142,61 @@ class FlowExecutor:
             return True
         return False
 
+    @staticmethod
+    def _branch_resource(branch: FlowNode) -> Optional[str]:
+        if branch.resource:
+            return branch.resource
+        # 组合节点默认不占槽位，只有其中嵌套的 ParallelNode 分支会再申请
+        return "llm" if isinstance(branch, AgentNode) else None
+
+    async def _run_parallel_branches(
+        self, node: ParallelNode, trace: _FlowExecutionTrace
+    ) -> Tuple[List[Any], int]:
+        """按节点并发上限与资源池执行分支，返回（按分支顺序的结果, 成功数）"""
+        pools = self.resource_pools
+        node_slots = asyncio.Semaphore(max(1, node.max_concurrency))
+
+        async def run_branch(branch: FlowNode) -> List[MessageChunk]:
+            """执行单个分支并收集所有消息"""
+            async with node_slots:
+                async with pools.hold(self._branch_resource(branch)):
+                    chunks = []
+                    async for chunk in self._execute_node(branch, trace):
+                        chunks.extend(chunk)
+                    return chunks
+
+        tasks = [asyncio.ensure_future(run_branch(branch)) for branch in node.branches]
+        if node.join == "all":
+            # 并行执行并收集结果
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            succeeded = sum(not isinstance(r, BaseException) for r in results)
+            return list(results), succeeded
+
+        required = 1 if node.join == "any" else max(1, node.first_n)
+        succeeded = 0
+        pending = set(tasks)
+        try:
+            while pending and succeeded < required:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded += sum(
+                    1 for task in done if not task.cancelled() and not task.exception()
+                )
+        finally:
+            # 凑够成功数（或外层被取消）后，取消仍在运行的分支
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        results = [
+            asyncio.CancelledError()
+            if task.cancelled()
+            else (task.exception() or task.result())
+            for task in tasks
+        ]
+        return results, succeeded
+
     async def execute(self, node: FlowNode) -> AsyncGenerator[List[MessageChunk], None]:
         trace = _FlowExecutionTrace()
         try:
@@ -187,22 +246,13 @@ class FlowExecutor:
             # 并行执行所有分支
             trace.add(f"parallel(branches={len(node.branches)})")
 
-            async def run_branch(branch: FlowNode) -> List[MessageChunk]:
-                """执行单个分支并收集所有消息"""
-                chunks = []
-                async for chunk in self._execute_node(branch, trace):
-                    chunks.extend(chunk)
-                return chunks
-
-            # 创建所有分支的任务
-            tasks = [run_branch(branch) for branch in node.branches]
-
-            # 并行执行并收集结果
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            results, succeeded = await self._run_parallel_branches(node, trace)
 
             # 处理结果（按分支顺序yield）
             for i, result in enumerate(results):
-                if isinstance(result, Exception):
+                if isinstance(result, asyncio.CancelledError):
+                    continue
+                if isinstance(result, BaseException):
                     logger.error(
                         f"FlowExecutor: Branch {i} failed with error: {result}"
                     )
@@ -217,7 +267,12 @@ class FlowExecutor:
                 )
                 return
 
-            trace.add(f"parallel_done({len(node.branches)})")
+            if node.join == "all":
+                trace.add(f"parallel_done({len(node.branches)})")
+            else:
+                trace.add(
+                    f"parallel_done({node.join}:{succeeded}/{len(node.branches)})"
+                )
 
         elif isinstance(node, LoopNode):
             loop_count = 0
@@ -7,6 +7,8 @@ class FlowNode(BaseModel):
 
     node_type: str
     description: Optional[str] = None
+    # 作为 ParallelNode 分支时占用的资源池；AgentNode 未指定时按 llm 计
+    resource: Optional[Literal["llm", "sandbox", "io"]] = None
 
 
 class AgentNode(FlowNode):
@@ -41,6 +43,9 @@ class ParallelNode(FlowNode):
         Union["AgentNode", "SequenceNode", "LoopNode", "IfNode", "SwitchNode"]
     ]
     max_concurrency: int = 5  # 最大并发数
+    # all: 等待全部分支；any: 首个成功即结束；first_n: 前 first_n 个成功即结束
+    join: Literal["all", "any", "first_n"] = "all"
+    first_n: int = 1
 
 
 class LoopNode(FlowNode):
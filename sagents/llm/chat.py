@@ -6,15 +6,18 @@ import httpx
 from openai import AsyncOpenAI
 from sagents.utils.logger import logger
 from sagents.llm.sage_openai import SageAsyncOpenAI
+from sagents.llm.replay import wrap_client_for_replay
 
 
 def _create_openai_client(api_key: str, base_url: Optional[str]) -> AsyncOpenAI:
     http_client = httpx.AsyncClient(headers={"Accept-Encoding": "identity"})
-    return AsyncOpenAI(
+    client = AsyncOpenAI(
         api_key=api_key,
         base_url=base_url,
         http_client=http_client,
     )
+    # SAGE_LLM_REPLAY_MODE 开启时录制/回放模型请求，默认原样返回
+    return wrap_client_for_replay(client)
 
 
 class OpenAIChat:
@@ -0,0 +1,449 @@
+"""LLM 请求录制 / 回放
+
+在 ``OpenAIChat`` 与底层 ``AsyncOpenAI`` 之间加一层，开发和压测时不再依赖真实模型：
+
+- record: 正常调用模型，把规范化后的请求和完整的流式 chunk 序列（含到达时间）追加到 cassette；
+- replay: 按请求指纹从 cassette 取响应，未命中直接报错；
+- auto:   能回放就回放，未命中再调用模型并录制。
+
+指纹先精确匹配；不命中时再用“模糊指纹”匹配，模糊指纹会抹掉 system prompt 中的时间、
+UUID 等易变片段和 ``<runtime_context>`` 块，并按顺序重新编号 tool_call id，
+同一段对话隔天回放也能命中。
+cassette 是 JSONL 文件，一行一次请求，可以用 ``scripts/llm_cassette.py`` 查看和整理。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from sagents.utils.logger import logger
+
+
+LLM_REPLAY_MODE_ENV = "SAGE_LLM_REPLAY_MODE"
+LLM_CASSETTE_ENV = "SAGE_LLM_CASSETTE"
+LLM_REPLAY_TIMING_ENV = "SAGE_LLM_REPLAY_TIMING"
+LLM_REPLAY_MODES = ("off", "record", "replay", "auto")
+
+# 不影响模型输出的传输层参数，不参与指纹
+_TRANSPORT_KEYS = {
+    "extra_headers",
+    "extra_query",
+    "metadata",
+    "stream_options",
+    "timeout",
+    "user",
+}
+_RUNTIME_CONTEXT_RE = re.compile(
+    r"<runtime_context\b[^>]*>.*?</runtime_context>", re.IGNORECASE | re.DOTALL
+)
+_VOLATILE_PATTERNS = (
+    (
+        re.compile(
+            r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?"
+            r"(?:Z|[+-]\d{2}:?\d{2})?"
+        ),
+        "<datetime>",
+    ),
+    (re.compile(r"\d{4}[-/年]\d{1,2}[-/月]\d{1,2}日?"), "<date>"),
+    (re.compile(r"\b\d{1,2}:\d{2}(?::\d{2})?\b"), "<time>"),
+    (
+        re.compile(
+            r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-"
+            r"[0-9a-fA-F]{12}\b"
+        ),
+        "<uuid>",
+    ),
+    (re.compile(r"\b[0-9a-fA-F]{16,}\b"), "<hex>"),
+)
+
+
+class LLMReplayMissError(RuntimeError):
+    """replay 模式下 cassette 中没有匹配的请求"""
+
+
+def get_llm_replay_mode() -> str:
+    mode = (os.getenv(LLM_REPLAY_MODE_ENV) or "off").strip().lower()
+    if mode not in LLM_REPLAY_MODES:
+        logger.warning(f"未知的 {LLM_REPLAY_MODE_ENV}={mode}，按 off 处理")
+        return "off"
+    return mode
+
+
+def get_llm_replay_timing() -> float:
+    """回放时的节奏系数：0 不等待，1 按录制时的节奏，其他值按比例缩放"""
+    raw = os.getenv(LLM_REPLAY_TIMING_ENV) or "0"
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        logger.warning(f"无效的 {LLM_REPLAY_TIMING_ENV}={raw}，按 0 处理")
+        return 0.0
+
+
+def canonical_request(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉传输层参数和 Sage 内部字段，得到可以稳定序列化的请求"""
+    request = {
+        key: value
+        for key, value in kwargs.items()
+        if key not in _TRANSPORT_KEYS and value is not None
+    }
+    messages = request.get("messages")
+    if isinstance(messages, list):
+        request["messages"] = [
+            {
+                key: value
+                for key, value in message.items()
+                if not str(key).startswith("_sage_")
+            }
+            if isinstance(message, dict)
+            else message
+            for message in messages
+        ]
+    return json.loads(json.dumps(request, ensure_ascii=False, default=str))
+
+
+def _mask_volatile(text: str, system: bool) -> str:
+    text = _RUNTIME_CONTEXT_RE.sub("<runtime_context/>", text)
+    if system:
+        for pattern, placeholder in _VOLATILE_PATTERNS:
+            text = pattern.sub(placeholder, text)
+    return text
+
+
+def _fuzzy_content(content: Any, system: bool) -> Any:
+    if isinstance(content, str):
+        return _mask_volatile(content, system)
+    if isinstance(content, list):
+        return [
+            {**part, "text": _mask_volatile(part["text"], system)}
+            if isinstance(part, dict) and isinstance(part.get("text"), str)
+            else part
+            for part in content
+        ]
+    return content
+
+
+def _fuzzy_message(message: Any, call_ids: Dict[str, str]) -> Any:
+    if not isinstance(message, dict):
+        return message
+    # 框架生成的 tool_call id 带随机后缀，按出现顺序重新编号
+    message = {
+        **message,
+        "content": _fuzzy_content(
+            message.get("content"), message.get("role") == "system"
+        ),
+    }
+    if message.get("tool_call_id"):
+        message["tool_call_id"] = call_ids.setdefault(
+            message["tool_call_id"], f"call_{len(call_ids)}"
+        )
+    if isinstance(message.get("tool_calls"), list):
+        message["tool_calls"] = [
+            {**call, "id": call_ids.setdefault(call["id"], f"call_{len(call_ids)}")}
+            if isinstance(call, dict) and call.get("id")
+            else call
+            for call in message["tool_calls"]
+        ]
+    return message
+
+
+def request_fingerprint(request: Dict[str, Any], fuzzy: bool = False) -> str:
+    if fuzzy:
+        call_ids: Dict[str, str] = {}
+        request = dict(request)
+        request["messages"] = [
+            _fuzzy_message(message, call_ids)
+            for message in request.get("messages") or []
+        ]
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CassetteEntry:
+    fingerprint: str
+    fuzzy_fingerprint: str
+    request: Dict[str, Any]
+    stream: bool
+    # 流式：每个 chunk 的 model_dump 以及相对请求开始的到达时间（秒）
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    offsets: List[float] = field(default_factory=list)
+    # 非流式：完整响应
+    response: Optional[Dict[str, Any]] = None
+    duration: float = 0.0
+    recorded_at: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CassetteEntry":
+        return cls(
+            **{key: data[key] for key in cls.__dataclass_fields__ if key in data}
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Cassette:
+    """一个 JSONL cassette 文件；同一指纹录到多次时按顺序依次回放"""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.entries: List[CassetteEntry] = []
+        self._exact: Dict[str, List[int]] = {}
+        self._fuzzy: Dict[str, List[int]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        self._index(CassetteEntry.from_dict(json.loads(line)))
+                    except (ValueError, TypeError) as e:
+                        logger.warning(
+                            f"Cassette {self.path}:{line_number} 解析失败，已跳过: {e}"
+                        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _index(self, entry: CassetteEntry) -> None:
+        # 指纹按当前规则重新计算，匹配规则调整后旧 cassette 仍然可用
+        entry.fingerprint = request_fingerprint(entry.request)
+        entry.fuzzy_fingerprint = request_fingerprint(entry.request, fuzzy=True)
+        index = len(self.entries)
+        self.entries.append(entry)
+        self._exact.setdefault(entry.fingerprint, []).append(index)
+        self._fuzzy.setdefault(entry.fuzzy_fingerprint, []).append(index)
+
+    def match(self, request: Dict[str, Any]) -> Optional[CassetteEntry]:
+        with self._lock:
+            for fingerprint, table, kind in (
+                (request_fingerprint(request), self._exact, "exact"),
+                (request_fingerprint(request, fuzzy=True), self._fuzzy, "fuzzy"),
+            ):
+                candidates = table.get(fingerprint)
+                if not candidates:
+                    continue
+                served_key = f"{kind}:{fingerprint}"
+                served = self._served.get(served_key, 0)
+                self._served[served_key] = served + 1
+                return self.entries[candidates[min(served, len(candidates) - 1)]]
+        return None
+
+    def append(self, entry: CassetteEntry) -> None:
+        with self._lock:
+            self._index(entry)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+
+    def rewrite(self, entries: Iterable[CassetteEntry]) -> None:
+        """用给定条目重写 cassette（整理工具使用）"""
+        entries = list(entries)
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry.to_dict(), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self.entries, self._exact, self._fuzzy, self._served = [], {}, {}, {}
+            for entry in entries:
+                self._index(entry)
+
+
+class ReplayStream:
+    """按录制的 chunk 序列回放的异步流，可选按录制时间间隔等待"""
+
+    def __init__(self, entry: CassetteEntry, timing: float):
+        self._entry = entry
+        self._timing = timing
+        self._position = 0
+        self._previous_offset = 0.0
+
+    def __aiter__(self) -> "ReplayStream":
+        return self
+
+    async def __anext__(self) -> ChatCompletionChunk:
+        if self._position >= len(self._entry.chunks):
+            raise StopAsyncIteration
+        offset = (
+            self._entry.offsets[self._position]
+            if self._position < len(self._entry.offsets)
+            else self._previous_offset
+        )
+        if self._timing > 0 and offset > self._previous_offset:
+            await asyncio.sleep((offset - self._previous_offset) * self._timing)
+        self._previous_offset = offset
+        chunk = self._entry.chunks[self._position]
+        self._position += 1
+        return ChatCompletionChunk.model_validate(chunk)
+
+    async def close(self) -> None:
+        self._position = len(self._entry.chunks)
+
+    aclose = close
+
+
+class RecordingStream:
+    """透传真实流，同时记录 chunk 和到达时间，流读完后写入 cassette"""
+
+    def __init__(
+        self,
+        stream: Any,
+        cassette: Cassette,
+        request: Dict[str, Any],
+        started_at: float,
+    ):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._cassette = cassette
+        self._request = request
+        self._started_at = started_at
+        self._chunks: List[Dict[str, Any]] = []
+        self._offsets: List[float] = []
+        self._saved = False
+
+    def __aiter__(self) -> "RecordingStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._save()
+            raise
+        self._offsets.append(time.perf_counter() - self._started_at)
+        self._chunks.append(chunk.model_dump(mode="json"))
+        return chunk
+
+    def _save(self) -> None:
+        if self._saved:
+            return
+        self._saved = True
+        self._cassette.append(
+            CassetteEntry(
+                fingerprint=request_fingerprint(self._request),
+                fuzzy_fingerprint=request_fingerprint(self._request, fuzzy=True),
+                request=self._request,
+                stream=True,
+                chunks=self._chunks,
+                offsets=self._offsets,
+                duration=time.perf_counter() - self._started_at,
+                recorded_at=time.time(),
+            )
+        )
+
+    async def close(self) -> None:
+        # 没读完就关闭的流不完整，不录制
+        self._saved = True
+        for method_name in ("aclose", "close"):
+            method = getattr(self._stream, method_name, None)
+            if callable(method):
+                result = method()
+                if asyncio.iscoroutine(result):
+                    await result
+                return
+
+    aclose = close
+
+
+class ReplayChatCompletions:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+        self.completions = self
+
+    async def create(self, **kwargs) -> Any:
+        client = self._client
+        request = canonical_request(kwargs)
+        stream = bool(kwargs.get("stream"))
+        if client.mode in ("replay", "auto"):
+            entry = client.cassette.match(request)
+            if entry is not None:
+                if entry.stream and stream:
+                    return ReplayStream(entry, client.timing)
+                if not entry.stream and not stream and entry.response is not None:
+                    if client.timing > 0:
+                        await asyncio.sleep(entry.duration * client.timing)
+                    return ChatCompletion.model_validate(entry.response)
+            if client.mode == "replay":
+                raise LLMReplayMissError(
+                    f"No recorded LLM response in {client.cassette.path} for "
+                    f"request {request_fingerprint(request)[:12]} "
+                    f"(model={request.get('model')})"
+                )
+
+        started_at = time.perf_counter()
+        response = await client.inner.chat.completions.create(**kwargs)
+        if stream:
+            return RecordingStream(response, client.cassette, request, started_at)
+        client.cassette.append(
+            CassetteEntry(
+                fingerprint=request_fingerprint(request),
+                fuzzy_fingerprint=request_fingerprint(request, fuzzy=True),
+                request=request,
+                stream=False,
+                response=response.model_dump(mode="json"),
+                duration=time.perf_counter() - started_at,
+                recorded_at=time.time(),
+            )
+        )
+        return response
+
+
+class ReplayClient:
+    """包装 AsyncOpenAI，只接管 chat.completions.create，其余属性透传"""
+
+    def __init__(self, inner: Any, cassette: Cassette, mode: str, timing: float = 0.0):
+        self.inner = inner
+        self.cassette = cassette
+        self.mode = mode
+        self.timing = timing
+        self.chat = ReplayChatCompletions(self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+_CASSETTES: Dict[str, Cassette] = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """同一路径共享一个 Cassette（标准/快速模型客户端录到同一个文件）"""
+    path = os.path.abspath(os.path.expanduser(path))
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get(path)
+        if cassette is None:
+            cassette = Cassette(path)
+            _CASSETTES[path] = cassette
+        return cassette
+
+
+def wrap_client_for_replay(client: Any) -> Any:
+    """按环境变量决定是否给客户端加录制/回放层，关闭时原样返回"""
+    mode = get_llm_replay_mode()
+    if mode == "off":
+        return client
+    path = os.getenv(LLM_CASSETTE_ENV)
+    if not path:
+        logger.warning(
+            f"{LLM_REPLAY_MODE_ENV}={mode} 但未设置 {LLM_CASSETTE_ENV}，忽略"
+        )
+        return client
+    cassette = get_cassette(path)
+    logger.info(f"LLM {mode} 已启用: cassette={cassette.path} entries={len(cassette)}")
+    return ReplayClient(client, cassette, mode, get_llm_replay_timing())
@@ -1,5 +1,7 @@
 from .base import BaseTraceHandler
+from .dispatcher import EventDispatcher, HandlerPolicy, TraceEvent
 from .manager import ObservabilityManager
+from .memory_handler import InMemoryTraceHandler
 
 try:
     from .opentelemetry_handler import OpenTelemetryTraceHandler
@@ -10,9 +12,13 @@ from .agent_runtime import AgentRuntime, ObservableAsyncOpenAI
 
 __all__ = [
     "BaseTraceHandler",
+    "EventDispatcher",
+    "HandlerPolicy",
+    "InMemoryTraceHandler",
     "ObservabilityManager",
     "OpenTelemetryTraceHandler",
     "PrometheusTraceHandler",
     "AgentRuntime",
     "ObservableAsyncOpenAI",
+    "TraceEvent",
 ]
@@ -1,5 +1,6 @@
 import asyncio
 import inspect
+import time
 from typing import Any, Dict, Optional
 from sagents.observability.manager import ObservabilityManager
 from sagents.tool.tool_schema import McpToolSpec, SageMcpToolSpec
@@ -200,12 +201,27 @@ class ObservableCompletions:
 
     async def _wrap_stream(self, stream, session_id):
         collected_content = []
+        # 首个输出 chunk 的时间与输出 token 数，供 TTFT / tokens-per-second 指标使用
+        first_token_at = None
+        output_chunks = 0
+        output_tokens = None
         try:
             async for chunk in stream:
                 if chunk.choices and len(chunk.choices) > 0:
                     delta = chunk.choices[0].delta
+                    if (
+                        delta.content
+                        or getattr(delta, "reasoning_content", None)
+                        or getattr(delta, "tool_calls", None)
+                    ):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        output_chunks += 1
                     if delta.content:
                         collected_content.append(delta.content)
+                usage = getattr(chunk, "usage", None)
+                if usage is not None and getattr(usage, "completion_tokens", None):
+                    output_tokens = usage.completion_tokens
                 yield chunk
         finally:
             # When stream ends (or error occurs during iteration which raises out)
@@ -214,7 +230,13 @@ class ObservableCompletions:
             # Since we can't easily reconstruct the full ChatCompletion object without duplicating AgentBase logic,
             # we will log the accumulated content.
             full_content = "".join(collected_content)
-            self.observability_manager.on_llm_end(full_content, session_id=session_id)
+            # 没有 usage 时按输出 chunk 数近似 token 数
+            self.observability_manager.on_llm_end(
+                full_content,
+                session_id=session_id,
+                first_token_at=first_token_at,
+                output_tokens=output_tokens if output_tokens else output_chunks,
+            )
 
 
 class AgentRuntime:
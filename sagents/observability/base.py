@@ -5,8 +5,21 @@ from typing import Dict, Any, List, Union
 class BaseTraceHandler(ABC):
     """
     Base interface for observability handlers (tracers).
+
+    Handlers run inline on the agent's hot path by default. A handler that
+    keeps no per-task state (no ContextVars, no reliance on being called
+    before the next event of the same task) can set ``async_safe = True``;
+    ObservabilityManager then queues its events and delivers them in batches
+    from a background exporter through ``on_event_batch``.
     """
 
+    async_safe: bool = False
+
+    def on_event_batch(self, events: List[Any]) -> None:
+        """Deliver queued TraceEvents by calling the matching ``on_*`` methods."""
+        for event in events:
+            getattr(self, event.name)(*event.args, **event.kwargs)
+
     @abstractmethod
     def on_chain_start(self, session_id: str, input_data: Any, **kwargs: Any) -> Any:
         """Run when the main chain (workflow) starts."""
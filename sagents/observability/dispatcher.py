@@ -0,0 +1,213 @@
+"""
+Asynchronous event dispatch for trace handlers that do not need the caller's context.
+
+Publishing appends an event to a bounded ring buffer without taking a lock; a
+daemon exporter thread drains the buffer every flush interval and hands each
+handler its share of the batch. When the buffer is full the oldest events are
+overwritten and counted as dropped.
+
+Handlers whose state lives in the calling task (span stacks kept in
+ContextVars, such as the OpenTelemetry and Prometheus handlers) must keep
+running inline and never go through this path.
+"""
+
+import itertools
+import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sagents.utils.logger import logger
+
+
+OBS_BUFFER_SIZE = int(os.getenv("SAGE_OBS_BUFFER_SIZE", "8192"))
+OBS_FLUSH_INTERVAL_MS = int(os.getenv("SAGE_OBS_FLUSH_INTERVAL_MS", "50"))
+OBS_BATCH_SIZE = int(os.getenv("SAGE_OBS_BATCH_SIZE", "512"))
+
+# 这些回调的第一个位置参数是 session_id
+_SESSION_FIRST_EVENTS = frozenset(
+    (
+        "on_chain_start",
+        "on_agent_start",
+        "on_llm_start",
+        "on_tool_start",
+        "on_message_start",
+        "on_message_end",
+    )
+)
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    """One handler callback captured on the hot path."""
+
+    name: str
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    session_id: Optional[str]
+    timestamp: float
+
+    @classmethod
+    def capture(
+        cls, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> "TraceEvent":
+        session_id = kwargs.get("session_id")
+        if session_id is None and args and name in _SESSION_FIRST_EVENTS:
+            session_id = args[0]
+        return cls(name, args, kwargs, session_id, time.time())
+
+
+@dataclass
+class HandlerPolicy:
+    """
+    Per-handler sampling and rate limit.
+
+    ``sample_rate`` keeps a deterministic share of sessions, so start and end
+    events of one session are kept or dropped together. ``max_events_per_second``
+    caps what a queued handler receives; excess events are dropped and counted.
+    """
+
+    sample_rate: float = 1.0
+    max_events_per_second: Optional[float] = None
+    _tokens: float = field(default=0.0, init=False, repr=False)
+    _refilled_at: float = field(default=0.0, init=False, repr=False)
+
+    def samples(self, session_id: Optional[str]) -> bool:
+        if self.sample_rate >= 1.0:
+            return True
+        if self.sample_rate <= 0.0:
+            return False
+        if session_id is None:
+            return random.random() < self.sample_rate
+        bucket = zlib.crc32(str(session_id).encode("utf-8")) % 10_000
+        return bucket < self.sample_rate * 10_000
+
+    def admit(self, now: float) -> bool:
+        limit = self.max_events_per_second
+        if limit is None:
+            return True
+        if self._refilled_at == 0.0:
+            self._tokens, self._refilled_at = limit, now
+        self._tokens = min(limit, self._tokens + (now - self._refilled_at) * limit)
+        self._refilled_at = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class EventDispatcher:
+    """Ring buffer plus a background exporter feeding queued trace handlers."""
+
+    def __init__(
+        self,
+        capacity: int = OBS_BUFFER_SIZE,
+        flush_interval: float = OBS_FLUSH_INTERVAL_MS / 1000,
+        batch_size: int = OBS_BATCH_SIZE,
+    ):
+        self.capacity = max(1, capacity)
+        self.flush_interval = max(0.001, flush_interval)
+        self.batch_size = max(1, batch_size)
+        # deque.append / popleft 在 CPython 中是原子操作，发布端无需加锁
+        self._buffer: Deque[TraceEvent] = deque(maxlen=self.capacity)
+        self._published = itertools.count()
+        self._published_total = 0
+        self._consumed = 0
+        self._handlers: List[Tuple[Any, HandlerPolicy]] = []
+        self._export_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._counters = {
+            "exported": 0,
+            "sampled_out": 0,
+            "rate_limited": 0,
+            "handler_errors": 0,
+            "batches": 0,
+        }
+
+    def add_handler(self, handler: Any, policy: Optional[HandlerPolicy] = None):
+        self._handlers.append((handler, policy or HandlerPolicy()))
+
+    def publish(self, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+        # 只做浅拷贝：调用方之后往 messages 等列表追加内容时不影响已入队的事件
+        args = tuple(list(arg) if isinstance(arg, list) else arg for arg in args)
+        self._buffer.append(TraceEvent.capture(name, args, kwargs))
+        self._published_total = next(self._published) + 1
+        if self._thread is None:
+            self._start()
+
+    def flush(self) -> None:
+        """Export everything published so far on the calling thread."""
+        self._drain()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._drain()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        published = self._published_total
+        pending = len(self._buffer)
+        return {
+            "published": published,
+            "pending": pending,
+            "dropped_overflow": max(0, published - self._consumed - pending),
+            **self._counters,
+        }
+
+    def _start(self) -> None:
+        with self._export_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="sage-observability-exporter", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.flush_interval):
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._export_lock:
+            while True:
+                batch: List[TraceEvent] = []
+                try:
+                    while len(batch) < self.batch_size:
+                        batch.append(self._buffer.popleft())
+                except IndexError:
+                    pass
+                if not batch:
+                    return
+                self._consumed += len(batch)
+                self._export(batch)
+
+    def _export(self, batch: List[TraceEvent]) -> None:
+        self._counters["batches"] += 1
+        now = time.monotonic()
+        for handler, policy in self._handlers:
+            selected = []
+            for event in batch:
+                if not policy.samples(event.session_id):
+                    self._counters["sampled_out"] += 1
+                elif not policy.admit(now):
+                    self._counters["rate_limited"] += 1
+                else:
+                    selected.append(event)
+            if not selected:
+                continue
+            try:
+                handler.on_event_batch(selected)
+                self._counters["exported"] += len(selected)
+            except Exception as e:
+                self._counters["handler_errors"] += 1
+                logger.error(
+                    f"Error exporting trace batch to {handler.__class__.__name__}: {e}"
+                )
@@ -1,16 +1,41 @@
 import asyncio
-from typing import List, Any, Dict, Union
+from typing import List, Any, Dict, Optional, Tuple, Union
 from .base import BaseTraceHandler
+from .dispatcher import EventDispatcher, HandlerPolicy
 from sagents.utils.logger import logger
 
 
 class ObservabilityManager(BaseTraceHandler):
     """
     Manager that dispatches events to multiple trace handlers.
+
+    Handlers run inline unless they declare ``async_safe``; those receive their
+    events in batches from a background EventDispatcher, subject to the
+    optional per-handler HandlerPolicy (sampling and rate limit).
     """
 
-    def __init__(self, handlers: List[BaseTraceHandler] = []):
+    def __init__(
+        self,
+        handlers: List[BaseTraceHandler] = [],
+        policies: Optional[Dict[BaseTraceHandler, HandlerPolicy]] = None,
+        dispatcher: Optional[EventDispatcher] = None,
+    ):
         self.handlers = handlers
+        self.policies = dict(policies or {})
+        self.dispatcher = dispatcher
+        self._inline_handlers: List[BaseTraceHandler] = []
+        self._has_queued_handlers = False
+        for handler in handlers:
+            self._register(handler)
+
+    def _register(self, handler: BaseTraceHandler) -> None:
+        if not getattr(handler, "async_safe", False):
+            self._inline_handlers.append(handler)
+            return
+        if self.dispatcher is None:
+            self.dispatcher = EventDispatcher()
+        self.dispatcher.add_handler(handler, self.policies.get(handler))
+        self._has_queued_handlers = True
 
     def _log_handler_error(
         self, handler: BaseTraceHandler, event_name: str, error: Exception
@@ -33,48 +58,41 @@ class ObservabilityManager(BaseTraceHandler):
 
     def add_handler(self, handler: BaseTraceHandler):
         self.handlers.append(handler)
+        self._register(handler)
 
-    def on_chain_start(self, session_id: str, input_data: Any, **kwargs: Any) -> Any:
-        for handler in self.handlers:
+    def flush(self) -> None:
+        """Deliver every queued event now (tests, shutdown)."""
+        if self.dispatcher is not None:
+            self.dispatcher.flush()
+
+    def _dispatch(
+        self, event_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        for handler in self._inline_handlers:
             try:
-                handler.on_chain_start(session_id, input_data, **kwargs)
+                getattr(handler, event_name)(*args, **kwargs)
             except Exception as e:
-                self._log_handler_error(handler, "on_chain_start", e)
+                self._log_handler_error(handler, event_name, e)
+        if self._has_queued_handlers:
+            self.dispatcher.publish(event_name, args, kwargs)  # pyright: ignore[reportOptionalMemberAccess]
+
+    def on_chain_start(self, session_id: str, input_data: Any, **kwargs: Any) -> Any:
+        self._dispatch("on_chain_start", (session_id, input_data), kwargs)
 
     def on_chain_end(self, output_data: Any, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_chain_end(output_data, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_chain_end", e)
+        self._dispatch("on_chain_end", (output_data,), kwargs)
 
     def on_chain_error(self, error: Exception, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_chain_error(error, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_chain_error", e)
+        self._dispatch("on_chain_error", (error,), kwargs)
 
     def on_agent_start(self, session_id: str, agent_name: str, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_agent_start(session_id, agent_name, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_agent_start", e)
+        self._dispatch("on_agent_start", (session_id, agent_name), kwargs)
 
     def on_agent_end(self, output: Any, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_agent_end(output, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_agent_end", e)
+        self._dispatch("on_agent_end", (output,), kwargs)
 
     def on_agent_error(self, error: Exception, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_agent_error(error, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_agent_error", e)
+        self._dispatch("on_agent_error", (error,), kwargs)
 
     def on_llm_start(
         self,
@@ -84,27 +102,15 @@ class ObservabilityManager(BaseTraceHandler):
         step_name: str = None,  # pyright: ignore[reportArgumentType]
         **kwargs: Any,
     ) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_llm_start(
-                    session_id, model_name, messages, step_name, **kwargs
-                )
-            except Exception as e:
-                self._log_handler_error(handler, "on_llm_start", e)
+        self._dispatch(
+            "on_llm_start", (session_id, model_name, messages, step_name), kwargs
+        )
 
     def on_llm_end(self, response: Any, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_llm_end(response, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_llm_end", e)
+        self._dispatch("on_llm_end", (response,), kwargs)
 
     def on_llm_error(self, error: Exception, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_llm_error(error, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_llm_error", e)
+        self._dispatch("on_llm_error", (error,), kwargs)
 
     def on_tool_start(
         self,
@@ -113,36 +119,16 @@ class ObservabilityManager(BaseTraceHandler):
         tool_input: Union[str, Dict],
         **kwargs: Any,
     ) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_tool_start(session_id, tool_name, tool_input, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_tool_start", e)
+        self._dispatch("on_tool_start", (session_id, tool_name, tool_input), kwargs)
 
     def on_tool_end(self, tool_output: Any, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_tool_end(tool_output, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_tool_end", e)
+        self._dispatch("on_tool_end", (tool_output,), kwargs)
 
     def on_tool_error(self, error: Exception, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_tool_error(error, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_tool_error", e)
+        self._dispatch("on_tool_error", (error,), kwargs)
 
     def on_message_start(self, session_id: str, message_id: str, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_message_start(session_id, message_id, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_message_start", e)
+        self._dispatch("on_message_start", (session_id, message_id), kwargs)
 
     def on_message_end(self, session_id: str, message_id: str, **kwargs: Any) -> Any:
-        for handler in self.handlers:
-            try:
-                handler.on_message_end(session_id, message_id, **kwargs)
-            except Exception as e:
-                self._log_handler_error(handler, "on_message_end", e)
+        self._dispatch("on_message_end", (session_id, message_id), kwargs)
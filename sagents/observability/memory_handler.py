@@ -0,0 +1,97 @@
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from .base import BaseTraceHandler
+from .dispatcher import TraceEvent
+
+
+class InMemoryTraceHandler(BaseTraceHandler):
+    """
+    Handler that keeps every event in memory, for tests and local inspection.
+    Queued through the background dispatcher when attached to an ObservabilityManager.
+    """
+
+    async_safe = True
+
+    def __init__(self, max_events: Optional[int] = None):
+        self.max_events = max_events
+        self._events: List[TraceEvent] = []
+        self._lock = threading.Lock()
+
+    @property
+    def events(self) -> List[TraceEvent]:
+        with self._lock:
+            return list(self._events)
+
+    def names(self) -> List[str]:
+        return [event.name for event in self.events]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+    def on_event_batch(self, events: List[TraceEvent]) -> None:
+        with self._lock:
+            self._events.extend(events)
+            if self.max_events is not None and len(self._events) > self.max_events:
+                del self._events[: len(self._events) - self.max_events]
+
+    def _record(self, name: str, args: tuple, kwargs: Dict[str, Any]) -> None:
+        self.on_event_batch([TraceEvent.capture(name, args, kwargs)])
+
+    def on_chain_start(self, session_id: str, input_data: Any, **kwargs: Any) -> Any:
+        self._record("on_chain_start", (session_id, input_data), kwargs)
+
+    def on_chain_end(self, output_data: Any, **kwargs: Any) -> Any:
+        self._record("on_chain_end", (output_data,), kwargs)
+
+    def on_chain_error(self, error: Exception, **kwargs: Any) -> Any:
+        self._record("on_chain_error", (error,), kwargs)
+
+    def on_agent_start(self, session_id: str, agent_name: str, **kwargs: Any) -> Any:
+        self._record("on_agent_start", (session_id, agent_name), kwargs)
+
+    def on_agent_end(self, output: Any, **kwargs: Any) -> Any:
+        self._record("on_agent_end", (output,), kwargs)
+
+    def on_agent_error(self, error: Exception, **kwargs: Any) -> Any:
+        self._record("on_agent_error", (error,), kwargs)
+
+    def on_llm_start(
+        self,
+        session_id: str,
+        model_name: str,
+        messages: List[Any],
+        step_name: str = None,  # pyright: ignore[reportArgumentType]
+        **kwargs: Any,
+    ) -> Any:
+        self._record(
+            "on_llm_start", (session_id, model_name, messages, step_name), kwargs
+        )
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> Any:
+        self._record("on_llm_end", (response,), kwargs)
+
+    def on_llm_error(self, error: Exception, **kwargs: Any) -> Any:
+        self._record("on_llm_error", (error,), kwargs)
+
+    def on_tool_start(
+        self,
+        session_id: str,
+        tool_name: str,
+        tool_input: Union[str, Dict],
+        **kwargs: Any,
+    ) -> Any:
+        self._record("on_tool_start", (session_id, tool_name, tool_input), kwargs)
+
+    def on_tool_end(self, tool_output: Any, **kwargs: Any) -> Any:
+        self._record("on_tool_end", (tool_output,), kwargs)
+
+    def on_tool_error(self, error: Exception, **kwargs: Any) -> Any:
+        self._record("on_tool_error", (error,), kwargs)
+
+    def on_message_start(self, session_id: str, message_id: str, **kwargs: Any) -> Any:
+        self._record("on_message_start", (session_id, message_id), kwargs)
+
+    def on_message_end(self, session_id: str, message_id: str, **kwargs: Any) -> Any:
+        self._record("on_message_end", (session_id, message_id), kwargs)
@@ -0,0 +1,523 @@
+"""
+In-process metrics registry with per-thread sharded accumulation.
+
+Counters and histograms record into a shard owned by the calling thread, so the
+hot path never takes a lock; a scrape merges every shard, and shards of threads
+that have exited are folded into a retired shard so they do not pile up. Gauges
+hold absolute values and are updated under a single lock.
+
+Histograms use either fixed bucket bounds or native-style exponential buckets:
+with ``schema`` n, bucket i covers ``(base ** (i - 1), base ** i]`` where
+``base = 2 ** (2 ** -n)``. Exponential buckets are stored sparsely, and when a
+series holds more than ``max_buckets`` populated buckets the scrape halves the
+resolution (schema - 1) until it fits. Observations may carry an exemplar, such
+as a trace id, which the OpenMetrics encoder attaches to the matching bucket.
+"""
+
+import abc
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+LabelPairs = Tuple[Tuple[str, str], ...]
+
+
+class Exemplar(NamedTuple):
+    labels: Dict[str, str]
+    value: float
+    timestamp: float
+
+
+class Sample(NamedTuple):
+    name: str
+    labels: LabelPairs
+    value: float
+    exemplar: Optional[Exemplar] = None
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    documentation: str
+    type: str
+    # 惰性生成：编码时边生成边写出，抓取大量序列时不会堆积临时对象触发 GC
+    samples: Iterable[Sample]
+
+
+def _label_pairs(labelnames: Sequence[str], values: LabelValues) -> LabelPairs:
+    return tuple(zip(labelnames, values))
+
+
+def _latest(first: Optional[Exemplar], second: Optional[Exemplar]):
+    if first is None:
+        return second
+    if second is None:
+        return first
+    return second if second.timestamp >= first.timestamp else first
+
+
+class _Shard:
+    __slots__ = ("values", "exemplars")
+
+    def __init__(self):
+        self.values: Dict[LabelValues, Any] = {}
+        self.exemplars: Dict[LabelValues, Exemplar] = {}
+
+
+class _ShardedMetric(abc.ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, _Shard]] = []
+        self._retired = _Shard()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shards = []
+            self._retired = _Shard()
+            self._local = threading.local()
+
+    def _merged(self) -> _Shard:
+        merged = _Shard()
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # 线程已退出，分片不会再被写入，可以安全折叠
+                    self._merge_into(self._retired, shard)
+            self._shards = live
+            self._merge_into(merged, self._retired)
+            for _, shard in live:
+                self._merge_into(merged, shard)
+        return merged
+
+    @abc.abstractmethod
+    def _merge_into(self, target: _Shard, shard: _Shard) -> None: ...
+
+    @abc.abstractmethod
+    def collect(self) -> MetricFamily: ...
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter; ``inc`` writes only to the calling thread's shard."""
+
+    type = "counter"
+
+    def inc(
+        self,
+        label_values: LabelValues = (),
+        amount: float = 1.0,
+        exemplar: Optional[Dict[str, str]] = None,
+    ) -> None:
+        shard = self._shard()
+        values = shard.values
+        values[label_values] = values.get(label_values, 0.0) + amount
+        if exemplar:
+            shard.exemplars[label_values] = Exemplar(
+                dict(exemplar), amount, time.time()
+            )
+
+    def _merge_into(self, target: _Shard, shard: _Shard) -> None:
+        for key, value in list(shard.values.items()):
+            target.values[key] = target.values.get(key, 0.0) + value
+        for key, exemplar in list(shard.exemplars.items()):
+            target.exemplars[key] = _latest(target.exemplars.get(key), exemplar)
+
+    def get(self, label_values: LabelValues = ()) -> float:
+        return self._merged().values.get(label_values, 0.0)
+
+    def collect(self) -> MetricFamily:
+        merged = self._merged()
+        samples = (
+            Sample(
+                self.name,
+                _label_pairs(self.labelnames, key),
+                merged.values[key],
+                merged.exemplars.get(key),
+            )
+            for key in sorted(merged.values)
+        )
+        return MetricFamily(self.name, self.documentation, self.type, samples)
+
+
+class Gauge:
+    """Gauge holding absolute values; updates take one lock."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, label_values: LabelValues = (), value: float = 0.0) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, label_values: LabelValues = (), amount: float = 1.0) -> float:
+        with self._lock:
+            value = self._values.get(label_values, 0.0) + amount
+            self._values[label_values] = value
+            return value
+
+    def dec(
+        self,
+        label_values: LabelValues = (),
+        amount: float = 1.0,
+        floor: Optional[float] = None,
+        remove_at_floor: bool = False,
+    ) -> float:
+        with self._lock:
+            value = self._values.get(label_values, 0.0) - amount
+            if floor is not None and value <= floor:
+                value = floor
+                if remove_at_floor:
+                    self._values.pop(label_values, None)
+                    return value
+            self._values[label_values] = value
+            return value
+
+    def remove(self, label_values: LabelValues) -> None:
+        with self._lock:
+            self._values.pop(label_values, None)
+
+    def get(self, label_values: LabelValues = ()) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            values = dict(self._values)
+        samples = (
+            Sample(self.name, _label_pairs(self.labelnames, key), values[key])
+            for key in sorted(values)
+        )
+        return MetricFamily(self.name, self.documentation, self.type, samples)
+
+
+class _HistogramPoint:
+    __slots__ = ("counts", "zero", "sum", "count", "exemplars")
+
+    def __init__(self, counts):
+        # 固定桶为 list（最后一位是 +Inf），指数桶为 {index: count} 的稀疏 dict
+        self.counts = counts
+        self.zero = 0
+        self.sum = 0.0
+        self.count = 0
+        self.exemplars: Dict[Any, Exemplar] = {}
+
+
+class Histogram(_ShardedMetric):
+    """
+    Histogram with fixed ``buckets`` or, when ``schema`` is given, sparse
+    native-style exponential buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+        schema: Optional[int] = None,
+        zero_threshold: float = 0.0,
+        max_buckets: int = 160,
+    ):
+        super().__init__(name, documentation, labelnames)
+        if schema is not None and not -4 <= schema <= 8:
+            raise ValueError("schema must be between -4 and 8")
+        self.schema = schema
+        self.zero_threshold = zero_threshold
+        self.max_buckets = max(1, max_buckets)
+        self.buckets = tuple(
+            sorted(float(b) for b in (buckets or DEFAULT_BUCKETS) if b != math.inf)
+        )
+        self._bucket_labels = tuple(str(bound) for bound in self.buckets)
+        self._scale = (2**schema) / math.log(2) if schema is not None else 0.0
+
+    def _bucket_index(self, value: float) -> Optional[int]:
+        if self.schema is None:
+            return bisect.bisect_left(self.buckets, value)
+        if value <= self.zero_threshold:
+            return None
+        return math.ceil(math.log(value) * self._scale)
+
+    def observe(
+        self,
+        label_values: LabelValues = (),
+        value: float = 0.0,
+        exemplar: Optional[Dict[str, str]] = None,
+    ) -> None:
+        shard = self._shard()
+        point = shard.values.get(label_values)
+        if point is None:
+            point = _HistogramPoint(
+                [0] * (len(self.buckets) + 1) if self.schema is None else {}
+            )
+            shard.values[label_values] = point
+        index = self._bucket_index(value)
+        if index is None:
+            point.zero += 1
+        elif self.schema is None:
+            point.counts[index] += 1
+        else:
+            point.counts[index] = point.counts.get(index, 0) + 1
+        point.sum += value
+        point.count += 1
+        if exemplar:
+            point.exemplars[index] = Exemplar(dict(exemplar), value, time.time())
+
+    def _merge_into(self, target: _Shard, shard: _Shard) -> None:
+        for key, point in list(shard.values.items()):
+            merged = target.values.get(key)
+            if merged is None:
+                merged = _HistogramPoint(
+                    [0] * (len(self.buckets) + 1) if self.schema is None else {}
+                )
+                target.values[key] = merged
+            if self.schema is None:
+                for i, count in enumerate(list(point.counts)):
+                    merged.counts[i] += count
+            else:
+                for index, count in list(point.counts.items()):
+                    merged.counts[index] = merged.counts.get(index, 0) + count
+            merged.zero += point.zero
+            merged.sum += point.sum
+            merged.count += point.count
+            for index, exemplar in list(point.exemplars.items()):
+                merged.exemplars[index] = _latest(merged.exemplars.get(index), exemplar)
+
+    def _fit_schema(self, point: _HistogramPoint) -> int:
+        schema = self.schema
+        while len(point.counts) > self.max_buckets and schema > -4:
+            # 降一级精度：schema n 的桶 i 落在 schema n-1 的桶 ceil(i/2)
+            counts: Dict[int, int] = {}
+            for index, count in point.counts.items():
+                coarse = -((-index) // 2)
+                counts[coarse] = counts.get(coarse, 0) + count
+            exemplars: Dict[Any, Exemplar] = {}
+            for index, exemplar in point.exemplars.items():
+                coarse = None if index is None else -((-index) // 2)
+                exemplars[coarse] = _latest(exemplars.get(coarse), exemplar)
+            point.counts, point.exemplars = counts, exemplars
+            schema -= 1
+        return schema
+
+    def _bucket_samples(
+        self, labels: LabelPairs, point: _HistogramPoint
+    ) -> Iterator[Sample]:
+        name = f"{self.name}_bucket"
+        cumulative = 0
+        if self.schema is None:
+            for i, le in enumerate(self._bucket_labels):
+                cumulative += point.counts[i]
+                yield Sample(
+                    name, labels + (("le", le),), cumulative, point.exemplars.get(i)
+                )
+            inf_exemplar = point.exemplars.get(len(self.buckets))
+        else:
+            schema = self._fit_schema(point)
+            base = 2 ** (2**-schema)
+            if point.zero:
+                cumulative += point.zero
+                yield Sample(
+                    name,
+                    labels + (("le", str(float(self.zero_threshold))),),
+                    cumulative,
+                    point.exemplars.get(None),
+                )
+            for index in sorted(point.counts):
+                cumulative += point.counts[index]
+                yield Sample(
+                    name,
+                    labels + (("le", format(base**index, ".9g")),),
+                    cumulative,
+                    point.exemplars.get(index),
+                )
+            inf_exemplar = None
+        yield Sample(name, labels + (("le", "+Inf"),), point.count, inf_exemplar)
+
+    def _samples(self, merged: _Shard) -> Iterator[Sample]:
+        for key in sorted(merged.values):
+            point = merged.values[key]
+            labels = _label_pairs(self.labelnames, key)
+            yield from self._bucket_samples(labels, point)
+            yield Sample(f"{self.name}_sum", labels, point.sum)
+            yield Sample(f"{self.name}_count", labels, point.count)
+
+    def collect(self) -> MetricFamily:
+        samples = self._samples(self._merged())
+        return MetricFamily(self.name, self.documentation, self.type, samples)
+
+
+class MetricsRegistry:
+    """
+    Named metrics plus collector callbacks, collected in registration order.
+
+    Registering a name twice returns the existing metric, so modules that are
+    imported again (tests, reloads) keep accumulating into the same series.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(
+                        f"metric {name} already registered as {existing.type}"
+                    )
+                return existing
+            metric = cls(name, *args, **kwargs)
+            self._metrics[name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        **kwargs: Any,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, **kwargs)
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[MetricFamily]]
+    ) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        families: List[MetricFamily] = []
+        for collector in collectors:
+            families.extend(collector())
+        families.extend(metric.collect() for metric in metrics)
+        return families
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _render_labels(labels: LabelPairs) -> str:
+    # 同一组标签每次抓取都会重复出现，缓存渲染结果省掉转义与拼接
+    if not labels:
+        return ""
+    rendered = ",".join(
+        f'{key}="{_escape_label_value(str(val))}"' for key, val in labels
+    )
+    return f"{{{rendered}}}"
+
+
+def encode_prometheus_text(families: Iterable[MetricFamily]) -> str:
+    """Prometheus text format 0.0.4; exemplars are not part of it and are dropped."""
+    lines: List[str] = []
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.documentation}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for sample in family.samples:
+            lines.append(
+                f"{sample.name}{_render_labels(sample.labels)} {float(sample.value):.6f}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _openmetrics_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def encode_openmetrics(families: Iterable[MetricFamily]) -> str:
+    """OpenMetrics 1.0 text format, including exemplars."""
+    lines: List[str] = []
+    for family in families:
+        name = family.name
+        if family.type == "counter" and name.endswith("_total"):
+            name = name[: -len("_total")]
+        lines.append(f"# TYPE {name} {family.type}")
+        lines.append(f"# HELP {name} {family.documentation}")
+        for sample in family.samples:
+            sample_name = sample.name
+            if family.type == "counter" and not sample_name.endswith("_total"):
+                sample_name = f"{sample_name}_total"
+            line = (
+                f"{sample_name}{_render_labels(sample.labels)} "
+                f"{_openmetrics_value(sample.value)}"
+            )
+            exemplar = sample.exemplar
+            if exemplar is not None:
+                line += (
+                    f" # {_render_labels(tuple(exemplar.labels.items())) or '{}'} "
+                    f"{_openmetrics_value(exemplar.value)} {exemplar.timestamp:.3f}"
+                )
+            lines.append(line)
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
@@ -67,7 +67,15 @@ class OpenTelemetryTraceHandler(BaseTraceHandler):
             )
         return str(value)
 
+    @staticmethod
+    def _is_recording(span: Any) -> bool:
+        # 未配置 SDK 时 span 不记录属性，跳过消息/响应的序列化
+        is_recording = getattr(span, "is_recording", None)
+        return is_recording() if callable(is_recording) else True
+
     def _set_serialized_attribute(self, span: trace.Span, key: str, value: Any) -> None:
+        if not self._is_recording(span):
+            return
         try:
             span.set_attribute(key, self._serialize_attribute_value(value))
         except Exception as e:
@@ -286,12 +294,13 @@ class OpenTelemetryTraceHandler(BaseTraceHandler):
         llm_system = kwargs.get("llm_system", "openai")
         span.set_attribute("llm.system", llm_system)
         span.set_attribute("llm.model", model_name)
-        try:
-            messages_str = json.dumps(messages, ensure_ascii=False, default=str)
-            span.set_attribute("llm.messages", messages_str)
-        except Exception as e:
-            logger.error(f"Error setting llm.messages attribute: {e}")
-            pass
+        if self._is_recording(span):
+            try:
+                messages_str = json.dumps(messages, ensure_ascii=False, default=str)
+                span.set_attribute("llm.messages", messages_str)
+            except Exception as e:
+                logger.error(f"Error setting llm.messages attribute: {e}")
+                pass
         span.set_attribute("session_id", session_id)
         self._push_span(span)
 
@@ -300,29 +309,32 @@ class OpenTelemetryTraceHandler(BaseTraceHandler):
         if not span:
             return
 
-        try:
-            # Convert response to serializable dict if needed
-            if hasattr(response, "model_dump"):
-                # Pydantic v2 model
-                response_dict = response.model_dump()
-            elif hasattr(response, "dict"):
-                # Pydantic v1 model
-                response_dict = response.dict()
-            elif hasattr(response, "__dict__"):
-                # Regular object
-                response_dict = response.__dict__
-            else:
-                response_dict = str(response)
-
-            # Limit response size to avoid span attribute limits
-            response_str = json.dumps(response_dict, ensure_ascii=False, default=str)
-            if len(response_str) > 10000:
-                response_str = response_str[:10000] + "... [truncated]"
-
-            span.set_attribute("llm.response", response_str)
-        except Exception as e:
-            logger.error(f"Error setting llm.response attribute: {e}")
-            pass
+        if self._is_recording(span):
+            try:
+                # Convert response to serializable dict if needed
+                if hasattr(response, "model_dump"):
+                    # Pydantic v2 model
+                    response_dict = response.model_dump()
+                elif hasattr(response, "dict"):
+                    # Pydantic v1 model
+                    response_dict = response.dict()
+                elif hasattr(response, "__dict__"):
+                    # Regular object
+                    response_dict = response.__dict__
+                else:
+                    response_dict = str(response)
+
+                # Limit response size to avoid span attribute limits
+                response_str = json.dumps(
+                    response_dict, ensure_ascii=False, default=str
+                )
+                if len(response_str) > 10000:
+                    response_str = response_str[:10000] + "... [truncated]"
+
+                span.set_attribute("llm.response", response_str)
+            except Exception as e:
+                logger.error(f"Error setting llm.response attribute: {e}")
+                pass
 
         span.set_status(Status(StatusCode.OK))
         try:
@@ -360,30 +372,32 @@ class OpenTelemetryTraceHandler(BaseTraceHandler):
         server_name = kwargs.get("server_name")
         if server_name:
             span.set_attribute("mcp.server_name", str(server_name))
-        try:
-            if isinstance(tool_input, (dict, list)):
-                input_str = json.dumps(tool_input, ensure_ascii=False)
-            else:
-                input_str = str(tool_input)
-            span.set_attribute("tool.input", input_str)
-        except Exception as e:
-            logger.error(f"Error setting tool input attribute: {e}")
-            pass
+        if self._is_recording(span):
+            try:
+                if isinstance(tool_input, (dict, list)):
+                    input_str = json.dumps(tool_input, ensure_ascii=False)
+                else:
+                    input_str = str(tool_input)
+                span.set_attribute("tool.input", input_str)
+            except Exception as e:
+                logger.error(f"Error setting tool input attribute: {e}")
+                pass
         self._push_span(span)
 
     def on_tool_end(self, tool_output: Any, **kwargs: Any) -> Any:
         span = self._get_current_span()
         if not span:
             return
-        try:
-            if isinstance(tool_output, (dict, list)):
-                output_str = json.dumps(tool_output, ensure_ascii=False)
-            else:
-                output_str = str(tool_output)
-            span.set_attribute("tool.output", str(output_str))
-        except Exception as e:
-            logger.error(f"Error setting tool output attribute: {e}")
-            pass
+        if self._is_recording(span):
+            try:
+                if isinstance(tool_output, (dict, list)):
+                    output_str = json.dumps(tool_output, ensure_ascii=False)
+                else:
+                    output_str = str(tool_output)
+                span.set_attribute("tool.output", str(output_str))
+            except Exception as e:
+                logger.error(f"Error setting tool output attribute: {e}")
+                pass
         span.set_status(Status(StatusCode.OK))
         self._pop_span()
 
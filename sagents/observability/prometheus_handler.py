@@ -1,11 +1,11 @@
 import contextvars
+import functools
 import hashlib
-import threading
 import time
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from .base import BaseTraceHandler
+from .metrics_registry import REGISTRY, encode_prometheus_text
 
 
 _DURATION_BUCKETS = (
@@ -30,46 +30,89 @@ _OP_STACK: contextvars.ContextVar[tuple[tuple[str, str, str, float], ...]] = (
     )
 )
 
-
-@dataclass
-class _PrometheusTraceState:
-    lock: threading.Lock = field(default_factory=threading.Lock)
-    agent_starts_total: dict[str, int] = field(default_factory=dict)
-    agent_total: dict[tuple[str, str], int] = field(default_factory=dict)
-    agent_active: dict[tuple[str, str], int] = field(default_factory=dict)
-    agent_duration_sum: dict[tuple[str, str], float] = field(default_factory=dict)
-    agent_duration_count: dict[tuple[str, str], int] = field(default_factory=dict)
-    agent_duration_buckets: dict[tuple[str, str, float], int] = field(
-        default_factory=dict
-    )
-    first_token_duration_sum: dict[tuple[str, str], float] = field(default_factory=dict)
-    first_token_duration_count: dict[tuple[str, str], int] = field(default_factory=dict)
-    first_token_duration_buckets: dict[tuple[str, str, float], int] = field(
-        default_factory=dict
-    )
-    tool_total: dict[tuple[str, str], int] = field(default_factory=dict)
-    tool_duration_sum: dict[str, float] = field(default_factory=dict)
-    tool_duration_count: dict[str, int] = field(default_factory=dict)
-    tool_duration_buckets: dict[tuple[str, float], int] = field(default_factory=dict)
-    tool_failures: dict[tuple[str, str, str, str], int] = field(default_factory=dict)
-
-
-_STATE = _PrometheusTraceState()
+_AGENT_STARTS = REGISTRY.counter(
+    "sagents_agent_starts_total",
+    "Total SAgents agent run starts by agent_id.",
+    ("agent_id",),
+)
+_AGENT_RUNS = REGISTRY.counter(
+    "sagents_agent_runs_total",
+    "Total SAgents agent runs by agent_id and status.",
+    ("agent_id", "status"),
+)
+_AGENT_DURATION = REGISTRY.histogram(
+    "sagents_agent_run_duration_seconds",
+    "SAgents agent run duration in seconds.",
+    ("agent_id", "status"),
+    buckets=_DURATION_BUCKETS,
+)
+_AGENT_ACTIVE = REGISTRY.gauge(
+    "sagents_agent_runs_active",
+    "SAgents agent runs currently in progress.",
+    ("agent_id", "session_id"),
+)
+_FIRST_TOKEN = REGISTRY.histogram(
+    "sagents_first_token_seconds",
+    "SAgents time from run_stream start to first visible assistant/tool content.",
+    ("agent_id", "session_id"),
+    buckets=_DURATION_BUCKETS,
+)
+_TOOL_CALLS = REGISTRY.counter(
+    "sagents_tool_calls_total",
+    "Total SAgents tool calls by tool_name and status.",
+    ("tool_name", "status"),
+)
+_TOOL_DURATION = REGISTRY.histogram(
+    "sagents_tool_call_duration_seconds",
+    "SAgents tool call duration in seconds.",
+    ("tool_name",),
+    buckets=_DURATION_BUCKETS,
+)
+_TOOL_FAILURES = REGISTRY.counter(
+    "sagents_tool_call_failures_total",
+    "SAgents tool call failures with session_id for drilldown.",
+    ("tool_name", "session_id", "trace_id", "error_type"),
+)
+_LLM_CALLS = REGISTRY.counter(
+    "sagents_llm_calls_total",
+    "Total SAgents LLM calls by model and status.",
+    ("model", "status"),
+)
+_LLM_TTFT = REGISTRY.histogram(
+    "sagents_llm_time_to_first_token_seconds",
+    "SAgents time from LLM request to the first streamed content chunk.",
+    ("model",),
+    schema=3,
+)
+_LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "sagents_llm_output_tokens_per_second",
+    "SAgents LLM output tokens per second after the first token.",
+    ("model",),
+    schema=3,
+)
+_TRACE_METRICS = (
+    _AGENT_STARTS,
+    _AGENT_RUNS,
+    _AGENT_DURATION,
+    _AGENT_ACTIVE,
+    _FIRST_TOKEN,
+    _TOOL_CALLS,
+    _TOOL_DURATION,
+    _TOOL_FAILURES,
+    _LLM_CALLS,
+    _LLM_TTFT,
+    _LLM_TOKENS_PER_SECOND,
+)
 
 
+@functools.lru_cache(maxsize=4096)
 def build_session_trace_id(session_id: str) -> str:
+    # 与 OpenTelemetry handler 按 session_id 生成的 trace_id 一致，可直接跳转 Jaeger
     return hashlib.md5(str(session_id or "unknown").encode("utf-8")).hexdigest()
 
 
-def _escape_label_value(value: str) -> str:
-    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
-
-
-def _labeled_metric_line(name: str, labels: dict[str, str], value: int | float) -> str:
-    rendered_labels = ",".join(
-        f'{key}="{_escape_label_value(val)}"' for key, val in labels.items()
-    )
-    return f"{name}{{{rendered_labels}}} {float(value):.6f}"
+def _trace_exemplar(session_id: str) -> Dict[str, str]:
+    return {"trace_id": build_session_trace_id(session_id)}
 
 
 def _normalize_label_value(value: Any, fallback: str = "unknown") -> str:
@@ -102,107 +145,100 @@ def _pop_operation(kind: str) -> tuple[str, str, float] | None:
 
 
 def _record_agent(agent_id: str, status: str) -> None:
-    normalized_agent_id = _normalize_label_value(agent_id)
-    normalized_status = _normalize_label_value(status)
-    key = (normalized_agent_id, normalized_status)
-    with _STATE.lock:
-        _STATE.agent_total[key] = _STATE.agent_total.get(key, 0) + 1
+    _AGENT_RUNS.inc((_normalize_label_value(agent_id), _normalize_label_value(status)))
 
 
 def _record_agent_start(agent_id: str) -> None:
-    normalized_agent_id = _normalize_label_value(agent_id)
-    with _STATE.lock:
-        _STATE.agent_starts_total[normalized_agent_id] = (
-            _STATE.agent_starts_total.get(normalized_agent_id, 0) + 1
-        )
+    _AGENT_STARTS.inc((_normalize_label_value(agent_id),))
 
 
 def _increment_agent_active(agent_id: str, session_id: str) -> None:
     key = (_normalize_label_value(agent_id), _normalize_label_value(session_id))
-    with _STATE.lock:
-        _STATE.agent_active[key] = _STATE.agent_active.get(key, 0) + 1
+    _AGENT_ACTIVE.inc(key)
 
 
 def _decrement_agent_active(agent_id: str, session_id: str) -> None:
     key = (_normalize_label_value(agent_id), _normalize_label_value(session_id))
-    with _STATE.lock:
-        active = _STATE.agent_active.get(key, 0)
-        if active <= 1:
-            _STATE.agent_active.pop(key, None)
-        else:
-            _STATE.agent_active[key] = active - 1
+    _AGENT_ACTIVE.dec(key, floor=0, remove_at_floor=True)
 
 
 def _record_agent_duration(agent_id: str, status: str, duration_seconds: float) -> None:
-    normalized_agent_id = _normalize_label_value(agent_id)
-    normalized_status = _normalize_label_value(status)
-    key = (normalized_agent_id, normalized_status)
-    duration = max(float(duration_seconds or 0.0), 0.0)
-    with _STATE.lock:
-        _STATE.agent_duration_sum[key] = (
-            _STATE.agent_duration_sum.get(key, 0.0) + duration
-        )
-        _STATE.agent_duration_count[key] = _STATE.agent_duration_count.get(key, 0) + 1
-        for bucket in _DURATION_BUCKETS:
-            if duration <= bucket:
-                bucket_key = (normalized_agent_id, normalized_status, bucket)
-                _STATE.agent_duration_buckets[bucket_key] = (
-                    _STATE.agent_duration_buckets.get(bucket_key, 0) + 1
-                )
+    key = (_normalize_label_value(agent_id), _normalize_label_value(status))
+    _AGENT_DURATION.observe(key, max(float(duration_seconds or 0.0), 0.0))
 
 
 def record_agent_first_token(
     agent_id: str, session_id: str, duration_seconds: float
 ) -> None:
-    normalized_agent_id = _normalize_label_value(agent_id)
     normalized_session_id = _normalize_label_value(session_id)
-    key = (normalized_agent_id, normalized_session_id)
-    duration = max(float(duration_seconds or 0.0), 0.0)
-    with _STATE.lock:
-        _STATE.first_token_duration_sum[key] = (
-            _STATE.first_token_duration_sum.get(key, 0.0) + duration
-        )
-        _STATE.first_token_duration_count[key] = (
-            _STATE.first_token_duration_count.get(key, 0) + 1
-        )
-        for bucket in _DURATION_BUCKETS:
-            if duration <= bucket:
-                bucket_key = (normalized_agent_id, normalized_session_id, bucket)
-                _STATE.first_token_duration_buckets[bucket_key] = (
-                    _STATE.first_token_duration_buckets.get(bucket_key, 0) + 1
-                )
+    _FIRST_TOKEN.observe(
+        (_normalize_label_value(agent_id), normalized_session_id),
+        max(float(duration_seconds or 0.0), 0.0),
+        exemplar=_trace_exemplar(normalized_session_id),
+    )
 
 
-def _record_tool(tool_name: str, status: str, duration: float) -> None:
+def _record_tool(
+    tool_name: str, status: str, duration: float, session_id: str = ""
+) -> None:
     normalized_tool_name = _normalize_label_value(tool_name)
-    normalized_status = _normalize_label_value(status)
-    with _STATE.lock:
-        total_key = (normalized_tool_name, normalized_status)
-        _STATE.tool_total[total_key] = _STATE.tool_total.get(total_key, 0) + 1
-        _STATE.tool_duration_sum[normalized_tool_name] = (
-            _STATE.tool_duration_sum.get(normalized_tool_name, 0.0) + duration
-        )
-        _STATE.tool_duration_count[normalized_tool_name] = (
-            _STATE.tool_duration_count.get(normalized_tool_name, 0) + 1
-        )
-        for bucket in _DURATION_BUCKETS:
-            if duration <= bucket:
-                bucket_key = (normalized_tool_name, bucket)
-                _STATE.tool_duration_buckets[bucket_key] = (
-                    _STATE.tool_duration_buckets.get(bucket_key, 0) + 1
-                )
+    _TOOL_CALLS.inc((normalized_tool_name, _normalize_label_value(status)))
+    _TOOL_DURATION.observe(
+        (normalized_tool_name,),
+        duration,
+        exemplar=_trace_exemplar(session_id) if session_id else None,
+    )
 
 
 def _record_tool_failure(tool_name: str, session_id: str, error: Exception) -> None:
     normalized_session_id = _normalize_label_value(session_id)
-    key = (
-        _normalize_label_value(tool_name),
-        normalized_session_id,
-        build_session_trace_id(normalized_session_id),
-        error.__class__.__name__ or "Error",
+    _TOOL_FAILURES.inc(
+        (
+            _normalize_label_value(tool_name),
+            normalized_session_id,
+            build_session_trace_id(normalized_session_id),
+            error.__class__.__name__ or "Error",
+        )
     )
-    with _STATE.lock:
-        _STATE.tool_failures[key] = _STATE.tool_failures.get(key, 0) + 1
+
+
+def _usage_output_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        tokens = usage.get("completion_tokens")
+    else:
+        tokens = getattr(usage, "completion_tokens", None)
+    return tokens if isinstance(tokens, int) else None
+
+
+def _record_llm(
+    model: str,
+    session_id: str,
+    started_at: float,
+    response: Any,
+    first_token_at: Optional[float],
+    output_tokens: Optional[int],
+) -> None:
+    now = time.perf_counter()
+    _LLM_CALLS.inc((model, "success"))
+    exemplar = _trace_exemplar(session_id)
+    # 非流式调用在拿到完整响应时才算首 token；解码速度也只能按整段耗时估算
+    streamed = first_token_at is not None
+    generation_started = first_token_at if streamed else started_at
+    _LLM_TTFT.observe(
+        (model,), max((first_token_at if streamed else now) - started_at, 0.0), exemplar
+    )
+    if output_tokens is None:
+        output_tokens = _usage_output_tokens(response)
+    generation_seconds = now - generation_started
+    if output_tokens and generation_seconds > 0:
+        _LLM_TOKENS_PER_SECOND.observe(
+            (model,), output_tokens / generation_seconds, exemplar
+        )
 
 
 def _agent_status(output: Any) -> str:
@@ -215,242 +251,13 @@ def _agent_status(output: Any) -> str:
 
 
 def reset_prometheus_trace_metrics() -> None:
-    with _STATE.lock:
-        _STATE.agent_starts_total.clear()
-        _STATE.agent_total.clear()
-        _STATE.agent_active.clear()
-        _STATE.agent_duration_sum.clear()
-        _STATE.agent_duration_count.clear()
-        _STATE.agent_duration_buckets.clear()
-        _STATE.first_token_duration_sum.clear()
-        _STATE.first_token_duration_count.clear()
-        _STATE.first_token_duration_buckets.clear()
-        _STATE.tool_total.clear()
-        _STATE.tool_duration_sum.clear()
-        _STATE.tool_duration_count.clear()
-        _STATE.tool_duration_buckets.clear()
-        _STATE.tool_failures.clear()
+    for metric in _TRACE_METRICS:
+        metric.clear()
     _OP_STACK.set(())
 
 
 def render_prometheus_trace_metrics() -> str:
-    with _STATE.lock:
-        agent_starts_total = dict(_STATE.agent_starts_total)
-        agent_total = dict(_STATE.agent_total)
-        agent_active = dict(_STATE.agent_active)
-        agent_duration_sum = dict(_STATE.agent_duration_sum)
-        agent_duration_count = dict(_STATE.agent_duration_count)
-        agent_duration_buckets = dict(_STATE.agent_duration_buckets)
-        first_token_duration_sum = dict(_STATE.first_token_duration_sum)
-        first_token_duration_count = dict(_STATE.first_token_duration_count)
-        first_token_duration_buckets = dict(_STATE.first_token_duration_buckets)
-        tool_total = dict(_STATE.tool_total)
-        tool_duration_sum = dict(_STATE.tool_duration_sum)
-        tool_duration_count = dict(_STATE.tool_duration_count)
-        tool_duration_buckets = dict(_STATE.tool_duration_buckets)
-        tool_failures = dict(_STATE.tool_failures)
-
-    lines = [
-        "# HELP sagents_agent_starts_total Total SAgents agent run starts by agent_id.",
-        "# TYPE sagents_agent_starts_total counter",
-    ]
-    for agent_id in sorted(agent_starts_total):
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_starts_total",
-                {"agent_id": agent_id},
-                agent_starts_total[agent_id],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_agent_runs_total Total SAgents agent runs by agent_id and status.",
-            "# TYPE sagents_agent_runs_total counter",
-        ]
-    )
-    for agent_id, status in sorted(agent_total):
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_runs_total",
-                {"agent_id": agent_id, "status": status},
-                agent_total[(agent_id, status)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_agent_run_duration_seconds SAgents agent run duration in seconds.",
-            "# TYPE sagents_agent_run_duration_seconds histogram",
-        ]
-    )
-    for agent_id, status in sorted(set(agent_duration_count) | set(agent_duration_sum)):
-        cumulative = 0
-        for bucket in _DURATION_BUCKETS:
-            cumulative = agent_duration_buckets.get(
-                (agent_id, status, bucket), cumulative
-            )
-            lines.append(
-                _labeled_metric_line(
-                    "sagents_agent_run_duration_seconds_bucket",
-                    {"agent_id": agent_id, "status": status, "le": str(bucket)},
-                    cumulative,
-                )
-            )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_run_duration_seconds_bucket",
-                {"agent_id": agent_id, "status": status, "le": "+Inf"},
-                agent_duration_count.get((agent_id, status), 0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_run_duration_seconds_sum",
-                {"agent_id": agent_id, "status": status},
-                agent_duration_sum.get((agent_id, status), 0.0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_run_duration_seconds_count",
-                {"agent_id": agent_id, "status": status},
-                agent_duration_count.get((agent_id, status), 0),
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_agent_runs_active SAgents agent runs currently in progress.",
-            "# TYPE sagents_agent_runs_active gauge",
-        ]
-    )
-    for agent_id, session_id in sorted(agent_active):
-        lines.append(
-            _labeled_metric_line(
-                "sagents_agent_runs_active",
-                {"agent_id": agent_id, "session_id": session_id},
-                agent_active[(agent_id, session_id)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_first_token_seconds SAgents time from run_stream start to first visible assistant/tool content.",
-            "# TYPE sagents_first_token_seconds histogram",
-        ]
-    )
-    for agent_id, session_id in sorted(
-        set(first_token_duration_count) | set(first_token_duration_sum)
-    ):
-        cumulative = 0
-        for bucket in _DURATION_BUCKETS:
-            cumulative = first_token_duration_buckets.get(
-                (agent_id, session_id, bucket), cumulative
-            )
-            lines.append(
-                _labeled_metric_line(
-                    "sagents_first_token_seconds_bucket",
-                    {"agent_id": agent_id, "session_id": session_id, "le": str(bucket)},
-                    cumulative,
-                )
-            )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_first_token_seconds_bucket",
-                {"agent_id": agent_id, "session_id": session_id, "le": "+Inf"},
-                first_token_duration_count.get((agent_id, session_id), 0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_first_token_seconds_sum",
-                {"agent_id": agent_id, "session_id": session_id},
-                first_token_duration_sum.get((agent_id, session_id), 0.0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_first_token_seconds_count",
-                {"agent_id": agent_id, "session_id": session_id},
-                first_token_duration_count.get((agent_id, session_id), 0),
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_tool_calls_total Total SAgents tool calls by tool_name and status.",
-            "# TYPE sagents_tool_calls_total counter",
-        ]
-    )
-    for tool_name, status in sorted(tool_total):
-        lines.append(
-            _labeled_metric_line(
-                "sagents_tool_calls_total",
-                {"tool_name": tool_name, "status": status},
-                tool_total[(tool_name, status)],
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_tool_call_duration_seconds SAgents tool call duration in seconds.",
-            "# TYPE sagents_tool_call_duration_seconds histogram",
-        ]
-    )
-    for tool_name in sorted(set(tool_duration_count) | set(tool_duration_sum)):
-        cumulative = 0
-        for bucket in _DURATION_BUCKETS:
-            cumulative = tool_duration_buckets.get((tool_name, bucket), cumulative)
-            lines.append(
-                _labeled_metric_line(
-                    "sagents_tool_call_duration_seconds_bucket",
-                    {"tool_name": tool_name, "le": str(bucket)},
-                    cumulative,
-                )
-            )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_tool_call_duration_seconds_bucket",
-                {"tool_name": tool_name, "le": "+Inf"},
-                tool_duration_count.get(tool_name, 0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_tool_call_duration_seconds_sum",
-                {"tool_name": tool_name},
-                tool_duration_sum.get(tool_name, 0.0),
-            )
-        )
-        lines.append(
-            _labeled_metric_line(
-                "sagents_tool_call_duration_seconds_count",
-                {"tool_name": tool_name},
-                tool_duration_count.get(tool_name, 0),
-            )
-        )
-
-    lines.extend(
-        [
-            "# HELP sagents_tool_call_failures_total SAgents tool call failures with session_id for drilldown.",
-            "# TYPE sagents_tool_call_failures_total counter",
-        ]
-    )
-    for tool_name, session_id, trace_id, error_type in sorted(tool_failures):
-        lines.append(
-            _labeled_metric_line(
-                "sagents_tool_call_failures_total",
-                {
-                    "tool_name": tool_name,
-                    "session_id": session_id,
-                    "trace_id": trace_id,
-                    "error_type": error_type,
-                },
-                tool_failures[(tool_name, session_id, trace_id, error_type)],
-            )
-        )
-    return "\n".join(lines) + "\n"
+    return encode_prometheus_text(metric.collect() for metric in _TRACE_METRICS)
 
 
 class PrometheusTraceHandler(BaseTraceHandler):
@@ -499,13 +306,26 @@ class PrometheusTraceHandler(BaseTraceHandler):
         step_name: str = None,  # pyright: ignore[reportArgumentType]
         **kwargs: Any,
     ) -> Any:
-        return None
+        _push_operation("llm", _normalize_label_value(model_name), session_id)
 
     def on_llm_end(self, response: Any, **kwargs: Any) -> Any:
-        return None
+        current = _pop_operation("llm")
+        if not current:
+            return
+        model, session_id, started_at = current
+        _record_llm(
+            model,
+            session_id,
+            started_at,
+            response,
+            kwargs.get("first_token_at"),
+            kwargs.get("output_tokens"),
+        )
 
     def on_llm_error(self, error: Exception, **kwargs: Any) -> Any:
-        return None
+        current = _pop_operation("llm")
+        if current:
+            _LLM_CALLS.inc((current[0], "error"))
 
     def on_tool_start(
         self,
@@ -520,15 +340,22 @@ class PrometheusTraceHandler(BaseTraceHandler):
         current = _pop_operation("tool")
         if not current:
             return
-        tool_name, _, started_at = current
-        _record_tool(tool_name, "success", max(time.perf_counter() - started_at, 0.0))
+        tool_name, session_id, started_at = current
+        _record_tool(
+            tool_name,
+            "success",
+            max(time.perf_counter() - started_at, 0.0),
+            session_id,
+        )
 
     def on_tool_error(self, error: Exception, **kwargs: Any) -> Any:
         current = _pop_operation("tool")
         if not current:
             return
         tool_name, session_id, started_at = current
-        _record_tool(tool_name, "error", max(time.perf_counter() - started_at, 0.0))
+        _record_tool(
+            tool_name, "error", max(time.perf_counter() - started_at, 0.0), session_id
+        )
         _record_tool_failure(tool_name, session_id, error)
 
     def on_message_start(self, session_id: str, message_id: str, **kwargs: Any) -> Any:
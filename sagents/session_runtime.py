@@ -7,8 +7,10 @@ import time
 import traceback
 import uuid
 import contextvars
+from collections import OrderedDict
+from copy import deepcopy
 from contextlib import contextmanager
-from typing import Any, AsyncGenerator, Dict, List, Optional, Set, Union, Type
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set, Tuple, Union, Type
 
 from sagents.agent import (
     AgentBase,
@@ -43,6 +45,7 @@ from sagents.skill import SkillManager, SkillProxy
 from sagents.tool import ToolManager, ToolProxy
 from sagents.utils.lock_manager import lock_manager, safe_release
 from sagents.utils.logger import logger
+from sagents.utils.phase_timer import finish_turn, start_turn
 from sagents.flow.schema import AgentFlow
 from sagents.flow.executor import FlowExecutor
 from sagents.utils.sandbox.config import VolumeMount
@@ -62,6 +65,8 @@ _session_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
 _SESSION_SHELL_CLEANUP_TIMEOUT_SECONDS = 6.0
 _SESSION_LOG_FLUSH_TIMEOUT_SECONDS = 6.0
 _SYNC_SESSION_CLOSE_WAIT_TIMEOUT_SECONDS = 13.0
+# 缓存最近恢复的非活跃会话消息数，避免翻页时反复解析 messages.json
+_RESTORED_MESSAGES_CACHE_SIZE = 8
 
 
 def _consume_cleanup_task_result(task: asyncio.Task) -> None:
@@ -1051,6 +1056,8 @@ class Session:
         self, **kwargs
     ) -> AsyncGenerator[List[MessageChunk], None]:
         session_id = kwargs.get("session_id")
+        # 阶段计时未开启时 turn_timer 为 None，后续记录都是空操作
+        turn_timer = start_turn(session_id)
         try:
             # 尝试获取 flow 参数，如果存在则调用 run_stream_with_flow
             if "flow" in kwargs and kwargs["flow"] is not None:
@@ -1084,79 +1091,96 @@ class Session:
                 ]
         finally:
             session_context = self.session_context
-            if self.observability_manager and session_context:
-                try:
-                    timing_summary = session_context._build_execution_timing_summary()
-                    for item in timing_summary.get("message_timings", []):
-                        message_id = item.get("message_id")
-                        if not message_id:
-                            continue
-                        role = item.get("role")
-                        if role not in {"assistant", "tool"}:
-                            continue
-                        self.observability_manager.on_message_end(
-                            session_id=session_id,  # pyright: ignore[reportArgumentType]
-                            message_id=message_id,
-                            role=role,
-                            message_type=item.get("message_type"),
-                            tool_call_id=item.get("tool_call_id"),
-                            end_ts=item.get("end_ts"),
-                            duration_ms=item.get("duration_ms"),
+            request_status = "error"
+            turn_request_id = None
+            token_usage_chunks: List[MessageChunk] = []
+            try:
+                if self.observability_manager and session_context:
+                    try:
+                        timing_summary = (
+                            session_context._build_execution_timing_summary()
                         )
-                except Exception as e:
-                    logger.debug(f"SAgent: 发送 message_end 观测事件失败: {e}")
-
-            if self.observability_manager:
-                self.observability_manager.on_chain_end(
-                    output_data={"status": "finished"},
-                    session_id=session_id,
-                    final_system_context=getattr(
-                        session_context, "system_context", None
-                    ),
-                )
-            self._cache_session_workspace(session_id, session_context)
-
-            # 顺序原则：先做"必须落盘"的副作用（end_request / save / 资源清理），
-            # 再尝试把 token_usage 作为最后一条 chunk 推给消费者。
-            # 因为 yield 在 finally 里如果遇到 GeneratorExit（消费者断开 / 取消）会
-            # 抛 BaseException，必须用 try/except BaseException 兜住，否则
-            # 后续清理会被跳过；同时保证就算推送失败，统计文件也已经落地。
-            if session_context:
-                try:
-                    if self.status == SessionStatus.ERROR:
-                        request_status = "error"
-                    elif self.status == SessionStatus.INTERRUPTED:
-                        request_status = "interrupted"
-                    else:
-                        request_status = "completed"
-                    await asyncio.to_thread(
-                        session_context.end_request, status=request_status
+                        for item in timing_summary.get("message_timings", []):
+                            message_id = item.get("message_id")
+                            if not message_id:
+                                continue
+                            role = item.get("role")
+                            if role not in {"assistant", "tool"}:
+                                continue
+                            self.observability_manager.on_message_end(
+                                session_id=session_id,  # pyright: ignore[reportArgumentType]
+                                message_id=message_id,
+                                role=role,
+                                message_type=item.get("message_type"),
+                                tool_call_id=item.get("tool_call_id"),
+                                end_ts=item.get("end_ts"),
+                                duration_ms=item.get("duration_ms"),
+                            )
+                    except Exception as e:
+                        logger.debug(f"SAgent: 发送 message_end 观测事件失败: {e}")
+
+                if self.observability_manager:
+                    self.observability_manager.on_chain_end(
+                        output_data={"status": "finished"},
+                        session_id=session_id,
+                        final_system_context=getattr(
+                            session_context, "system_context", None
+                        ),
                     )
-                except Exception as exc:
-                    logger.warning(f"SAgent: 关闭 per-request tokens 统计失败: {exc}")
+                self._cache_session_workspace(session_id, session_context)
+
+                # 顺序原则：先做"必须落盘"的副作用（end_request / save / 资源清理），
+                # 再尝试把 token_usage 作为最后一条 chunk 推给消费者。
+                # 因为 yield 在 finally 里如果遇到 GeneratorExit（消费者断开 / 取消）会
+                # 抛 BaseException，必须用 try/except BaseException 兜住，否则
+                # 后续清理会被跳过；同时保证就算推送失败，统计文件也已经落地。
+                if self.status == SessionStatus.ERROR:
+                    request_status = "error"
+                elif self.status == SessionStatus.INTERRUPTED:
+                    request_status = "interrupted"
+                else:
+                    request_status = "completed"
+                turn_request_id = (
+                    session_context.current_request_id() if session_context else None
+                )
+                if session_context:
+                    try:
+                        await asyncio.to_thread(
+                            session_context.end_request, status=request_status
+                        )
+                    except Exception as exc:
+                        logger.warning(
+                            f"SAgent: 关闭 per-request tokens 统计失败: {exc}"
+                        )
 
-            token_usage_chunks: List[MessageChunk] = []
-            if session_context:
-                try:
-                    token_usage_chunks = await self._emit_token_usage_if_any(
-                        session_context,
-                        session_id,  # pyright: ignore[reportArgumentType]
-                    )
-                except Exception as e:
-                    logger.error(f"SAgent: 计算 token usage 失败: {e}")
+                if session_context:
+                    try:
+                        token_usage_chunks = await self._emit_token_usage_if_any(
+                            session_context,
+                            session_id,  # pyright: ignore[reportArgumentType]
+                        )
+                    except Exception as e:
+                        logger.error(f"SAgent: 计算 token usage 失败: {e}")
 
-            if session_context:
-                try:
-                    logger.debug("SAgent: 会话状态保存")
-                    await asyncio.to_thread(
-                        session_context.save,
-                        session_status=self.status,
-                        child_session_ids=list(self.child_session_ids),
-                        interrupt_reason=self.interrupt_reason,
-                    )
-                except Exception as e:
-                    logger.error(f"SAgent: 会话状态保存时出错: {e}")
-            await self._cleanup_session_resources(session_id)  # pyright: ignore[reportArgumentType]
+                if session_context:
+                    try:
+                        logger.debug("SAgent: 会话状态保存")
+                        await asyncio.to_thread(
+                            session_context.save,
+                            session_status=self.status,
+                            child_session_ids=list(self.child_session_ids),
+                            interrupt_reason=self.interrupt_reason,
+                        )
+                    except Exception as e:
+                        logger.error(f"SAgent: 会话状态保存时出错: {e}")
+                await self._cleanup_session_resources(session_id)  # pyright: ignore[reportArgumentType]
+            finally:
+                # 前面任何清理抛错都必须结束计时，否则 profiler 占用永远不会释放
+                turn_record = finish_turn(
+                    turn_timer, request_id=turn_request_id, status=request_status
+                )
+            if turn_record is not None and session_context:
+                await asyncio.to_thread(session_context.record_turn_timing, turn_record)
 
             # 真正向消费者推送 token_usage 放在最后；任何 yield 异常（含
             # GeneratorExit）都不得影响前面的清理，因此放在所有清理之后。
@@ -1375,6 +1399,11 @@ class SessionManager:
         self._session_close_lock = threading.RLock()
         self._session_close_futures: Dict[str, concurrent.futures.Future[None]] = {}
         self._shutdown = False
+        # 已从存储恢复的非活跃会话消息：session_id -> (ledger 版本, 消息列表)
+        self._restored_messages: "OrderedDict[str, Tuple[Any, List[MessageChunk]]]" = (
+            OrderedDict()
+        )
+        self._restored_messages_lock = threading.Lock()
         self.storage = create_session_store(
             storage_config,
             session_root=self.session_root_space,
@@ -1788,6 +1817,18 @@ class SessionManager:
             logger.warning(f"SessionManager: 无法找到会话 {session_id} 的路径")
             return []
 
+        try:
+            version = self.storage.message_ledger_version(session_id)
+        except Exception:
+            version = None
+        if version is not None:
+            with self._restored_messages_lock:
+                cached = self._restored_messages.get(session_id)
+                if cached is not None and cached[0] == version:
+                    self._restored_messages.move_to_end(session_id)
+                    # 调用方可能修改返回的消息，缓存快照只交出副本
+                    return deepcopy(cached[1])
+
         try:
             ledger = self.storage.load_message_ledger(session_id)
             raw_messages = ledger.messages
@@ -1817,6 +1858,14 @@ class SessionManager:
                     logger.warning(f"SessionManager: 解析消息失败: {e}")
             elif isinstance(msg, MessageChunk):
                 messages.append(msg)
+        if version is not None:
+            # 翻页会反复读取同一个已结束会话，按 ledger 版本复用解码结果
+            with self._restored_messages_lock:
+                self._restored_messages[session_id] = (version, messages)
+                self._restored_messages.move_to_end(session_id)
+                while len(self._restored_messages) > _RESTORED_MESSAGES_CACHE_SIZE:
+                    self._restored_messages.popitem(last=False)
+            return deepcopy(messages)
         return messages
 
     def get_tasks_status(self, session_id: str) -> Optional[Dict[str, Any]]:
@@ -1855,82 +1904,187 @@ class SessionManager:
             return False
 
 
-def build_conversation_messages_view(session_id: str) -> Dict[str, Any]:
-    """从 sagents 会话中构造统一的对话消息视图。"""
-    session_manager = get_global_session_manager()
-    if not session_manager:
-        logger.error("会话管理器未初始化")
-        return {"conversation_id": session_id, "messages": []}
+_DELEGATE_TOOL_NAMES = frozenset({"sys_delegate_task", "sys_team_delegate_task"})
 
-    raw_messages = list(session_manager.get_session_messages(session_id))
-    messages: List[Dict[str, Any]] = []
-    seen_message_keys = set()
+# 摘要投影下工具输出保留的最大字符数
+CONVERSATION_SUMMARY_TOOL_CHARS = 2000
 
-    def is_hidden_context_message(message_dict: Dict[str, Any]) -> bool:
-        return not is_message_client_visible(message_dict)
 
-    def append_message(message_dict: Dict[str, Any]):
-        if is_hidden_context_message(message_dict):
+def _iter_delegated_session_ids(message: MessageChunk) -> List[str]:
+    """解析委派类工具调用中引用的子会话 ID。"""
+    session_ids: List[str] = []
+    for tool_call in message.tool_calls or []:
+        function = tool_call.get("function") or {}
+        if function.get("name") not in _DELEGATE_TOOL_NAMES:
+            continue
+        arguments = function.get("arguments")
+        args = json.loads(arguments) if isinstance(arguments, str) else arguments
+        tasks = args.get("tasks", []) if isinstance(args, dict) else []
+        if not isinstance(tasks, list):
+            continue
+        for task in tasks:
+            if isinstance(task, dict) and task.get("session_id"):
+                session_ids.append(task["session_id"])
+    return session_ids
+
+
+def _collect_conversation_view_chunks(
+    session_manager: "SessionManager", session_id: str
+) -> List[MessageChunk]:
+    """按展示顺序收集客户端可见的消息（含内联的子会话消息），按 message_id 去重。
+
+    只做可见性判断与去重，不做序列化；分页时只有当前页会被转换为 dict。
+    MessageChunk 总会生成 message_id，因此去重键无需再序列化消息内容。
+    """
+    chunks: List[MessageChunk] = []
+    seen_message_ids: Set[str] = set()
+
+    def append_message(message: MessageChunk):
+        if not is_message_client_visible(message):
             return
-        message_key = message_dict.get("message_id") or (
-            message_dict.get("role"),
-            message_dict.get("tool_call_id"),
-            json.dumps(
-                message_dict.get("tool_calls", []), ensure_ascii=False, sort_keys=True
-            ),
-            json.dumps(message_dict.get("content"), ensure_ascii=False, sort_keys=True),
-            message_dict.get("timestamp"),
-        )
-        if message_key in seen_message_keys:
+        if message.message_id in seen_message_ids:
             return
-        seen_message_keys.add(message_key)
-        messages.append(message_dict)
+        seen_message_ids.add(message.message_id)
+        chunks.append(message)
 
-    for message in raw_messages:
-        result = message.to_dict()
-        append_message(result)
+    for message in session_manager.get_session_messages(session_id):
+        append_message(message)
 
-        if result.get("role") != "assistant" or not result.get("tool_calls"):
+        if message.role != MessageRole.ASSISTANT.value or not message.tool_calls:
             continue
 
-        for tool_call in result["tool_calls"]:
-            if tool_call.get("function", {}).get("name") not in {
-                "sys_delegate_task",
-                "sys_team_delegate_task",
-            }:
+        try:
+            sub_session_ids = _iter_delegated_session_ids(message)
+        except Exception as e:
+            logger.warning(f"处理子任务消息失败: {e}")
+            continue
+        for sub_session_id in sub_session_ids:
+            if sub_session_id == session_id:
+                logger.warning(
+                    f"build_conversation_messages_view: 跳过与当前会话相同的子会话引用 session_id={session_id}"
+                )
                 continue
-
             try:
-                arguments = tool_call["function"]["arguments"]
-                args = (
-                    json.loads(arguments) if isinstance(arguments, str) else arguments
-                )
-                tasks = args.get("tasks", [])
-                if not isinstance(tasks, list):
-                    continue
-
-                for task in tasks:
-                    if not isinstance(task, dict):
-                        continue
-                    sub_session_id = task.get("session_id")
-                    if not sub_session_id:
-                        continue
-                    if sub_session_id == session_id:
-                        logger.warning(
-                            f"build_conversation_messages_view: 跳过与当前会话相同的子会话引用 session_id={session_id}"
-                        )
-                        continue
-                    for sub_msg in session_manager.get_session_messages(sub_session_id):
-                        append_message(sub_msg.to_dict())
+                for sub_msg in session_manager.get_session_messages(sub_session_id):
+                    append_message(sub_msg)
             except Exception as e:
                 logger.warning(f"处理子任务消息失败: {e}")
 
+    return chunks
+
+
+def summarize_conversation_message(
+    message: Dict[str, Any], max_chars: int = CONVERSATION_SUMMARY_TOOL_CHARS
+) -> Dict[str, Any]:
+    """摘要投影：截断过长的工具输出，保留原始长度供客户端按需拉取全文。"""
+    content = message.get("content")
+    if message.get("role") != MessageRole.TOOL.value or not isinstance(content, str):
+        return message
+    if len(content) <= max_chars:
+        return message
+    summary = dict(message)
+    summary["content"] = content[:max_chars]
+    summary["content_truncated"] = True
+    summary["content_length"] = len(content)
+    return summary
+
+
+def build_conversation_messages_view(session_id: str) -> Dict[str, Any]:
+    """从 sagents 会话中构造统一的对话消息视图。"""
+    session_manager = get_global_session_manager()
+    if not session_manager:
+        logger.error("会话管理器未初始化")
+        return {"conversation_id": session_id, "messages": []}
+
+    chunks = _collect_conversation_view_chunks(session_manager, session_id)
     return {
         "conversation_id": session_id,
-        "messages": messages,
+        "messages": [chunk.to_dict() for chunk in chunks],
     }
 
 
+def build_conversation_messages_page(
+    session_id: str,
+    *,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 50,
+    message_types: Optional[Set[str]] = None,
+    summary: bool = False,
+) -> Dict[str, Any]:
+    """按 message_id 游标分页读取对话消息视图。
+
+    - 不传游标时返回最新的 ``limit`` 条；``before`` 向更早方向翻页，``after``
+      向更新方向翻页（用于追加新消息）。
+    - 游标是消息在视图中的位置，消息被原地更新时位置不变，追加消息不会让已
+      取得的游标失效。
+    - ``message_types`` 在服务端按 ``type`` 过滤，游标本身不受过滤影响。
+    - 游标对应的消息不存在时抛出 ``KeyError``。
+    """
+    if before is not None and after is not None:
+        raise ValueError("before 与 after 不能同时使用")
+    limit = max(1, int(limit))
+    page: Dict[str, Any] = {
+        "conversation_id": session_id,
+        "messages": [],
+        "has_more_before": False,
+        "has_more_after": False,
+        "before_cursor": None,
+        "after_cursor": None,
+    }
+    session_manager = get_global_session_manager()
+    if not session_manager:
+        logger.error("会话管理器未初始化")
+        return page
+
+    chunks = _collect_conversation_view_chunks(session_manager, session_id)
+
+    def matches(chunk: MessageChunk) -> bool:
+        return not message_types or chunk.type in message_types
+
+    def find(cursor: str) -> int:
+        for index in range(len(chunks) - 1, -1, -1):
+            if chunks[index].message_id == cursor:
+                return index
+        raise KeyError(cursor)
+
+    selected: List[MessageChunk] = []
+    if after is not None:
+        start = find(after) + 1
+        index = start
+        while index < len(chunks) and len(selected) <= limit:
+            if matches(chunks[index]):
+                selected.append(chunks[index])
+            index += 1
+        page["has_more_after"] = len(selected) > limit
+        page["has_more_before"] = any(matches(chunk) for chunk in chunks[:start])
+        selected = selected[:limit]
+    else:
+        end = find(before) if before is not None else len(chunks)
+        index = end - 1
+        while index >= 0 and len(selected) <= limit:
+            if matches(chunks[index]):
+                selected.append(chunks[index])
+            index -= 1
+        page["has_more_before"] = len(selected) > limit
+        page["has_more_after"] = any(matches(chunk) for chunk in chunks[end:])
+        selected = selected[:limit]
+        selected.reverse()
+
+    messages = [chunk.to_dict() for chunk in selected]
+    if summary:
+        messages = [summarize_conversation_message(message) for message in messages]
+    page["messages"] = messages
+    if messages:
+        page["before_cursor"] = messages[0]["message_id"]
+        page["after_cursor"] = messages[-1]["message_id"]
+    else:
+        # 空页沿用请求中的游标，客户端可继续轮询新消息
+        page["before_cursor"] = before
+        page["after_cursor"] = after
+    return page
+
+
 # 全局 SessionManager 实例
 _global_session_manager: Optional[SessionManager] = None
 
@@ -0,0 +1,302 @@
+"""
+SkillCatalog (技能目录缓存)
+
+Process-wide cache of skill metadata shared by every SkillManager instance.
+(进程内共享的技能元数据缓存，所有 SkillManager 实例共用。)
+
+- SKILL.md content and parsed front-matter, keyed by the file's
+  (size, mtime_ns, inode). (SKILL.md 内容与解析后的 front-matter，按文件 stat 签名缓存)
+- Per-file MD5, recomputed only when the stat signature changes.
+  (逐文件 MD5，stat 签名变化时才重新计算)
+- The rendered file tree, reused while every directory mtime is unchanged.
+  (文件树，所有目录 mtime 不变时复用)
+
+Each cache holds a bounded number of entries and evicts the least recently used.
+(每类缓存有条目上限，超出后按最近最少使用淘汰。)
+
+Entries whose mtime is within the last second are never cached, so an in-place
+edit that keeps the size and lands in the same timestamp tick is still seen.
+(mtime 距今不足 1 秒的条目不缓存，避免同一时间戳内的同尺寸修改被漏掉。)
+
+An optional watchdog observer can push change notifications for incremental
+refresh; without it every lookup still validates against ``stat``.
+(可选的 watchdog 监听用于增量刷新；未启用时每次查询仍通过 stat 校验。)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from sagents.utils.logger import logger
+from sagents.utils.stat_cache import (
+    Signature,
+    dirs_unchanged,
+    is_racy,
+    lru_put,
+    md5_file,
+    stat_signature,
+)
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - watchdog is optional
+    FileSystemEventHandler = object
+    Observer = None
+
+
+SKILL_FILE_NAME = "SKILL.md"
+IGNORED_DIR_NAMES = ("__pycache__", "node_modules")
+
+# 各缓存的条目上限，超出后按最近最少使用淘汰
+SKILL_MD_CACHE_SIZE = 4096
+SKILL_HASH_CACHE_SIZE = 100000
+SKILL_TREE_CACHE_SIZE = 4096
+
+
+def parse_front_matter(content: str) -> Dict[str, Any]:
+    """
+    Parse the YAML front-matter of a SKILL.md document.
+    解析 SKILL.md 的 YAML front-matter，没有或不是映射时返回空字典。
+    """
+    if content.startswith("---"):
+        parts = content.split("---", 2)
+        if len(parts) >= 3:
+            metadata = yaml.safe_load(parts[1])
+            if isinstance(metadata, dict):
+                return metadata
+    return {}
+
+
+class _SkillDirHandler(FileSystemEventHandler):
+    def __init__(self, catalog: "SkillCatalog", root: str):
+        self.catalog = catalog
+        self.root = root
+
+    def on_any_event(self, event):
+        if event.is_directory and event.event_type == "modified":
+            return
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if path:
+                self.catalog._notify(self.root, os.fsdecode(path))
+
+
+class SkillCatalog:
+    """
+    Stat-validated cache of skill files.
+    基于 stat 校验的技能文件缓存。
+    """
+
+    def __init__(
+        self,
+        *,
+        skill_md_cache_size: int = SKILL_MD_CACHE_SIZE,
+        hash_cache_size: int = SKILL_HASH_CACHE_SIZE,
+        tree_cache_size: int = SKILL_TREE_CACHE_SIZE,
+    ):
+        self._lock = threading.Lock()
+        self._skill_md: OrderedDict[str, Tuple[Signature, str, Dict[str, Any]]] = (
+            OrderedDict()
+        )
+        self._hashes: OrderedDict[str, Tuple[Signature, str]] = OrderedDict()
+        self._trees: OrderedDict[str, Tuple[List[Tuple[str, int]], str]] = OrderedDict()
+        self.skill_md_cache_size = skill_md_cache_size
+        self.hash_cache_size = hash_cache_size
+        self.tree_cache_size = tree_cache_size
+        self._observers: Dict[str, Any] = {}
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self.stats = {
+            "metadata_hits": 0,
+            "metadata_misses": 0,
+            "hash_hits": 0,
+            "hash_misses": 0,
+            "tree_hits": 0,
+            "tree_misses": 0,
+        }
+
+    def read_skill_md(self, skill_path: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Return (SKILL.md content, front-matter), or None if there is no SKILL.md.
+        返回 SKILL.md 内容与 front-matter；不存在时返回 None。
+        """
+        md_path = os.path.join(os.path.abspath(skill_path), SKILL_FILE_NAME)
+        try:
+            signature = stat_signature(os.stat(md_path))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        with self._lock:
+            cached = self._skill_md.get(md_path)
+            if cached is not None and cached[0] == signature:
+                self.stats["metadata_hits"] += 1
+                self._skill_md.move_to_end(md_path)
+                return cached[1], dict(cached[2])
+            self.stats["metadata_misses"] += 1
+
+        with open(md_path, "r", encoding="utf-8") as f:
+            content = f.read()
+        metadata = parse_front_matter(content)
+        if not is_racy(signature[1]):
+            with self._lock:
+                lru_put(
+                    self._skill_md,
+                    md_path,
+                    (signature, content, metadata),
+                    self.skill_md_cache_size,
+                )
+        return content, dict(metadata)
+
+    def file_hashes(self, skill_path: str) -> Dict[str, str]:
+        """
+        MD5 of every file in the skill, keyed by relative path.
+        Hidden entries, __pycache__ and node_modules are skipped; files are only
+        re-read when their stat signature changed.
+        (技能内每个文件的 MD5，跳过隐藏文件与缓存目录；stat 签名未变的文件不重新读取。)
+        """
+        skill_path = os.path.abspath(skill_path)
+        hashes: Dict[str, str] = {}
+        for root, dirs, files in os.walk(skill_path):
+            dirs[:] = [
+                d for d in dirs if not d.startswith(".") and d not in IGNORED_DIR_NAMES
+            ]
+            relative = os.path.relpath(root, skill_path)
+            prefix = "" if relative == "." else relative + os.sep
+            for file in files:
+                if file.startswith("."):
+                    continue
+                file_path = os.path.join(root, file)
+                try:
+                    digest = self._file_hash(file_path)
+                except OSError as e:
+                    logger.warning(f"SkillCatalog: 计算文件哈希失败 {file_path}: {e}")
+                    continue
+                hashes[prefix + file] = digest
+        return hashes
+
+    def _file_hash(self, file_path: str) -> str:
+        signature = stat_signature(os.stat(file_path))
+        with self._lock:
+            cached = self._hashes.get(file_path)
+            if cached is not None and cached[0] == signature:
+                self.stats["hash_hits"] += 1
+                self._hashes.move_to_end(file_path)
+                return cached[1]
+            self.stats["hash_misses"] += 1
+        digest = md5_file(file_path)
+        after = stat_signature(os.stat(file_path))
+        if after == signature and not is_racy(signature[1]):
+            with self._lock:
+                lru_put(
+                    self._hashes, file_path, (signature, digest), self.hash_cache_size
+                )
+        return digest
+
+    def file_tree(self, skill_path: str, build: Callable[[], str]) -> str:
+        """
+        Return the skill's file tree, calling ``build`` only when a directory changed.
+        返回技能文件树；只有目录发生增删改名时才调用 ``build`` 重新生成。
+        """
+        skill_path = os.path.abspath(skill_path)
+        with self._lock:
+            cached = self._trees.get(skill_path)
+        if cached is not None and dirs_unchanged(cached[0]):
+            with self._lock:
+                self.stats["tree_hits"] += 1
+                if skill_path in self._trees:
+                    self._trees.move_to_end(skill_path)
+            return cached[1]
+
+        dir_mtimes: List[Tuple[str, int]] = []
+        for root, dirs, _ in os.walk(skill_path):
+            dirs[:] = [
+                d for d in dirs if not d.startswith(".") and d not in IGNORED_DIR_NAMES
+            ]
+            try:
+                dir_mtimes.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                continue
+        tree = build()
+        with self._lock:
+            self.stats["tree_misses"] += 1
+            if not any(is_racy(mtime_ns) for _, mtime_ns in dir_mtimes):
+                lru_put(
+                    self._trees, skill_path, (dir_mtimes, tree), self.tree_cache_size
+                )
+        return tree
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """
+        Drop cached entries under ``path`` (all entries when omitted).
+        清除 ``path`` 下的缓存条目（不传则全部清除）。
+        """
+        with self._lock:
+            if path is None:
+                self._skill_md.clear()
+                self._hashes.clear()
+                self._trees.clear()
+                return
+            path = os.path.abspath(path)
+            prefix = path + os.sep
+            for cache in (self._skill_md, self._hashes, self._trees):
+                for key in [k for k in cache if k == path or k.startswith(prefix)]:
+                    del cache[key]
+
+    def watch(self, root: str, listener: Callable[[str], None]) -> bool:
+        """
+        Watch a skill root and call ``listener(skill_path)`` when a skill changes.
+        Returns False when watchdog is not installed.
+        (监听技能根目录，技能变化时回调 ``listener(skill_path)``；未安装 watchdog 时返回 False。)
+        """
+        if Observer is None:
+            logger.info("SkillCatalog: watchdog 未安装，跳过技能目录监听")
+            return False
+        root = os.path.abspath(root)
+        with self._lock:
+            self._listeners.setdefault(root, []).append(listener)
+            if root in self._observers:
+                return True
+            observer = Observer()
+            observer.daemon = True
+            self._observers[root] = observer
+        observer.schedule(_SkillDirHandler(self, root), root, recursive=True)
+        observer.start()
+        logger.info(f"SkillCatalog: 开始监听技能目录 {root}")
+        return True
+
+    def unwatch(self, root: str, listener: Callable[[str], None]) -> None:
+        root = os.path.abspath(root)
+        with self._lock:
+            listeners = self._listeners.get(root, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if listeners:
+                return
+            self._listeners.pop(root, None)
+            observer = self._observers.pop(root, None)
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=5)
+
+    def _notify(self, root: str, path: str) -> None:
+        relative = os.path.relpath(path, root)
+        name = relative.split(os.sep, 1)[0]
+        if relative.startswith("..") or name in (".", "") or name.startswith("."):
+            return
+        skill_path = os.path.join(root, name)
+        self.invalidate(skill_path)
+        with self._lock:
+            listeners = list(self._listeners.get(root, []))
+        for listener in listeners:
+            try:
+                listener(skill_path)
+            except Exception as e:
+                logger.error(f"SkillCatalog: 技能变更回调失败 {skill_path}: {e}")
+
+
+_SKILL_CATALOG = SkillCatalog()
+
+
+def get_skill_catalog() -> SkillCatalog:
+    return _SKILL_CATALOG
@@ -1,9 +1,10 @@
 from typing import Any, Dict, List, Optional
+import asyncio
 import os
-import yaml
 import shutil
 
 from sagents.utils.logger import logger
+from sagents.skill.skill_catalog import get_skill_catalog
 from sagents.skill.skill_schema import SkillSchema
 
 
@@ -15,6 +16,9 @@ def get_skill_manager() -> Optional["SkillManager"]:
 
 
 def set_skill_manager(tm: Optional["SkillManager"]) -> None:
+    previous = SkillManager._instance
+    if previous is not None and previous is not tm:
+        previous.stop_watching()
     SkillManager._instance = tm
 
 
@@ -63,6 +67,79 @@ class SkillManager:
             # Invalidate cache when adding new directory (添加新目录时使缓存失效)
             self._skills_cache_valid = False
             self.reload()
+            if self._watched_dirs:
+                self._watch_dir(path)
+
+    def watch(self) -> bool:
+        """
+        Watch all skill directories and refresh changed skills incrementally.
+        Requires the optional ``watchdog`` package; returns False without it.
+        (监听所有技能目录，技能变化时增量刷新；需要可选依赖 watchdog，缺失时返回 False。)
+        """
+        # Change events arrive on the watchdog thread; skill updates are handed to this loop
+        # (变更事件来自 watchdog 线程，技能表的修改交回到当前事件循环执行)
+        try:
+            self._watch_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._watch_loop = None
+        watching = False
+        for path in self.skill_dirs:
+            watching = self._watch_dir(path) or watching
+        return watching
+
+    def _watch_dir(self, path: str) -> bool:
+        if path in self._watched_dirs or not os.path.isdir(path):
+            return path in self._watched_dirs
+        if not get_skill_catalog().watch(path, self._on_skill_changed):
+            return False
+        self._watched_dirs.append(path)
+        return True
+
+    def stop_watching(self) -> None:
+        """
+        Stop watching skill directories (停止监听技能目录).
+        """
+        catalog = get_skill_catalog()
+        for path in getattr(self, "_watched_dirs", []):
+            catalog.unwatch(path, self._on_skill_changed)
+        self._watched_dirs = []
+
+    def _on_skill_changed(self, skill_path: str) -> None:
+        """
+        Reload one skill after a change notification (收到变更通知后只刷新这一个技能).
+        Runs on the watchdog thread: the skill is parsed here and ``self.skills`` is
+        only updated on the event loop that started watching.
+        (在 watchdog 线程上执行：这里只解析技能，技能表在启动监听的事件循环上更新。)
+        """
+        schema = self._read_skill(skill_path) if os.path.isdir(skill_path) else None
+        loop = getattr(self, "_watch_loop", None)
+        if loop is None:
+            self._apply_skill_change(skill_path, schema)
+            return
+        try:
+            loop.call_soon_threadsafe(self._apply_skill_change, skill_path, schema)
+        except RuntimeError:
+            # Loop already closed during shutdown (关闭过程中事件循环已结束)
+            pass
+
+    def _apply_skill_change(
+        self, skill_path: str, schema: Optional[SkillSchema]
+    ) -> None:
+        if schema is None and os.path.exists(os.path.join(skill_path, "SKILL.md")):
+            # SKILL.md is mid-write or unparsable; keep the old version until the next event
+            # (SKILL.md 写入中途或暂时无法解析，保留旧版本等待下一次事件)
+            return
+        previous = [
+            name
+            for name, skill in self.skills.items()
+            if os.path.abspath(skill.path) == os.path.abspath(skill_path)
+        ]
+        name = schema.name if schema is not None else None
+        if schema is not None:
+            self.skills[schema.name] = schema
+        for old_name in previous:
+            if old_name != name:
+                self.skills.pop(old_name, None)
 
     def _initialize(self, skill_dirs: List[str] = None):  # pyright: ignore[reportArgumentType]
         self.skills: Dict[str, SkillSchema] = {}
@@ -74,6 +151,9 @@ class SkillManager:
         self.skill_dirs = list(dict.fromkeys(dirs))
         # Flag to track if skills cache is valid (标志：跟踪技能缓存是否有效)
         self._skills_cache_valid = False
+        # Watched skill roots (已监听的技能根目录)
+        self._watched_dirs: List[str] = []
+        self._watch_loop: Optional[asyncio.AbstractEventLoop] = None
         self._load_skills_from_workspace()
 
     @classmethod
@@ -311,46 +391,52 @@ class SkillManager:
         Load a skill from a directory on the HOST.
         Returns skill name if successful, None otherwise.
         """
-        skill_md_path = os.path.join(skill_path, "SKILL.md")
-        if os.path.exists(skill_md_path):
-            try:
-                with open(skill_md_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                # Parse frontmatter
-                metadata = {}
-                if content.startswith("---"):
-                    parts = content.split("---", 2)
-                    if len(parts) >= 3:
-                        yaml_content = parts[1]
-                        metadata = yaml.safe_load(yaml_content)
-
-                # Validation for Claude Code Skills format
-                # Must have name, description
-                if not self._validate_skill_metadata(metadata, skill_path):
-                    return None
-                name = metadata.get("name")
-                description = metadata.get("description", "")
-
-                if name:
-                    if skip_if_loaded and name in self.skills:
-                        return name
-
-                    # Generate compact file tree with skill name as root
-                    file_list = f"{name}/\n" + self._generate_file_list(
-                        skill_path, skill_path, name
-                    )
-                    schema = SkillSchema(
-                        name=name,
-                        description=description,
-                        path=skill_path,
-                        instructions=content,
-                        file_list=file_list,
-                    )
-                    self.skills[name] = schema
-                    return name
-            except Exception as e:
-                logger.error(f"Failed to load skill from {skill_path}: {e}")
+        schema = self._read_skill(skill_path, self.skills if skip_if_loaded else None)
+        if schema is None:
+            return None
+        self.skills[schema.name] = schema
+        return schema.name
+
+    def _read_skill(
+        self, skill_path: str, known: Optional[Dict[str, SkillSchema]] = None
+    ) -> Optional[SkillSchema]:
+        """
+        Parse a skill directory without registering it; a name already in ``known``
+        returns that schema instead of rebuilding it.
+        (解析技能目录但不注册；名称已在 ``known`` 中时直接返回已有的技能。)
+        """
+        catalog = get_skill_catalog()
+        try:
+            loaded = catalog.read_skill_md(skill_path)
+            if loaded is None:
+                return None
+            content, metadata = loaded
+
+            # Validation for Claude Code Skills format
+            # Must have name, description
+            if not self._validate_skill_metadata(metadata, skill_path):
+                return None
+            name = metadata.get("name")
+            description = metadata.get("description", "")
+
+            if name:
+                if known is not None and name in known:
+                    return known[name]
+
+                # Generate compact file tree with skill name as root
+                file_list = f"{name}/\n" + catalog.file_tree(
+                    skill_path,
+                    lambda: self._generate_file_list(skill_path, skill_path, name),
+                )
+                return SkillSchema(
+                    name=name,
+                    description=description,
+                    path=skill_path,
+                    instructions=content,
+                    file_list=file_list,
+                )
+        except Exception as e:
+            logger.error(f"Failed to load skill from {skill_path}: {e}")
         return None
 
     def register_new_skill(self, skill_dir_name: str) -> Optional[str]:
@@ -8,7 +8,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Iterable, Mapping, Optional, Sequence
+from typing import Any, Hashable, Iterable, Mapping, Optional, Sequence, TextIO
 
 
 class StorageError(RuntimeError):
@@ -114,6 +114,14 @@ class SessionStore(ABC):
     @abstractmethod
     def load_message_ledger(self, session_id: str) -> MessageLedger: ...
 
+    def message_ledger_version(self, session_id: str) -> Optional[Hashable]:
+        """Cheap token that changes whenever the session's message ledger does.
+
+        Readers use it to reuse a previously decoded ledger. Backends that
+        cannot provide one return ``None`` and callers always reload.
+        """
+        return None
+
     @abstractmethod
     def append_message_event(
         self, session_id: str, event: Mapping[str, Any]
@@ -149,6 +157,14 @@ class SessionStore(ABC):
         """Append already formatted diagnostic text for one session."""
         ...
 
+    def open_session_log(self, session_id: str) -> Optional[TextIO]:
+        """Return an append-mode text stream for batched log writers.
+
+        Backends without a streamable log return None; callers then fall back
+        to ``append_session_log`` with the whole batch.
+        """
+        return None
+
     @abstractmethod
     def read_session_log_tail(self, session_id: str, *, max_bytes: int) -> str:
         """Return up to the most recent ``max_bytes`` of diagnostic text."""
@@ -170,6 +186,21 @@ class SessionStore(ABC):
         self, session_id: str, request_id: str, payload: Mapping[str, Any]
     ) -> str: ...
 
+    def append_turn_timing(
+        self, session_id: str, record: Mapping[str, Any]
+    ) -> Optional[str]:
+        """Append one per-turn phase timing record.
+
+        Optional: backends without a home for it keep this no-op default.
+        """
+        return None
+
+    def load_turn_timings(
+        self, session_id: str, *, limit: int = 50
+    ) -> Sequence[Mapping[str, Any]]:
+        """Return the most recent turn timing records, newest first."""
+        return []
+
     @abstractmethod
     def purge_llm_requests(self, *, before: float) -> Mapping[str, int]: ...
 
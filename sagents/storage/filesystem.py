@@ -20,6 +20,7 @@ from sagents.storage.base import MessageLedger, SessionStore, StorageError
 MESSAGE_SNAPSHOT_FILE = "messages.json"
 MESSAGE_JOURNAL_FILE = "messages.journal.jsonl"
 SESSION_SNAPSHOT_FILE = "session_context.json"
+TURN_TIMINGS_FILE = "turn_timings.jsonl"
 
 
 class _FilesystemSessionStore(SessionStore):
@@ -256,6 +257,20 @@ class _FilesystemSessionStore(SessionStore):
                     count += 1
         return MessageLedger(messages, max_sequence, count)
 
+    def message_ledger_version(self, session_id):
+        workspace = self._workspace(session_id)
+        version = []
+        for filename in (MESSAGE_SNAPSHOT_FILE, MESSAGE_JOURNAL_FILE):
+            try:
+                stat = os.stat(os.path.join(workspace, filename))
+            except OSError:
+                version.append(None)
+                continue
+            version.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+        if version == [None, None]:
+            return None
+        return (workspace, *version)
+
     def append_message_event(self, session_id, event):
         path = os.path.join(self._workspace(session_id), MESSAGE_JOURNAL_FILE)
         os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -322,6 +337,11 @@ class _FilesystemSessionStore(SessionStore):
             stream.write(text)
         return path
 
+    def open_session_log(self, session_id: str):
+        path = os.path.join(self._workspace(session_id), f"session_{session_id}.log")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, "a", encoding="utf-8")
+
     def read_session_log_tail(self, session_id: str, *, max_bytes: int) -> str:
         if max_bytes <= 0:
             return ""
@@ -380,6 +400,32 @@ class _FilesystemSessionStore(SessionStore):
             indent=2,
         )
 
+    def append_turn_timing(self, session_id, record):
+        path = os.path.join(self._workspace(session_id), TURN_TIMINGS_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as stream:
+            stream.write(json.dumps(dict(record), ensure_ascii=False) + "\n")
+        return path
+
+    def load_turn_timings(self, session_id, *, limit=50):
+        path = os.path.join(self._workspace(session_id), TURN_TIMINGS_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as stream:
+                lines = stream.read().splitlines()
+        except FileNotFoundError:
+            return []
+        records = []
+        for line in reversed(lines):
+            if len(records) >= limit:
+                break
+            try:
+                value = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                records.append(value)
+        return records
+
     def purge_llm_requests(self, *, before):
         stats = {
             "scanned_dirs": 0,
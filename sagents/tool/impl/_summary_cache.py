@@ -0,0 +1,225 @@
+"""Disk-backed cache of history-compression summaries.
+
+Design notes:
+- keys are content addresses: a hash chain over the canonical request form of
+  each source message, seeded with the model, the compression prompt version
+  and the summary target, so the key of a prefix never depends on what follows
+- ``CompressHistoryTool._summarize_batches`` stores the rolling summary after
+  every batch under the key of the messages it covers; a later request looks up
+  the longest cached user-turn prefix and only summarizes the rest on top of it
+  (reloads and retries hit fully, forks and grown histories hit partially)
+- entries live in one SQLite table with an LRU bound on the number of rows
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sagents.observability.metrics_registry import REGISTRY
+from sagents.utils.logger import logger
+
+
+DEFAULT_MAX_ENTRIES = 2048
+
+_LOOKUPS = REGISTRY.counter(
+    "sagents_compression_summary_cache_lookups_total",
+    "History compression summary cache lookups by result (hit, partial, miss).",
+    ("result",),
+)
+_EVICTIONS = REGISTRY.counter(
+    "sagents_compression_summary_cache_evictions_total",
+    "History compression summaries evicted from the cache.",
+)
+
+
+@dataclass(frozen=True)
+class CachedSummary:
+    key: str
+    payload: Dict[str, Any]
+    parse_status: str
+    omission_stats: Dict[str, Dict[str, int]]
+
+
+def chain_keys(seed: str, canonical_messages: Iterable[str]) -> List[str]:
+    """``keys[i]`` addresses the first ``i`` messages; ``keys[0]`` is the seed."""
+    keys = [hashlib.sha256(seed.encode("utf-8")).hexdigest()]
+    for text in canonical_messages:
+        keys.append(hashlib.sha256(f"{keys[-1]}\n{text}".encode("utf-8")).hexdigest())
+    return keys
+
+
+class SummaryCache:
+    """LRU-bounded store of rolling summaries keyed by message-prefix hash."""
+
+    def __init__(self, cache_dir: str, *, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_entries = max(0, int(max_entries))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "partial_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "evicted": 0,
+        }
+        self._conn = sqlite3.connect(
+            os.path.join(self.cache_dir, "summaries.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                parse_status TEXT NOT NULL,
+                omission TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                access_seq INTEGER NOT NULL
+            )
+            """
+        )
+        row = self._conn.execute("SELECT MAX(access_seq) FROM summaries").fetchone()
+        self._access_seq = int(row[0] or 0)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["partial_hits"] + self.stats["misses"]
+        if not lookups:
+            return 0.0
+        return (self.stats["hits"] + self.stats["partial_hits"]) / lookups
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _next_seq(self) -> int:
+        self._access_seq += 1
+        return self._access_seq
+
+    def longest_prefix(
+        self, keys: Sequence[str], boundaries: Sequence[int]
+    ) -> Tuple[int, Optional[CachedSummary]]:
+        """Return ``(message count, summary)`` for the longest cached boundary.
+
+        ``boundaries`` are message counts at which a cached summary may be
+        resumed (user-turn starts and the full length).
+        """
+        candidates = sorted({b for b in boundaries if 0 < b < len(keys)}, reverse=True)
+        found: Optional[Tuple[int, Tuple[Any, ...]]] = None
+        if candidates and self.max_entries > 0:
+            wanted = {keys[b]: b for b in candidates}
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, payload, parse_status, omission FROM summaries "
+                    f"WHERE key IN ({','.join('?' * len(wanted))})",
+                    tuple(wanted),
+                ).fetchall()
+                if rows:
+                    best = max(rows, key=lambda row: wanted[row[0]])
+                    found = (wanted[best[0]], best)
+                    self._conn.execute(
+                        "UPDATE summaries SET access_seq = ? WHERE key = ?",
+                        (self._next_seq(), best[0]),
+                    )
+        total = len(keys) - 1
+        if found is None:
+            result = "miss"
+        elif found[0] >= total:
+            result = "hit"
+        else:
+            result = "partial"
+        self.stats[
+            {"hit": "hits", "partial": "partial_hits", "miss": "misses"}[result]
+        ] += 1
+        _LOOKUPS.inc((result,))
+        if found is None:
+            return 0, None
+        count, row = found
+        return count, CachedSummary(
+            key=row[0],
+            payload=json.loads(row[1]),
+            parse_status=row[2],
+            omission_stats=json.loads(row[3]),
+        )
+
+    def put(
+        self,
+        key: str,
+        payload: Dict[str, Any],
+        parse_status: str,
+        omission_stats: Dict[str, Dict[str, int]],
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries "
+                "(key, payload, parse_status, omission, created_at, access_seq) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(payload, ensure_ascii=False),
+                    parse_status,
+                    json.dumps(omission_stats, ensure_ascii=False),
+                    time.time(),
+                    self._next_seq(),
+                ),
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM summaries WHERE rowid IN ("
+                "SELECT rowid FROM summaries ORDER BY access_seq DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self.stats["stored"] += 1
+            if evicted > 0:
+                self.stats["evicted"] += evicted
+                _EVICTIONS.inc((), evicted)
+
+
+_default_cache: Optional[SummaryCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def _default_cache_settings() -> Tuple[str, int]:
+    cache_dir = os.environ.get("SAGE_COMPRESSION_SUMMARY_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".sage", "cache", "compression_summaries"
+    )
+    raw_entries = os.environ.get("SAGE_COMPRESSION_SUMMARY_CACHE_ENTRIES")
+    try:
+        max_entries = int(raw_entries) if raw_entries else DEFAULT_MAX_ENTRIES
+    except ValueError:
+        logger.warning(f"Invalid SAGE_COMPRESSION_SUMMARY_CACHE_ENTRIES: {raw_entries}")
+        max_entries = DEFAULT_MAX_ENTRIES
+    return os.path.abspath(cache_dir), max_entries
+
+
+def get_default_summary_cache() -> Optional[SummaryCache]:
+    """Process-wide cache; ``SAGE_COMPRESSION_SUMMARY_CACHE_ENTRIES=0`` disables it."""
+    global _default_cache
+    cache_dir, max_entries = _default_cache_settings()
+    if max_entries <= 0:
+        return None
+    with _default_cache_lock:
+        current = _default_cache
+        if (
+            current is None
+            or current.cache_dir != cache_dir
+            or current.max_entries != max_entries
+        ):
+            try:
+                current = SummaryCache(cache_dir, max_entries=max_entries)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Compression summary cache unavailable: {e}")
+                return None
+            _default_cache = current
+    return current
@@ -0,0 +1,793 @@
+"""Disk-backed HTTP cache shared by the web fetcher tool.
+
+Design notes:
+- freshness follows RFC 9111: ``Cache-Control`` (``no-store`` / ``no-cache`` /
+  ``max-age``), ``Expires`` + ``Date`` and the 10% ``Last-Modified`` heuristic
+- stale entries are revalidated with ``If-None-Match`` / ``If-Modified-Since``;
+  a ``304`` only refreshes the stored headers and the cached body is served
+- bodies live as files under ``<cache_dir>/bodies``; a small SQLite index keeps
+  metadata and the LRU order, total body bytes are bounded by ``max_bytes``
+- extracted readable text is cached in a separate table keyed by body hash,
+  so an unchanged page never goes through HTML -> Markdown conversion twice
+- concurrent fetches of the same URL share one in-flight transport call
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional
+
+import aiohttp
+
+from sagents.utils.logger import logger
+
+
+CACHEABLE_STATUSES = frozenset({200, 203})
+HEURISTIC_FRACTION = 0.1
+MAX_HEURISTIC_LIFETIME = 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_TEXT_ENTRIES = 1024
+# Bump when the readable-text extraction output format changes.
+READABLE_TEXT_VERSION = 1
+
+# Headers a 304 must not overwrite on the stored response (RFC 9111 §3.2).
+_NON_UPDATABLE_HEADERS = frozenset(
+    {
+        "content-length",
+        "content-encoding",
+        "content-range",
+        "transfer-encoding",
+        "connection",
+    }
+)
+_UNSTORED_HEADERS = frozenset({"set-cookie", "set-cookie2"})
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a ``Cache-Control`` header into ``{directive: argument}``."""
+    directives: Dict[str, Optional[str]] = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') if sep else None
+    return directives
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_headers(headers: Optional[Mapping[str, Any]]) -> Dict[str, str]:
+    """Lower-case header names and fold repeated headers into one value."""
+    result: Dict[str, str] = {}
+    if not headers:
+        return result
+    for name, value in headers.items():
+        key = str(name).lower()
+        if key in _UNSTORED_HEADERS:
+            continue
+        if key in result:
+            result[key] = f"{result[key]}, {value}"
+        else:
+            result[key] = str(value)
+    return result
+
+
+def is_storable(status: int, headers: Mapping[str, str]) -> bool:
+    """Whether a response may be stored, given normalized headers."""
+    if status not in CACHEABLE_STATUSES:
+        return False
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in directives:
+        return False
+    if headers.get("vary", "").strip() == "*":
+        return False
+    # Without explicit freshness or a validator the entry could never be reused.
+    return any(marker in directives for marker in ("max-age", "no-cache")) or any(
+        name in headers for name in ("expires", "etag", "last-modified")
+    )
+
+
+def freshness_lifetime(headers: Mapping[str, str], response_time: float) -> float:
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        max_age = _parse_seconds(directives.get("max-age"))
+        return float(max_age or 0)
+
+    date = parse_http_date(headers.get("date"))
+    if date is None:
+        date = response_time
+    if "expires" in headers:
+        expires = parse_http_date(headers.get("expires"))
+        # An invalid Expires value means "already expired".
+        return max(0.0, expires - date) if expires is not None else 0.0
+
+    last_modified = parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        heuristic = max(0.0, date - last_modified) * HEURISTIC_FRACTION
+        return min(heuristic, float(MAX_HEURISTIC_LIFETIME))
+    return 0.0
+
+
+def current_age(
+    headers: Mapping[str, str], request_time: float, response_time: float, now: float
+) -> float:
+    """RFC 9111 §4.2.3 age calculation."""
+    date = parse_http_date(headers.get("date"))
+    apparent_age = max(0.0, response_time - date) if date is not None else 0.0
+    age_value = _parse_seconds(headers.get("age")) or 0
+    corrected_age = age_value + max(0.0, response_time - request_time)
+    return max(apparent_age, corrected_age) + max(0.0, now - response_time)
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.debug(f"WebCache: failed to remove {path}: {e}")
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    url: str
+    final_url: str
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    request_time: float
+    response_time: float
+    size: int
+    body_path: str
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        age = current_age(self.headers, self.request_time, self.response_time, now)
+        return age < freshness_lifetime(self.headers, self.response_time)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+@dataclass
+class TransportResponse:
+    """What a transport reports after writing the response body to ``body_path``."""
+
+    status: int
+    reason: str = ""
+    headers: Mapping[str, Any] = field(default_factory=dict)
+    final_url: Optional[str] = None
+    # Transport-native response object (e.g. a parsed Scrapling page).
+    payload: Any = None
+    # False when the body could not be written in full; such responses are never stored.
+    body_complete: bool = True
+
+
+Transport = Callable[[str, Dict[str, str], str], Awaitable[TransportResponse]]
+
+
+@dataclass
+class FetchResult:
+    url: str
+    final_url: str
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body_path: str
+    from_cache: bool = False
+    revalidated: bool = False
+    payload: Any = None
+    # Set when ``body_path`` belongs to a stored entry rather than a one-off download.
+    cache_key: Optional[str] = None
+
+    def read_body(self) -> bytes:
+        try:
+            with open(self.body_path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    @classmethod
+    def from_entry(
+        cls, entry: CacheEntry, *, revalidated: bool = False
+    ) -> "FetchResult":
+        return cls(
+            url=entry.url,
+            final_url=entry.final_url,
+            status=entry.status,
+            reason=entry.reason,
+            headers=dict(entry.headers),
+            body_path=entry.body_path,
+            from_cache=True,
+            revalidated=revalidated,
+            cache_key=entry.key,
+        )
+
+
+class HttpCache:
+    """Size-bounded LRU store for HTTP responses and extracted readable text."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_text_entries: int = DEFAULT_MAX_TEXT_ENTRIES,
+    ) -> None:
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.body_dir = os.path.join(self.cache_dir, "bodies")
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_text_entries = max(0, int(max_text_entries))
+        os.makedirs(self.body_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._pins: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stored": 0,
+            "evicted": 0,
+            "text_hits": 0,
+            "text_misses": 0,
+        }
+        self._conn = sqlite3.connect(
+            os.path.join(self.cache_dir, "index.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                final_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                request_time REAL NOT NULL,
+                response_time REAL NOT NULL,
+                size INTEGER NOT NULL,
+                access_seq INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS text_entries (
+                body_hash TEXT NOT NULL,
+                base_url TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                access_seq INTEGER NOT NULL,
+                PRIMARY KEY (body_hash, base_url, version)
+            )
+            """
+        )
+        row = self._conn.execute(
+            "SELECT MAX(seq) FROM ("
+            "SELECT MAX(access_seq) AS seq FROM http_entries "
+            "UNION ALL SELECT MAX(access_seq) FROM text_entries)"
+        ).fetchone()
+        self._access_seq = int(row[0] or 0)
+        # Running size of stored bodies, so eviction need not sum the table.
+        self._total_bytes = int(
+            self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM http_entries"
+            ).fetchone()[0]
+        )
+        self._remove_partial_bodies()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def new_body_path(self) -> str:
+        return os.path.join(self.body_dir, f"{uuid.uuid4().hex}.part")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _next_seq(self) -> int:
+        self._access_seq += 1
+        return self._access_seq
+
+    def _remove_partial_bodies(self) -> None:
+        """Drop ``*.part`` files left behind by a crashed process."""
+        try:
+            names = os.listdir(self.body_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".part"):
+                _remove_file(os.path.join(self.body_dir, name))
+
+    # ------------------------------------------------------------------ HTTP
+
+    def lookup(
+        self, url: str, *, pin_fresh_at: Optional[float] = None
+    ) -> Optional[CacheEntry]:
+        """With ``pin_fresh_at``, an entry fresh at that time is pinned under the lock."""
+        key = self.key_for(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, final_url, status, reason, headers, request_time, "
+                "response_time, size FROM http_entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            body_path = os.path.join(self.body_dir, key)
+            if not os.path.exists(body_path):
+                self._delete_locked(key, row[7])
+                return None
+            self._conn.execute(
+                "UPDATE http_entries SET access_seq = ? WHERE key = ?",
+                (self._next_seq(), key),
+            )
+            entry = CacheEntry(
+                key=key,
+                url=row[0],
+                final_url=row[1],
+                status=row[2],
+                reason=row[3],
+                headers=json.loads(row[4]),
+                request_time=row[5],
+                response_time=row[6],
+                size=row[7],
+                body_path=body_path,
+            )
+            if pin_fresh_at is not None and entry.is_fresh(pin_fresh_at):
+                self.pin(key)
+        return entry
+
+    def store(
+        self,
+        url: str,
+        response: TransportResponse,
+        body_path: str,
+        *,
+        request_time: float,
+        response_time: float,
+        pin: bool = False,
+    ) -> Optional[CacheEntry]:
+        """Move ``body_path`` into the cache if the response is storable.
+
+        ``pin`` pins the stored entry before another store can evict it.
+        """
+        headers = normalize_headers(response.headers)
+        if (
+            self.max_bytes <= 0
+            or not response.body_complete
+            or not is_storable(response.status, headers)
+        ):
+            return None
+        try:
+            size = os.path.getsize(body_path)
+        except OSError:
+            return None
+        if size > self.max_bytes:
+            return None
+
+        key = self.key_for(url)
+        final_path = os.path.join(self.body_dir, key)
+        with self._lock:
+            os.replace(body_path, final_path)
+            previous = self._conn.execute(
+                "SELECT size FROM http_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_entries (key, url, final_url, status, "
+                "reason, headers, request_time, response_time, size, access_seq) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    url,
+                    response.final_url or url,
+                    response.status,
+                    response.reason or "",
+                    json.dumps(headers, ensure_ascii=False),
+                    request_time,
+                    response_time,
+                    size,
+                    self._next_seq(),
+                ),
+            )
+            self._total_bytes += size
+            self.stats["stored"] += 1
+            self._evict_locked(keep=key)
+            if pin:
+                self.pin(key)
+        return CacheEntry(
+            key=key,
+            url=url,
+            final_url=response.final_url or url,
+            status=response.status,
+            reason=response.reason or "",
+            headers=headers,
+            request_time=request_time,
+            response_time=response_time,
+            size=size,
+            body_path=final_path,
+        )
+
+    def freshen(
+        self,
+        entry: CacheEntry,
+        not_modified_headers: Mapping[str, Any],
+        *,
+        request_time: float,
+        response_time: float,
+        pin: bool = False,
+    ) -> CacheEntry:
+        """Apply the headers of a ``304 Not Modified`` to a stored entry."""
+        headers = dict(entry.headers)
+        for name, value in normalize_headers(not_modified_headers).items():
+            if name not in _NON_UPDATABLE_HEADERS:
+                headers[name] = value
+        with self._lock:
+            self._conn.execute(
+                "UPDATE http_entries SET headers = ?, request_time = ?, "
+                "response_time = ?, access_seq = ? WHERE key = ?",
+                (
+                    json.dumps(headers, ensure_ascii=False),
+                    request_time,
+                    response_time,
+                    self._next_seq(),
+                    entry.key,
+                ),
+            )
+            if pin:
+                self.pin(entry.key)
+        entry.headers = headers
+        entry.request_time = request_time
+        entry.response_time = response_time
+        return entry
+
+    def invalidate(self, url: str) -> None:
+        key = self.key_for(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size FROM http_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._delete_locked(key, row[0])
+            if not self._pins.get(key):
+                _remove_file(os.path.join(self.body_dir, key))
+
+    def pin(self, key: str) -> None:
+        """Protect a body from eviction while a caller is still reading it."""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            remaining = self._pins.get(key, 0) - 1
+            if remaining > 0:
+                self._pins[key] = remaining
+                return
+            self._pins.pop(key, None)
+            # Bodies invalidated while pinned are removed once the last reader is done.
+            row = self._conn.execute(
+                "SELECT 1 FROM http_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                _remove_file(os.path.join(self.body_dir, key))
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def _delete_locked(self, key: str, size: int) -> None:
+        self._conn.execute("DELETE FROM http_entries WHERE key = ?", (key,))
+        self._total_bytes -= size
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM http_entries ORDER BY access_seq ASC"
+        ).fetchall()
+        for key, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            if key == keep or self._pins.get(key):
+                continue
+            self._delete_locked(key, size)
+            _remove_file(os.path.join(self.body_dir, key))
+            self.stats["evicted"] += 1
+
+    # -------------------------------------------------------- readable text
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get_text(self, body_hash: str, base_url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM text_entries "
+                "WHERE body_hash = ? AND base_url = ? AND version = ?",
+                (body_hash, base_url, READABLE_TEXT_VERSION),
+            ).fetchone()
+            if row is None:
+                self.stats["text_misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE text_entries SET access_seq = ? "
+                "WHERE body_hash = ? AND base_url = ? AND version = ?",
+                (self._next_seq(), body_hash, base_url, READABLE_TEXT_VERSION),
+            )
+            self.stats["text_hits"] += 1
+        return json.loads(row[0])
+
+    def put_text(self, body_hash: str, base_url: str, payload: Dict[str, Any]) -> None:
+        if self.max_text_entries <= 0:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO text_entries "
+                "(body_hash, base_url, version, payload, access_seq) VALUES (?, ?, ?, ?, ?)",
+                (
+                    body_hash,
+                    base_url,
+                    READABLE_TEXT_VERSION,
+                    json.dumps(payload, ensure_ascii=False),
+                    self._next_seq(),
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM text_entries WHERE rowid IN ("
+                "SELECT rowid FROM text_entries ORDER BY access_seq DESC LIMIT -1 OFFSET ?)",
+                (self.max_text_entries,),
+            )
+
+
+@dataclass
+class _Flight:
+    loop: asyncio.AbstractEventLoop
+    task: "asyncio.Task[FetchResult]"
+    refs: int = 0
+    released: bool = False
+
+
+class CachingFetcher:
+    """Coalesces concurrent fetches and routes them through an :class:`HttpCache`."""
+
+    def __init__(self, cache: HttpCache) -> None:
+        self.cache = cache
+        self.coalesced = 0
+        self._inflight: Dict[str, _Flight] = {}
+        self._state_lock = threading.Lock()
+        self._open_flights = 0
+        self._closing = False
+        self._closed = False
+
+    def close(self) -> None:
+        """Close the cache once every in-flight fetch has released its body."""
+        with self._state_lock:
+            self._closing = True
+        self._close_if_idle()
+
+    def _close_if_idle(self) -> None:
+        with self._state_lock:
+            if not self._closing or self._closed or self._open_flights:
+                return
+            self._closed = True
+        self.cache.close()
+
+    @contextlib.asynccontextmanager
+    async def fetch(self, url: str, transport: Transport) -> AsyncIterator[FetchResult]:
+        """Yield a response whose ``body_path`` stays valid until the block exits."""
+        key = HttpCache.key_for(url)
+        loop = asyncio.get_running_loop()
+        flight = self._inflight.get(key)
+        if flight is None or flight.loop is not loop:
+            flight = _Flight(
+                loop=loop, task=loop.create_task(self._fetch(url, transport))
+            )
+            with self._state_lock:
+                self._open_flights += 1
+            self._inflight[key] = flight
+            flight.task.add_done_callback(
+                lambda _task, key=key, flight=flight: self._on_flight_done(key, flight)
+            )
+        else:
+            self.coalesced += 1
+
+        flight.refs += 1
+        try:
+            # Shield so one cancelled caller does not abort the shared download.
+            yield await asyncio.shield(flight.task)
+        finally:
+            flight.refs -= 1
+            if flight.refs == 0 and flight.task.done():
+                self._release(flight)
+
+    def _on_flight_done(self, key: str, flight: _Flight) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+        if flight.refs == 0:
+            self._release(flight)
+
+    def _release(self, flight: _Flight) -> None:
+        if flight.released:
+            return
+        flight.released = True
+        try:
+            if flight.task.cancelled() or flight.task.exception() is not None:
+                return
+            result = flight.task.result()
+            if result.cache_key:
+                self.cache.unpin(result.cache_key)
+            else:
+                _remove_file(result.body_path)
+        finally:
+            with self._state_lock:
+                self._open_flights -= 1
+            self._close_if_idle()
+
+    async def _fetch(self, url: str, transport: Transport) -> FetchResult:
+        cache = self.cache
+        # Index queries and body moves are blocking disk I/O; keep them off the loop.
+        now = time.time()
+        entry = await asyncio.to_thread(cache.lookup, url, pin_fresh_at=now)
+        if entry is not None and entry.is_fresh(now):
+            cache.stats["hits"] += 1
+            return FetchResult.from_entry(entry)
+
+        body_path = cache.new_body_path()
+        request_headers = entry.conditional_headers() if entry is not None else {}
+        request_time = time.time()
+        try:
+            response = await transport(url, request_headers, body_path)
+        except BaseException:
+            _remove_file(body_path)
+            raise
+        response_time = time.time()
+
+        if response.status == 304 and entry is not None:
+            _remove_file(body_path)
+            entry = await asyncio.to_thread(
+                cache.freshen,
+                entry,
+                response.headers,
+                request_time=request_time,
+                response_time=response_time,
+                pin=True,
+            )
+            cache.stats["revalidated"] += 1
+            return FetchResult.from_entry(entry, revalidated=True)
+
+        cache.stats["misses"] += 1
+        stored = await asyncio.to_thread(
+            cache.store,
+            url,
+            response,
+            body_path,
+            request_time=request_time,
+            response_time=response_time,
+            pin=True,
+        )
+        if stored is not None:
+            result = FetchResult.from_entry(stored)
+            result.from_cache = False
+            result.payload = response.payload
+            return result
+
+        if entry is not None and response.status in CACHEABLE_STATUSES:
+            # The origin no longer allows storing this URL; drop the stale copy.
+            await asyncio.to_thread(cache.invalidate, url)
+        return FetchResult(
+            url=url,
+            final_url=response.final_url or url,
+            status=response.status,
+            reason=response.reason or "",
+            headers=normalize_headers(response.headers),
+            body_path=body_path,
+            payload=response.payload,
+        )
+
+
+class SharedClientSession:
+    """One ``aiohttp.ClientSession`` reused across requests of the same event loop."""
+
+    def __init__(self) -> None:
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession()
+            self._loop = loop
+        return self._session
+
+    async def aclose(self) -> None:
+        session, self._session, self._loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
+
+
+_default_fetcher: Optional[CachingFetcher] = None
+_default_fetcher_lock = threading.Lock()
+
+
+def _default_cache_settings() -> tuple:
+    cache_dir = os.environ.get("SAGE_WEB_FETCHER_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".sage", "cache", "web_fetcher"
+    )
+    max_mb = os.environ.get("SAGE_WEB_FETCHER_CACHE_MB")
+    try:
+        max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    except ValueError:
+        logger.warning(f"Invalid SAGE_WEB_FETCHER_CACHE_MB: {max_mb}")
+        max_bytes = DEFAULT_MAX_BYTES
+    return os.path.abspath(cache_dir), max_bytes
+
+
+def get_default_fetcher() -> CachingFetcher:
+    """Process-wide fetcher; ``SAGE_WEB_FETCHER_CACHE_MB=0`` disables storage."""
+    global _default_fetcher
+    cache_dir, max_bytes = _default_cache_settings()
+    with _default_fetcher_lock:
+        current = _default_fetcher
+        if (
+            current is None
+            or current.cache.cache_dir != cache_dir
+            or current.cache.max_bytes != max_bytes
+        ):
+            previous = current
+            current = CachingFetcher(HttpCache(cache_dir, max_bytes=max_bytes))
+            _default_fetcher = current
+            if previous is not None:
+                # The replaced cache keeps serving fetches already in flight.
+                previous.close()
+    return current
@@ -7,11 +7,14 @@
 from typing import Dict, Any, List, Optional, Tuple
 from copy import deepcopy
 from dataclasses import dataclass
+import asyncio
+import hashlib
 import json
 import inspect
 import math
 import os
 import re
+import sqlite3
 
 from sagents.utils.logger import logger
 from sagents.context.messages.message import MessageChunk, MessageRole, MessageType
@@ -23,6 +26,11 @@ from sagents.llm.capabilities import (
     uses_max_completion_tokens,
 )
 from sagents.llm.model_capabilities import build_llm_extra_body
+from sagents.tool.impl._summary_cache import (
+    SummaryCache,
+    chain_keys,
+    get_default_summary_cache,
+)
 
 COMPACT_LIST_LIMITS = {
     "decisions": 20,
@@ -99,6 +107,8 @@ class CompressionLLMResult:
 class CompressionTextPart:
     text: str
     lineage: Tuple[Tuple[int, int], ...] = ()
+    # 该片段处理完后摘要覆盖到的消息数（批次最后一片才有），用于写摘要缓存
+    covered_messages: Optional[int] = None
 
     def rendered(self) -> str:
         if not self.lineage:
@@ -280,6 +290,66 @@ class CompressHistoryTool:
             turns.append(current)
         return turns
 
+    @staticmethod
+    def _summary_cache_boundaries(messages: List[MessageChunk]) -> List[int]:
+        """可以从缓存摘要接着压缩的位置：每个 user turn 的起点和末尾。"""
+        boundaries = []
+        offset = 0
+        for unit in CompressHistoryTool._compression_units(messages):
+            offset += len(unit)
+            boundaries.append(offset)
+        return boundaries
+
+    @classmethod
+    def _compression_prompt_version(cls) -> str:
+        """压缩提示词模板的指纹，模板一改旧摘要自然失效。"""
+        rendered = "\n".join(
+            cls._build_compression_prompt("{messages}", 0, retry_after_truncation=retry)
+            for retry in (False, True)
+        )
+        return hashlib.md5(rendered.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _canonical_cache_message(message: MessageChunk) -> str:
+        filtered = CompressHistoryTool._messages_for_compression_input([message])
+        converted = (
+            MessageManager.convert_message_to_dict_for_request(filtered[0])
+            if filtered
+            else None
+        )
+        return json.dumps(converted, ensure_ascii=False, sort_keys=True, default=str)
+
+    def _summary_cache_plan(
+        self,
+        messages: List[MessageChunk],
+        session_id: str,
+        budget: CompressionBudget,
+    ) -> Optional[Tuple[SummaryCache, List[str]]]:
+        """返回摘要缓存和每个消息前缀的缓存键；拿不到模型标识时不使用缓存。"""
+        from sagents.utils.agent_session_helper import get_live_session
+
+        session = get_live_session(session_id, log_prefix="CompressHistoryTool")
+        model_config = dict(getattr(session, "model_config", {}) or {})
+        model_name = model_config.get("model")
+        if not model_name:
+            return None
+        summary_cache = get_default_summary_cache()
+        if summary_cache is None:
+            return None
+        seed = json.dumps(
+            [
+                self._compression_prompt_version(),
+                model_name,
+                model_config.get("base_url"),
+                budget.target_tokens,
+            ],
+            ensure_ascii=False,
+        )
+        keys = chain_keys(
+            seed, (self._canonical_cache_message(message) for message in messages)
+        )
+        return summary_cache, keys
+
     @staticmethod
     def _estimated_messages_tokens(messages: List[MessageChunk]) -> int:
         messages = CompressHistoryTool._messages_for_compression_input(messages)
@@ -554,7 +624,47 @@ class CompressHistoryTool:
         Dict[str, Any],
     ]:
         budget = self._get_compression_budget(session_id)
-        batches = self._compression_batches(messages, session_id)
+        # 摘要缓存：从已缓存的最长 user turn 前缀的摘要继续滚动，只压缩剩余消息
+        # 缓存读写都是同步 SQLite 调用，放到线程里执行，避免阻塞事件循环
+        cache_plan = await asyncio.to_thread(
+            self._summary_cache_plan, messages, session_id, budget
+        )
+        rolling_payload: Optional[Dict[str, Any]] = None
+        parse_status = "fallback_text"
+        omission_stats: Dict[str, Dict[str, int]] = {}
+        cached_message_count = 0
+        cache_result = "disabled"
+        if cache_plan is not None:
+            summary_cache, cache_keys = cache_plan
+            try:
+                cached_message_count, cached = await asyncio.to_thread(
+                    summary_cache.longest_prefix,
+                    cache_keys,
+                    self._summary_cache_boundaries(messages),
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"压缩摘要缓存读取失败: {e}")
+                cached_message_count, cached = 0, None
+            if cached is None:
+                cache_result = "miss"
+            else:
+                rolling_payload = cached.payload
+                parse_status = cached.parse_status
+                omission_stats = deepcopy(cached.omission_stats)
+                cache_result = (
+                    "hit" if cached_message_count >= len(messages) else "partial"
+                )
+            logger.info(
+                "压缩摘要缓存: "
+                f"result={cache_result} cached_messages={cached_message_count} "
+                f"total_messages={len(messages)}"
+            )
+        remaining_messages = messages[cached_message_count:]
+        batches = (
+            self._compression_batches(remaining_messages, session_id)
+            if remaining_messages
+            else []
+        )
         nominal_batch_limit = max(
             1024, int(budget.max_model_len * COMPRESSION_BATCH_RATIO)
         )
@@ -568,7 +678,9 @@ class CompressHistoryTool:
             )
 
         text_queue: List[CompressionTextPart] = []
+        covered_messages = cached_message_count
         for batch in batches:
+            covered_messages += len(batch)
             batch_text = self._format_messages_for_compression(batch)
             raw_parts = self._split_compression_text_payload(
                 batch_text, nominal_batch_limit
@@ -578,13 +690,13 @@ class CompressHistoryTool:
                 CompressionTextPart(
                     text=part,
                     lineage=((index, total),) if total > 1 else (),
+                    covered_messages=(
+                        covered_messages if index == total else None
+                    ),
                 )
                 for index, part in enumerate(raw_parts, 1)
             )
 
-        rolling_payload: Optional[Dict[str, Any]] = None
-        parse_status = "fallback_text"
-        omission_stats: Dict[str, Dict[str, int]] = {}
         finish_reason_counts: Dict[str, int] = {}
         request_count = 0
         retry_count = 0
@@ -638,6 +750,9 @@ class CompressHistoryTool:
                     CompressionTextPart(
                         text=part,
                         lineage=queued_part.lineage + ((idx, 2),),
+                        covered_messages=(
+                            queued_part.covered_messages if idx == 2 else None
+                        ),
                     )
                     for idx, part in enumerate(split_parts, 1)
                     if part
@@ -752,6 +867,17 @@ class CompressHistoryTool:
             self._merge_omission_stats(omission_stats, attempt_omission)
             processed_batch_count += 1
             final_target_tokens = attempt_target
+            if cache_plan is not None and queued_part.covered_messages is not None:
+                try:
+                    await asyncio.to_thread(
+                        summary_cache.put,
+                        cache_keys[queued_part.covered_messages],
+                        rolling_payload,
+                        parse_status,
+                        omission_stats,
+                    )
+                except sqlite3.Error as e:
+                    logger.warning(f"压缩摘要缓存写入失败: {e}")
 
         llm_stats = {
             "window_target_tokens": budget.window_target_tokens,
@@ -784,6 +910,10 @@ class CompressHistoryTool:
                 }
                 for config_key, count in sorted(actual_output_config_counts.items())
             ],
+            "summary_cache": {
+                "result": cache_result,
+                "cached_message_count": cached_message_count,
+            },
         }
         return (
             rolling_payload or {},
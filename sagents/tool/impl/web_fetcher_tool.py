@@ -7,17 +7,28 @@ Scrapling 特性：
 - 多种 Fetcher：StealthyFetcher、DynamicFetcher 等支持无头浏览器
 - 智能内容提取
 - 支持文件下载：自动检测并下载非 HTML 文件到 Agent 工作空间
+- HTTP 缓存：遵循 Cache-Control / ETag / Last-Modified，同一 URL 的并发请求合并为一次下载
 """
 
 import asyncio
 import json
 import os
 import re
+import shutil
 import aiohttp
 import aiofiles
+from functools import partial
 from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin, urlparse, unquote
 from ..tool_base import tool
+from ._web_cache import (
+    CachingFetcher,
+    FetchResult,
+    HttpCache,
+    SharedClientSession,
+    TransportResponse,
+    get_default_fetcher,
+)
 from ..error_codes import (
     ToolErrorCode as _ToolErrorCode,
     make_tool_error as _make_tool_error,
@@ -36,6 +47,10 @@ class _HttpStatusError(Exception):
         super().__init__(f"HTTP {status}{detail}")
 
 
+# 文件下载复用同一个 ClientSession（按事件循环），避免每次下载都重新建连
+_shared_session = SharedClientSession()
+
+
 class WebFetcherTool:
     """基于 Scrapling 的网页抓取工具，支持网页内容提取和文件下载"""
 
@@ -340,26 +355,14 @@ class WebFetcherTool:
 
         for attempt in range(retries + 1):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        url, timeout=aiohttp.ClientTimeout(total=timeout)
-                    ) as response:
-                        if response.status != 200:
-                            raise Exception(f"HTTP {response.status}")
-
-                        # 获取文件大小
-                        content_length = response.headers.get("Content-Length")
-                        if content_length:
-                            size_mb = int(content_length) / (1024 * 1024)
-                            if size_mb > 100:  # 限制100MB
-                                raise Exception(
-                                    f"文件过大 ({size_mb:.1f}MB)，超过100MB限制"
-                                )
-
-                        # 下载文件
-                        async with aiofiles.open(save_path, "wb") as f:
-                            async for chunk in response.content.iter_chunked(8192):
-                                await f.write(chunk)
+                async with self._web_fetcher().fetch(
+                    url, partial(self._download_transport, timeout=timeout)
+                ) as fetched:
+                    if fetched.status != 200:
+                        raise Exception(f"HTTP {fetched.status}")
+                    await asyncio.to_thread(
+                        shutil.copyfile, fetched.body_path, save_path
+                    )
 
                 # 获取文件信息
                 file_size = os.path.getsize(save_path)
@@ -400,6 +403,34 @@ class WebFetcherTool:
             "metadata": None,
         }
 
+    async def _download_transport(
+        self, url: str, headers: Dict[str, str], body_path: str, *, timeout: int
+    ) -> TransportResponse:
+        """通过共享 ClientSession 流式下载到 body_path（带条件请求头）"""
+        session = _shared_session.get()
+        async with session.get(
+            url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status == 200:
+                # 获取文件大小
+                content_length = response.headers.get("Content-Length")
+                if content_length:
+                    size_mb = int(content_length) / (1024 * 1024)
+                    if size_mb > 100:  # 限制100MB
+                        raise Exception(f"文件过大 ({size_mb:.1f}MB)，超过100MB限制")
+
+                async with aiofiles.open(body_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(65536):
+                        await f.write(chunk)
+
+            return TransportResponse(
+                status=response.status,
+                reason=response.reason or "",
+                headers=response.headers,
+                final_url=str(response.url),
+                body_complete=response.status == 200,
+            )
+
     def _get_extension_from_url(self, url: str) -> str:
         """从URL获取文件扩展名"""
         parsed = urlparse(url)
@@ -449,9 +480,10 @@ class WebFetcherTool:
                     title = page.css("#activity-name::text").get("")
 
                 effective_base_url = self._effective_base_url(page, url)
-                full_content, used_selector, images = self._extract_markdown_content(
+                extracted = await self._extract_markdown_content(
                     page, effective_base_url
                 )
+                full_content, used_selector, images = extracted
 
                 # 生成文件名
                 from urllib.parse import urlparse
@@ -567,7 +599,7 @@ class WebFetcherTool:
                     title = page.css("#activity-name::text").get("")
 
                 effective_base_url = self._effective_base_url(page, url)
-                content, used_selector, images = self._extract_markdown_content(
+                content, used_selector, images = await self._extract_markdown_content(
                     page, effective_base_url
                 )
 
@@ -632,22 +664,68 @@ class WebFetcherTool:
             "metadata": None,
         }
 
+    def _web_fetcher(self) -> CachingFetcher:
+        """进程级 HTTP 缓存 + 并发合并（见 _web_cache）"""
+        return get_default_fetcher()
+
     async def _fetch_html_page(self, url: str, timeout: int):
-        """Fetch an HTML page with Scrapling's class-level async fetcher API."""
+        """Fetch an HTML page through the HTTP cache, revalidating stale entries."""
+        async with self._web_fetcher().fetch(
+            url, partial(self._scrapling_transport, timeout=timeout)
+        ) as fetched:
+            if not 200 <= fetched.status < 300:
+                raise _HttpStatusError(fetched.status, fetched.reason)
+            if fetched.payload is not None:
+                return fetched.payload
+            return await asyncio.to_thread(self._page_from_cache, fetched)
+
+    async def _scrapling_transport(
+        self, url: str, headers: Dict[str, str], body_path: str, *, timeout: int
+    ) -> TransportResponse:
+        """Fetch with Scrapling's class-level async fetcher API."""
         from scrapling.fetchers import AsyncFetcher  # pyright: ignore[reportMissingImports]
 
+        kwargs: Dict[str, Any] = {
+            "stealthy_headers": True,
+            "timeout": timeout,
+            "retries": 1,
+        }
+        if headers:
+            kwargs["headers"] = headers
         page = await asyncio.wait_for(
-            AsyncFetcher.get(
-                url,
-                stealthy_headers=True,
-                timeout=timeout,
-                retries=1,
-            ),
+            AsyncFetcher.get(url, **kwargs),
             timeout=timeout + 5,
         )
-        if not 200 <= page.status < 300:
-            raise _HttpStatusError(page.status, page.reason)
-        return page
+        body = getattr(page, "body", None)
+        body_complete = isinstance(body, (bytes, bytearray))
+        if body_complete:
+            await asyncio.to_thread(self._write_bytes_sync, body_path, bytes(body))  # pyright: ignore[reportArgumentType]
+        return TransportResponse(
+            status=page.status,
+            reason=page.reason or "",
+            headers=getattr(page, "headers", None) or {},
+            final_url=self._effective_base_url(page, url),
+            payload=page,
+            body_complete=body_complete,
+        )
+
+    @staticmethod
+    def _write_bytes_sync(path: str, data: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(data)
+
+    @staticmethod
+    def _page_from_cache(fetched: FetchResult):
+        """Rebuild a Scrapling page from a cached (or revalidated) body."""
+        from scrapling.parser import Selector  # pyright: ignore[reportMissingImports]
+
+        content_type = fetched.headers.get("content-type", "")
+        match = re.search(r"charset=([\w-]+)", content_type, flags=re.IGNORECASE)
+        return Selector(
+            content=fetched.read_body(),
+            url=fetched.final_url,
+            encoding=match.group(1) if match else "utf-8",
+        )
 
     def _clean_content(self, text: str) -> str:
         """清理内容"""
@@ -676,7 +754,31 @@ class WebFetcherTool:
 
         return "\n".join(cleaned_lines)
 
-    def _extract_markdown_content(self, page, base_url: str):
+    async def _extract_markdown_content(self, page, base_url: str):
+        """Extract the main content as Markdown, reusing text cached by body hash."""
+        body = getattr(page, "body", None)
+        if not isinstance(body, (bytes, bytearray)) or not body:
+            return self._extract_markdown_content_uncached(page, base_url)
+
+        cache = self._web_fetcher().cache
+        body_hash = HttpCache.body_hash(bytes(body))
+        # 文本缓存是同步 SQLite 调用，放到线程里执行，避免阻塞事件循环
+        cached = await asyncio.to_thread(cache.get_text, body_hash, base_url)
+        if cached is not None:
+            return cached["content"], cached["selector"], cached["images"]
+
+        content, selector, images = self._extract_markdown_content_uncached(
+            page, base_url
+        )
+        await asyncio.to_thread(
+            cache.put_text,
+            body_hash,
+            base_url,
+            {"content": content, "selector": selector, "images": images},
+        )
+        return content, selector, images
+
+    def _extract_markdown_content_uncached(self, page, base_url: str):
         """Extract the main content as Markdown while keeping image references."""
         platform_content = self._extract_platform_markdown_content(page, base_url)
         if platform_content:
@@ -13,6 +13,7 @@ from .tool_schema import (
 from sagents.utils.logger import logger
 from sagents.utils.sandbox.environment import build_agent_environment
 from sagents.context.session_context import SessionContext
+from sagents.context.user_memory.cache import invalidate_user_memory_cache
 from sagents.context.messages.message_manager import MessageManager
 from sagents.utils.serialization import make_serializable
 from sagents.utils.i18n import (
@@ -40,6 +41,9 @@ MAX_TOOL_RESULT_TOKENS_ENV = "SAGE_MAX_TOOL_RESULT_TOKENS"
 
 # `ToolSpec.category` → 前端展示的 source 标签映射。前端按 source 分组，并通过
 # locale (tools.source.*) 翻译显示文案。新增工具组时在这里登记一行即可。
+# 会写入/删除用户记忆的工具；智能体直接调用时不经过 UserMemoryManager，需要在这里让检索缓存失效
+_USER_MEMORY_WRITE_TOOLS = frozenset({"remember_user_memory", "forget_user_memory"})
+
 _CATEGORY_SOURCE_LABELS: Dict[str, str] = {
     "browser": "浏览器扩展",
 }
@@ -1410,6 +1414,11 @@ class ToolManager:
         if callable(record_timing_event):
             record_timing_event("tool_request_end", **fields)
 
+    @staticmethod
+    def _invalidate_user_memory_cache(tool_name: str, user_id: Optional[str]) -> None:
+        if tool_name in _USER_MEMORY_WRITE_TOOLS and user_id:
+            invalidate_user_memory_cache(user_id)
+
     async def run_tool_async(
         self,
         tool_name: str,
@@ -1597,6 +1606,8 @@ class ToolManager:
                     error_msg, tool_name, "UNKNOWN_TOOL_TYPE"
                 )
 
+            self._invalidate_user_memory_cache(tool_name, resolved_user_id)
+
             # Validate JSON format
             is_valid, validation_msg = self._validate_json_response(
                 final_result, tool_name
@@ -1684,6 +1695,8 @@ class ToolManager:
             )
             raise
         except Exception as e:
+            # 出错前可能已经写入了一部分
+            self._invalidate_user_memory_cache(tool_name, resolved_user_id)
             execution_time = time.time() - execution_start
             error_detail = _innermost_exception_message(e)
             error_msg = tool_t(
@@ -0,0 +1,271 @@
+"""Local lexical pre-ranking of tools for the tool-suggestion step.
+
+``ToolRanker`` indexes tool names, descriptions and parameter docs with BM25
+and adds a boost learned from which tools were used together in past sessions
+(``tools_usage``). ``ToolSuggestionAgent`` uses it to skip its LLM round trip
+when the lexical match is unambiguous.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sagents.utils.logger import logger
+
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+|[\u4e00-\u9fff]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_CJK_RE = re.compile(r"[\u4e00-\u9fff]")
+
+# 工具名在索引里重复几次，让名字命中比描述命中更重
+_NAME_WEIGHT = 3
+_PARAM_DESCRIPTION_CHARS = 200
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+
+def tokenize_tool_text(text: str) -> List[str]:
+    """Split text into lowercase terms.
+
+    snake_case / camelCase identifiers yield their parts, CJK runs yield single
+    characters plus character bigrams so short Chinese queries still match.
+    """
+    tokens: List[str] = []
+    for word in _WORD_RE.findall(text or ""):
+        if _CJK_RE.match(word):
+            tokens.extend(word)
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+            continue
+        parts = _CAMEL_RE.findall(word)
+        tokens.extend(part.lower() for part in parts if len(part) > 1)
+        if len(parts) > 1:
+            tokens.append(word.lower())
+    return tokens
+
+
+def _tool_document(tool: Mapping[str, Any]) -> Tuple[str, List[str]]:
+    function = tool.get("function") if "function" in tool else tool
+    function = function if isinstance(function, Mapping) else {}
+    name = str(function.get("name") or "")
+    tokens = tokenize_tool_text(name.replace("_", " ")) * _NAME_WEIGHT
+    tokens += tokenize_tool_text(str(function.get("description") or ""))
+    parameters = function.get("parameters")
+    properties = (
+        parameters.get("properties") if isinstance(parameters, Mapping) else None
+    )
+    for param_name, spec in (properties or {}).items():
+        tokens += tokenize_tool_text(str(param_name).replace("_", " "))
+        if isinstance(spec, Mapping):
+            description = str(spec.get("description") or "")
+            tokens += tokenize_tool_text(description[:_PARAM_DESCRIPTION_CHARS])
+    return name, tokens
+
+
+class ToolCoUsageStats:
+    """Which tools appear together in the same session, from ``tools_usage``."""
+
+    def __init__(self, max_sessions: int = 2000):
+        self.max_sessions = max_sessions
+        self.bootstrapped = False
+        self._sessions: "OrderedDict[str, frozenset]" = OrderedDict()
+        self._tool_sessions: Counter = Counter()
+        self._pair_sessions: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def update(self, session_id: str, usage: Mapping[str, int]) -> None:
+        tools = frozenset(name for name, count in usage.items() if name and count)
+        with self._lock:
+            self._forget(session_id)
+            if not tools:
+                return
+            self._sessions[session_id] = tools
+            self._tool_sessions.update(tools)
+            self._pair_sessions.update((a, b) for a in tools for b in tools if a != b)
+            while len(self._sessions) > self.max_sessions:
+                self._forget(next(iter(self._sessions)))
+
+    def _forget(self, session_id: str) -> None:
+        tools = self._sessions.pop(session_id, None)
+        if not tools:
+            return
+        for tool in tools:
+            self._decrement(self._tool_sessions, tool)
+            for other in tools:
+                if other != tool:
+                    self._decrement(self._pair_sessions, (tool, other))
+
+    @staticmethod
+    def _decrement(counter: Counter, key: Any) -> None:
+        if counter.get(key, 0) <= 1:
+            counter.pop(key, None)
+        else:
+            counter[key] -= 1
+
+    def bootstrap(self, storage: Any, limit: int = 500) -> int:
+        """Load the most recently registered sessions' ``tools_usage`` once."""
+        if self.bootstrapped:
+            return 0
+        self.bootstrapped = True
+        loaded = 0
+        try:
+            session_ids = list(storage.list_sessions())[-limit:]
+        except Exception as e:
+            logger.warning(f"ToolCoUsageStats: failed to list sessions: {e}")
+            return 0
+        for session_id in session_ids:
+            try:
+                usage = storage.load_tools_usage(session_id)
+            except Exception:
+                continue
+            if isinstance(usage, Mapping) and session_id not in self._sessions:
+                self.update(session_id, usage)
+                loaded += 1
+        return loaded
+
+    def conditional(self, tool: str, given: str) -> float:
+        """P(tool used in a session | given used in that session)."""
+        sessions = self._tool_sessions.get(given, 0)
+        if sessions <= 0:
+            return 0.0
+        return self._pair_sessions.get((given, tool), 0) / sessions
+
+
+TOOL_CO_USAGE = ToolCoUsageStats()
+
+
+class ToolRanker:
+    """BM25 over tool docs plus a co-usage boost from the tools already in use."""
+
+    def __init__(
+        self,
+        tools: Sequence[Mapping[str, Any]],
+        co_usage: Optional[ToolCoUsageStats] = None,
+        co_usage_weight: float = 0.5,
+    ):
+        documents = [_tool_document(tool) for tool in tools]
+        self.names = [name for name, _ in documents]
+        self.co_usage = co_usage if co_usage is not None else TOOL_CO_USAGE
+        self.co_usage_weight = co_usage_weight
+        # 工具只有几十到几百个，倒排表 term -> [(文档序号, 词频)] 足够
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = [len(tokens) for _, tokens in documents]
+        average = sum(lengths) / len(lengths) if lengths else 0.0
+        self._norms = [
+            _BM25_K1 * (1 - _BM25_B + _BM25_B * length / average) if average else 1.0
+            for length in lengths
+        ]
+        for index, (_, tokens) in enumerate(documents):
+            for term, frequency in Counter(tokens).items():
+                self._postings.setdefault(term, []).append((index, frequency))
+        total = len(documents)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def _lexical_scores(self, query_tokens: List[str]) -> List[float]:
+        scores = [0.0] * len(self.names)
+        for term in query_tokens:
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for index, frequency in self._postings[term]:
+                scores[index] += (
+                    idf * frequency * (_BM25_K1 + 1) / (frequency + self._norms[index])
+                )
+        return scores
+
+    def rank(
+        self, query: str, used_tools: Iterable[str] = ()
+    ) -> List[Tuple[str, float, float]]:
+        """Return ``(name, score, lexical)`` sorted by score, best first.
+
+        ``lexical`` is the raw BM25 score; ``score`` is BM25 normalised to the
+        best match plus the co-usage boost.
+        """
+        if not self.names:
+            return []
+        lexical = self._lexical_scores(tokenize_tool_text(query))
+        best = max(lexical)
+        used = [name for name in dict.fromkeys(used_tools) if name]
+        ranked = []
+        for name, raw in zip(self.names, lexical):
+            score = raw / best if best > 0 else 0.0
+            if used:
+                boost = max(
+                    1.0 if name == given else self.co_usage.conditional(name, given)
+                    for given in used
+                )
+                score += self.co_usage_weight * boost
+            ranked.append((name, score, raw))
+        ranked.sort(key=lambda item: -item[1])
+        return ranked
+
+    def select(
+        self,
+        query: str,
+        used_tools: Iterable[str] = (),
+        top_k: int = 8,
+        min_lexical: float = 1.0,
+        cutoff_ratio: float = 0.3,
+    ) -> Tuple[List[str], bool]:
+        """Pick the tools scoring within ``cutoff_ratio`` of the best one.
+
+        The pick is confident when the best lexical match is at least
+        ``min_lexical`` and no more than ``top_k`` tools clear the cutoff;
+        otherwise the scores are ambiguous and the caller should ask the LLM.
+        """
+        ranked = self.rank(query, used_tools)
+        if not ranked or ranked[0][1] <= 0:
+            return [], False
+        cutoff = ranked[0][1] * cutoff_ratio
+        selected = [name for name, score, _ in ranked if score >= cutoff]
+        best_lexical = max(raw for _, _, raw in ranked)
+        confident = best_lexical >= min_lexical and len(selected) <= top_k
+        return selected[:top_k], confident
+
+
+_RANKERS: "OrderedDict[str, ToolRanker]" = OrderedDict()
+_RANKERS_MAX = 16
+
+
+def get_tool_ranker(tools: Sequence[Mapping[str, Any]]) -> ToolRanker:
+    """Ranker for this tool list, reused while the tool specs stay the same."""
+    key = hashlib.md5(
+        json.dumps(list(tools), ensure_ascii=False, sort_keys=True, default=str).encode(
+            "utf-8"
+        )
+    ).hexdigest()
+    ranker = _RANKERS.get(key)
+    if ranker is None:
+        ranker = ToolRanker(tools)
+        _RANKERS[key] = ranker
+        while len(_RANKERS) > _RANKERS_MAX:
+            _RANKERS.popitem(last=False)
+    else:
+        _RANKERS.move_to_end(key)
+    return ranker
+
+
+def tool_specs_for_ranking(
+    tool_manager: Any, lang: Optional[str]
+) -> List[Dict[str, Any]]:
+    """OpenAI tool specs (with parameter docs) when the manager offers them."""
+    get_openai_tools = getattr(tool_manager, "get_openai_tools", None)
+    if callable(get_openai_tools):
+        try:
+            return list(get_openai_tools(lang=lang))
+        except Exception as e:
+            logger.debug(
+                f"ToolRanker: get_openai_tools failed, using simplified list: {e}"
+            )
+    return list(tool_manager.list_tools_simplified(lang=lang))
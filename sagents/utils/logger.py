@@ -8,24 +8,42 @@ from datetime import datetime, timedelta
 from logging.handlers import TimedRotatingFileHandler
 from typing import Dict, Optional
 
+from sagents.utils.session_log_writer import SessionLogWriter, get_session_log_writer
+
 
 _DISABLE_FILE_LOGGING_ENV = "SAGE_DISABLE_SAGENTS_FILE_LOGGING"
+_SESSION_LOG_ASYNC_ENV = "SAGE_SESSION_LOG_ASYNC"
 _TRUE_VALUES = {"1", "true", "yes", "on"}
+_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
 
 
 class _SessionStoreLogHandler(logging.Handler):
-    """Logging handler that delegates session logs to the configured store."""
+    """Logging handler that delegates session logs to the configured store.
+
+    With a writer the record is only queued here; formatting and the file write
+    happen on the writer thread.
+    """
 
-    def __init__(self, storage, session_id: str):
+    def __init__(
+        self, storage, session_id: str, writer: Optional[SessionLogWriter] = None
+    ):
         super().__init__()
         self.storage = storage
         self.session_id = session_id
+        self.writer = writer
 
     def emit(self, record):
         try:
-            self.storage.append_session_log(
-                self.session_id, self.format(record) + "\n"
-            )
+            if self.writer is not None:
+                self.writer.submit(self.storage, self.session_id, self, record)
+                return
+            self.storage.append_session_log(self.session_id, self.format(record) + "\n")
         except Exception:
             self.handleError(record)
 
@@ -34,6 +52,10 @@ def _file_logging_disabled() -> bool:
     return os.getenv(_DISABLE_FILE_LOGGING_ENV, "").strip().lower() in _TRUE_VALUES
 
 
+def _session_log_async_enabled() -> bool:
+    return os.getenv(_SESSION_LOG_ASYNC_ENV, "1").strip().lower() in _TRUE_VALUES
+
+
 class BoundLogger:
     def __init__(
         self, base_logger: "Logger", context: Optional[Dict[str, object]] = None
@@ -192,6 +214,11 @@ class Logger:
         # Session-specific loggers cache
         self.session_loggers: Dict[str, logging.Logger] = {}
         self._session_loggers_lock = threading.RLock()
+        # 会话日志经后台线程批量写入；SAGE_SESSION_LOG_ASYNC=0 时退回同步追加
+        self.session_log_writer: Optional[SessionLogWriter] = (
+            get_session_log_writer() if _session_log_async_enabled() else None
+        )
+        self._caller_filenames: Dict[str, str] = {}
 
         if self.file_logging_enabled:
             # 清理一个月前的日志文件
@@ -374,7 +401,9 @@ class Logger:
                 if cached_logger is not None:
                     return cached_logger
                 storage.append_session_log(session_id, "")
-                session_file_handler = _SessionStoreLogHandler(storage, session_id)
+                session_file_handler = _SessionStoreLogHandler(
+                    storage, session_id, self.session_log_writer
+                )
                 session_file_handler.setLevel(logging.DEBUG)
                 session_file_handler.setFormatter(
                     logging.Formatter(
@@ -396,7 +425,76 @@ class Logger:
                 )
                 return None
 
+    def _is_main_enabled(self, levelno: int) -> bool:
+        return self.logger.isEnabledFor(levelno) and any(
+            levelno >= handler.level for handler in self.logger.handlers
+        )
+
+    def _caller_filename(self, filepath: str) -> str:
+        filename = self._caller_filenames.get(filepath)
+        if filename is not None:
+            return filename
+        # 优化路径处理
+        try:
+            # 缓存cwd避免频繁系统调用
+            if not hasattr(self, "_cwd"):
+                self._cwd = os.getcwd()
+
+            # 简单的字符串操作替代 os.path.relpath
+            if filepath.startswith(self._cwd):
+                rel_path = filepath[len(self._cwd) :].lstrip(os.sep)
+            else:
+                rel_path = filepath
+
+            parts = rel_path.split(os.sep)
+            if len(parts) > 2:
+                filename = os.path.join(*parts[-2:])
+            else:
+                filename = rel_path
+        except Exception:
+            filename = os.path.basename(filepath)
+        self._caller_filenames[filepath] = filename
+        return filename
+
+    @staticmethod
+    def _emit(target, levelno, message, filepath, extra, kwargs) -> None:
+        if kwargs:
+            target.log(levelno, message, extra=extra, **kwargs)
+            return
+        # 调用者信息已经取到，直接构造记录，省掉 logging 内部再做一次 findCaller
+        target.handle(
+            target.makeRecord(
+                target.name,
+                levelno,
+                filepath,
+                extra["caller_lineno"],
+                message,
+                (),
+                None,
+                extra=extra,
+            )
+        )
+
     def _log(self, level, message, explicit_session_id: Optional[str] = None, **kwargs):
+        levelno = _LEVELS[level]
+
+        # 获取session id：优先使用显式传递的，然后从上下文获取
+        session_id = (
+            explicit_session_id or self._get_current_session_id() or "NO_SESSION"
+        )
+        session_logger = None
+        if session_id != "NO_SESSION":
+            try:
+                session_logger = self._get_session_logger(session_id)
+            except Exception:
+                session_logger = None
+        main_enabled = self._is_main_enabled(levelno)
+        if not main_enabled and (
+            session_logger is None or not session_logger.isEnabledFor(levelno)
+        ):
+            # 没有任何处理器接收该级别，跳过调用者查找与记录构造
+            return
+
         # Get caller frame info to include filename and line number
         # 优化：使用sys._getframe替代inspect.stack，因为inspect.stack在Docker/OverlayFS下非常慢
         try:
@@ -405,59 +503,38 @@ class Logger:
             # 2: caller of debug/info/etc (user code)
             f = sys._getframe(2)
             filepath = f.f_code.co_filename
+            filename = self._caller_filename(filepath)
             lineno = f.f_lineno
-
-            # 优化路径处理
-            try:
-                # 缓存cwd避免频繁系统调用
-                if not hasattr(self, "_cwd"):
-                    self._cwd = os.getcwd()
-
-                # 简单的字符串操作替代 os.path.relpath
-                if filepath.startswith(self._cwd):
-                    rel_path = filepath[len(self._cwd) :].lstrip(os.sep)
-                else:
-                    rel_path = filepath
-
-                parts = rel_path.split(os.sep)
-                if len(parts) > 2:
-                    filename = os.path.join(*parts[-2:])
-                else:
-                    filename = rel_path
-            except Exception:
-                filename = os.path.basename(filepath)
-
         except (ValueError, AttributeError):
-            filename = "unknown.py"
+            filepath = filename = "unknown.py"
             lineno = 0
 
-        # 获取session id：优先使用显式传递的，然后从上下文获取
-        session_id = (
-            explicit_session_id or self._get_current_session_id() or "NO_SESSION"
-        )
-
-        # 准备extra信息
-        extra_info = {
-            "caller_filename": filename,
-            "caller_lineno": lineno,
-            "session_id": session_id,
-        }
-
         # 记录到主logger（包含session id）
-        log_method = getattr(self.logger, level)
-        log_method(f"{message}", extra=extra_info, **kwargs)
+        if main_enabled:
+            self._emit(
+                self.logger,
+                levelno,
+                f"{message}",
+                filepath,
+                {
+                    "caller_filename": filename,
+                    "caller_lineno": lineno,
+                    "session_id": session_id,
+                },
+                kwargs,
+            )
 
         # 如果有session id，同时记录到session专用日志
-        if session_id != "NO_SESSION":
+        if session_logger is not None and session_logger.isEnabledFor(levelno):
             try:
-                session_logger = self._get_session_logger(session_id)
-                if session_logger is not None:
-                    session_log_method = getattr(session_logger, level)
-                    session_log_method(
-                        f"{message}",
-                        extra={"caller_filename": filename, "caller_lineno": lineno},
-                        **kwargs,
-                    )
+                self._emit(
+                    session_logger,
+                    levelno,
+                    f"{message}",
+                    filepath,
+                    {"caller_filename": filename, "caller_lineno": lineno},
+                    kwargs,
+                )
             except Exception:
                 # 如果session日志记录失败，不影响主要功能
                 pass
@@ -515,9 +592,7 @@ class Logger:
         logger_name = f"sage_session_{session_id}"
         with self._session_loggers_lock:
             session_logger = self.session_loggers.pop(session_id, None)
-            registered_logger = logging.Logger.manager.loggerDict.pop(
-                logger_name, None
-            )
+            registered_logger = logging.Logger.manager.loggerDict.pop(logger_name, None)
 
             loggers_to_close = []
             if session_logger is not None:
@@ -529,6 +604,14 @@ class Logger:
                 loggers_to_close.append(registered_logger)
             for target_logger in loggers_to_close:
                 self._close_handlers(target_logger)
+        if self.session_log_writer is not None:
+            self.session_log_writer.close_session(session_id)
+
+    def flush_session_logs(self, timeout: Optional[float] = None) -> bool:
+        """等待已排队的会话日志全部写入（用于读取日志尾部前）"""
+        if self.session_log_writer is None:
+            return True
+        return self.session_log_writer.flush(timeout)
 
 
 # Create a global logger instance for easy import
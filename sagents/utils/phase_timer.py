@@ -0,0 +1,343 @@
+"""
+Per-turn phase timing for agent runs.
+
+A turn opens a ``TurnTimer`` held in a context variable. Hot-path code either
+wraps its work in ``with phase("name")``, reports an already measured span via
+``record_phase`` or is decorated with ``timed_phase``. Every entry point reads
+the context variable once and returns immediately when no turn is being timed,
+so the instrumentation stays in place at near-zero cost while disabled. Child
+tasks and ``asyncio.to_thread`` calls copy the context, so parallel tool calls
+and threaded saves land in the same breakdown. Phases may nest; each total is
+inclusive of the phases inside it.
+
+Timing is switched on with ``SAGE_PHASE_TIMING=1`` or ``enable_phase_timing``.
+With ``SAGE_PHASE_PROFILE_TOP=N`` every timed turn also runs under cProfile and
+the stacks of the N slowest turns seen by this process are kept. cProfile
+hooks the whole thread, so the stacks include any other coroutine that ran on
+the event loop during the turn, and only one turn is profiled at a time.
+"""
+
+import contextlib
+import cProfile
+import functools
+import heapq
+import inspect
+import io
+import itertools
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+PHASE_TIMING_ENV = "SAGE_PHASE_TIMING"
+PHASE_PROFILE_TOP_ENV = "SAGE_PHASE_PROFILE_TOP"
+RECENT_TURNS_LIMIT = 256
+PROFILE_STATS_LINES = 40
+
+_enabled: Optional[bool] = None
+_profile_top: Optional[int] = None
+_current_turn: ContextVar[Optional["TurnTimer"]] = ContextVar(
+    "sage_turn_timer", default=None
+)
+_noop = contextlib.nullcontext()
+_lock = threading.Lock()
+_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_TURNS_LIMIT)
+_slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+_slowest_seq = itertools.count()
+_profiler_busy = False
+_phase_histogram = None
+
+
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def phase_timing_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = _env_flag(PHASE_TIMING_ENV)
+    return _enabled
+
+
+def profile_top() -> int:
+    global _profile_top
+    if _profile_top is None:
+        try:
+            _profile_top = max(0, int(os.getenv(PHASE_PROFILE_TOP_ENV) or "0"))
+        except ValueError:
+            _profile_top = 0
+    return _profile_top
+
+
+def enable_phase_timing(enabled: bool = True, profile_slowest: Optional[int] = None):
+    """Switch timing on or off for this process, overriding the environment."""
+    global _enabled, _profile_top
+    _enabled = enabled
+    if profile_slowest is not None:
+        _profile_top = max(0, int(profile_slowest))
+
+
+class TurnTimer:
+    """Accumulates phase durations for one turn."""
+
+    __slots__ = (
+        "session_id",
+        "started_at",
+        "_started",
+        "_token",
+        "_profiler",
+        "phases",
+    )
+
+    def __init__(self, session_id: Optional[str]):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self._token = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, name: str, elapsed: float) -> None:
+        entry = self.phases.get(name)
+        if entry is None:
+            self.phases[name] = [elapsed, 1]
+        else:
+            entry[0] += elapsed
+            entry[1] += 1
+
+
+class _PhaseSpan:
+    __slots__ = ("_turn", "_name", "_started")
+
+    def __init__(self, turn: TurnTimer, name: str):
+        self._turn = turn
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._turn.add(self._name, time.monotonic() - self._started)
+        return False
+
+
+def phase(name: str):
+    """Context manager timing a block as phase ``name`` of the current turn."""
+    turn = _current_turn.get()
+    if turn is None:
+        return _noop
+    return _PhaseSpan(turn, name)
+
+
+def record_phase(name: str, elapsed: float) -> None:
+    """Add an already measured span (seconds) to the current turn."""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.add(name, elapsed)
+
+
+def timed_phase(name: str) -> Callable[[Callable], Callable]:
+    """Decorator timing every call of a function as phase ``name``.
+
+    Works for plain functions, coroutine functions and async generator
+    functions. For async generators only the time spent inside the generator
+    counts, not the time its consumer holds a yielded item. When no turn is
+    being timed the original call result is returned untouched.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.isasyncgenfunction(func):
+
+            async def _timed_agen(turn, agen):
+                try:
+                    while True:
+                        started = time.monotonic()
+                        try:
+                            item = await agen.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            turn.add(name, time.monotonic() - started)
+                        yield item
+                finally:
+                    await agen.aclose()
+
+            @functools.wraps(func)
+            def agen_wrapper(*args, **kwargs):
+                turn = _current_turn.get()
+                if turn is None:
+                    return func(*args, **kwargs)
+                return _timed_agen(turn, func(*args, **kwargs))
+
+            return agen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            async def _timed_coro(turn, coro):
+                started = time.monotonic()
+                try:
+                    return await coro
+                finally:
+                    turn.add(name, time.monotonic() - started)
+
+            @functools.wraps(func)
+            def coro_wrapper(*args, **kwargs):
+                turn = _current_turn.get()
+                if turn is None:
+                    return func(*args, **kwargs)
+                return _timed_coro(turn, func(*args, **kwargs))
+
+            return coro_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            turn = _current_turn.get()
+            if turn is None:
+                return func(*args, **kwargs)
+            started = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                turn.add(name, time.monotonic() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def start_turn(session_id: Optional[str]) -> Optional[TurnTimer]:
+    """Start timing a turn in the current context; None when disabled."""
+    global _profiler_busy
+    if not phase_timing_enabled():
+        return None
+    timer = TurnTimer(session_id)
+    timer._token = _current_turn.set(timer)
+    if profile_top() > 0:
+        with _lock:
+            claim = not _profiler_busy
+            _profiler_busy = _profiler_busy or claim
+        if claim:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                timer._profiler = profiler
+            except ValueError:
+                # 其他 profiler 已在运行（如 SAGENTS_PROFILING_TOOL_DECORATOR）
+                with _lock:
+                    _profiler_busy = False
+    return timer
+
+
+def _phase_seconds():
+    # 延迟注册：本模块被 session_context 导入，不能在导入期拉起 observability 包
+    global _phase_histogram
+    if _phase_histogram is None:
+        from sagents.observability.metrics_registry import REGISTRY
+
+        _phase_histogram = REGISTRY.histogram(
+            "sagents_turn_phase_seconds",
+            "Time spent per agent turn phase (only while phase timing is enabled)",
+            ("phase",),
+        )
+    return _phase_histogram
+
+
+def _format_profile(profiler: cProfile.Profile) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_STATS_LINES)
+    return stream.getvalue()
+
+
+def finish_turn(
+    timer: Optional[TurnTimer],
+    *,
+    request_id: Optional[str] = None,
+    status: str = "completed",
+) -> Optional[Dict[str, Any]]:
+    """Stop a turn and return its structured breakdown record."""
+    global _profiler_busy
+    if timer is None:
+        return None
+    duration = time.monotonic() - timer._started
+    profiler = timer._profiler
+    if profiler is not None:
+        profiler.disable()
+        timer._profiler = None
+        with _lock:
+            _profiler_busy = False
+    try:
+        _current_turn.reset(timer._token)
+    except ValueError:
+        # 生成器在另一个上下文里被关闭：token 不属于当前上下文，不能动它，
+        # 原上下文的计时引用随上下文一起回收
+        pass
+
+    histogram = _phase_seconds()
+    phases = []
+    for name, (elapsed, count) in sorted(
+        timer.phases.items(), key=lambda item: item[1][0], reverse=True
+    ):
+        histogram.observe((name,), elapsed)
+        phases.append(
+            {
+                "phase": name,
+                "duration_ms": round(elapsed * 1000, 3),
+                "count": int(count),
+                "share": round(elapsed / duration, 4) if duration > 0 else 0.0,
+            }
+        )
+    histogram.observe(("turn",), duration)
+    record: Dict[str, Any] = {
+        "session_id": timer.session_id,
+        "request_id": request_id,
+        "started_at": timer.started_at,
+        "duration_ms": round(duration * 1000, 3),
+        "status": status,
+        "phases": phases,
+    }
+
+    with _lock:
+        _recent.append(record)
+        if profiler is not None:
+            limit = profile_top()
+            if limit > 0 and (len(_slowest) < limit or duration > _slowest[0][0]):
+                profiled = dict(record, profile=_format_profile(profiler))
+                entry = (duration, next(_slowest_seq), profiled)
+                if len(_slowest) < limit:
+                    heapq.heappush(_slowest, entry)
+                else:
+                    heapq.heapreplace(_slowest, entry)
+                record["profiled"] = True
+    return record
+
+
+def recent_turn_timings(
+    session_id: Optional[str] = None, limit: int = 50
+) -> List[Dict[str, Any]]:
+    """Most recent turn records of this process, newest first."""
+    with _lock:
+        records = [
+            record
+            for record in reversed(_recent)
+            if session_id is None or record.get("session_id") == session_id
+        ]
+    return records[: max(0, limit)]
+
+
+def slowest_turn_profiles() -> List[Dict[str, Any]]:
+    """Retained cProfile captures, slowest turn first."""
+    with _lock:
+        entries = sorted(_slowest, reverse=True)
+    return [entry[2] for entry in entries]
+
+
+def reset_phase_timings() -> None:
+    with _lock:
+        _recent.clear()
+        _slowest.clear()
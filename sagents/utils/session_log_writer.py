@@ -0,0 +1,282 @@
+"""Background writer for per-session log files.
+
+Log calls on the event-loop thread only append the record to a bounded
+in-memory queue.  A daemon thread drains the queue in batches, formats the
+records, and writes them through per-session append streams kept in a small
+LRU, so a busy session costs one write per batch instead of an
+open/append/close per record.
+
+When the queue is full the overflow policy decides what happens:
+
+- ``drop_new`` (default): the incoming record is discarded.
+- ``drop_old``: the oldest queued record is discarded to make room.
+- ``block``: the caller waits for the writer to catch up.
+
+Dropped records are counted in ``stats`` and a marker line is written to the
+affected session log the next time it is flushed.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+
+OVERFLOW_POLICIES = ("drop_new", "drop_old", "block")
+
+SESSION_LOG_QUEUE_SIZE = int(os.getenv("SAGE_SESSION_LOG_QUEUE_SIZE", "20000"))
+SESSION_LOG_BATCH_SIZE = int(os.getenv("SAGE_SESSION_LOG_BATCH_SIZE", "512"))
+SESSION_LOG_FLUSH_INTERVAL_MS = int(
+    os.getenv("SAGE_SESSION_LOG_FLUSH_INTERVAL_MS", "200")
+)
+SESSION_LOG_MAX_OPEN_FILES = int(os.getenv("SAGE_SESSION_LOG_MAX_OPEN_FILES", "64"))
+SESSION_LOG_OVERFLOW = os.getenv("SAGE_SESSION_LOG_OVERFLOW", "drop_new").strip()
+
+_RECORD = 0
+_CLOSE = 1
+_FLUSH = 2
+
+
+class SessionLogWriter:
+    """Bounded queue plus one writer thread shared by every session logger."""
+
+    def __init__(
+        self,
+        *,
+        max_queue: int = SESSION_LOG_QUEUE_SIZE,
+        batch_size: int = SESSION_LOG_BATCH_SIZE,
+        flush_interval: float = SESSION_LOG_FLUSH_INTERVAL_MS / 1000,
+        max_open_files: int = SESSION_LOG_MAX_OPEN_FILES,
+        overflow: str = SESSION_LOG_OVERFLOW,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            overflow = "drop_new"
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_open_files = max(1, max_open_files)
+        self.overflow = overflow
+
+        self._queue: Deque[Tuple[Any, ...]] = deque()
+        self._cond = threading.Condition()
+        self._urgent = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # 仅由写线程访问：session_id -> 追加写入流（None 表示存储不支持，回退到 append_session_log）
+        self._streams: "OrderedDict[str, Any]" = OrderedDict()
+        self._dropped_by_session: Dict[str, int] = {}
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "write_errors": 0,
+        }
+
+    def submit(self, storage, session_id: str, handler, record) -> bool:
+        """Queue one record; returns False when it was dropped."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "block":
+                    self._urgent = True
+                    self._cond.notify_all()
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        self._cond.wait()
+                elif self.overflow == "drop_old":
+                    self._drop_oldest_record()
+                else:
+                    self._count_drop(session_id)
+                    return False
+            was_empty = not self._queue
+            self._queue.append((_RECORD, storage, session_id, handler, record))
+            self.stats["enqueued"] += 1
+            self._ensure_thread()
+            if was_empty or len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+        return True
+
+    def close_session(self, session_id: str) -> None:
+        """Write everything queued for the session, then close its stream."""
+        with self._cond:
+            if self._closed or self._thread is None:
+                return
+            self._queue.append((_CLOSE, session_id))
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every record queued before this call has been written."""
+        done = threading.Event()
+        with self._cond:
+            if self._thread is None or self._closed:
+                return True
+            self._queue.append((_FLUSH, done))
+            self._urgent = True
+            self._cond.notify_all()
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        """Drain the queue and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _drop_oldest_record(self) -> None:
+        for index, item in enumerate(self._queue):
+            if item[0] == _RECORD:
+                del self._queue[index]
+                self._count_drop(item[2])
+                return
+
+    def _count_drop(self, session_id: str) -> None:
+        self.stats["dropped"] += 1
+        self._dropped_by_session[session_id] = (
+            self._dropped_by_session.get(session_id, 0) + 1
+        )
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="sage-session-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                # 攒批：队列未满一批且无人等待时，最多再等一个刷新周期
+                if (
+                    len(self._queue) < self.batch_size
+                    and not self._urgent
+                    and not self._closed
+                ):
+                    deadline = time.monotonic() + self.flush_interval
+                    while len(self._queue) < self.batch_size and not self._urgent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or self._closed:
+                            break
+                        self._cond.wait(remaining)
+                batch = list(self._queue)
+                self._queue.clear()
+                self._urgent = False
+                dropped = self._dropped_by_session
+                self._dropped_by_session = {}
+                self._cond.notify_all()
+            self._write_batch(batch, dropped)
+        self._close_streams()
+
+    def _write_batch(self, batch: List[Tuple[Any, ...]], dropped: Dict[str, int]):
+        pending: Dict[str, Tuple[Any, List[str]]] = {}
+        for item in batch:
+            kind = item[0]
+            if kind == _RECORD:
+                _, storage, session_id, handler, record = item
+                try:
+                    text = handler.format(record) + "\n"
+                except Exception:
+                    handler.handleError(record)
+                    continue
+                entry = pending.get(session_id)
+                if entry is None:
+                    entry = pending[session_id] = (storage, [])
+                entry[1].append(text)
+                continue
+            self._write_pending(pending, dropped)
+            pending = {}
+            if kind == _CLOSE:
+                self._close_stream(item[1])
+            elif kind == _FLUSH:
+                item[1].set()
+        self._write_pending(pending, dropped)
+        self.stats["batches"] += 1
+        if dropped:
+            # 本批没有该会话的记录，丢弃标记留到下一批再写
+            with self._cond:
+                for session_id, count in dropped.items():
+                    self._dropped_by_session[session_id] = (
+                        self._dropped_by_session.get(session_id, 0) + count
+                    )
+
+    def _write_pending(
+        self, pending: Dict[str, Tuple[Any, List[str]]], dropped: Dict[str, int]
+    ) -> None:
+        written = []
+        for session_id, (storage, lines) in pending.items():
+            count = len(lines)
+            if session_id in dropped:
+                lines.append(
+                    f"[session log] {dropped.pop(session_id)} records dropped: "
+                    "queue full\n"
+                )
+            text = "".join(lines)
+            try:
+                stream = self._stream(storage, session_id)
+                if stream is None:
+                    storage.append_session_log(session_id, text)
+                else:
+                    stream.write(text)
+                    written.append(session_id)
+                self.stats["written"] += count
+            except Exception as e:
+                self.stats["write_errors"] += 1
+                self._close_stream(session_id)
+                sys.stderr.write(
+                    f"Warning: Failed to write session log for {session_id}: {e}\n"
+                )
+        for session_id in written:
+            stream = self._streams.get(session_id)
+            if stream is None:
+                continue
+            try:
+                stream.flush()
+            except Exception:
+                self._close_stream(session_id)
+
+    def _stream(self, storage, session_id: str):
+        if session_id in self._streams:
+            self._streams.move_to_end(session_id)
+            return self._streams[session_id]
+        opener = getattr(storage, "open_session_log", None)
+        stream = opener(session_id) if opener is not None else None
+        self._streams[session_id] = stream
+        while len(self._streams) > self.max_open_files:
+            evicted_id, _ = next(iter(self._streams.items()))
+            self._close_stream(evicted_id)
+        return stream
+
+    def _close_stream(self, session_id: str) -> None:
+        stream = self._streams.pop(session_id, None)
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _close_streams(self) -> None:
+        for session_id in list(self._streams):
+            self._close_stream(session_id)
+
+
+_WRITER: Optional[SessionLogWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_session_log_writer() -> SessionLogWriter:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = SessionLogWriter()
+            atexit.register(_WRITER.shutdown)
+        return _WRITER
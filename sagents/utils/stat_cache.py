@@ -0,0 +1,63 @@
+"""按 stat 元数据校验的文件缓存共用的小工具。
+
+技能目录缓存（sagents.skill.skill_catalog）与工作空间索引
+（common.services.workspace_index）共用同一套规则，避免两边各自漂移：
+
+- 文件签名为（大小, mtime_ns, inode），三者都不变才视为内容未变；
+- mtime 距今不足 ``RACY_SECONDS`` 的文件或目录不缓存，同一时间戳内
+  的同尺寸修改仍能被发现；
+- 各缓存超出条目上限后按最近最少使用淘汰。
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Tuple
+
+Signature = Tuple[int, int, int]
+
+RACY_SECONDS = 1.0
+_RACY_NS = int(RACY_SECONDS * 1_000_000_000)
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def stat_signature(file_stat: os.stat_result) -> Signature:
+    return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+
+def is_racy(mtime_ns: int) -> bool:
+    """mtime 落在最近的竞争窗口内，结果不能缓存"""
+    return time.time_ns() - mtime_ns < _RACY_NS
+
+
+def lru_put(
+    cache: "OrderedDict[Any, Any]", key: Hashable, value: Any, limit: int
+) -> None:
+    """写入并移到最新位置，超出 ``limit`` 时淘汰最久未用的条目"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def dirs_unchanged(dir_mtimes: List[Tuple[str, int]]) -> bool:
+    """记录的每个目录 mtime 都未变化；任一目录无法 stat 视为已变化"""
+    try:
+        return all(
+            os.stat(directory).st_mtime_ns == mtime_ns
+            for directory, mtime_ns in dir_mtimes
+        )
+    except OSError:
+        return False
+
+
+def md5_file(path: str) -> str:
+    """分块计算文件 MD5，复用同一块缓冲区，避免每块重新分配内存。"""
+    digest = hashlib.md5()
+    buffer = bytearray(_HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as stream:
+        while read := stream.readinto(buffer):
+            digest.update(view[:read])
+    return digest.hexdigest()
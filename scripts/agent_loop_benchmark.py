@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""End-to-end agent loop benchmark against a local fake OpenAI server.
+
+Starts ``scripts/fake_openai_server.py`` in a subprocess and drives complete
+``SAgent.run_stream`` turns through it with local tools only, so regressions in
+context preparation, message merging, tool dispatch and session persistence
+show up without any network or model variance. Scenario parameters:
+
+* ``--history``: prior user/assistant turn pairs in the request
+* ``--tools``: filler tools registered next to the benchmark tool
+* ``--fanout`` / ``--rounds``: parallel tool calls per round, tool rounds per turn
+
+Per run it reports wall time, client CPU time, client-side ``ttft`` / ``llm``
+time and the per-phase turn breakdown recorded by ``sagents.utils.phase_timer``
+(system segments, context prep, multimodal, LLM wait, tool execution, session
+save); one extra run under tracemalloc reports allocations. ``--json`` writes the results and
+``--baseline`` compares p50s against an earlier JSON file, exiting non-zero
+when a metric regresses by more than ``--max-regression``.
+
+    agent_loop_benchmark.py --history 40 --tools 30 --fanout 4 --json now.json
+    agent_loop_benchmark.py --history 40 --tools 30 --fanout 4 --baseline now.json
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.llm.chat import OpenAIChat  # noqa: E402
+from sagents.sagents import SAgent  # noqa: E402
+from sagents.tool.tool_base import tool  # noqa: E402
+from sagents.tool.tool_manager import ToolManager  # noqa: E402
+from sagents.utils.phase_timer import (  # noqa: E402
+    enable_phase_timing,
+    recent_turn_timings,
+)
+
+
+BENCH_TOOL = "bench_lookup"
+# phases recorded by sagents.utils.phase_timer during each turn
+TURN_PHASES = (
+    "system_segments",
+    "context_prep",
+    "multimodal",
+    "llm_wait",
+    "tool_exec",
+    "session_save",
+)
+PHASES = defaultdict(float)
+
+
+class BenchTools:
+    @tool()
+    def bench_lookup(self, key: str) -> dict:
+        """Look up a record by key in the local benchmark table."""
+        return {"key": key, "value": f"record for {key}", "tags": ["bench"] * 8}
+
+
+def build_tool_manager(filler_tools: int) -> ToolManager:
+    manager = ToolManager(isolated=True, is_auto_discover=False)
+    manager.register_tools_from_object(BenchTools())
+    template = manager.tools[BENCH_TOOL]
+    for index in range(filler_tools):
+        spec = copy.copy(template)
+        spec.name = f"filler_tool_{index}"
+        spec.description = f"Filler tool number {index} used to size the tool list."
+        manager.register_tool(spec)
+    return manager
+
+
+def history_messages(turns: int) -> list:
+    messages = []
+    for index in range(turns):
+        messages.append(
+            {"role": "user", "content": f"Earlier question {index}: " + "context " * 30}
+        )
+        messages.append(
+            {
+                "role": "assistant",
+                "content": f"Earlier answer {index}: " + "detail " * 60,
+            }
+        )
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# client-side LLM timing
+# ---------------------------------------------------------------------------
+
+
+class TimedStream:
+    def __init__(self, inner, started: float):
+        self.inner = inner
+        self.started = started
+        self.first = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self.inner.__anext__()
+        except StopAsyncIteration:
+            PHASES["llm"] += time.perf_counter() - self.started
+            raise
+        if self.first:
+            self.first = False
+            PHASES["ttft"] += time.perf_counter() - self.started
+        return chunk
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+class TimedCompletions:
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def create(self, **kwargs):
+        PHASES["llm_requests"] += 1
+        started = time.perf_counter()
+        result = await self.inner.create(**kwargs)
+        if kwargs.get("stream"):
+            return TimedStream(result, started)
+        elapsed = time.perf_counter() - started
+        PHASES["ttft"] += elapsed
+        PHASES["llm"] += elapsed
+        return result
+
+
+class TimedClient:
+    """Wrap an AsyncOpenAI client to time requests and the first chunk."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = TimedCompletions(inner.chat.completions)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+# ---------------------------------------------------------------------------
+# runs
+# ---------------------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable,
+        str(REPO_ROOT / "scripts" / "fake_openai_server.py"),
+        "--port",
+        str(port),
+        "--ttft",
+        str(args.ttft),
+        "--chunk-delay",
+        str(args.chunk_delay),
+        "--tool-name",
+        BENCH_TOOL,
+        "--rounds",
+        str(args.rounds),
+        "--fanout",
+        str(args.fanout),
+    ]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/v1/models", timeout=1)
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake OpenAI server did not start")
+
+
+async def run_once(args, base_url: str, history: list, tool_manager) -> dict:
+    workspace = tempfile.mkdtemp(prefix="sage-agent-bench-")
+    chat = OpenAIChat(api_key="bench", base_url=base_url, model_name="fake")
+    model_config = {
+        "model": "fake",
+        "api_key": "bench",
+        "base_url": base_url,
+        "max_tokens": 4096,
+        "max_model_len": 128000,
+        "temperature": 0,
+    }
+    agent = SAgent(
+        session_root_space=os.path.join(workspace, "sessions"), enable_obs=False
+    )
+    messages = history + [{"role": "user", "content": args.query}]
+    session_id = f"bench-{uuid.uuid4().hex[:12]}"
+    PHASES.clear()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    try:
+        async for batch in agent.run_stream(
+            input_messages=messages,
+            model=TimedClient(chat.raw_client),
+            model_config=model_config,
+            system_prefix="You are a helpful assistant.",
+            sandbox_type="passthrough",
+            sandbox_agent_workspace=os.path.join(workspace, "agent"),
+            tool_manager=tool_manager,
+            session_id=session_id,
+            user_id="bench",
+            agent_mode=args.agent_mode,
+            max_loop_count=args.max_loops,
+        ):
+            if first_chunk is None and batch:
+                first_chunk = time.perf_counter() - started
+            chunks += len(batch)
+    finally:
+        await chat.close()
+        wall = time.perf_counter() - started
+        usage_after = resource.getrusage(resource.RUSAGE_SELF)
+        shutil.rmtree(workspace, ignore_errors=True)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (
+        usage_after.ru_stime - usage_before.ru_stime
+    )
+    result = {
+        "wall": wall,
+        "cpu": cpu,
+        "first_chunk": first_chunk or 0.0,
+        "non_llm": wall - PHASES["llm"],
+        "chunks": chunks,
+    }
+    result["ttft"] = PHASES["ttft"]
+    result["llm"] = PHASES["llm"]
+    turns = recent_turn_timings(session_id, limit=1)
+    turn_phases = {
+        item["phase"]: item["duration_ms"] / 1000
+        for item in (turns[0]["phases"] if turns else [])
+    }
+    for phase in TURN_PHASES:
+        result[phase] = turn_phases.get(phase, 0.0)
+    result["llm_requests"] = int(PHASES["llm_requests"])
+    return result
+
+
+def summarize(results: list) -> dict:
+    metrics = {}
+    for name in results[0]:
+        if name in ("chunks", "llm_requests"):
+            continue
+        values = [result[name] * 1000 for result in results]
+        metrics[f"{name}_ms"] = {
+            "p50": round(percentile(values, 50), 3),
+            "p99": round(percentile(values, 99), 3),
+            "mean": round(sum(values) / len(values), 3),
+        }
+    return metrics
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> int:
+    regressions = 0
+    print(f"{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in report["metrics"].items():
+        previous = baseline.get("metrics", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous["p50"], current["p50"]
+        change = (after - before) / before if before else 0.0
+        # ignore sub-millisecond noise on near-zero phases
+        regressed = change > max_regression and after - before > 1.0
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<18}{before:>12.2f}{after:>12.2f}{change:>+10.1%}{flag}")
+    if baseline.get("scenario") != report["scenario"]:
+        print("warning: baseline was recorded with a different scenario")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Agent loop benchmark.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--history", type=int, default=10, help="prior turn pairs")
+    parser.add_argument("--tools", type=int, default=10, help="filler tools")
+    parser.add_argument("--fanout", type=int, default=2, help="tool calls per round")
+    parser.add_argument("--rounds", type=int, default=2, help="tool rounds per turn")
+    parser.add_argument("--ttft", type=float, default=0.0, help="server delay, s")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds")
+    parser.add_argument("--agent-mode", default="simple")
+    parser.add_argument("--max-loops", type=int, default=20)
+    parser.add_argument(
+        "--query", default="Look up the records I need and summarize them."
+    )
+    parser.add_argument(
+        "--no-allocations", action="store_true", help="skip the tracemalloc run"
+    )
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against an earlier --json file")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.getLogger("sage").setLevel(logging.CRITICAL)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    enable_phase_timing(True)
+    tool_manager = build_tool_manager(args.tools)
+    history = history_messages(args.history)
+    port = free_port()
+    server = start_server(args, port)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    try:
+        for _ in range(args.warmup):
+            asyncio.run(run_once(args, base_url, history, tool_manager))
+        results = [
+            asyncio.run(run_once(args, base_url, history, tool_manager))
+            for _ in range(args.runs)
+        ]
+        allocations = None
+        if not args.no_allocations:
+            tracemalloc.start()
+            asyncio.run(run_once(args, base_url, history, tool_manager))
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            allocations = {
+                "peak_kb": round(peak / 1024, 1),
+                "retained_kb": round(current / 1024, 1),
+            }
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    report = {
+        "scenario": {
+            "history": args.history,
+            "tools": args.tools,
+            "fanout": args.fanout,
+            "rounds": args.rounds,
+            "ttft": args.ttft,
+            "chunk_delay": args.chunk_delay,
+            "agent_mode": args.agent_mode,
+        },
+        "runs": args.runs,
+        "llm_requests_per_run": results[-1]["llm_requests"],
+        "chunks_per_run": results[-1]["chunks"],
+        "metrics": summarize(results),
+        "allocations": allocations,
+    }
+    print(
+        f"runs={args.runs} llm_requests/run={report['llm_requests_per_run']} "
+        f"chunks/run={report['chunks_per_run']}"
+    )
+    for name, values in report["metrics"].items():
+        print(
+            f"{name:<18} p50={values['p50']:>9.2f} p99={values['p99']:>9.2f} "
+            f"mean={values['mean']:>9.2f}"
+        )
+    if allocations:
+        print(
+            f"allocations peak_kb={allocations['peak_kb']} "
+            f"retained_kb={allocations['retained_kb']}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            return compare(report, json.load(handle), args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
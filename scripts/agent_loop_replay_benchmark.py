@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""End-to-end agent-loop benchmark driven by an LLM replay cassette.
+
+Record once against a real (or fake) OpenAI-compatible endpoint:
+
+    agent_loop_replay_benchmark.py --cassette run.jsonl --record \\
+        --base-url http://127.0.0.1:8000/v1 --api-key sk-... --model gpt-4o
+
+then replay it as often as needed without any model calls:
+
+    agent_loop_replay_benchmark.py --cassette run.jsonl --runs 20 [--timing 1]
+
+Every run drives ``SAgent.run_stream`` through the full session / flow / agent
+stack with a fresh session; only the provider responses come from the cassette.
+``--timing 0`` measures pure framework overhead, ``--timing 1`` replays the
+recorded streaming cadence. Per-run wall time, time to first chunk and the
+number of LLM requests served are reported.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+
+DEFAULT_QUERIES = [
+    "Summarize the benefits of unit tests in three bullet points.",
+]
+
+
+async def run_once(args, workspace: str, queries) -> dict:
+    from sagents.llm.chat import OpenAIChat
+    from sagents.llm.replay import get_cassette
+    from sagents.sagents import SAgent
+    from sagents.tool.tool_manager import ToolManager
+
+    cassette = get_cassette(args.cassette)
+    served_before = sum(cassette._served.values())
+    recorded_before = len(cassette)
+    chat = OpenAIChat(
+        api_key=args.api_key, base_url=args.base_url, model_name=args.model
+    )
+    model_config = {
+        "model": args.model,
+        "api_key": args.api_key,
+        "base_url": args.base_url,
+        "max_tokens": 4096,
+        "max_model_len": 64000,
+        "temperature": 0,
+    }
+    agent = SAgent(
+        session_root_space=os.path.join(workspace, "sessions"), enable_obs=False
+    )
+    tool_manager = ToolManager()
+    started = time.perf_counter()
+    first_chunk = None
+    chunks = 0
+    messages = []
+    try:
+        for query in queries:
+            messages.append({"role": "user", "content": query})
+            async for batch in agent.run_stream(
+                input_messages=list(messages),
+                model=chat.raw_client,
+                model_config=model_config,
+                system_prefix="You are a helpful assistant.",
+                sandbox_type="passthrough",
+                sandbox_agent_workspace=os.path.join(workspace, "agent"),
+                tool_manager=tool_manager,
+                session_id="replay-bench",
+                user_id="replay-bench",
+                agent_mode=args.agent_mode,
+                max_loop_count=args.max_loops,
+            ):
+                if first_chunk is None and batch:
+                    first_chunk = time.perf_counter() - started
+                chunks += len(batch)
+    finally:
+        await chat.close()
+    return {
+        "wall": time.perf_counter() - started,
+        "first_chunk": first_chunk or 0.0,
+        "chunks": chunks,
+        "served": sum(cassette._served.values()) - served_before,
+        "recorded": len(cassette) - recorded_before,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay-driven agent loop benchmark.")
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument(
+        "--record", action="store_true", help="record instead of replay"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--timing", type=float, default=0.0, help="replay cadence factor"
+    )
+    parser.add_argument("--query", action="append", help="user turn (repeatable)")
+    parser.add_argument("--agent-mode", default="simple")
+    parser.add_argument("--max-loops", type=int, default=10)
+    parser.add_argument("--base-url", default="http://127.0.0.1:9/v1")
+    parser.add_argument("--api-key", default="replay")
+    parser.add_argument(
+        "--model", help="defaults to the model recorded in the cassette"
+    )
+    args = parser.parse_args()
+    logging.getLogger("sage").setLevel(logging.CRITICAL)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    os.environ["SAGE_LLM_CASSETTE"] = args.cassette
+    os.environ["SAGE_LLM_REPLAY_MODE"] = "record" if args.record else "replay"
+    os.environ["SAGE_LLM_REPLAY_TIMING"] = str(args.timing)
+    if not args.model:
+        from sagents.llm.replay import get_cassette
+
+        entries = get_cassette(args.cassette).entries
+        if not entries:
+            parser.error("--model is required when recording a new cassette")
+        args.model = entries[0].request.get("model")
+    queries = args.query or DEFAULT_QUERIES
+    runs = 1 if args.record else args.runs
+
+    # the workspace path ends up in the system prompt; reuse one path per run
+    workspace = os.path.join(tempfile.gettempdir(), "sage-replay-bench")
+    results = []
+    for _ in range(runs):
+        shutil.rmtree(workspace, ignore_errors=True)
+        results.append(asyncio.run(run_once(args, workspace, queries)))
+    shutil.rmtree(workspace, ignore_errors=True)
+    if args.record:
+        print(f"recorded {results[0]['recorded']} LLM requests to {args.cassette}")
+        return 0
+
+    walls = [result["wall"] for result in results]
+    firsts = [result["first_chunk"] for result in results]
+    print(
+        f"runs={runs} llm_requests/run={results[-1]['served']} "
+        f"chunks/run={results[-1]['chunks']} timing={args.timing}"
+    )
+    print(
+        f"wall_ms p50={percentile(walls, 50) * 1000:.1f} "
+        f"p99={percentile(walls, 99) * 1000:.1f} "
+        f"first_chunk_ms p50={percentile(firsts, 50) * 1000:.1f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Benchmark conversation listing with large message histories.
+
+Generates conversations whose ``messages`` blobs are large, then compares:
+
+- legacy:     load full rows (messages included) and derive counts and the
+              last-message preview in Python, as listings did before
+- projection: ConversationDao.get_conversations_paginated(include_messages=False)
+              reading only the denormalized listing columns
+
+Each mode lists one page and the whole table.
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from sqlalchemy import update  # noqa: E402
+
+from common.core.client.db import SessionManager, register_db_getter  # noqa: E402
+from common.models.base import Base  # noqa: E402
+from common.models.conversation import (  # noqa: E402
+    Conversation,
+    ConversationDao,
+    build_listing_stats,
+)
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+
+async def populate(conversations, messages, message_chars):
+    body = "lorem ipsum " * (message_chars // 12)
+    batch = []
+    for n in range(conversations):
+        batch.append(
+            Conversation(
+                user_id="user-1",
+                session_id=f"session-{n}",
+                agent_id="agent-1",
+                agent_name="Agent",
+                title=f"conversation {n}",
+                messages=[
+                    {
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": f"{n}-{i} {body}",
+                    }
+                    for i in range(messages)
+                ],
+            )
+        )
+        if len(batch) == 500:
+            await ConversationDao().batch_insert(batch)
+            batch = []
+    if batch:
+        await ConversationDao().batch_insert(batch)
+
+
+async def list_legacy(dao, page_size):
+    conversations, _ = await dao.get_conversations_paginated(
+        user_id="user-1", page_size=page_size, include_messages=True
+    )
+    return [build_listing_stats(c.messages) for c in conversations]
+
+
+async def list_projection(dao, page_size):
+    conversations, _ = await dao.get_conversations_paginated(
+        user_id="user-1", page_size=page_size, include_messages=False
+    )
+    return [(c.get_message_count(), c.last_message_preview) for c in conversations]
+
+
+async def measure(label, fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager(
+            SimpleNamespace(db_type="file", db_file=str(Path(tmp) / "bench.db"))
+        )
+        await manager.init_conn()
+
+        async def get_db():
+            return manager
+
+        register_db_getter(get_db)
+        async with manager._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        started = time.perf_counter()
+        await populate(args.conversations, args.messages, args.message_chars)
+        print(
+            f"populate: {args.conversations} conversations x {args.messages} messages "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        dao = ConversationDao()
+        async with manager.get_session() as session:
+            await session.execute(update(Conversation).values(message_count=None))
+        started = time.perf_counter()
+        filled = await dao.backfill_listing_stats(batch_size=500)
+        elapsed = time.perf_counter() - started
+        print(f"backfill: {filled} conversations in {elapsed:.1f}s")
+
+        for label, page_size in (("page", args.page_size), ("all", args.conversations)):
+            await measure(
+                f"legacy {label}",
+                lambda: list_legacy(dao, page_size),
+                args.repeat,
+            )
+            await measure(
+                f"projection {label}",
+                lambda: list_projection(dao, page_size),
+                args.repeat,
+            )
+        register_db_getter(None)
+        await manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark conversation listing.")
+    parser.add_argument("--conversations", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--message-chars", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
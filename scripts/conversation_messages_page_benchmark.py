@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Benchmark first-page latency of the conversation messages API.
+
+Builds a long session (user turns, assistant replies and large tool outputs)
+and compares the full history response with the first cursor page:
+
+- full:     build_conversation_messages_view + clean_content + JSON encode
+- page:     build_conversation_messages_page(limit=N) + clean_content + JSON encode
+- summary:  same page with the tool-output summary projection
+
+Sources:
+- live: messages served from an in-memory session
+- disk: messages restored from messages.json through SessionManager
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.services.chat_processor import ContentProcessor  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents import session_runtime  # noqa: E402
+from sagents.context.messages.message import MessageChunk, MessageRole  # noqa: E402
+
+
+def build_messages(count, tool_chars):
+    messages = []
+    for n in range(count):
+        kind = n % 4
+        if kind == 0:
+            messages.append(
+                MessageChunk(
+                    role=MessageRole.USER.value,
+                    content=f"question {n}",
+                    message_id=f"u{n}",
+                    type="user_input",
+                )
+            )
+        elif kind == 1:
+            messages.append(
+                MessageChunk(
+                    role=MessageRole.ASSISTANT.value,
+                    content="",
+                    tool_calls=[
+                        {
+                            "id": f"call-{n}",
+                            "type": "function",
+                            "function": {"name": "search", "arguments": "{}"},
+                        }
+                    ],
+                    message_id=f"c{n}",
+                    type="tool_call",
+                )
+            )
+        elif kind == 2:
+            messages.append(
+                MessageChunk(
+                    role=MessageRole.TOOL.value,
+                    content="r" * tool_chars,
+                    tool_call_id=f"call-{n - 1}",
+                    message_id=f"t{n}",
+                    type="tool_call_result",
+                )
+            )
+        else:
+            messages.append(
+                MessageChunk(
+                    role=MessageRole.ASSISTANT.value,
+                    content=f"answer {n} " * 20,
+                    message_id=f"a{n}",
+                    type="assistant_text",
+                )
+            )
+    return messages
+
+
+class LiveSessionManager:
+    def __init__(self, messages):
+        self._messages = messages
+
+    def get_session_messages(self, session_id):
+        return self._messages
+
+
+def respond(view):
+    messages = [ContentProcessor.clean_content(message) for message in view["messages"]]
+    return len(json.dumps({"messages": messages}, ensure_ascii=False))
+
+
+def measure(label, fn, repeat):
+    latencies = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = fn()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f} response_kb={size / 1024:.0f}"
+    )
+
+
+def run(manager, args, source):
+    session_runtime._global_session_manager = manager
+    measure(
+        f"{source} full",
+        lambda: respond(session_runtime.build_conversation_messages_view("bench")),
+        args.repeat,
+    )
+    measure(
+        f"{source} page",
+        lambda: respond(
+            session_runtime.build_conversation_messages_page("bench", limit=args.limit)
+        ),
+        args.repeat,
+    )
+    measure(
+        f"{source} summary",
+        lambda: respond(
+            session_runtime.build_conversation_messages_page(
+                "bench", limit=args.limit, summary=True
+            )
+        ),
+        args.repeat,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark first-page latency of conversation messages."
+    )
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--tool-chars", type=int, default=8000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sources", nargs="+", default=["live", "disk"])
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, args.tool_chars)
+    if "live" in args.sources:
+        run(LiveSessionManager(messages), args, "live")
+    if "disk" in args.sources:
+        with tempfile.TemporaryDirectory() as tmp:
+            workspace = Path(tmp) / "bench"
+            workspace.mkdir()
+            (workspace / "messages.json").write_text(
+                json.dumps([message.to_dict() for message in messages]),
+                encoding="utf-8",
+            )
+            manager = session_runtime.SessionManager(tmp, enable_obs=False)
+            run(manager, args, "disk")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Benchmark conversation search latency on a large SQLite database.
+
+Generates conversations with English and Chinese message text, backfills the
+FTS5 index, then compares:
+
+- like: ``LIKE '%term%'`` over titles and the JSON message blobs
+- fts:  ConversationDao.get_conversations_paginated(search=..., sort_by="relevance")
+        ranked by BM25 and recency, with highlighted snippets
+- fts-date: the default date-ordered search (index hits OR session id match)
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from sqlalchemy import String, cast, func, or_, select  # noqa: E402
+
+from common.core.client.db import SessionManager, register_db_getter  # noqa: E402
+from common.models.base import Base  # noqa: E402
+from common.models.conversation import Conversation, ConversationDao  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+# Zipf-distributed synthetic vocabulary: a few very common words, a long tail.
+WORDS = [f"w{rank}x" for rank in range(5000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(5000)))
+CJK = "数据分析性能优化部署流程季度总结全文检索引擎模型训练用户反馈接口文档"
+QUERIES = ["w3x", "w40x", "w400x", "w2000x", "w40x w400x", "性能优化", "检索"]
+
+
+def _words(rng, count):
+    return " ".join(rng.choices(WORDS, cum_weights=CUM_WEIGHTS, k=count))
+
+
+def _text(rng):
+    start = rng.randrange(len(CJK) - 6)
+    return f"{_words(rng, rng.randint(8, 30))} {CJK[start : start + rng.randint(2, 6)]}"
+
+
+async def populate(conversations, seed):
+    rng = random.Random(seed)
+    batch = []
+    for n in range(conversations):
+        batch.append(
+            Conversation(
+                user_id=f"user-{n % 50}",
+                session_id=f"session-{n}",
+                agent_id="agent-1",
+                agent_name="Agent",
+                title=_words(rng, 3),
+                messages=[
+                    {
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": _text(rng),
+                    }
+                    for i in range(6)
+                ],
+            )
+        )
+        if len(batch) == 2000:
+            await ConversationDao().batch_insert(batch)
+            batch = []
+    if batch:
+        await ConversationDao().batch_insert(batch)
+
+
+async def like_search(db, term, page_size):
+    like = f"%{term}%"
+    where = or_(
+        Conversation.title.like(like),
+        cast(Conversation.messages, String).like(like),
+    )
+    async with db.get_session() as session:
+        total = (await session.execute(select(func.count()).where(where))).scalar()
+        ids = (
+            (
+                await session.execute(
+                    select(Conversation.session_id)
+                    .where(where)
+                    .order_by(Conversation.updated_at.desc())
+                    .limit(page_size)
+                )
+            )
+            .scalars()
+            .all()
+        )
+    return total, ids
+
+
+async def measure(label, fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            started = time.perf_counter()
+            await fn(query)
+            latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: queries={len(latencies)} "
+        f"p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager(
+            SimpleNamespace(db_type="file", db_file=str(Path(tmp) / "bench.db"))
+        )
+        await manager.init_conn()
+
+        async def get_db():
+            return manager
+
+        register_db_getter(get_db)
+        async with manager._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        started = time.perf_counter()
+        await populate(args.conversations, args.seed)
+        print(
+            f"populate: {args.conversations} conversations in {time.perf_counter() - started:.1f}s"
+        )
+
+        dao = ConversationDao()
+        started = time.perf_counter()
+        indexed = await dao.backfill_search_index(batch_size=1000)
+        elapsed = time.perf_counter() - started
+        print(
+            f"backfill: {indexed} conversations in {elapsed:.1f}s ({indexed / elapsed:.0f}/s)"
+        )
+
+        await measure(
+            "like",
+            lambda query: like_search(manager, query, args.page_size),
+            args.repeat,
+        )
+        await measure(
+            "fts",
+            lambda query: dao.get_conversations_paginated(
+                search=query,
+                sort_by="relevance",
+                page_size=args.page_size,
+                include_messages=False,
+            ),
+            args.repeat,
+        )
+        await measure(
+            "fts-date",
+            lambda query: dao.get_conversations_paginated(
+                search=query, page_size=args.page_size, include_messages=False
+            ),
+            args.repeat,
+        )
+        await measure(
+            "fts+user",
+            lambda query: dao.get_conversations_paginated(
+                search=query,
+                sort_by="relevance",
+                user_id="user-7",
+                page_size=args.page_size,
+                include_messages=False,
+            ),
+            args.repeat,
+        )
+        register_db_getter(None)
+        await manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark conversation search.")
+    parser.add_argument("--conversations", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
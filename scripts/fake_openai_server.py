@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Local fake OpenAI-compatible chat completions server for benchmarks.
+
+Serves ``POST /v1/chat/completions`` (streaming and non-streaming) and
+``GET /v1/models`` with deterministic, scripted answers:
+
+* a request that offers the ``--tool-name`` tool gets ``--fanout`` parallel
+  calls to it until ``--rounds`` tool rounds have happened since the last user
+  message, then a plain text answer;
+* every other request (auxiliary prompts, rounds exhausted) gets a text answer
+  of ``--answer-words`` words.
+
+``--ttft`` delays the first chunk and ``--chunk-delay`` spaces the following
+ones, so client-side timings can be separated from the simulated model time.
+
+    fake_openai_server.py --port 18931 --rounds 2 --fanout 4
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+
+class FakeModel:
+    def __init__(
+        self,
+        ttft: float = 0.0,
+        chunk_delay: float = 0.0,
+        answer_words: int = 40,
+        tool_name: str = "bench_lookup",
+        rounds: int = 1,
+        fanout: int = 1,
+    ):
+        self.ttft = ttft
+        self.chunk_delay = chunk_delay
+        self.answer_words = answer_words
+        self.tool_name = tool_name
+        self.rounds = rounds
+        self.fanout = fanout
+        self.requests = 0
+
+    def _offers_tool(self, body: dict) -> bool:
+        return any(
+            (item.get("function") or {}).get("name") == self.tool_name
+            for item in body.get("tools") or []
+        )
+
+    def _rounds_done(self, messages: list) -> int:
+        done = 0
+        for message in reversed(messages):
+            if message.get("role") == "user":
+                break
+            calls = message.get("tool_calls") or []
+            if any(
+                (call.get("function") or {}).get("name") == self.tool_name
+                for call in calls
+            ):
+                done += 1
+        return done
+
+    def plan(self, body: dict):
+        """Return ``(text, tool_calls)`` for a request."""
+        self.requests += 1
+        messages = body.get("messages") or []
+        if self._offers_tool(body):
+            done = self._rounds_done(messages)
+            if done < self.rounds:
+                calls = [
+                    {
+                        "id": f"call_{done}_{index}",
+                        "type": "function",
+                        "function": {
+                            "name": self.tool_name,
+                            "arguments": json.dumps({"key": f"item-{done}-{index}"}),
+                        },
+                    }
+                    for index in range(self.fanout)
+                ]
+                return "", calls
+        words = [f"word{index}" for index in range(self.answer_words)]
+        return " ".join(words), []
+
+    @staticmethod
+    def usage(body: dict, text: str) -> dict:
+        prompt_tokens = len(json.dumps(body.get("messages") or [])) // 4
+        completion_tokens = max(1, len(text) // 4)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+
+def _chunk(model: str, delta: dict, finish_reason=None, usage=None) -> bytes:
+    payload = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        if usage is None
+        else [],
+    }
+    if usage is not None:
+        payload["usage"] = usage
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    fake: FakeModel = request.app["fake_model"]
+    body = await request.json()
+    model = body.get("model") or "fake"
+    text, tool_calls = fake.plan(body)
+    if fake.ttft:
+        await asyncio.sleep(fake.ttft)
+
+    if not body.get("stream"):
+        message = {"role": "assistant", "content": text or None}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        return web.json_response(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_calls else "stop",
+                    }
+                ],
+                "usage": fake.usage(body, text),
+            }
+        )
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    if tool_calls:
+        deltas = [
+            {"role": "assistant", "tool_calls": [{"index": index, **call}]}
+            for index, call in enumerate(tool_calls)
+        ]
+    else:
+        deltas = [
+            {"role": "assistant", "content": word + " "} for word in text.split(" ")
+        ]
+    for position, delta in enumerate(deltas):
+        if position and fake.chunk_delay:
+            await asyncio.sleep(fake.chunk_delay)
+        await response.write(_chunk(model, delta))
+    finish_reason = "tool_calls" if tool_calls else "stop"
+    await response.write(_chunk(model, {}, finish_reason=finish_reason))
+    if (body.get("stream_options") or {}).get("include_usage"):
+        await response.write(_chunk(model, {}, usage=fake.usage(body, text)))
+    await response.write(b"data: [DONE]\n\n")
+    return response
+
+
+async def list_models(request: web.Request) -> web.Response:
+    return web.json_response(
+        {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+    )
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response({"requests": request.app["fake_model"].requests})
+
+
+def create_app(fake_model: FakeModel) -> web.Application:
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["fake_model"] = fake_model
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/v1/models", list_models)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18931)
+    parser.add_argument("--ttft", type=float, default=0.0, help="seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds")
+    parser.add_argument("--answer-words", type=int, default=40)
+    parser.add_argument("--tool-name", default="bench_lookup")
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--fanout", type=int, default=1)
+    args = parser.parse_args()
+
+    fake_model = FakeModel(
+        ttft=args.ttft,
+        chunk_delay=args.chunk_delay,
+        answer_words=args.answer_words,
+        tool_name=args.tool_name,
+        rounds=args.rounds,
+        fanout=args.fanout,
+    )
+    web.run_app(create_app(fake_model), host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Benchmark ParallelNode throughput against a simulated rate-limited LLM backend.
+
+The backend serves ``--capacity`` calls at full speed, slows down linearly past
+that, and rejects calls once more than twice the capacity are in flight.
+``--sessions`` flows each run ``--nodes`` ParallelNodes of ``--branches``
+agent branches, sharing one set of resource pools:
+
+- unbounded: every branch starts immediately (the previous behaviour)
+- fixed:     llm pool pinned at ``--fixed`` slots
+- adaptive:  llm pool starts at ``--fixed`` and tunes itself (AIMD)
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import sagents.session_runtime  # noqa: E402,F401
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.context.messages.message import MessageChunk, MessageRole  # noqa: E402
+from sagents.context.session_context import SessionStatus  # noqa: E402
+from sagents.flow.concurrency import AdaptiveLimiter, ResourcePools  # noqa: E402
+from sagents.flow.executor import FlowExecutor  # noqa: E402
+from sagents.flow.schema import AgentNode, ParallelNode, SequenceNode  # noqa: E402
+
+
+class _Session:
+    class _Context:
+        audit_status = {}
+        system_context = {}
+
+        def add_messages(self, _messages):
+            pass
+
+    def __init__(self):
+        self.context = self._Context()
+
+    def should_interrupt(self):
+        return False
+
+    def get_status(self):
+        return SessionStatus.RUNNING
+
+    def get_context(self):
+        return self.context
+
+
+class _SessionManager:
+    def __init__(self):
+        self.session = _Session()
+
+    def get_live_session(self, _session_id):
+        return self.session
+
+
+class _Agent:
+    agent_name = "bench"
+
+
+class SimulatedBackend:
+    def __init__(self, capacity: int, base_latency: float):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.in_flight = 0
+        self.errors = 0
+        self.latencies = []
+
+    def _get_agent(self, _agent_key):
+        return _Agent()
+
+    async def _execute_agent_phase(self, session_id, agent, phase_name):
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            if self.in_flight > 2 * self.capacity:
+                # fail fast like an HTTP 429
+                await asyncio.sleep(self.base_latency / 10)
+                self.errors += 1
+                raise RuntimeError("rate limited")
+            load = max(1.0, self.in_flight / self.capacity)
+            await asyncio.sleep(self.base_latency * load)
+        finally:
+            self.in_flight -= 1
+        self.latencies.append(time.perf_counter() - started)
+        yield [MessageChunk(role=MessageRole.ASSISTANT.value, content="ok")]
+
+
+async def run_mode(args, limiter: AdaptiveLimiter) -> None:
+    backend = SimulatedBackend(args.capacity, args.latency)
+    pools = ResourcePools({"llm": limiter})
+    flow = SequenceNode(
+        steps=[
+            ParallelNode(
+                max_concurrency=args.branches,
+                branches=[AgentNode(agent_key="bench")] * args.branches,
+            )
+        ]
+        * args.nodes
+    )
+
+    async def session(n: int) -> int:
+        executor = FlowExecutor(
+            tool_manager=None,
+            session_runtime=backend,
+            session_id=f"bench-{n}",
+            session_manager=_SessionManager(),
+            resource_pools=pools,
+        )
+        return sum([len(chunks) async for chunks in executor.execute(flow)])
+
+    started = time.perf_counter()
+    succeeded = sum(await asyncio.gather(*(session(n) for n in range(args.sessions))))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{limiter.name}: ok={succeeded} errors={backend.errors} "
+        f"goodput={succeeded / elapsed:.1f} branches/s "
+        f"p50_ms={percentile(backend.latencies, 50) * 1000:.0f} "
+        f"p99_ms={percentile(backend.latencies, 99) * 1000:.0f} "
+        f"final_limit={int(limiter.limit)}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ParallelNode execution.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--branches", type=int, default=6)
+    parser.add_argument("--capacity", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fixed", type=int, default=2)
+    args = parser.parse_args()
+    # FlowExecutor logs every agent phase and failed branch; keep the output readable
+    logging.getLogger("sage").setLevel(logging.CRITICAL)
+
+    unbounded = args.sessions * args.branches
+    modes = (
+        AdaptiveLimiter("unbounded", initial=unbounded, min_limit=unbounded),
+        AdaptiveLimiter("fixed", initial=args.fixed, max_limit=args.fixed),
+        AdaptiveLimiter("adaptive", initial=args.fixed, max_limit=unbounded),
+    )
+    for limiter in modes:
+        asyncio.run(run_mode(args, limiter))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark IM message ingest against the IM server session database.
+
+Each simulated incoming message does what ``handle_incoming_message`` does
+before calling the agent: find-or-create the session and read the binding
+(which records activity). Messages arrive at a fixed rate while a loop-lag
+probe measures how late the event loop wakes up.
+
+Modes:
+- legacy:  one sqlite connection per call, no caching, run on the event loop
+- inline:  pooled/cached database, still called synchronously on the loop
+- async:   pooled/cached database through the SessionManager async wrappers
+"""
+
+import argparse
+import asyncio
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.im_server.db import IMServerDB  # noqa: E402
+from mcp_servers.im_server.session_manager import SessionManager  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+
+class PerCallConnectionDB(IMServerDB):
+    """The previous access pattern: a fresh connection and commit per call."""
+
+    def __init__(self, db_path):
+        super().__init__(db_path, cache_size=0)
+
+    @contextmanager
+    def _read(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _write(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def touch_binding(self, session_id):
+        super().touch_binding(session_id)
+        self.flush()
+
+
+async def _loop_lag_probe(samples, stop, interval=0.005):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def run_mode(mode, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "sage.db"
+        db = PerCallConnectionDB(db_path) if mode == "legacy" else IMServerDB(db_path)
+        manager = SessionManager(db)
+
+        async def ingest(i):
+            user_id = f"user-{i % args.users}"
+            started = time.perf_counter()
+            if mode == "async":
+                session_id = await manager.afind_or_create_session(
+                    "feishu", user_id, "agent", f"chat-{user_id}"
+                )
+                await manager.aget_binding(session_id)
+            else:
+                session_id = manager.find_or_create_session(
+                    "feishu", user_id, "agent", f"chat-{user_id}"
+                )
+                manager.get_binding(session_id)
+            latencies.append(time.perf_counter() - started)
+
+        latencies = []
+        lag = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_loop_lag_probe(lag, stop))
+        total = int(args.rate * args.seconds)
+        interval = 1.0 / args.rate
+        pending = set()
+        started = time.perf_counter()
+        for i in range(total):
+            # Open-loop arrivals: schedule by wall clock, not by completion.
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(ingest(i))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe
+        db.close()
+
+        sqlite_version = sqlite3.sqlite_version
+        print(
+            f"{mode}: msgs={total} elapsed={elapsed:.2f}s "
+            f"throughput={total / elapsed:.0f}/s "
+            f"ingest_p50_ms={percentile(latencies, 50) * 1000:.2f} "
+            f"ingest_p99_ms={percentile(latencies, 99) * 1000:.2f} "
+            f"loop_lag_p99_ms={percentile(lag, 99) * 1000:.2f} "
+            f"loop_lag_max_ms={max(lag or [0]) * 1000:.2f} "
+            f"touch_batches={db.stats['touch_batches']} sqlite={sqlite_version}"
+        )
+
+
+async def main_async(args):
+    # Per-message INFO logs would dominate the measurement.
+    logging.getLogger("IMSessionManager").setLevel(logging.WARNING)
+    for mode in args.modes:
+        await run_mode(mode, args)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark IM session DB ingest throughput and event-loop lag."
+    )
+    parser.add_argument("--rate", type=float, default=1000.0, help="messages/s")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "inline", "async"])
+    args = parser.parse_args()
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
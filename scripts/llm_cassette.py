@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Inspect and maintain LLM record/replay cassettes.
+
+Cassettes are written by ``SAGE_LLM_REPLAY_MODE=record|auto`` (see
+``sagents/llm/replay.py``): one JSON line per model request.
+
+    llm_cassette.py list  run.jsonl
+    llm_cassette.py show  run.jsonl 3
+    llm_cassette.py stats run.jsonl
+    llm_cassette.py dedupe run.jsonl          # keep the first recording per request
+    llm_cassette.py drop  run.jsonl 4 5       # remove entries by index
+    llm_cassette.py merge out.jsonl a.jsonl b.jsonl
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.llm.replay import Cassette  # noqa: E402
+
+
+def response_text(entry) -> str:
+    """Reassemble the assistant text and tool calls of a recorded response."""
+    if not entry.stream:
+        message = ((entry.response or {}).get("choices") or [{}])[0].get(
+            "message"
+        ) or {}
+        calls = [
+            f"{call['function']['name']}({call['function']['arguments']})"
+            for call in message.get("tool_calls") or []
+        ]
+        return "\n".join([message.get("content") or "", *calls]).strip()
+    content = []
+    calls = {}
+    for chunk in entry.chunks:
+        for choice in chunk.get("choices") or []:
+            delta = choice.get("delta") or {}
+            content.append(delta.get("content") or "")
+            for call in delta.get("tool_calls") or []:
+                slot = calls.setdefault(call.get("index", 0), ["", ""])
+                function = call.get("function") or {}
+                slot[0] += function.get("name") or ""
+                slot[1] += function.get("arguments") or ""
+    lines = ["".join(content)] + [f"{name}({args})" for name, args in calls.values()]
+    return "\n".join(lines).strip()
+
+
+def last_user_text(entry, limit: int = 60) -> str:
+    for message in reversed(entry.request.get("messages") or []):
+        if message.get("role") in ("user", "tool"):
+            content = message.get("content")
+            if not isinstance(content, str):
+                content = json.dumps(content, ensure_ascii=False)
+            content = " ".join(content.split())
+            return content[:limit] + ("…" if len(content) > limit else "")
+    return ""
+
+
+def ttft(entry) -> float:
+    return entry.offsets[0] if entry.offsets else entry.duration
+
+
+def cmd_list(args) -> int:
+    cassette = Cassette(args.cassette)
+    for index, entry in enumerate(cassette.entries):
+        print(
+            f"{index:>4}  {entry.fingerprint[:12]}  {entry.request.get('model')}  "
+            f"{'stream' if entry.stream else 'plain '}  chunks={len(entry.chunks):<4} "
+            f"ttft_ms={ttft(entry) * 1000:>7.0f}  total_ms={entry.duration * 1000:>7.0f}  "
+            f"{last_user_text(entry)}"
+        )
+    return 0
+
+
+def cmd_show(args) -> int:
+    cassette = Cassette(args.cassette)
+    entry = cassette.entries[args.index]
+    if args.request:
+        print(json.dumps(entry.request, ensure_ascii=False, indent=2))
+        print("-" * 40)
+    print(response_text(entry))
+    return 0
+
+
+def cmd_stats(args) -> int:
+    cassette = Cassette(args.cassette)
+    entries = cassette.entries
+    if not entries:
+        print("empty cassette")
+        return 0
+    durations = [entry.duration for entry in entries]
+    ttfts = [ttft(entry) for entry in entries]
+    unique = len({entry.fingerprint for entry in entries})
+    print(f"entries={len(entries)} unique_requests={unique}")
+    print(
+        f"recorded total_s={sum(durations):.2f} "
+        f"p50_ms={percentile(durations, 50) * 1000:.0f} "
+        f"p99_ms={percentile(durations, 99) * 1000:.0f} "
+        f"ttft_p50_ms={percentile(ttfts, 50) * 1000:.0f}"
+    )
+    return 0
+
+
+def cmd_dedupe(args) -> int:
+    cassette = Cassette(args.cassette)
+    seen = set()
+    kept = []
+    for entry in cassette.entries:
+        if entry.fingerprint not in seen:
+            seen.add(entry.fingerprint)
+            kept.append(entry)
+    removed = len(cassette) - len(kept)
+    cassette.rewrite(kept)
+    print(f"removed {removed} duplicate entries, {len(kept)} left")
+    return 0
+
+
+def cmd_drop(args) -> int:
+    cassette = Cassette(args.cassette)
+    drop = set(args.indexes)
+    cassette.rewrite(
+        entry for index, entry in enumerate(cassette.entries) if index not in drop
+    )
+    print(f"{len(cassette)} entries left")
+    return 0
+
+
+def cmd_merge(args) -> int:
+    entries = [entry for path in args.inputs for entry in Cassette(path).entries]
+    Cassette(args.output).rewrite(entries)
+    print(f"wrote {len(entries)} entries to {args.output}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage LLM replay cassettes.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="one line per recorded request")
+    list_parser.add_argument("cassette")
+    list_parser.set_defaults(handler=cmd_list)
+
+    show_parser = subparsers.add_parser("show", help="print a recorded response")
+    show_parser.add_argument("cassette")
+    show_parser.add_argument("index", type=int)
+    show_parser.add_argument(
+        "--request", action="store_true", help="also print the request"
+    )
+    show_parser.set_defaults(handler=cmd_show)
+
+    stats_parser = subparsers.add_parser("stats", help="recorded latency summary")
+    stats_parser.add_argument("cassette")
+    stats_parser.set_defaults(handler=cmd_stats)
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="drop repeated recordings")
+    dedupe_parser.add_argument("cassette")
+    dedupe_parser.set_defaults(handler=cmd_dedupe)
+
+    drop_parser = subparsers.add_parser("drop", help="remove entries by index")
+    drop_parser.add_argument("cassette")
+    drop_parser.add_argument("indexes", type=int, nargs="+")
+    drop_parser.set_defaults(handler=cmd_drop)
+
+    merge_parser = subparsers.add_parser("merge", help="concatenate cassettes")
+    merge_parser.add_argument("output")
+    merge_parser.add_argument("inputs", nargs="+")
+    merge_parser.set_defaults(handler=cmd_merge)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
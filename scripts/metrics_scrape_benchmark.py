@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Benchmark the server metrics registry: hot-path recording and scrape cost.
+
+- record: increments per second from several threads, a lock-protected dict
+          (the previous implementation) vs the sharded registry counter
+- scrape: ``/metrics`` render time with ``--series`` HTTP request series
+          loaded, in Prometheus text and OpenMetrics formats, with process
+          sampling cached vs re-sampled on every scrape
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from app.server.services import prometheus_metrics  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.observability.metrics_registry import MetricsRegistry  # noqa: E402
+
+
+_STATUSES = ("200", "400", "404", "500")
+
+
+def run_threads(fn, threads: int) -> float:
+    workers = [threading.Thread(target=fn) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def bench_record(args) -> None:
+    keys = [("GET", f"/api/r{n}", "200") for n in range(64)]
+    lock = threading.Lock()
+    totals = {}
+
+    def locked():
+        for n in range(args.increments):
+            key = keys[n % len(keys)]
+            with lock:
+                totals[key] = totals.get(key, 0) + 1
+
+    counter = MetricsRegistry().counter("bench_total", "Bench.", ("m", "p", "s"))
+
+    def sharded():
+        for n in range(args.increments):
+            counter.inc(keys[n % len(keys)])
+
+    total_ops = args.threads * args.increments
+    for label, fn in (("locked dict", locked), ("sharded", sharded)):
+        elapsed = run_threads(fn, args.threads)
+        print(
+            f"record {label}: {total_ops / elapsed:,.0f} inc/s ({args.threads} threads)"
+        )
+
+
+def load_series(series: int) -> None:
+    prometheus_metrics._reset_prometheus_metrics_state()
+    for n in range(series):
+        path = f"/api/bench/r{n // len(_STATUSES)}"
+        started, method, path = prometheus_metrics.start_http_request("GET", path)
+        prometheus_metrics.finish_http_request(
+            started, method, path, _STATUSES[n % len(_STATUSES)]
+        )
+
+
+def measure(label, fn, repeat) -> None:
+    latencies = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn())
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"scrape {label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f} bytes={size:,}"
+    )
+
+
+def bench_scrape(args) -> None:
+    load_series(args.series)
+    measure("text", prometheus_metrics.render_prometheus_metrics, args.repeat)
+    measure("openmetrics", prometheus_metrics.render_openmetrics_metrics, args.repeat)
+    prometheus_metrics.PROCESS_SAMPLE_INTERVAL_SECONDS = 0
+    measure(
+        "text, process re-sampled",
+        prometheus_metrics.render_prometheus_metrics,
+        args.repeat,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the metrics registry.")
+    parser.add_argument("--series", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--increments", type=int, default=200_000)
+    args = parser.parse_args()
+    bench_record(args)
+    bench_scrape(args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Benchmark observability overhead per LLM call and per tool call.
+
+Drives ``ObservableCompletions.create`` and ``ObservableToolManager.run_tool_async``
+against in-process fakes and reports the time added on top of the bare call for:
+
+- default:   OpenTelemetry (no SDK configured) + Prometheus, as SessionRuntime
+             builds them
+- audit:     default handlers plus an exporter-style handler that serializes
+             every event to JSON, run inline vs queued through the dispatcher
+- recording: default handlers with an OpenTelemetry SDK tracer provider and an
+             in-memory span exporter
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import sagents.observability.agent_runtime as agent_runtime  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.observability import (  # noqa: E402
+    InMemoryTraceHandler,
+    ObservabilityManager,
+    OpenTelemetryTraceHandler,
+    PrometheusTraceHandler,
+    TraceEvent,
+)
+
+
+class FakeCompletions:
+    class _Client:
+        base_url = "http://bench.local/v1"
+
+    _client = _Client()
+
+    def __init__(self, response):
+        self.response = response
+
+    async def create(self, **kwargs):
+        return self.response
+
+
+class FakeToolManager:
+    def get_tool(self, tool_name):
+        return None
+
+    async def run_tool_async(self, tool_name, session_id, user_id=None, **kwargs):
+        return {"status": "ok", "lines": ["match"] * 20}
+
+
+class JsonAuditHandler(InMemoryTraceHandler):
+    """Serializes every event, like a log/trace shipper would."""
+
+    def on_event_batch(self, events):
+        for event in events:
+            json.dumps(
+                {"name": event.name, "args": event.args, "kwargs": event.kwargs},
+                ensure_ascii=False,
+                default=str,
+            )
+
+
+class InlineJsonAuditHandler(JsonAuditHandler):
+    async_safe = False
+
+    def _record(self, name, args, kwargs):
+        self.on_event_batch([TraceEvent.capture(name, args, kwargs)])
+
+
+def build_messages(count, size):
+    return [
+        {"role": "user" if n % 2 else "assistant", "content": "x" * size}
+        for n in range(count)
+    ]
+
+
+async def time_calls(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def measure(label, manager, args, baseline=None):
+    messages = build_messages(args.messages, args.message_chars)
+    response = {"choices": [{"message": {"content": "y" * args.message_chars}}]}
+    completions = FakeCompletions(response)
+    tools = FakeToolManager()
+    if manager is not None:
+        llm = agent_runtime.ObservableCompletions(completions, manager)
+        tool = agent_runtime.ObservableToolManager(tools, manager, "bench-session")
+    else:
+        llm, tool = completions, tools
+
+    async def llm_call():
+        await llm.create(model="bench-model", messages=messages)
+
+    async def tool_call():
+        await tool.run_tool_async(
+            "grep", session_id="bench-session", pattern="x", path="/tmp"
+        )
+
+    results = {}
+    for name, fn in (("llm", llm_call), ("tool", tool_call)):
+        latencies = await time_calls(fn, args.repeat)
+        results[name] = percentile(latencies, 50)
+    if manager is not None and manager.dispatcher is not None:
+        manager.flush()
+    if baseline is None:
+        print(
+            f"{label}: llm p50_us={results['llm'] * 1e6:.1f} "
+            f"tool p50_us={results['tool'] * 1e6:.1f}"
+        )
+    else:
+        print(
+            f"{label}: llm overhead_us={(results['llm'] - baseline['llm']) * 1e6:.1f} "
+            f"tool overhead_us={(results['tool'] - baseline['tool']) * 1e6:.1f}"
+        )
+    return results
+
+
+def default_handlers():
+    handlers = []
+    if OpenTelemetryTraceHandler is not None:
+        handlers.append(OpenTelemetryTraceHandler(service_name="bench"))
+    handlers.append(PrometheusTraceHandler())
+    return handlers
+
+
+async def run(args):
+    agent_runtime._get_current_observability_session_id = lambda: "bench-session"
+    baseline = await measure("bare", None, args)
+    await measure("default", ObservabilityManager(default_handlers()), args, baseline)
+    await measure(
+        "audit inline",
+        ObservabilityManager(default_handlers() + [InlineJsonAuditHandler()]),
+        args,
+        baseline,
+    )
+    queued = ObservabilityManager(default_handlers() + [JsonAuditHandler()])
+    await measure("audit queued", queued, args, baseline)
+    print(f"dispatcher stats: {queued.dispatcher.stats}")
+
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+    except ImportError:
+        print("recording: skipped, opentelemetry-sdk not installed")
+        return
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(InMemorySpanExporter()))
+    trace.set_tracer_provider(provider)
+    await measure("recording", ObservabilityManager(default_handlers()), args, baseline)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark observability overhead.")
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--message-chars", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=2_000)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
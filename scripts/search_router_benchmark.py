@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Compare sequential provider fallback with the hedged SearchRouter.
+
+Both strategies run against the same fake providers (seeded latency and
+failure injection), so the reported p50/p95/p99 differences come only from
+the routing strategy.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.search.search_providers.base import (  # noqa: E402
+    BaseSearchProvider,
+    SearchResult,
+)
+from mcp_servers.search.search_router import SearchRouter, percentile  # noqa: E402
+from sagents.utils.logger import logger  # noqa: E402
+
+
+class SimulatedProvider(BaseSearchProvider):
+    rate_limit_per_second = 0.0
+
+    def __init__(self, name, base_latency, slow_latency, slow_ratio, fail_ratio, seed):
+        super().__init__("benchmark")
+        self.name = name
+        self.base_latency = base_latency
+        self.slow_latency = slow_latency
+        self.slow_ratio = slow_ratio
+        self.fail_ratio = fail_ratio
+        self._random = random.Random(seed)
+
+    async def search_web(self, query, count, time_range=""):
+        roll = self._random.random()
+        jitter = self._random.uniform(0.8, 1.2)
+        if roll < self.fail_ratio:
+            await asyncio.sleep(self.base_latency * jitter)
+            raise RuntimeError(f"{self.name} injected failure")
+        if roll < self.fail_ratio + self.slow_ratio:
+            await asyncio.sleep(self.slow_latency * jitter)
+        else:
+            await asyncio.sleep(self.base_latency * jitter)
+        return [SearchResult(title=query, url="https://bench.test", snippet="")]
+
+
+def _providers(args, seed):
+    return [
+        SimulatedProvider(
+            "primary",
+            args.primary_latency,
+            args.slow_latency,
+            args.slow_ratio,
+            args.fail_ratio,
+            seed,
+        ),
+        SimulatedProvider(
+            "secondary",
+            args.secondary_latency,
+            args.slow_latency,
+            args.slow_ratio / 2,
+            args.fail_ratio / 2,
+            seed + 1,
+        ),
+    ]
+
+
+async def _sequential(providers, query):
+    for provider in providers:
+        try:
+            results = await provider.search_web(query, 10)
+            if results:
+                return results
+        except Exception:
+            continue
+    return []
+
+
+async def _measure(run_one, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query):
+        async with semaphore:
+            started = time.perf_counter()
+            await run_one(query)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(query) for query in queries))
+    return latencies
+
+
+def _report(label, latencies):
+    for pct in (50, 95, 99):
+        print(f"{label}_p{pct}_ms={percentile(latencies, pct) * 1000:.1f}")
+    return percentile(latencies, 99)
+
+
+async def run_benchmark(args) -> int:
+    # The first log call lazily imports the session runtime; keep it out of timings.
+    logger.debug("search router benchmark")
+    queries = [f"query {i}" for i in range(args.queries)]
+
+    providers = _providers(args, args.seed)
+    sequential = await _measure(
+        lambda query: _sequential(providers, query), queries, args.concurrency
+    )
+
+    providers = _providers(args, args.seed)
+    router = SearchRouter(default_hedge_delay=args.slow_latency / 2)
+    hedged = await _measure(
+        lambda query: router.hedged_search(
+            providers, lambda provider: provider.search_web(query, 10)
+        ),
+        queries,
+        args.concurrency,
+    )
+
+    print(f"queries={args.queries}")
+    sequential_p99 = _report("sequential", sequential)
+    hedged_p99 = _report("hedged", hedged)
+    if hedged_p99 > 0:
+        print(f"p99_speedup={sequential_p99 / hedged_p99:.2f}x")
+    for name, stats in router.snapshot().items():
+        print(f"router_{name}={stats}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark tail latency of hedged multi-provider web search."
+    )
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--primary-latency", type=float, default=0.08)
+    parser.add_argument("--secondary-latency", type=float, default=0.12)
+    parser.add_argument(
+        "--slow-latency",
+        type=float,
+        default=0.8,
+        help="Latency of injected slow responses (seconds).",
+    )
+    parser.add_argument("--slow-ratio", type=float, default=0.04)
+    parser.add_argument("--fail-ratio", type=float, default=0.03)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    return asyncio.run(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark session logging throughput and event-loop lag.
+
+Runs many concurrent asyncio "sessions" that each write log records through
+the sagents logger into a filesystem session store, while a probe task
+measures how late ``asyncio.sleep`` wakes up. Compares:
+
+- sync:   the previous behaviour, one open/append/close per record on the
+          event-loop thread (``SAGE_SESSION_LOG_ASYNC=0``)
+- queued: records are queued and written in batches by the background
+          session log writer
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import sagents.session_runtime  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.storage.filesystem import _FilesystemSessionStore  # noqa: E402
+from sagents.utils import logger as logger_module  # noqa: E402
+
+
+def build_logger(root: Path, sessions, queued: bool):
+    store = _FilesystemSessionStore(str(root / "store"))
+    live = {}
+    for session_id in sessions:
+        workspace = root / "workspaces" / session_id
+        workspace.mkdir(parents=True)
+        store.bind_session_workspace(session_id, str(workspace))
+        live[session_id] = types.SimpleNamespace(
+            session_context=types.SimpleNamespace(storage=store),
+            status=types.SimpleNamespace(value="running"),
+        )
+    sagents.session_runtime.get_global_session_manager = lambda: types.SimpleNamespace(
+        get_live_session=live.get
+    )
+
+    logger_module.Logger._instance = None
+    logger_module.Logger._initialized = False
+    sage_logger = logger_module.Logger(log_dir=str(root / "main-logs"))
+    sage_logger.stop_periodic_cleanup()
+    # 只测会话日志：去掉主 logger 的控制台与文件处理器
+    logger_module.Logger._close_handlers(logging.getLogger("sage"))
+    if not queued:
+        sage_logger.session_log_writer = None
+    return sage_logger
+
+
+async def run_mode(args, queued: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        sessions = [f"bench-{n}" for n in range(args.sessions)]
+        sage_logger = build_logger(root, sessions, queued)
+        lags = []
+        stop = asyncio.Event()
+
+        async def probe():
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(args.probe_ms / 1000)
+                lags.append(time.perf_counter() - started - args.probe_ms / 1000)
+
+        async def session(session_id):
+            for n in range(args.records):
+                sage_logger.info(f"step {n} tool call finished", session_id=session_id)
+                if n % args.yield_every == 0:
+                    await asyncio.sleep(0)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(session(session_id) for session_id in sessions))
+        logged = time.perf_counter() - started
+        sage_logger.flush_session_logs()
+        durable = time.perf_counter() - started
+        stop.set()
+        await probe_task
+
+        total = args.sessions * args.records
+        lines = sum(
+            (root / "workspaces" / sid / f"session_{sid}.log")
+            .read_text(encoding="utf-8")
+            .count("\n")
+            for sid in sessions
+        )
+        label = "queued" if queued else "sync"
+        print(
+            f"{label}: {total / logged:,.0f} records/s on the loop, "
+            f"{total / durable:,.0f} records/s on disk ({lines} lines), "
+            f"loop lag p50_ms={percentile(lags, 50) * 1000:.2f} "
+            f"p99_ms={percentile(lags, 99) * 1000:.2f} "
+            f"max_ms={max(lags) * 1000:.2f}"
+        )
+        writer = sage_logger.session_log_writer
+        if writer is not None:
+            print(f"writer stats: {writer.stats}")
+        for session_id in sessions:
+            sage_logger.cleanup_session_logger(session_id)
+        sage_logger.flush_session_logs()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark session logging.")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--records", type=int, default=2_000)
+    parser.add_argument("--yield-every", type=int, default=1)
+    parser.add_argument("--probe-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    for queued in (False, True):
+        asyncio.run(run_mode(args, queued))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Benchmark skill rescans with and without the stat-based skill catalog.
+
+Creates a skill root plus an agent copy of every skill, then measures:
+
+- manager:     building an isolated SkillManager over the root (parses every
+               SKILL.md and renders every file tree), cold catalog vs warm
+- hash:        the old read-everything MD5 per skill vs SkillCatalog.file_hashes
+- need_update: ``_is_skill_need_update`` for every skill against its agent
+               copy, cold catalog vs warm
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.services.skill_service import _is_skill_need_update  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.skill.skill_catalog import get_skill_catalog  # noqa: E402
+from sagents.skill.skill_manager import SkillManager  # noqa: E402
+
+
+def populate(root: Path, args) -> None:
+    past = time.time() - 3600
+    body = os.urandom(args.file_kb * 1024)
+    for n in range(args.skills):
+        skill_dir = root / f"skill-{n}"
+        (skill_dir / "scripts").mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text(
+            f"---\nname: skill-{n}\ndescription: benchmark skill {n}\n"
+            f"tags: [bench, demo]\n---\n# Skill {n}\n\n" + "Usage notes.\n" * 50,
+            encoding="utf-8",
+        )
+        for m in range(args.files_per_skill):
+            (skill_dir / "scripts" / f"part-{m}.py").write_bytes(body)
+    for current, dirs, files in os.walk(root):
+        for name in dirs + files:
+            os.utime(os.path.join(current, name), (past, past))
+
+
+def legacy_skill_hash(skill_path: str) -> str:
+    """The previous ``_calculate_skill_hash``: read and hash every file."""
+    file_hashes = {}
+    for root, dirs, files in os.walk(skill_path):
+        dirs[:] = [
+            d
+            for d in dirs
+            if not d.startswith(".") and d not in ["__pycache__", "node_modules"]
+        ]
+        for file in sorted(files):
+            if file.startswith("."):
+                continue
+            file_path = os.path.join(root, file)
+            with open(file_path, "rb") as f:
+                file_hashes[os.path.relpath(file_path, skill_path)] = hashlib.md5(
+                    f.read()
+                ).hexdigest()
+    composite = "|".join(f"{p}:{h}" for p, h in sorted(file_hashes.items()))
+    return hashlib.md5(composite.encode("utf-8")).hexdigest()
+
+
+def measure(label, fn, repeat, cold=False):
+    latencies = []
+    for _ in range(repeat):
+        if cold:
+            get_skill_catalog().invalidate()
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+def run(args):
+    # _is_skill_need_update logs every comparison; keep the output readable
+    logger.remove()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "skills"
+        agent_root = Path(tmp) / "agent_skills"
+        started = time.perf_counter()
+        populate(root, args)
+        shutil.copytree(root, agent_root, copy_function=shutil.copy2)
+        print(f"populate: {args.skills} skills in {time.perf_counter() - started:.1f}s")
+        skill_paths = sorted(str(path) for path in root.iterdir())
+
+        def build_manager():
+            manager = SkillManager(skill_dirs=[str(root)], isolated=True)
+            assert len(manager.skills) == args.skills
+
+        measure("manager cold", build_manager, args.repeat, cold=True)
+        measure("manager warm", build_manager, args.repeat)
+
+        catalog = get_skill_catalog()
+        measure(
+            "hash legacy",
+            lambda: [legacy_skill_hash(path) for path in skill_paths],
+            args.repeat,
+        )
+        measure(
+            "hash catalog cold",
+            lambda: [catalog.file_hashes(path) for path in skill_paths],
+            args.repeat,
+            cold=True,
+        )
+        measure(
+            "hash catalog warm",
+            lambda: [catalog.file_hashes(path) for path in skill_paths],
+            args.repeat,
+        )
+
+        def need_update():
+            for path in skill_paths:
+                agent_path = agent_root / os.path.basename(path)
+                assert not _is_skill_need_update(path, str(agent_path))
+
+        measure("need_update cold", need_update, args.repeat, cold=True)
+        measure("need_update warm", need_update, args.repeat)
+        print(f"catalog stats: {catalog.stats}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark skill catalog rescans.")
+    parser.add_argument("--skills", type=int, default=1_000)
+    parser.add_argument("--files-per-skill", type=int, default=10)
+    parser.add_argument("--file-kb", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=5)
+    run(parser.parse_args())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Benchmark StreamManager replay memory with many concurrent long streams.
+
+Each simulated session streams assistant text deltas interleaved with the
+occasional tool call/result, the way a long agent run does. Streams are
+published round-robin so all sessions are live at once, then every session is
+resumed from a random offset.
+
+Modes:
+- legacy:  every chunk kept in an unbounded list (the previous ``history``)
+- replay:  StreamReplayBuffer with delta coalescing, memory caps and spill
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.services.stream_replay_buffer import ReplayBufferPool  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+
+def _chunk(rng, session, i):
+    if i % 200 == 199:
+        return (
+            json.dumps(
+                {
+                    "session_id": session,
+                    "message_id": f"{session}-tool-{i}",
+                    "role": "tool",
+                    "tool_call_id": f"call-{i}",
+                    "content": "x" * 400,
+                    "type": "tool_call_result",
+                    "timestamp": time.time(),
+                }
+            )
+            + "\n"
+        )
+    return (
+        json.dumps(
+            {
+                "session_id": session,
+                "message_id": f"{session}-msg-{i // 200}",
+                "role": "assistant",
+                "content": "token" * rng.randint(1, 4),
+                "type": "assistant_text",
+                "timestamp": time.time(),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+class LegacyHistory:
+    def __init__(self):
+        self.history = []
+
+    def append(self, chunk):
+        self.history.append(chunk)
+        return len(self.history) - 1
+
+    @property
+    def next_offset(self):
+        return len(self.history)
+
+    def read(self, offset, limit=256):
+        return [
+            (i + 1, self.history[i])
+            for i in range(offset, min(offset + limit, len(self.history)))
+        ]
+
+    def close(self):
+        self.history = []
+
+
+def run_mode(mode, args):
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ReplayBufferPool(
+            max_total_bytes=args.total_mb * 1024 * 1024,
+            session_max_bytes=args.session_kb * 1024,
+            spill_dir=tmp,
+            spill_max_bytes=args.spill_mb * 1024 * 1024,
+        )
+        tracemalloc.start()
+        if mode == "legacy":
+            buffers = [LegacyHistory() for _ in range(args.sessions)]
+        else:
+            buffers = [pool.create(f"s{i}") for i in range(args.sessions)]
+
+        started = time.perf_counter()
+        for i in range(args.chunks):
+            for index, buffer in enumerate(buffers):
+                buffer.append(_chunk(rng, f"s{index}", i))
+        publish_elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        resume_latencies = []
+        replayed_chunks = 0
+        for buffer in buffers:
+            cursor = rng.randrange(buffer.next_offset)
+            started = time.perf_counter()
+            while cursor < buffer.next_offset:
+                items = buffer.read(cursor)
+                if not items:
+                    break
+                replayed_chunks += len(items)
+                cursor = items[-1][0]
+            resume_latencies.append(time.perf_counter() - started)
+
+        spilled = sum(getattr(buffer, "spilled_bytes", 0) for buffer in buffers)
+        for buffer in buffers:
+            buffer.close()
+
+        total = args.sessions * args.chunks
+        print(
+            f"{mode}: sessions={args.sessions} chunks/session={args.chunks} "
+            f"publish={total / publish_elapsed:.0f} chunks/s "
+            f"heap_now_mb={current / 1e6:.1f} heap_peak_mb={peak / 1e6:.1f} "
+            f"spilled_mb={spilled / 1e6:.1f} replayed_lines={replayed_chunks} "
+            f"resume_p50_ms={percentile(resume_latencies, 50) * 1000:.2f} "
+            f"resume_p99_ms={percentile(resume_latencies, 99) * 1000:.2f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark stream replay memory for concurrent long streams."
+    )
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=5000, help="chunks per session")
+    parser.add_argument("--session-kb", type=int, default=256)
+    parser.add_argument("--total-mb", type=int, default=32)
+    parser.add_argument("--spill-mb", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "replay"])
+    args = parser.parse_args()
+    for mode in args.modes:
+        run_mode(mode, args)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
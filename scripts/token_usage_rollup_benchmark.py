@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Benchmark token usage statistics over raw rows vs hourly/daily rollups.
+
+Fills ``token_usage`` with synthetic executions spread over several months
+(each session is a burst of runs a few minutes apart),
+measures ``TokenUsageDao.get_stats`` on the raw table, compacts the rows into
+the rollup tables and measures the same queries again:
+
+- raw:    no watermark yet, every query aggregates ``token_usage`` directly
+- rollup: full days/hours come from the rollup tables, edges from raw rows
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from sqlalchemy import insert  # noqa: E402
+
+from common.core.client.db import SessionManager, register_db_getter  # noqa: E402
+from common.models.base import Base  # noqa: E402
+from common.models.token_usage import TokenUsage, TokenUsageDao  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+END = datetime(2026, 6, 30)
+
+
+def executions(args):
+    """Sessions start uniformly over the period; each one is a burst of runs."""
+    rng = random.Random(args.seed)
+    start = END - timedelta(days=args.days)
+    span = int((END - start).total_seconds())
+    n = 0
+    session = 0
+    while n < args.rows:
+        finished_at = start + timedelta(seconds=rng.randrange(span))
+        for _ in range(max(1, int(rng.expovariate(1 / args.runs_per_session)))):
+            finished_at += timedelta(seconds=rng.expovariate(1 / 300))
+            yield n, session, finished_at, rng
+            n += 1
+            if n >= args.rows:
+                return
+        session += 1
+
+
+async def populate(manager, args):
+    batch = []
+    users = args.users
+    agents = args.agents
+    for n, session, finished_at, rng in executions(args):
+        total = rng.randrange(200, 8000)
+        batch.append(
+            {
+                "id": f"u{n}",
+                "session_id": f"s{session}",
+                "user_id": f"user{session % users}",
+                "agent_id": f"agent{session % agents}",
+                "request_source": "api/chat" if session % 3 else "api/web-stream",
+                "input_tokens": total * 3 // 4,
+                "output_tokens": total // 4,
+                "total_tokens": total,
+                "cached_tokens": 0,
+                "reasoning_tokens": 0,
+                "prompt_audio_tokens": 0,
+                "completion_audio_tokens": 0,
+                "step_count": rng.randrange(1, 6),
+                "step_model_names": "{}",
+                "started_at": finished_at - timedelta(seconds=30),
+                "finished_at": finished_at,
+                "created_at": finished_at,
+            }
+        )
+        if len(batch) == 50_000:
+            async with manager.get_session() as session:
+                await session.execute(insert(TokenUsage), batch)
+            batch = []
+    if batch:
+        async with manager.get_session() as session:
+            await session.execute(insert(TokenUsage), batch)
+
+
+def queries(args):
+    month_ago = END - timedelta(days=30)
+    return [
+        ("agent all-time", {"dimension": "agent"}),
+        (
+            "user 30d",
+            {
+                "dimension": "user",
+                "start_time": month_ago,
+                "end_time": END - timedelta(microseconds=1),
+            },
+        ),
+        (
+            "agent 30d ragged",
+            {
+                "dimension": "agent",
+                "start_time": month_ago + timedelta(hours=5, minutes=17),
+                "end_time": END - timedelta(hours=2, minutes=43),
+            },
+        ),
+        (
+            "one user 90d",
+            {
+                "dimension": "session",
+                "user_id": "user7",
+                "start_time": END - timedelta(days=90),
+            },
+        ),
+    ]
+
+
+async def measure(label, dao, args):
+    for name, query in queries(args):
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            await dao.get_stats(**query)
+            latencies.append(time.perf_counter() - started)
+        print(
+            f"{label} {name}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+            f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+        )
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager(
+            SimpleNamespace(db_type="file", db_file=str(Path(tmp) / "bench.db"))
+        )
+        await manager.init_conn()
+
+        async def get_db():
+            return manager
+
+        register_db_getter(get_db)
+        async with manager._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        started = time.perf_counter()
+        await populate(manager, args)
+        print(f"populate: {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        dao = TokenUsageDao()
+        await measure("raw", dao, args)
+
+        started = time.perf_counter()
+        compacted = await dao.compact_rollups(now=END + timedelta(hours=1))
+        elapsed = time.perf_counter() - started
+        print(
+            f"compact: {compacted} rows in {elapsed:.1f}s ({compacted / elapsed:.0f}/s)"
+        )
+        await measure("rollup", dao, args)
+        register_db_getter(None)
+        await manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark token usage stats over rollups."
+    )
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--runs-per-session", type=float, default=20)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Offline evaluation of the local tool pre-ranker on recorded sessions.
+
+Replays every user turn found in ``--session-root``: the query is the user's
+text, the ground truth is the set of tools the agent then called in that turn
+(baseline execution tools and ``complete_task`` are left out because tool
+suggestion always passes them through). Co-usage statistics are learned from
+every other session (leave-one-out).
+
+Reports recall@k of the ranked list, and for the confidence-gated mode how
+many tool-suggestion LLM calls would have been skipped and the recall of the
+local pick on those turns.
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from sagents.context.messages.message import MessageChunk, MessageRole  # noqa: E402
+from sagents.storage import create_session_store  # noqa: E402
+from sagents.tool.tool_baseline import BASELINE_EXECUTION_TOOLS  # noqa: E402
+from sagents.tool.tool_ranker import ToolCoUsageStats, ToolRanker  # noqa: E402
+
+
+_ALWAYS_PASSED = set(BASELINE_EXECUTION_TOOLS) | {"complete_task"}
+
+
+def load_turns(store, session_id):
+    """[(query, tools used before this turn, tools called in this turn)]"""
+    turns = []
+    used = []
+    for record in store.load_message_ledger(session_id).messages:
+        try:
+            message = MessageChunk.from_dict(record)
+        except Exception:
+            continue
+        if message.is_user_input_message():
+            content = message.get_content()
+            query = content if isinstance(content, str) else json.dumps(content)
+            turns.append((query, list(used), set()))
+        elif message.role == MessageRole.ASSISTANT.value and turns:
+            for tool_call in message.tool_calls or []:
+                name = (tool_call.get("function") or {}).get("name")
+                if name:
+                    turns[-1][2].add(name)
+                    used.append(name)
+    return [
+        (query, before, called - _ALWAYS_PASSED)
+        for query, before, called in turns
+        if called - _ALWAYS_PASSED
+    ]
+
+
+def load_tool_specs(args):
+    if args.tools:
+        return json.loads(Path(args.tools).read_text(encoding="utf-8"))
+    from sagents.tool.tool_manager import ToolManager
+
+    return ToolManager().get_openai_tools(lang=args.lang)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the local tool ranker.")
+    parser.add_argument("--session-root", required=True)
+    parser.add_argument("--tools", help="JSON file with OpenAI tool specs")
+    parser.add_argument("--lang", default="zh")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--top-k", type=int, default=8, help="gated mode cap")
+    parser.add_argument("--limit", type=int, default=0, help="max sessions")
+    args = parser.parse_args()
+    logging.getLogger("sage").setLevel(logging.WARNING)
+
+    store = create_session_store(session_root=args.session_root)
+    session_ids = list(store.list_sessions())
+    if args.limit:
+        session_ids = session_ids[-args.limit :]
+    sessions = {session_id: load_turns(store, session_id) for session_id in session_ids}
+
+    stats = ToolCoUsageStats(max_sessions=len(sessions) + 1)
+    for session_id, turns in sessions.items():
+        stats.update(session_id, {name: 1 for *_, called in turns for name in called})
+    ranker = ToolRanker(load_tool_specs(args), co_usage=stats)
+
+    recall = {k: 0.0 for k in args.k}
+    total = saved = 0
+    gated_recall = 0.0
+    for session_id, turns in sessions.items():
+        own = {name: 1 for *_, called in turns for name in called}
+        stats.update(session_id, {})
+        for query, before, called in turns:
+            total += 1
+            ranked = [name for name, _, _ in ranker.rank(query, before)]
+            for k in args.k:
+                recall[k] += len(called & set(ranked[:k])) / len(called)
+            selected, confident = ranker.select(query, before, top_k=args.top_k)
+            if confident:
+                saved += 1
+                gated_recall += len(called & set(selected)) / len(called)
+        stats.update(session_id, own)
+
+    print(f"sessions={len(sessions)} turns={total}")
+    if not total:
+        return 0
+    for k in args.k:
+        print(f"recall@{k}: {recall[k] / total:.3f}")
+    print(
+        f"gated: llm_calls_saved={saved}/{total} ({saved / total:.1%}) "
+        f"recall_on_saved={gated_recall / saved if saved else 0.0:.3f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
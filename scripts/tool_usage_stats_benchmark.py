@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Benchmark agent tool usage statistics.
+
+Creates conversations with a ``tools_usage.json`` in each session directory,
+backfills the ``tool_usage`` table from those files, then compares:
+
+- files:   load the agent's recent conversations and read every
+           ``tools_usage.json``, as the usage-stats endpoint did before
+- indexed: ToolUsageDao.get_usage_stats, one aggregation over ``tool_usage``
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.core.client.db import SessionManager, register_db_getter  # noqa: E402
+from common.models.base import Base, get_local_now  # noqa: E402
+from common.models.conversation import Conversation, ConversationDao  # noqa: E402
+from common.models.tool_usage import ToolUsageDao  # noqa: E402
+from common.services.conversation_service import backfill_tool_usage  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.storage import create_session_store  # noqa: E402
+
+TOOLS = [f"tool_{n}" for n in range(60)]
+
+
+async def populate(storage, args):
+    rng = random.Random(args.seed)
+    now = get_local_now()
+    batch = []
+    for n in range(args.conversations):
+        session_id = f"session-{n}"
+        conversation = Conversation(
+            user_id=f"user-{n % args.users}",
+            session_id=session_id,
+            agent_id=f"agent-{n % args.agents}",
+            agent_name="Agent",
+            title=f"conversation {n}",
+            messages=[],
+        )
+        conversation.updated_at = now - timedelta(days=rng.uniform(0, args.days))
+        batch.append(conversation)
+        usage = {
+            tool: rng.randint(1, 20)
+            for tool in rng.sample(TOOLS, rng.randint(0, args.tools_per_session))
+        }
+        await asyncio.to_thread(storage.save_tools_usage, session_id, usage)
+        if len(batch) == 1000:
+            await ConversationDao().batch_insert(batch)
+            batch = []
+    if batch:
+        await ConversationDao().batch_insert(batch)
+
+
+def _read_files(conversations, storage):
+    usage = Counter()
+    for conversation in conversations:
+        for tool_name, count in storage.load_tools_usage(
+            conversation.session_id
+        ).items():
+            usage[tool_name] += int(count or 0)
+    return dict(usage)
+
+
+async def stats_from_files(storage, days, agent_id):
+    conversations = await ConversationDao().get_recent_conversations(
+        updated_after=get_local_now() - timedelta(days=days),
+        agent_id=agent_id,
+    )
+    return await asyncio.to_thread(_read_files, conversations, storage)
+
+
+async def stats_indexed(days, agent_id, top_n=None):
+    return await ToolUsageDao().get_usage_stats(
+        updated_after=get_local_now() - timedelta(days=days),
+        agent_id=agent_id,
+        limit=top_n,
+    )
+
+
+async def measure(label, fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = SessionManager(
+            SimpleNamespace(db_type="file", db_file=str(Path(tmp) / "bench.db"))
+        )
+        await manager.init_conn()
+
+        async def get_db():
+            return manager
+
+        register_db_getter(get_db)
+        async with manager._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        storage = create_session_store(session_root=str(Path(tmp) / "sessions"))
+
+        started = time.perf_counter()
+        await populate(storage, args)
+        print(
+            f"populate: {args.conversations} conversations in "
+            f"{time.perf_counter() - started:.1f}s"
+        )
+
+        started = time.perf_counter()
+        synced = await backfill_tool_usage(storage, batch_size=500)
+        elapsed = time.perf_counter() - started
+        print(
+            f"backfill: {synced} sessions in {elapsed:.1f}s ({synced / elapsed:.0f}/s)"
+        )
+
+        for days in (7, args.days):
+            expected = await stats_from_files(storage, days, "agent-0")
+            assert await stats_indexed(days, "agent-0") == expected
+            await measure(
+                f"files {days}d",
+                lambda: stats_from_files(storage, days, "agent-0"),
+                args.repeat,
+            )
+            await measure(
+                f"indexed {days}d",
+                lambda: stats_indexed(days, "agent-0"),
+                args.repeat,
+            )
+            await measure(
+                f"indexed {days}d top10",
+                lambda: stats_indexed(days, "agent-0", top_n=10),
+                args.repeat,
+            )
+        register_db_getter(None)
+        await manager.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark tool usage stats.")
+    parser.add_argument("--conversations", type=int, default=5_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--agents", type=int, default=2)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--tools-per-session", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
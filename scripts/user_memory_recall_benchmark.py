@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Benchmark the per-turn cost of loading system-level user memories.
+
+Every turn calls ``UserMemoryManager.get_system_memories`` against a simulated
+memory backend whose ``recall_by_type`` takes ``--latency`` seconds (roughly a
+tool / MCP round trip). Every ``--write-every`` turns the user's memory is
+updated, which invalidates the cache. Compares the uncached path with the
+generation-versioned recall cache, optionally prefetched at session start.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from mcp_servers.search.search_router import percentile  # noqa: E402
+from sagents.context.user_memory import (  # noqa: E402
+    IMemoryDriver,
+    MemoryEntry,
+    MemoryType,
+    UserMemoryManager,
+    UserMemoryRecallCache,
+)
+
+
+class SimulatedDriver(IMemoryDriver):
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.memories = {
+            f"{kind}-{n}": (kind, f"{kind} memory {n}")
+            for kind in ("preference", "requirement", "persona", "constraint")
+            for n in range(3)
+        }
+
+    def is_available(self):
+        return True
+
+    async def remember(
+        self,
+        user_id,
+        memory_key,
+        content,
+        memory_type,
+        tags,
+        session_id=None,
+        session_context=None,
+    ):
+        await asyncio.sleep(self.latency)
+        self.memories[memory_key] = (memory_type, content)
+        return "ok"
+
+    async def recall(
+        self, user_id, query, limit, session_id=None, session_context=None
+    ):
+        return []
+
+    async def recall_by_type(
+        self, user_id, memory_type, query, limit, session_id=None, session_context=None
+    ):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [
+            MemoryEntry(key=key, content=content, memory_type=MemoryType(kind))
+            for key, (kind, content) in self.memories.items()
+            if kind == memory_type
+        ][:limit]
+
+    async def forget(self, user_id, memory_key, session_id=None, session_context=None):
+        self.memories.pop(memory_key, None)
+        return "ok"
+
+
+async def run_mode(
+    args, name: str, cache: UserMemoryRecallCache, prefetch: bool
+) -> None:
+    driver = SimulatedDriver(args.latency)
+    manager = UserMemoryManager(
+        tempfile.gettempdir(), driver=driver, recall_cache=cache
+    )
+    if prefetch:
+        # session start: prefetch runs while the user is still typing
+        await manager.prefetch_system_memories("bench-user")
+    samples = []
+    for turn in range(args.turns):
+        if args.write_every and turn and turn % args.write_every == 0:
+            await manager.remember(
+                "bench-user", f"note-{turn}", "updated", memory_type="preference"
+            )
+        started = time.perf_counter()
+        await manager.get_system_memories("bench-user")
+        samples.append(time.perf_counter() - started)
+    print(
+        f"{name}: backend_calls={driver.calls} "
+        f"mean_ms={sum(samples) / len(samples) * 1000:.2f} "
+        f"p50_ms={percentile(samples, 50) * 1000:.2f} "
+        f"p99_ms={percentile(samples, 99) * 1000:.2f}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark user memory recall per turn."
+    )
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--write-every", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("sage").setLevel(logging.WARNING)
+
+    modes = (
+        ("uncached", UserMemoryRecallCache(ttl=0, negative_ttl=0), False),
+        ("cached", UserMemoryRecallCache(), False),
+        ("cached+prefetch", UserMemoryRecallCache(), True),
+    )
+    for name, cache, prefetch in modes:
+        asyncio.run(run_mode(args, name, cache, prefetch))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Benchmark workspace listing and content hashing.
+
+Generates a workspace of small files spread over nested directories, then
+compares:
+
+- full:    ``list_workspace_files``, a full ``os.walk`` + ``stat`` per call
+- paged:   ``list_workspace_entries`` first page (cold index, then warm),
+           for direct children and an unlimited-depth listing
+- hashing: ``stat_workspace_files(include_content_hash=True)`` over larger
+           files with a cold hash cache vs a warm one
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.services import agent_service  # noqa: E402
+from common.services.workspace_index import get_workspace_index  # noqa: E402
+from mcp_servers.search.search_router import percentile  # noqa: E402
+
+
+def populate(root: Path, args):
+    rng = random.Random(args.seed)
+    paths = []
+    past = time.time() - 3600
+    for n in range(args.files):
+        folder = root / f"dir-{n % args.dirs}" / f"sub-{n % 7}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"file-{n}.txt"
+        path.write_bytes(os.urandom(rng.randint(1, args.max_kb) * 1024))
+        os.utime(path, (past, past))
+        paths.append(str(path.relative_to(root)))
+    hashed = []
+    for n in range(args.hash_files):
+        path = root / "hashed" / f"blob-{n}.bin"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(os.urandom(args.hash_kb * 1024))
+        os.utime(path, (past, past))
+        hashed.append(str(path.relative_to(root)))
+    for current, dirs, _ in os.walk(root, topdown=False):
+        for name in dirs:
+            os.utime(os.path.join(current, name), (past, past))
+    os.utime(root, (past, past))
+    return paths, hashed
+
+
+def measure(label, fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    print(
+        f"{label}: p50_ms={percentile(latencies, 50) * 1000:.1f} "
+        f"p99_ms={percentile(latencies, 99) * 1000:.1f}"
+    )
+
+
+def run(args):
+    index = get_workspace_index()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "workspace"
+        started = time.perf_counter()
+        paths, sample = populate(root, args)
+        print(f"populate: {len(paths)} files in {time.perf_counter() - started:.1f}s")
+
+        measure(
+            "full list_workspace_files",
+            lambda: agent_service.list_workspace_files(root, "bench"),
+            args.repeat,
+        )
+        measure(
+            "full list_workspace_files depth 0",
+            lambda: agent_service.list_workspace_files(root, "bench", max_depth=0),
+            args.repeat,
+        )
+        for label, options in (
+            ("depth 0", {"max_depth": 0}),
+            ("unlimited name", {"max_depth": None}),
+            (
+                "unlimited size desc",
+                {"max_depth": None, "sort_by": "size", "order": "desc"},
+            ),
+        ):
+            index.clear()
+            measure(
+                f"paged {label} cold",
+                lambda: agent_service.list_workspace_entries(root, "bench", **options),
+                1,
+            )
+            measure(
+                f"paged {label} warm",
+                lambda: agent_service.list_workspace_entries(root, "bench", **options),
+                args.repeat,
+            )
+
+        index.clear()
+        measure(
+            f"hash {args.hash_files} files cold",
+            lambda: agent_service.stat_workspace_files(root, sample, True),
+            1,
+        )
+        measure(
+            f"hash {args.hash_files} files warm",
+            lambda: agent_service.stat_workspace_files(root, sample, True),
+            args.repeat,
+        )
+        print(f"index stats: {index.stats}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark workspace listing.")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--max-kb", type=int, default=4)
+    parser.add_argument("--hash-files", type=int, default=500)
+    parser.add_argument("--hash-kb", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Benchmark workspace folder downloads: temp-file zip vs streaming zip.
+
+Generates a workspace mixing compressible text files and already-compressed
+media files, then measures time-to-first-byte and total time for:
+
+- tempfile: build the whole archive with ``zipfile`` in a temporary file and
+            read it back, as ``prepare_workspace_download`` did before
+- stream:   ``aiter_zip_stream`` (auto mode: media stored, text deflated)
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from common.utils.zip_stream import aiter_zip_stream  # noqa: E402
+
+READ_CHUNK = 1024 * 1024
+
+
+def populate(root: Path, args) -> int:
+    total = 0
+    target = int(args.size_gb * 1024**3)
+    file_bytes = args.file_mb * 1024 * 1024
+    line = b"2026-06-30 12:00:00 INFO request handled in 12ms status=200\n"
+    text_block = line * (file_bytes // len(line))
+    n = 0
+    while total < target:
+        media = n % 10 < args.media_ratio * 10
+        folder = root / ("media" if media else "logs") / f"part-{n // 100}"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / (f"clip-{n}.mp4" if media else f"app-{n}.log")
+        with open(path, "wb") as stream:
+            if media:
+                for _ in range(file_bytes // READ_CHUNK):
+                    stream.write(os.urandom(READ_CHUNK))
+            else:
+                stream.write(text_block)
+        total += path.stat().st_size
+        n += 1
+    return total
+
+
+def tempfile_download(root: Path, first_byte):
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, "workspace.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for current, _, files in os.walk(root):
+                for file in files:
+                    file_abs_path = os.path.join(current, file)
+                    zipf.write(file_abs_path, os.path.relpath(file_abs_path, root))
+        size = 0
+        with open(zip_path, "rb") as stream:
+            while chunk := stream.read(READ_CHUNK):
+                if not size:
+                    first_byte()
+                size += len(chunk)
+        return size
+
+
+async def stream_download(root: Path, first_byte):
+    size = 0
+    async for chunk in aiter_zip_stream(str(root)):
+        if not size:
+            first_byte()
+        size += len(chunk)
+    return size
+
+
+async def measure(label, fn, root):
+    started = time.perf_counter()
+    ttfb = []
+
+    def first_byte():
+        ttfb.append(time.perf_counter() - started)
+
+    result = fn(root, first_byte)
+    size = await result if asyncio.iscoroutine(result) else result
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label}: ttfb_ms={ttfb[0] * 1000:.1f} total_s={elapsed:.1f} "
+        f"archive_mb={size / 1024**2:.0f} mb_per_s={size / 1024**2 / elapsed:.0f}"
+    )
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "workspace"
+        started = time.perf_counter()
+        total = populate(root, args)
+        print(
+            f"populate: {total / 1024**3:.2f} GB in {time.perf_counter() - started:.1f}s"
+        )
+        await measure("stream", stream_download, root)
+        if not args.skip_tempfile:
+            await measure(
+                "tempfile",
+                lambda root, first_byte: asyncio.to_thread(
+                    tempfile_download, root, first_byte
+                ),
+                root,
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark workspace zip download.")
+    parser.add_argument("--size-gb", type=float, default=5)
+    parser.add_argument("--file-mb", type=int, default=64)
+    parser.add_argument("--media-ratio", type=float, default=0.7)
+    parser.add_argument("--skip-tempfile", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.desktop.core.routers import agent as agent_module
+from common.core.exceptions import SageHTTPException
+from common.services.agent_service import prepare_workspace_download
+
+
+def _request(file_path, headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/agent/a1/file_workspace/stream",
+            "query_string": f"file_path={file_path}".encode(),
+            "headers": [
+                (key.lower().encode(), value.encode())
+                for key, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+async def _body(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.fixture
+def workspace(monkeypatch, tmp_path):
+    (tmp_path / "clip.mp4").write_bytes(b"0123456789")
+    (tmp_path / "folder").mkdir()
+
+    async def download(agent_id, file_path):
+        return prepare_workspace_download(tmp_path, file_path)
+
+    monkeypatch.setattr(
+        agent_module.agent_service, "download_desktop_agent_file", download
+    )
+    return tmp_path
+
+
+def test_stream_file_serves_whole_files_and_ranges(workspace):
+    async def run():
+        full = await agent_module.stream_file("a1", _request("clip.mp4"))
+        ranged = await agent_module.stream_file(
+            "a1", _request("clip.mp4", {"Range": "bytes=2-5"})
+        )
+        return full, await _body(full), ranged, await _body(ranged)
+
+    full, full_body, ranged, ranged_body = asyncio.run(run())
+
+    assert full.status_code == 200
+    assert full.media_type == "video/mp4"
+    assert full_body == b"0123456789"
+    assert ranged.status_code == 206
+    assert ranged.headers["content-range"] == "bytes 2-5/10"
+    assert ranged_body == b"2345"
+
+
+def test_stream_file_rejects_directories(workspace):
+    with pytest.raises(SageHTTPException) as exc_info:
+        asyncio.run(agent_module.stream_file("a1", _request("folder")))
+
+    assert exc_info.value.status_code == 400
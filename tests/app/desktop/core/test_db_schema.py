@@ -40,3 +40,33 @@ def test_sync_database_schema_adds_missing_and_drops_unused_sqlite_columns():
         columns = {col["name"] for col in inspect(conn).get_columns("agent_configs")}
         assert "is_default" in columns
         assert "legacy_prompt" not in columns
+
+
+def test_sync_database_schema_adds_listing_columns_and_indexes_to_conversations():
+    engine = create_engine("sqlite:///:memory:")
+
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                CREATE TABLE conversations (
+                    session_id VARCHAR(255) PRIMARY KEY,
+                    user_id VARCHAR(255) NOT NULL,
+                    agent_id VARCHAR(255) NOT NULL,
+                    agent_name TEXT NOT NULL,
+                    title VARCHAR(255) NOT NULL,
+                    messages JSON NOT NULL,
+                    created_at DATETIME NOT NULL,
+                    updated_at DATETIME NOT NULL
+                )
+                """
+            )
+        )
+
+        sync_database_schema(conn)
+
+        inspector = inspect(conn)
+        columns = {col["name"] for col in inspector.get_columns("conversations")}
+        assert {"message_count", "last_message_preview", "total_tokens"} <= columns
+        indexes = {index["name"] for index in inspector.get_indexes("conversations")}
+        assert "idx_conversations_user_updated_at" in indexes
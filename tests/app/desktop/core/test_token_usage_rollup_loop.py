@@ -0,0 +1,31 @@
+import asyncio
+
+from app.desktop.core import lifecycle
+from common.models import token_usage
+
+
+class _FlakyDao:
+    def __init__(self):
+        self.calls = 0
+
+    async def compact_rollups(self):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("database is locked")
+        return 3
+
+
+async def test_desktop_rollup_loop_keeps_compacting_after_errors(monkeypatch):
+    dao = _FlakyDao()
+    monkeypatch.setattr(token_usage, "TokenUsageDao", lambda: dao)
+
+    task = asyncio.create_task(lifecycle._token_usage_rollup_loop(0.01))
+    while dao.calls < 3:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+    assert task.cancelled()
@@ -1,11 +1,13 @@
 import asyncio
 import hashlib
+import time
 
 from app.server.core.middleware import (
     _is_whitelisted,
     _should_record_prometheus_http_metrics,
 )
 from app.server.routers.observability import prometheus_metrics
+from app.server.services import prometheus_metrics as prometheus_metrics_module
 from app.server.services.prometheus_metrics import (
     _reset_prometheus_metrics_state,
     finish_http_request,
@@ -182,3 +184,39 @@ def test_prometheus_sse_failures_include_session_drilldown_only_for_failure_stat
     assert 'session_id="session-2"' in body
     assert 'session_id="session-3"' in body
     assert 'session_id="session-4"' not in body
+
+
+def test_prometheus_metrics_route_negotiates_openmetrics_with_exemplars():
+    reset_prometheus_trace_metrics()
+    handler = PrometheusTraceHandler()
+    handler.on_llm_start("session-1", "demo-model", [])
+    handler.on_llm_end("ok", first_token_at=time.perf_counter(), output_tokens=20)
+
+    response = asyncio.run(
+        prometheus_metrics(accept="application/openmetrics-text; version=1.0.0")
+    )
+    body = response.body.decode()
+    trace_id = hashlib.md5(b"session-1").hexdigest()
+
+    assert response.media_type.startswith("application/openmetrics-text")  # pyright: ignore[reportOptionalMemberAccess]
+    assert 'sagents_llm_calls_total{model="demo-model",status="success"} 1' in body
+    assert (
+        'sagents_llm_time_to_first_token_seconds_bucket{model="demo-model",le="' in body
+    )
+    assert f'# {{trace_id="{trace_id}"}}' in body
+    assert 'sagents_llm_output_tokens_per_second_count{model="demo-model"} 1' in body
+    assert body.endswith("# EOF\n")
+
+
+def test_prometheus_process_metrics_are_sampled_on_an_interval(monkeypatch):
+    _reset_prometheus_metrics_state()
+    calls = []
+    monkeypatch.setattr(
+        prometheus_metrics_module, "_open_fds", lambda: calls.append(1) or 7
+    )
+
+    render_prometheus_metrics()
+    body = render_prometheus_metrics()
+
+    assert len(calls) == 1
+    assert "sage_server_process_open_fds 7.000000" in body
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.server.routers import observability
+from common.core.exceptions import SageHTTPException
+from sagents.storage import create_session_store
+
+
+def _request():
+    return SimpleNamespace(state=SimpleNamespace(user_claims={"userid": "u1"}))
+
+
+def test_session_turn_timings_requires_admin_and_reads_storage(monkeypatch, tmp_path):
+    store = create_session_store(session_root=str(tmp_path))
+    store.register_session("s1", store.create_session_workspace("s1"))
+    store.append_turn_timing("s1", {"request_id": "req_1", "duration_ms": 12.5})
+    monkeypatch.setattr(
+        "sagents.session_runtime.get_global_session_manager",
+        lambda: SimpleNamespace(storage=store),
+    )
+
+    def user_with_role(role):
+        async def _get_user(request):
+            return SimpleNamespace(role=role, user_id="u1", username="u1")
+
+        monkeypatch.setattr(observability, "_get_current_user", _get_user)
+
+    user_with_role("user")
+    with pytest.raises(SageHTTPException) as excinfo:
+        asyncio.run(observability.session_turn_timings(_request(), "s1"))
+    assert excinfo.value.status_code == 403
+
+    user_with_role("admin")
+    response = asyncio.run(observability.session_turn_timings(_request(), "s1"))
+    assert response.data["session_id"] == "s1"
+    assert response.data["turns"] == [{"request_id": "req_1", "duration_ms": 12.5}]
+
+    with pytest.raises(SageHTTPException) as excinfo:
+        asyncio.run(observability.session_turn_timings(_request(), "bad/id"))
+    assert excinfo.value.status_code == 400
@@ -1,10 +1,12 @@
 from types import SimpleNamespace
 
 import pytest
+from sqlalchemy import update
 
 from common.core.client.db import SessionManager, register_db_getter
-from common.models.base import Base
-from common.models.conversation import ConversationDao
+from common.models.base import Base, get_local_now
+from common.models.conversation import Conversation, ConversationDao
+from common.models.token_usage import TokenUsage
 from common.services import conversation_service
 
 
@@ -118,3 +120,110 @@ async def test_conversation_list_can_skip_message_counts_without_loading_message
     assert result["list"][0]["message_count"] == 0
     assert result["list"][0]["user_count"] == 0
     assert result["list"][0]["agent_count"] == 0
+
+
+async def _save(dao, session_id, messages):
+    await dao.save_conversation(
+        user_id="user-1",
+        session_id=session_id,
+        agent_id="agent-1",
+        agent_name="Agent One",
+        title=session_id,
+        messages=messages,
+    )
+
+
+async def _list(dao, **kwargs):
+    conversations, _ = await dao.get_conversations_paginated(
+        user_id="user-1", include_messages=False, **kwargs
+    )
+    return {conversation.session_id: conversation for conversation in conversations}
+
+
+@pytest.mark.asyncio
+async def test_listing_projection_is_maintained_on_write(conversation_db, monkeypatch):
+    monkeypatch.setattr(conversation_service, "_build_session_trace_id", lambda _: None)
+    monkeypatch.setattr(
+        conversation_service, "_build_session_trace_url", lambda _: None
+    )
+    dao = ConversationDao()
+    await _save(dao, "session_a", [{"role": "user", "content": "hello"}])
+    await dao.update_conversation_messages(
+        "session_a",
+        [
+            {"role": "user", "content": "hello"},
+            {"role": "assistant", "content": "x" * 2000, "type": "assistant_text"},
+            {"role": "tool", "content": ""},
+        ],
+    )
+    await dao.add_total_tokens("session_a", 120)
+    await dao.add_total_tokens("session_a", 30)
+
+    conversation = (await _list(dao))["session_a"]
+    assert "messages" not in conversation.__dict__
+    assert conversation.get_message_count() == {"user_count": 1, "agent_count": 1}
+    assert conversation.message_count == 2
+    assert conversation.last_message_preview["role"] == "assistant"
+    assert conversation.last_message_preview["type"] == "assistant_text"
+    assert len(conversation.last_message_preview["content"]) == 500
+    assert conversation.total_tokens == 150
+    assert conversation.last_activity_at is not None
+
+    result = conversation_service.build_conversation_list_result(
+        conversations=[conversation], total_count=1, page=1, page_size=10
+    )
+    assert result["list"][0]["message_count"] == 2
+    assert result["list"][0]["total_tokens"] == 150
+    assert result["list"][0]["last_message"]["role"] == "assistant"
+
+
+@pytest.mark.asyncio
+async def test_listing_projection_is_backfilled_for_legacy_rows(conversation_db):
+    dao = ConversationDao()
+    for n in range(3):
+        await _save(
+            dao,
+            f"legacy_{n}",
+            [
+                {"role": "user", "content": f"q{n}"},
+                {"role": "assistant", "content": "a"},
+            ],
+        )
+    async with conversation_db.get_session() as session:
+        await session.execute(
+            update(Conversation).values(
+                message_count=None, last_message_preview=None, total_tokens=0
+            )
+        )
+        session.add(
+            TokenUsage(
+                id="usage-1",
+                session_id="legacy_0",
+                user_id="user-1",
+                agent_id="agent-1",
+                request_source="test",
+                input_tokens=5,
+                output_tokens=5,
+                total_tokens=10,
+                cached_tokens=0,
+                reasoning_tokens=0,
+                prompt_audio_tokens=0,
+                completion_audio_tokens=0,
+                step_count=1,
+                started_at=get_local_now(),
+                finished_at=get_local_now(),
+            )
+        )
+
+    # 列表遇到未回填的行时就地补算
+    listed = await _list(dao, page_size=1)
+    (conversation,) = listed.values()
+    assert conversation.message_count == 2
+    assert conversation.last_message_preview["content"] == "a"
+
+    assert await dao.backfill_listing_stats(batch_size=1) == 2
+    assert await dao.backfill_listing_stats() == 0
+    listed = await _list(dao)
+    assert {c.message_count for c in listed.values()} == {2}
+    assert listed["legacy_0"].total_tokens == 10
+    assert listed["legacy_1"].total_tokens == 0
@@ -0,0 +1,197 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from common.core.client.db import SessionManager, register_db_getter
+from common.models.base import Base, get_local_now
+from common.models.conversation import Conversation, ConversationDao
+from common.models.conversation_search import (
+    build_match_query,
+    build_snippet,
+    cjk_bigrams,
+)
+
+
+@pytest.fixture
+async def conversation_db():
+    manager = SessionManager(SimpleNamespace(db_type="memory"))
+    await manager.init_conn()
+
+    async def get_test_db():
+        return manager
+
+    register_db_getter(get_test_db)
+    async with manager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield manager
+    finally:
+        register_db_getter(None)
+        await manager.close()
+
+
+def _messages(*texts):
+    return [
+        {"role": "user" if index % 2 == 0 else "assistant", "content": text}
+        for index, text in enumerate(texts)
+    ]
+
+
+async def _save(dao, session_id, title, *texts, user_id="user-1"):
+    await dao.save_conversation(
+        user_id=user_id,
+        session_id=session_id,
+        agent_id="agent-1",
+        agent_name="Agent",
+        title=title,
+        messages=_messages(*texts),
+    )
+
+
+async def _search(dao, search, **kwargs):
+    conversations, total = await dao.get_conversations_paginated(
+        search=search, include_messages=False, **kwargs
+    )
+    return [conversation.session_id for conversation in conversations], total
+
+
+def test_cjk_text_is_split_into_bigrams_for_index_and_query():
+    assert cjk_bigrams("用中文 ok").split() == ["用中", "中文", "文", "ok"]
+    assert cjk_bigrams("中文搜索").split() == ["中文", "文搜", "搜索", "索"]
+    assert cjk_bigrams("中文搜索", query=True).split() == ["中文", "文搜", "搜索"]
+    assert build_match_query('搜索 "plan') == '"搜索"* """plan"*'
+    assert build_match_query("%% --") is None
+
+
+def test_snippet_escapes_html_and_marks_every_term():
+    body = "intro " * 30 + "the <b>Budget</b> plan for the budget review"
+    snippet = build_snippet(body, "budget plan")
+    assert snippet.startswith("…")
+    assert "&lt;b&gt;<mark>Budget</mark>&lt;/b&gt; <mark>plan</mark>" in snippet
+    assert "<mark>budget</mark> review" in snippet
+
+
+async def test_messages_are_indexed_incrementally_and_ranked(conversation_db):
+    dao = ConversationDao()
+    await _save(dao, "s-body", "Weekly sync", "we discussed the budget later")
+    await _save(dao, "s-title", "Budget planning", "numbers attached")
+    await _save(dao, "s-none", "Roadmap", "nothing relevant")
+
+    assert await _search(dao, "budget", sort_by="relevance") == (
+        ["s-title", "s-body"],
+        2,
+    )
+
+    await dao.update_conversation_messages(
+        "s-none", _messages("the budget was approved")
+    )
+    ids, total = await _search(dao, "budget approved")
+    assert (ids, total) == (["s-none"], 1)
+    conversations, _ = await dao.get_conversations_paginated(search="approved")
+    assert "<mark>approved</mark>" in conversations[0].search_snippet
+
+    await dao.update_title("s-body", "Budget review")
+    assert (await _search(dao, "review"))[0] == ["s-body"]
+
+    await dao.delete_conversation("s-title")
+    assert await _search(dao, "budget", sort_by="relevance") == (
+        ["s-body", "s-none"],
+        2,
+    )
+
+
+async def test_recency_breaks_ties_and_filters_apply(conversation_db):
+    dao = ConversationDao()
+    await _save(dao, "old", "notes", "deploy checklist")
+    await _save(dao, "new", "notes", "deploy checklist")
+    await _save(dao, "other-user", "notes", "deploy checklist", user_id="user-2")
+    db = await dao._get_db()
+    async with db.get_session() as session:
+        old = await session.get(Conversation, "old")
+        old.updated_at = get_local_now() - timedelta(days=90)
+    await dao._reindex_messages("old", _messages("deploy checklist"))
+
+    ranked = {"sort_by": "relevance", "user_id": "user-1"}
+    assert (await _search(dao, "deploy", **ranked))[0] == ["new", "old"]
+    assert (await _search(dao, "deploy", page=2, page_size=1, **ranked)) == (
+        ["old"],
+        2,
+    )
+    # Explicit non-relevance sorts keep their order and only use the index to filter.
+    assert (await _search(dao, "deploy", sort_by="title"))[1] == 3
+
+
+async def test_default_search_keeps_date_order(conversation_db):
+    dao = ConversationDao()
+    await _save(dao, "title-hit", "Budget", "numbers")
+    await _save(dao, "body-hit", "Weekly sync", "the budget moved")
+    db = await dao._get_db()
+    async with db.get_session() as session:
+        older = await session.get(Conversation, "title-hit")
+        older.updated_at = get_local_now() - timedelta(days=10)
+
+    assert await _search(dao, "budget") == (["body-hit", "title-hit"], 2)
+    assert (await _search(dao, "budget", sort_by="relevance"))[0] == [
+        "title-hit",
+        "body-hit",
+    ]
+    conversations, _ = await dao.get_conversations_paginated(search="budget")
+    assert "<mark>budget</mark>" in conversations[0].search_snippet
+
+
+async def test_search_still_matches_session_id_fragments(conversation_db):
+    dao = ConversationDao()
+    await _save(dao, "notes-1", "Release", "f3a rollout notes")
+    await _save(dao, "sess-7f3a9", "Roadmap", "nothing relevant")
+    await _save(dao, "sess-7f3a9-other", "Roadmap", "f3a", user_id="user-2")
+
+    assert await _search(dao, "f3a9") == (["sess-7f3a9-other", "sess-7f3a9"], 2)
+    assert await _search(dao, "f3a", user_id="user-1") == (
+        ["sess-7f3a9", "notes-1"],
+        2,
+    )
+    # 相关度排序时全文命中在前，只有会话 ID 命中的排在后面
+    assert await _search(dao, "f3a", sort_by="relevance", user_id="user-1") == (
+        ["notes-1", "sess-7f3a9"],
+        2,
+    )
+    assert await _search(
+        dao, "f3a", sort_by="relevance", page=2, page_size=1, user_id="user-1"
+    ) == (["sess-7f3a9"], 2)
+    assert (await _search(dao, "f3a", sort_by="relevance"))[1] == 3
+
+
+async def test_cjk_search_matches_fragments(conversation_db):
+    dao = ConversationDao()
+    await _save(dao, "zh", "季度总结", "我们讨论了全文检索引擎的性能")
+    await _save(dao, "zh-other", "周报", "检查了部署流程")
+
+    assert (await _search(dao, "检索"))[0] == ["zh"]
+    assert (await _search(dao, "索引擎"))[0] == ["zh"]
+    assert set((await _search(dao, "检"))[0]) == {"zh", "zh-other"}
+    assert (await _search(dao, "总结"))[0] == ["zh"]
+    assert (await _search(dao, "引擎优化"))[1] == 0
+
+
+async def test_backfill_indexes_conversations_written_before_the_index(
+    conversation_db,
+):
+    dao = ConversationDao()
+    async with conversation_db.get_session() as session:
+        for n in range(5):
+            session.add(
+                Conversation(
+                    user_id="user-1",
+                    session_id=f"legacy-{n}",
+                    agent_id="agent-1",
+                    agent_name="Agent",
+                    title=f"legacy {n}",
+                    messages=_messages(f"archived topic {n}"),
+                )
+            )
+
+    assert await _search(dao, "archived") == ([], 0)
+    assert await dao.backfill_search_index(batch_size=2) == 5
+    assert (await _search(dao, "archived"))[1] == 5
+    assert await dao.backfill_search_index() == 0
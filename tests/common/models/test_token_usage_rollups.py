@@ -0,0 +1,217 @@
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select, update
+
+from common.core.client.db import SessionManager, register_db_getter
+from common.models.base import Base
+from common.models.token_usage import (
+    TokenUsage,
+    TokenUsageDaily,
+    TokenUsageDao,
+    TokenUsageHourly,
+    TokenUsageRollupState,
+)
+
+BASE_TIME = datetime(2026, 4, 20, 0, 0, 0)
+
+
+@pytest.fixture
+async def usage_db():
+    manager = SessionManager(SimpleNamespace(db_type="memory"))
+    await manager.init_conn()
+
+    async def get_test_db():
+        return manager
+
+    register_db_getter(get_test_db)
+    async with manager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield manager
+    finally:
+        register_db_getter(None)
+        await manager.close()
+
+
+def _usage(rng, n, finished_at, created_at):
+    return TokenUsage(
+        id=f"usage-{n}",
+        session_id=f"s-{rng.randrange(12)}",
+        user_id=f"u-{rng.randrange(3)}",
+        agent_id=f"a-{rng.randrange(2)}",
+        request_source=rng.choice(["api/chat", "api/web-stream"]),
+        input_tokens=rng.randrange(100),
+        output_tokens=rng.randrange(50),
+        total_tokens=rng.randrange(150),
+        cached_tokens=0,
+        reasoning_tokens=0,
+        prompt_audio_tokens=0,
+        completion_audio_tokens=0,
+        step_count=rng.randrange(1, 4),
+        started_at=finished_at - timedelta(seconds=rng.randrange(600)),
+        finished_at=finished_at,
+        created_at=created_at,
+    )
+
+
+QUERIES = [
+    {},
+    {"start_time": BASE_TIME + timedelta(days=1)},
+    {"end_time": BASE_TIME + timedelta(days=2, microseconds=-1)},
+    {
+        "start_time": BASE_TIME + timedelta(days=1),
+        "end_time": BASE_TIME + timedelta(days=3, microseconds=-1),
+    },
+    {
+        "start_time": BASE_TIME + timedelta(hours=7, minutes=13),
+        "end_time": BASE_TIME + timedelta(days=2, hours=5, minutes=41),
+    },
+    {
+        "start_time": BASE_TIME + timedelta(hours=30, minutes=5),
+        "end_time": BASE_TIME + timedelta(hours=36, minutes=50),
+    },
+    {
+        "start_time": BASE_TIME + timedelta(hours=50, minutes=5),
+        "end_time": BASE_TIME + timedelta(hours=50, minutes=20),
+    },
+    {"user_id": "u-1", "request_source": "api/chat"},
+    {"agent_id": "a-0", "start_time": BASE_TIME + timedelta(hours=12, minutes=30)},
+    {"session_id": "s-3"},
+]
+
+
+async def _all_stats(dao):
+    dimensions = ("user", "agent", "session")
+    return [
+        await dao.get_stats(dimension=dimensions[index % 3], **query)
+        for index, query in enumerate(QUERIES)
+    ]
+
+
+def _batches():
+    rng = random.Random(7)
+    compact_at = BASE_TIME + timedelta(days=3)
+    first = []
+    for n in range(300):
+        finished_at = BASE_TIME + timedelta(seconds=rng.randrange(4 * 86400))
+        first.append(_usage(rng, n, finished_at, finished_at))
+    # 迟到的明细：写入时间晚于第一次压实，但结束时间落在已汇总的桶里
+    late = []
+    for n in range(300, 340):
+        finished_at = BASE_TIME + timedelta(seconds=rng.randrange(2 * 86400))
+        late.append(_usage(rng, n, finished_at, compact_at + timedelta(minutes=n)))
+    return compact_at, first, late
+
+
+async def _raw_stats(batches):
+    """在没有汇总数据的独立数据库上直接聚合明细，作为对照。"""
+    manager = SessionManager(SimpleNamespace(db_type="memory"))
+    await manager.init_conn()
+
+    async def get_reference_db():
+        return manager
+
+    register_db_getter(get_reference_db)
+    async with manager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    results = []
+    for batch in batches:
+        async with manager.get_session() as session:
+            session.add_all(batch)
+        results.append(await _all_stats(TokenUsageDao()))
+    await manager.close()
+    return results
+
+
+async def test_rollups_match_raw_aggregation_with_late_arrivals(usage_db):
+    _, first, late = _batches()
+    expected_first, expected_all = await _raw_stats([first, late])
+
+    async def get_test_db():
+        return usage_db
+
+    register_db_getter(get_test_db)
+    compact_at, first, late = _batches()
+    dao = TokenUsageDao()
+    async with usage_db.get_session() as session:
+        session.add_all(first)
+    assert 0 < await dao.compact_rollups(now=compact_at, lag_seconds=0) < 300
+    assert await _all_stats(dao) == expected_first
+
+    async with usage_db.get_session() as session:
+        session.add_all(late)
+    assert await _all_stats(dao) == expected_all
+
+    compacted = await dao.compact_rollups(
+        now=compact_at + timedelta(days=2), lag_seconds=0
+    )
+    assert compacted > len(late)
+    assert await _all_stats(dao) == expected_all
+    assert await dao.compact_rollups(now=compact_at + timedelta(days=2)) == 0
+
+    async with usage_db.get_session() as session:
+        raw_total = (
+            await session.execute(select(func.sum(TokenUsage.total_tokens)))
+        ).scalar()
+        for model in (TokenUsageHourly, TokenUsageDaily):
+            rollup_total = (
+                await session.execute(select(func.sum(model.total_tokens)))
+            ).scalar()
+            assert rollup_total == raw_total
+            records = (
+                await session.execute(select(func.sum(model.record_count)))
+            ).scalar()
+            assert records == 340
+
+
+async def test_rollup_boundaries_survive_whole_second_datetime_columns(usage_db):
+    """MySQL DATETIME 把 12:00:00.6 存成 12:00:01，分段边界不能落在秒内。"""
+
+    async def get_test_db():
+        return usage_db
+
+    register_db_getter(get_test_db)
+    dao = TokenUsageDao()
+    rng = random.Random(3)
+    noon = BASE_TIME + timedelta(hours=12)
+    async with usage_db.get_session() as session:
+        session.add(_usage(rng, 1, noon, noon + timedelta(seconds=1)))
+
+    async def total_tokens():
+        async with usage_db.get_session() as session:
+            return (
+                await session.execute(select(func.sum(TokenUsage.total_tokens)))
+            ).scalar()
+
+    expected = await total_tokens()
+    assert (
+        await dao.compact_rollups(
+            now=noon + timedelta(microseconds=700_000), lag_seconds=0
+        )
+        == 0
+    )
+
+    async with usage_db.get_session() as session:
+        watermark = (
+            await session.execute(select(TokenUsageRollupState.watermark))
+        ).scalar()
+        assert watermark == noon
+        # 与 MySQL 一样按整秒四舍五入保存水位线
+        await session.execute(
+            update(TokenUsageRollupState).values(
+                watermark=(watermark + timedelta(microseconds=500_000)).replace(
+                    microsecond=0
+                )
+            )
+        )
+
+    stats = await dao.get_stats(dimension="user")
+    assert sum(item["total_tokens"] for item in stats["items"]) == expected
+    assert (
+        await dao.compact_rollups(now=noon + timedelta(seconds=5), lag_seconds=0) == 1
+    )
+    stats = await dao.get_stats(dimension="user")
+    assert sum(item["total_tokens"] for item in stats["items"]) == expected
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from common.core.client.db import SessionManager, register_db_getter
+from common.models.base import Base, get_local_now
+from common.models.conversation import Conversation, ConversationDao
+from common.models.tool_usage import ToolUsageDao, count_tool_calls
+from common.services.conversation_service import backfill_tool_usage
+
+
+@pytest.fixture
+async def usage_db():
+    manager = SessionManager(SimpleNamespace(db_type="memory"))
+    await manager.init_conn()
+
+    async def get_test_db():
+        return manager
+
+    register_db_getter(get_test_db)
+    async with manager._engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield manager
+    finally:
+        register_db_getter(None)
+        await manager.close()
+
+
+class _Storage:
+    def __init__(self, usages):
+        self.usages = usages
+        self.reads = []
+
+    def load_tools_usage(self, session_id):
+        self.reads.append(session_id)
+        if session_id == "broken":
+            raise OSError("unreadable")
+        return self.usages.get(session_id, {})
+
+
+async def _add(db, session_id, *, user_id="user-1", agent_id="agent-1", age=0):
+    async with db.get_session() as session:
+        conversation = Conversation(
+            user_id=user_id,
+            session_id=session_id,
+            agent_id=agent_id,
+            agent_name="Agent",
+            title=session_id,
+            messages=[],
+        )
+        conversation.updated_at = get_local_now() - timedelta(days=age)
+        session.add(conversation)
+
+
+def test_count_tool_calls_matches_tools_usage_file():
+    messages = [
+        {"role": "user", "content": "hi"},
+        {
+            "role": "assistant",
+            "tool_calls": [
+                {"function": {"name": "search"}},
+                {"function": {"name": "search"}},
+                {"function": {}},
+            ],
+        },
+        {"role": "assistant", "tool_calls": [{"function": {"name": "shell"}}]},
+    ]
+    assert count_tool_calls(messages) == {"search": 2, "shell": 1}
+
+
+async def test_sync_replaces_rows_and_stats_aggregate_with_filters(usage_db):
+    dao = ConversationDao()
+    await _add(usage_db, "s1")
+    await _add(usage_db, "s2", user_id="user-2")
+    await _add(usage_db, "old", age=40)
+    await _add(usage_db, "other-agent", agent_id="agent-2")
+
+    assert (
+        await dao.sync_tools_usage(
+            {
+                "s1": {"search": 3, "shell": 1},
+                "s2": {"search": 1, "browser": 5},
+                "old": {"shell": 7},
+                "other-agent": {"search": 2},
+                "missing": {"search": 100},
+            }
+        )
+        == 4
+    )
+    await dao.sync_tools_usage({"s1": {"search": 4}})
+
+    stats = ToolUsageDao()
+    recent = get_local_now() - timedelta(days=7)
+    assert await stats.get_usage_stats(updated_after=recent, agent_id="agent-1") == {
+        "browser": 5,
+        "search": 5,
+    }
+    assert list(
+        await stats.get_usage_stats(updated_after=recent, agent_id="agent-1", limit=1)
+    ) == ["browser"]
+    assert await stats.get_usage_stats(user_id="user-1", agent_id="agent-1") == {
+        "shell": 7,
+        "search": 4,
+    }
+
+    await dao.delete_conversation("s2")
+    assert await stats.get_usage_stats(updated_after=recent) == {"search": 6}
+
+
+async def test_backfill_reads_each_unsynced_session_once(usage_db):
+    dao = ConversationDao()
+    for session_id in ("a", "b", "c", "broken"):
+        await _add(usage_db, session_id)
+    await dao.sync_tools_usage({"a": {"search": 1}})
+    storage = _Storage({"a": {"search": 9}, "b": {"shell": 2}})
+
+    assert await backfill_tool_usage(storage, batch_size=2) == 3
+    assert sorted(storage.reads) == ["b", "broken", "c"]
+    assert await backfill_tool_usage(storage) == 0
+    assert await ToolUsageDao().get_usage_stats() == {"shell": 2, "search": 1}
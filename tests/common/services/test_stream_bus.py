@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from common.services import chat_stream_manager
+from common.services.agui_v2_run_store import AguiV2RunStore
+from common.services.chat_stream_manager import StreamManager
+from common.services.stream_bus import (
+    InProcessStreamBus,
+    SqliteStreamBus,
+    TopicNotFound,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def bus(request, tmp_path):
+    if request.param == "memory":
+        yield InProcessStreamBus(max_events=5)
+        return
+    instance = SqliteStreamBus(str(tmp_path / "bus.db"), max_events=5)
+    yield instance
+    instance.close()
+
+
+async def _collect(subscription, count=None):
+    events = []
+    async for event in subscription:
+        if event is not None:
+            events.append(event)
+        if count is not None and len(events) == count:
+            break
+    return events
+
+
+async def test_sequences_replay_after_cursor_and_end_on_close(bus):
+    info, created = await bus.open_topic("t", {"k": "v"})
+    assert created and info.meta == {"k": "v"} and info.last_seq == 0
+    assert (await bus.open_topic("t"))[1] is False
+
+    seqs = [await bus.publish("t", {"n": n}) for n in range(3)]
+    await bus.close_topic("t", "completed")
+
+    events = await _collect(bus.subscribe("t", after_seq=1))
+    assert seqs == [1, 2, 3]
+    assert [(e.seq, e.payload["n"]) for e in events] == [(2, 1), (3, 2)]
+    with pytest.raises(TopicNotFound):
+        await bus.publish("missing", {})
+
+
+async def test_publish_many_keeps_order_and_retention(bus):
+    await bus.open_topic("t")
+    await bus.publish("t", 0)
+
+    last = await bus.publish_many("t", list(range(1, 8)))
+    await bus.close_topic("t", "completed")
+
+    events = await _collect(bus.subscribe("t"))
+    assert last == 8
+    assert [(e.seq, e.payload) for e in events] == [(n + 1, n) for n in range(3, 8)]
+
+
+async def test_subscriber_follows_live_events(bus):
+    await bus.open_topic("t")
+    consumer = asyncio.create_task(_collect(bus.subscribe("t")))
+    await asyncio.sleep(0.05)
+    for n in range(3):
+        await bus.publish("t", n)
+    await bus.close_topic("t", "completed")
+
+    events = await asyncio.wait_for(consumer, 1)
+    assert [e.payload for e in events] == [0, 1, 2]
+
+
+async def test_slow_consumer_skips_evicted_events_without_blocking_publisher(bus):
+    await bus.open_topic("t")
+    subscription = bus.subscribe("t")
+    for n in range(20):
+        await bus.publish("t", n)  # nobody is reading; publishing never waits
+    await bus.close_topic("t", "completed")
+
+    events = await _collect(subscription)
+    assert [e.seq for e in events] == [16, 17, 18, 19, 20]
+    assert subscription.dropped == 15
+    assert (await bus.get_topic("t")).first_seq == 16
+
+
+async def test_replace_restarts_sequence_and_ends_old_subscribers(bus):
+    await bus.open_topic("t")
+    await bus.publish("t", "old")
+    stale = bus.subscribe("t", after_seq=1, heartbeat_seconds=0.05)
+    stale_task = asyncio.create_task(_collect(stale))
+    await asyncio.sleep(0.05)
+
+    info, created = await bus.open_topic("t", replace=True)
+    assert created and info.last_seq == 0
+    assert await bus.publish("t", "new") == 1
+    assert await asyncio.wait_for(stale_task, 1) == []
+
+
+async def test_heartbeat_is_yielded_while_idle(bus):
+    await bus.open_topic("t")
+    iterator = bus.subscribe("t", heartbeat_seconds=0.02).__aiter__()
+    assert await asyncio.wait_for(anext(iterator), 1) is None
+    await iterator.aclose()
+
+
+async def test_agui_run_resumes_through_another_bus_instance(tmp_path):
+    path = str(tmp_path / "bus.db")
+    worker_a = SqliteStreamBus(path)
+    worker_b = SqliteStreamBus(path)
+    try:
+        store_a = AguiV2RunStore(bus=worker_a, heartbeat_seconds=0.05)
+        store_b = AguiV2RunStore(bus=worker_b, heartbeat_seconds=0.05)
+        claim = await store_a.claim_run(user_id="u", thread_id="t", run_id="r")
+        first_id = await store_a.publish(claim.run, {"type": "RUN_STARTED"})
+        await store_a.publish(claim.run, {"type": "RUN_FINISHED"})
+        await store_a.finish(claim.run, status="completed")
+
+        rejoined = await store_b.claim_run(user_id="u", thread_id="t", run_id="r")
+        chunks = [
+            chunk
+            async for chunk in store_b.subscribe(rejoined.run, last_event_id=first_id)
+        ]
+
+        assert store_b.shared and rejoined.created is False
+        assert rejoined.run.status == "completed"
+        assert chunks == ['id: 2-0\ndata: {"type":"RUN_FINISHED"}\n\n']
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+async def test_stream_manager_resumes_a_session_owned_by_another_worker(
+    tmp_path, monkeypatch
+):
+    path = str(tmp_path / "bus.db")
+    owner, other = SqliteStreamBus(path), SqliteStreamBus(path)
+    manager = StreamManager.get_instance()
+    try:
+        monkeypatch.setattr(chat_stream_manager, "get_stream_bus", lambda: owner)
+        await manager.create_publisher("bus-s1")
+        for n in range(3):
+            await manager.publish("bus-s1", json.dumps({"n": n}) + "\n")
+        await manager.finish_publisher("bus-s1")
+
+        monkeypatch.setattr(chat_stream_manager, "get_stream_bus", lambda: other)
+        chunks = [chunk async for chunk in manager.subscribe("bus-s1", last_index=1)]
+        assert [json.loads(chunk)["n"] for chunk in chunks] == [1, 2]
+    finally:
+        StreamManager._sessions.clear()
+        owner.close()
+        other.close()
+
+
+class _RecordingBus(InProcessStreamBus):
+    shared = True
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    async def publish_many(self, topic, payloads):
+        self.batches.append(list(payloads))
+        await asyncio.sleep(0.01)
+        return await super().publish_many(topic, payloads)
+
+
+async def test_stream_manager_batches_mirror_writes(monkeypatch):
+    bus = _RecordingBus()
+    manager = StreamManager.get_instance()
+    monkeypatch.setattr(chat_stream_manager, "get_stream_bus", lambda: bus)
+    try:
+        await manager.create_publisher("mirror-s1")
+        await manager.publish("mirror-s1", json.dumps({"n": 0}) + "\n")
+        await asyncio.sleep(0)
+        # 第一批写入期间到达的 chunk 合并成下一批
+        for n in range(1, 5):
+            await manager.publish("mirror-s1", json.dumps({"n": n}) + "\n")
+        await manager.finish_publisher("mirror-s1")
+
+        events = await _collect(bus.subscribe("chat:mirror-s1"))
+        assert [len(batch) for batch in bus.batches] == [1, 4]
+        assert [json.loads(e.payload)["n"] for e in events] == list(range(5))
+        assert (await bus.get_topic("chat:mirror-s1")).status == "completed"
+    finally:
+        StreamManager._sessions.clear()
+
+
+async def test_notify_pipes_reuse_the_directory_listing(tmp_path, monkeypatch):
+    if not hasattr(os, "mkfifo"):
+        pytest.skip("named pipes are not available")
+    path = str(tmp_path / "bus.db")
+    publisher, follower = SqliteStreamBus(path), SqliteStreamBus(path)
+    listings = []
+    real_listdir = os.listdir
+
+    def counting_listdir(directory):
+        listings.append(directory)
+        return real_listdir(directory)
+
+    monkeypatch.setattr(os, "listdir", counting_listdir)
+    try:
+        await publisher.open_topic("t")
+        for n in range(5):
+            await publisher.publish("t", n)
+
+        assert len(listings) == 1
+        assert os.read(follower._pipes.fd, 16) == b"\0" * 5
+    finally:
+        publisher.close()
+        follower.close()
+
+
+async def test_idle_heartbeats_are_json_lines_that_keep_the_cursor(
+    tmp_path, monkeypatch
+):
+    bus = SqliteStreamBus(str(tmp_path / "bus.db"))
+    manager = StreamManager.get_instance()
+    monkeypatch.setattr(StreamManager, "_HEARTBEAT_SECONDS", 0.02)
+
+    async def read_across_heartbeat(session_id):
+        lines = []
+
+        async def consume():
+            async for chunk in manager.subscribe(session_id, last_index=1):
+                lines.extend(chunk.splitlines())
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.1)
+        await manager.publish(session_id, json.dumps({"n": 2}) + "\n")
+        await manager.finish_publisher(session_id)
+        await asyncio.wait_for(consumer, 1)
+        return [json.loads(line) for line in lines]
+
+    try:
+        monkeypatch.setattr(chat_stream_manager, "get_stream_bus", lambda: bus)
+        for session_id in ("hb-local", "hb-shared"):
+            await manager.create_publisher(session_id)
+            for n in range(2):
+                await manager.publish(session_id, json.dumps({"n": n}) + "\n")
+
+        local = await read_across_heartbeat("hb-local")
+
+        # 另一个 worker 上没有该会话，从共享总线续传
+        owner = StreamManager._sessions.pop("hb-shared")
+        shared_task = asyncio.create_task(read_across_heartbeat("hb-shared"))
+        await asyncio.sleep(0.01)
+        StreamManager._sessions["hb-shared"] = owner
+        shared = await shared_task
+
+        for events in (local, shared):
+            heartbeats = [event for event in events if event.get("type") == "heartbeat"]
+            assert heartbeats
+            assert {event["stream_offset"] for event in heartbeats} == {2}
+            assert [event["n"] for event in events if "n" in event] == [1, 2]
+    finally:
+        StreamManager._sessions.clear()
+        bus.close()
+
+
+_PUBLISHER = textwrap.dedent(
+    """
+    import asyncio, sys
+    from common.services.stream_bus import SqliteStreamBus
+
+    async def main(path):
+        bus = SqliteStreamBus(path)
+        await bus.open_topic("run")
+        for n in range(3):
+            await bus.publish("run", n)
+        print("ready", flush=True)
+        sys.stdin.readline()  # wait until the other worker is following live
+        for n in range(3, 5):
+            await bus.publish("run", n)
+        await bus.close_topic("run", "completed")
+        bus.close()
+
+    asyncio.run(main(sys.argv[1]))
+    """
+)
+
+
+async def test_publish_in_one_process_and_resume_live_in_another(tmp_path):
+    if not hasattr(os, "mkfifo"):
+        pytest.skip("named pipes are not available")
+    path = str(tmp_path / "bus.db")
+    worker = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        _PUBLISHER,
+        path,
+        cwd=str(REPO_ROOT),
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    # A long poll interval proves the wakeup comes from the notify pipe.
+    bus = SqliteStreamBus(path, poll_interval=30)
+    try:
+        assert (await asyncio.wait_for(worker.stdout.readline(), 1.5)) == b"ready\n"
+        received = []
+        async for event in bus.subscribe("run", after_seq=1):
+            received.append(event.payload)
+            if event.seq == 3:
+                worker.stdin.write(b"go\n")
+                await worker.stdin.drain()
+        assert received == [1, 2, 3, 4]
+        assert await asyncio.wait_for(worker.wait(), 1) == 0
+        assert sorted(os.listdir(path + ".notify")) == [
+            os.path.basename(bus._pipes.path)
+        ]
+    finally:
+        if worker.returncode is None:
+            worker.kill()
+            await worker.wait()
+        bus.close()
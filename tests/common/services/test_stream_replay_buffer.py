@@ -0,0 +1,317 @@
+import asyncio
+import json
+import os
+import random
+import threading
+
+import pytest
+
+from common.services.chat_stream_manager import StreamManager
+from common.services.stream_replay_buffer import (
+    ReplayBufferPool,
+    StreamReplayBuffer,
+    _spill_writer,
+    flush_spill_writes,
+)
+
+
+def _delta(message_id, content=None, reasoning=None, **extra):
+    payload = {"message_id": message_id, "role": "assistant", "type": "assistant_text"}
+    if content is not None:
+        payload["content"] = content
+    if reasoning is not None:
+        payload["reasoning_content"] = reasoning
+    payload.update(extra)
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+def _random_stream(rng, length):
+    chunks = []
+    message = 0
+    for i in range(length):
+        roll = rng.random()
+        if roll < 0.05:
+            message += 1
+            chunks.append(
+                json.dumps(
+                    {
+                        "message_id": f"tool-{i}",
+                        "role": "tool",
+                        "tool_call_id": f"call-{i}",
+                        "content": "ok",
+                    }
+                )
+                + "\n"
+            )
+        elif roll < 0.1:
+            message += 1
+            chunks.append(_delta(f"m{message}", content="", tool_calls=[{"id": "c"}]))
+        elif roll < 0.3:
+            chunks.append(_delta(f"m{message}", reasoning=f"r{i}中", timestamp=i))
+        else:
+            chunks.append(_delta(f"m{message}", content=f"c{i}文", timestamp=i))
+    return chunks
+
+
+class Client:
+    """Mimics the web client: merges text per message and tracks the cursor."""
+
+    def __init__(self):
+        self.cursor = 0
+        self.text = {}
+        self.events = []
+
+    def apply(self, chunk):
+        data = json.loads(chunk)
+        self.cursor = data.get("stream_offset", self.cursor + 1)
+        if data.get("role") == "tool" or data.get("tool_calls"):
+            self.events.append(data["message_id"])
+            return
+        content, reasoning = self.text.get(data["message_id"], ("", ""))
+        self.text[data["message_id"]] = (
+            content + data.get("content", ""),
+            reasoning + data.get("reasoning_content", ""),
+        )
+
+
+def _resume(buffer, client):
+    while client.cursor < buffer.next_offset:
+        items = buffer.read(client.cursor)
+        assert items
+        for next_cursor, chunk in items:
+            client.apply(chunk)
+            assert client.cursor == next_cursor
+
+
+def _fill(buffer, chunks):
+    for offset, chunk in enumerate(chunks):
+        assert buffer.append(chunk) == offset
+
+
+def test_consecutive_deltas_are_coalesced_with_cursor(tmp_path):
+    buffer = StreamReplayBuffer("s", spill_dir=str(tmp_path))
+    _fill(
+        buffer,
+        [
+            _delta("m1", content="Hel", timestamp=1),
+            _delta("m1", content="lo", timestamp=2),
+            _delta("m1", reasoning="why", timestamp=3),
+            json.dumps({"type": "token_usage", "message_id": "m1", "role": "assistant"})
+            + "\n",
+            _delta("m2", content="x"),
+        ],
+    )
+
+    items = buffer.read(0)
+    assert [cursor for cursor, _ in items] == [3, 4, 5]
+    merged = json.loads(items[0][1])
+    assert merged["content"] == "Hello"
+    assert merged["reasoning_content"] == "why"
+    assert merged["timestamp"] == 3
+    assert merged["stream_offset"] == 3
+    # A single-piece record is replayed verbatim, without a cursor hint.
+    assert "stream_offset" not in json.loads(items[2][1])
+
+    suffix = json.loads(buffer.read(1)[0][1])
+    assert (suffix["content"], suffix["reasoning_content"]) == ("lo", "why")
+
+
+@pytest.mark.parametrize("max_bytes", [1 << 20, 600])
+def test_reconnect_from_every_offset_matches_full_stream(tmp_path, max_bytes):
+    chunks = _random_stream(random.Random(7), 300)
+    buffer = StreamReplayBuffer(
+        "s", max_bytes=max_bytes, spill_dir=str(tmp_path), spill_max_bytes=1 << 20
+    )
+    _fill(buffer, chunks)
+    if max_bytes < 1 << 20:
+        assert buffer.spilled_bytes > 0
+        assert buffer.memory_bytes <= max_bytes + 1024
+
+    expected = Client()
+    for chunk in chunks:
+        expected.apply(chunk)
+
+    for offset in range(len(chunks) + 1):
+        client = Client()
+        for chunk in chunks[:offset]:
+            client.apply(chunk)
+        _resume(buffer, client)
+        assert client.cursor == len(chunks)
+        assert client.text == expected.text
+        assert client.events == expected.events
+
+
+def test_resume_while_the_last_run_is_still_growing(tmp_path):
+    buffer = StreamReplayBuffer("s", spill_dir=str(tmp_path))
+    _fill(buffer, [_delta("m1", content="a"), _delta("m1", content="b")])
+    client = Client()
+    _resume(buffer, client)
+
+    buffer.append(_delta("m1", content="c"))
+    _resume(buffer, client)
+
+    assert client.cursor == 3
+    assert client.text == {"m1": ("abc", "")}
+
+
+def test_ring_file_overwrites_oldest_batches(tmp_path):
+    chunks = [json.dumps({"type": "tool_progress", "n": i}) + "\n" for i in range(400)]
+    buffer = StreamReplayBuffer(
+        "s", max_bytes=512, spill_dir=str(tmp_path), spill_max_bytes=2048
+    )
+    _fill(buffer, chunks)
+
+    floor = buffer.floor
+    assert 0 < floor < 400
+    flush_spill_writes()
+    assert os.path.getsize(buffer._ring.path) <= 2048
+
+    replayed = []
+    cursor = 0
+    while cursor < buffer.next_offset:
+        for cursor, chunk in buffer.read(cursor):
+            replayed.append(json.loads(chunk)["n"])
+    assert replayed == list(range(floor, 400))
+
+    path = buffer._ring.path
+    buffer.close()
+    flush_spill_writes()
+    assert not os.path.exists(path)
+
+
+def test_spill_writes_are_batched_off_the_calling_thread(tmp_path):
+    chunks = [json.dumps({"type": "tool_progress", "n": i}) + "\n" for i in range(400)]
+    buffer = StreamReplayBuffer(
+        "s", max_bytes=512, spill_dir=str(tmp_path), spill_max_bytes=1 << 20
+    )
+    gate = threading.Event()
+    _spill_writer.submit(gate.wait, 5)
+    try:
+        _fill(buffer, chunks)
+        # 写入线程被挡住：溢写只登记在内存里，调用方没有碰文件
+        assert buffer.spilled_bytes > 0
+        assert os.listdir(tmp_path) == []
+        assert len(buffer._ring._pending) > 1
+
+        def replay():
+            replayed = []
+            cursor = 0
+            while cursor < buffer.next_offset:
+                for cursor, chunk in buffer.read(cursor):
+                    replayed.append(json.loads(chunk)["n"])
+            return replayed
+
+        assert replay() == list(range(400))
+    finally:
+        gate.set()
+    flush_spill_writes()
+
+    assert buffer._ring._pending == []
+    assert buffer._ring._unwritten == {}
+    assert replay() == list(range(400))
+    buffer.close()
+
+
+def test_resume_below_the_floor_moves_the_client_cursor(tmp_path):
+    chunks = [json.dumps({"type": "tool_progress", "n": i}) + "\n" for i in range(400)]
+    buffer = StreamReplayBuffer(
+        "s", max_bytes=512, spill_dir=str(tmp_path), spill_max_bytes=0
+    )
+    _fill(buffer, chunks)
+    floor = buffer.floor
+    assert floor > 0
+
+    # 游标落在已淘汰的区间：第一条带上 stream_offset，之后按行推进即可对齐
+    first_cursor, first = buffer.read(0)[0]
+    assert json.loads(first)["stream_offset"] == first_cursor == floor + 1
+
+    cursor = 0
+    while cursor < buffer.next_offset:
+        for next_cursor, chunk in buffer.read(cursor):
+            cursor = json.loads(chunk).get("stream_offset", cursor + 1)
+            assert cursor == next_cursor
+    buffer.close()
+
+
+def test_pool_enforces_global_memory_cap(tmp_path):
+    pool = ReplayBufferPool(
+        max_total_bytes=20_000,
+        session_max_bytes=1 << 20,
+        spill_dir=str(tmp_path),
+        spill_max_bytes=1 << 20,
+    )
+    buffers = [pool.create(f"s{i}") for i in range(20)]
+    for i in range(200):
+        for buffer in buffers:
+            buffer.append(
+                json.dumps({"type": "tool_progress", "text": "x" * 40}) + "\n"
+            )
+
+    assert pool.memory_bytes <= 20_000
+    assert pool.memory_bytes == sum(buffer.memory_bytes for buffer in buffers)
+    assert pool.stats["global_spills"] > 0
+
+    for buffer in buffers:
+        buffer.close()
+    assert pool.memory_bytes == 0
+    assert len(pool) == 0
+    flush_spill_writes()
+    assert os.listdir(tmp_path) == []
+
+
+def test_pool_cap_covers_sealed_buffers_behind_a_large_open_run(tmp_path):
+    pool = ReplayBufferPool(
+        max_total_bytes=20_000,
+        session_max_bytes=1 << 20,
+        spill_dir=str(tmp_path),
+        spill_max_bytes=1 << 20,
+    )
+    sealed = [pool.create(f"sealed-{i}") for i in range(5)]
+    for buffer in sealed:
+        for _ in range(30):
+            buffer.append(
+                json.dumps({"type": "tool_progress", "text": "x" * 60}) + "\n"
+            )
+    streaming = pool.create("streaming")
+    chunks = [_delta("m1", content="y" * 80) for _ in range(400)]
+    for chunk in chunks:
+        streaming.append(chunk)
+        assert pool.memory_bytes <= 20_000
+
+    assert all(buffer.sealed_bytes < 3_000 for buffer in sealed)
+    client = Client()
+    _resume(streaming, client)
+    assert client.text["m1"][0] == "y" * 80 * 400
+
+    for buffer in [*sealed, streaming]:
+        buffer.close()
+    assert pool.memory_bytes == 0
+
+
+@pytest.fixture
+def manager():
+    manager = StreamManager.get_instance()
+    yield manager
+    StreamManager._sessions.clear()
+
+
+async def test_subscribe_replays_from_offset_then_follows_live(manager):
+    await manager.create_publisher("replay-s1")
+    for text in ["a", "b", "c"]:
+        await manager.publish("replay-s1", _delta("m1", content=text))
+    assert manager.get_history_length("replay-s1") == 3
+
+    received = []
+
+    async def consume():
+        async for chunk in manager.subscribe("replay-s1", last_index=1):
+            received.append(json.loads(chunk))
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0.01)
+    await manager.publish("replay-s1", _delta("m1", content="d"))
+    await manager.finish_publisher("replay-s1")
+    await asyncio.wait_for(consumer, 1)
+
+    assert [chunk.get("content") for chunk in received] == ["bc", "d"]
+    assert received[0]["stream_offset"] == 3
@@ -112,3 +112,24 @@ def test_spawn_due_recurring_tasks_does_not_spawn_early_within_one_minute(monkey
     service.dao.advance_recurring_task_cursor.assert_not_awaited()
     service.dao.has_active_task_instance.assert_not_awaited()
     service.dao.create_one_time_task.assert_not_awaited()
+
+
+@pytest.mark.skipif(
+    task_service_module.croniter is None, reason="croniter not installed"
+)
+def test_get_next_recurring_run_at_returns_earliest_cron_fire(monkeypatch):
+    fixed_now = datetime(2026, 4, 8, 11, 59, 14)
+    monkeypatch.setattr(task_service_module, "get_local_now", lambda: fixed_now)
+
+    service = TaskService()
+    noon = _build_recurring_task(last_executed_at=datetime(2026, 4, 7, 12, 0, 0))
+    noon.cron_expression = "0 12 * * *"
+    invalid = _build_recurring_task(last_executed_at=datetime(2026, 4, 7, 9, 0, 0))
+    invalid.cron_expression = "not a cron"
+    service.dao.get_enabled_recurring_tasks = AsyncMock(
+        return_value=[_build_recurring_task(last_executed_at=fixed_now), noon, invalid]
+    )
+
+    next_run_at = asyncio.run(service.get_next_recurring_run_at(user_id="user-1"))
+
+    assert next_run_at == datetime(2026, 4, 8, 12, 0, 0)
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+from common.core.exceptions import SageHTTPException
+from common.services import agent_service
+from common.services.workspace_index import WorkspaceIndex
+
+
+def _age(path, seconds=60):
+    """把 mtime 调到过去，避开“刚修改不缓存”的保护。"""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def _build_workspace(tmp_path):
+    workspace = tmp_path / "workspace"
+    (workspace / "docs" / "deep").mkdir(parents=True)
+    for name, size in (("a.txt", 30), ("b.txt", 10), ("c.txt", 20), ("d.txt", 40)):
+        (workspace / name).write_bytes(b"x" * size)
+    (workspace / "docs" / "guide.md").write_text("guide", encoding="utf-8")
+    (workspace / "docs" / "deep" / "note.md").write_text("note", encoding="utf-8")
+    (workspace / ".hidden").write_text("hidden", encoding="utf-8")
+    for root, dirs, files in os.walk(workspace, topdown=False):
+        for name in files + dirs:
+            _age(os.path.join(root, name))
+    _age(workspace)
+    return workspace
+
+
+def _pages(index, workspace, **options):
+    paths, cursor = [], None
+    while True:
+        page = index.list_page(
+            str(workspace), str(workspace), cursor=cursor, limit=2, **options
+        )
+        paths.extend(entry["path"] for entry in page["entries"])
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            return paths, page
+        cursor = page["next_cursor"]
+
+
+def test_cursor_paging_sorts_and_limits_depth(tmp_path):
+    workspace = _build_workspace(tmp_path)
+    index = WorkspaceIndex()
+
+    paths, page = _pages(index, workspace)
+    assert paths == ["a.txt", "b.txt", "c.txt", "d.txt", "docs"]
+    assert page["total"] == 5 and page["truncated_by_depth"] is True
+
+    paths, _ = _pages(index, workspace, order="desc")
+    assert paths == ["docs", "d.txt", "c.txt", "b.txt", "a.txt"]
+
+    paths, _ = _pages(index, workspace, sort_by="size", max_depth=None)
+    assert paths[:4] == ["docs", "docs/deep", "docs/deep/note.md", "docs/guide.md"]
+    assert paths[4:] == ["b.txt", "c.txt", "a.txt", "d.txt"]
+
+    paths, page = _pages(index, workspace, max_depth=1)
+    assert "docs/deep" in paths and "docs/deep/note.md" not in paths
+    assert page["truncated_by_depth"] is True
+
+
+def test_snapshots_are_reused_until_directory_mtime_changes(tmp_path):
+    workspace = _build_workspace(tmp_path)
+    index = WorkspaceIndex(ttl_seconds=3600)
+
+    index.list_dir(str(workspace))
+    index.list_dir(str(workspace))
+    assert (index.stats["dir_hits"], index.stats["dir_scans"]) == (1, 1)
+
+    (workspace / "e.txt").write_text("new", encoding="utf-8")
+    names = [entry.name for entry in index.list_dir(str(workspace))]
+    assert "e.txt" in names
+    assert index.stats["dir_scans"] == 2
+
+
+def test_sorted_listing_is_reused_until_a_directory_changes(tmp_path):
+    workspace = _build_workspace(tmp_path)
+    index = WorkspaceIndex(ttl_seconds=3600)
+
+    _pages(index, workspace, max_depth=None)
+    assert index.stats["listing_hits"] == 3
+
+    deep = workspace / "docs" / "deep"
+    (deep / "extra.md").write_text("extra", encoding="utf-8")
+    _age(deep / "extra.md")
+    _age(deep)
+    paths, _ = _pages(index, workspace, max_depth=None)
+    assert "docs/deep/extra.md" in paths
+    assert index.stats["listing_hits"] == 7
+
+
+def test_content_hash_is_cached_until_file_changes(tmp_path):
+    workspace = _build_workspace(tmp_path)
+    index = WorkspaceIndex()
+    target = workspace / "a.txt"
+
+    assert index.content_hash(str(target)) == hashlib.md5(b"x" * 30).hexdigest()
+    assert index.content_hash(str(target)) == hashlib.md5(b"x" * 30).hexdigest()
+    assert (index.stats["hash_hits"], index.stats["hash_misses"]) == (1, 1)
+
+    target.write_bytes(b"y" * 30)
+    assert index.content_hash(str(target)) == hashlib.md5(b"y" * 30).hexdigest()
+    assert index.stats["hash_misses"] == 2
+
+
+def test_list_workspace_entries_validates_options(tmp_path):
+    workspace = _build_workspace(tmp_path)
+
+    result = agent_service.list_workspace_entries(workspace, "agent_demo", "docs")
+    assert [entry["path"] for entry in result["entries"]] == [
+        "docs/deep",
+        "docs/guide.md",
+    ]
+    assert result["has_more"] is False
+
+    first = agent_service.list_workspace_entries(workspace, "agent_demo", limit=2)
+    with pytest.raises(SageHTTPException):
+        agent_service.list_workspace_entries(
+            workspace, "agent_demo", cursor=first["next_cursor"], sort_by="size"
+        )
+    for options in ({"sort_by": "owner"}, {"order": "up"}, {"limit": 0}):
+        with pytest.raises(SageHTTPException):
+            agent_service.list_workspace_entries(workspace, "agent_demo", **options)
+    with pytest.raises(SageHTTPException):
+        agent_service.list_workspace_entries(workspace, "agent_demo", path="../x")
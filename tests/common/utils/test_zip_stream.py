@@ -0,0 +1,92 @@
+import io
+import os
+import zipfile
+
+from common.utils import zip_stream
+from common.utils.zip_stream import aiter_zip_stream, iter_zip_stream
+
+
+def _workspace(tmp_path):
+    files = {
+        "notes.txt": b"hello workspace\n" * 200,
+        "docs/报告.md": "中文内容".encode("utf-8") * 50,
+        "docs/image.png": os.urandom(3000),
+        "build/out.bin": b"\0" * 100,
+        "src/app.py": b"print('x')\n",
+        "src/cache/mod.pyc": b"\x00\x01",
+        "empty.txt": b"",
+    }
+    for name, data in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return files
+
+
+def _archive(root, **options):
+    return zipfile.ZipFile(io.BytesIO(b"".join(iter_zip_stream(str(root), **options))))
+
+
+def test_stream_is_a_valid_zip_with_per_file_compression(tmp_path):
+    files = _workspace(tmp_path)
+    archive = _archive(tmp_path, chunk_size=512)
+
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == sorted(files)
+    for name, data in files.items():
+        assert archive.read(name) == data
+    assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert archive.getinfo("docs/image.png").compress_type == zipfile.ZIP_STORED
+    assert archive.getinfo("docs/报告.md").flag_bits & 0x800
+
+    stored = _archive(tmp_path, compression="store")
+    assert {info.compress_type for info in stored.infolist()} == {zipfile.ZIP_STORED}
+    assert stored.read("notes.txt") == files["notes.txt"]
+
+
+def test_include_and_exclude_globs(tmp_path):
+    _workspace(tmp_path)
+
+    archive = _archive(tmp_path, exclude=["build", "*.pyc"])
+    assert sorted(archive.namelist()) == [
+        "docs/image.png",
+        "docs/报告.md",
+        "empty.txt",
+        "notes.txt",
+        "src/app.py",
+    ]
+    archive = _archive(tmp_path, include=["*.py", "docs/*.md"], exclude=["docs"])
+    assert archive.namelist() == ["src/app.py"]
+
+
+def test_zip64_records_when_limits_are_exceeded(tmp_path, monkeypatch):
+    files = _workspace(tmp_path)
+    monkeypatch.setattr(zip_stream, "_ZIP64_LIMIT", 1000)
+    monkeypatch.setattr(zip_stream, "_ZIP64_COUNT_LIMIT", 3)
+
+    data = b"".join(iter_zip_stream(str(tmp_path)))
+    archive = zipfile.ZipFile(io.BytesIO(data))
+
+    assert b"PK\x06\x06" in data and b"PK\x06\x07" in data
+    assert archive.testzip() is None
+    for name, content in files.items():
+        assert archive.read(name) == content
+
+
+async def test_async_stream_stops_when_client_disconnects(tmp_path):
+    _workspace(tmp_path)
+    checks = 0
+
+    async def is_disconnected():
+        nonlocal checks
+        checks += 1
+        return checks > 1
+
+    chunks = [
+        chunk
+        async for chunk in aiter_zip_stream(
+            str(tmp_path), chunk_size=256, is_disconnected=is_disconnected
+        )
+    ]
+    assert len(chunks) == 1
+    assert chunks[0].startswith(b"PK\x03\x04")
@@ -0,0 +1,187 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from mcp_servers.im_server import db as im_db_module
+from mcp_servers.im_server.db import _MISSING, IMServerDB, LRUCache
+from mcp_servers.im_server.session_manager import SessionManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = IMServerDB(tmp_path / "sage.db", reader_pool_size=2)
+    yield database
+    database.close()
+
+
+def _raw_binding(db, session_id):
+    conn = sqlite3.connect(db.db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(
+            "SELECT * FROM im_session_bindings WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+
+def test_writer_uses_wal_and_readers_are_pooled(db):
+    assert db._writer.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db.create_or_update_binding("s1", "feishu", "u1", chat_id="c1")
+
+    for _ in range(20):
+        assert db.get_binding("s1") is not None
+        db._binding_cache.clear()
+    assert len(db._all_readers) == 1
+
+
+def test_hot_lookups_are_cached_and_invalidated_on_write(db):
+    db.create_or_update_binding("s1", "feishu", "u1", chat_id="c1", agent_id="a1")
+
+    assert db.find_binding_by_user("feishu", "u1")["agent_id"] == "a1"
+    assert db.find_binding_by_user("feishu", "u1")["agent_id"] == "a1"
+    assert db.cache_stats()["user_bindings"] == {"hits": 1, "misses": 1}
+
+    db.create_or_update_binding("s1", "feishu", "u1", chat_id="c1", agent_id="a2")
+    assert db.find_binding_by_user("feishu", "u1")["agent_id"] == "a2"
+    assert db.get_binding("s1")["agent_id"] == "a2"
+
+    db.delete_binding("s1")
+    assert db.get_binding("s1") is None
+    assert db.find_binding_by_user("feishu", "u1") is None
+
+
+def test_cached_values_are_copies(db):
+    db.create_or_update_binding("s1", "feishu", "u1", metadata={"k": "v"})
+    first = db.get_binding("s1")
+    first["metadata"]["k"] = "mutated"
+
+    assert db.get_binding("s1")["metadata"] == {"k": "v"}
+
+
+def test_user_config_cache_invalidation(db):
+    assert db.get_user_config("default", "feishu") is None
+    db.save_user_config("default", "feishu", {"app_id": "x"})
+    assert db.get_user_config("default", "feishu")["config"] == {"app_id": "x"}
+
+    db.save_user_config("default", "feishu", {"app_id": "y"}, enabled=False)
+    assert db.get_user_config("default", "feishu") is None
+    db.delete_user_config("default", "feishu")
+    assert db.list_user_configs("default") == []
+
+
+def test_touches_are_coalesced_into_batched_writes(db):
+    db.create_or_update_binding("s1", "feishu", "u1")
+    db.create_or_update_binding("s2", "feishu", "u2")
+    before = _raw_binding(db, "s1")["last_message_at"]
+    db.get_binding("s1")
+
+    for _ in range(50):
+        db.touch_binding("s1")
+        db.touch_binding("s2")
+    db.flush()
+
+    # 100 touches collapse to at most one row per session per flush.
+    assert db.stats["touches"] == 100
+    assert db.stats["touch_rows"] <= 2 * db.stats["touch_batches"]
+    assert db.stats["touch_batches"] <= 2
+    after = _raw_binding(db, "s1")
+    assert after["last_message_at"] >= before
+    assert db.get_binding("s1")["last_message_at"] == after["last_message_at"]
+
+
+def test_most_recent_binding_reflects_buffered_activity(db):
+    db.create_or_update_binding("old", "feishu", "u1", chat_id="c1")
+    db.create_or_update_binding("new", "feishu", "u1", chat_id="c2")
+    assert db.find_binding_by_user("feishu", "u1")["session_id"] == "new"
+
+    db.get_binding("old")
+    db.touch_binding("old")
+    assert db.find_binding_by_user("feishu", "u1")["session_id"] == "old"
+
+
+def test_close_flushes_pending_touches(tmp_path):
+    db = IMServerDB(tmp_path / "sage.db", touch_flush_interval=60)
+    db.create_or_update_binding("s1", "feishu", "u1")
+    stamp = _raw_binding(db, "s1")["last_message_at"]
+    db.get_binding("s1")
+    db.touch_binding("s1")
+    db.close()
+
+    assert _raw_binding(db, "s1")["last_message_at"] >= stamp
+    assert db.stats["touch_rows"] == 1
+
+
+def test_shutdown_closes_the_global_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(im_db_module, "_im_db", None)
+    im_db_module.close_im_db()
+
+    db = im_db_module.get_im_db(tmp_path / "sage.db")
+    db.create_or_update_binding("s1", "feishu", "u1")
+    db.get_binding("s1")
+    db.touch_binding("s1")
+    im_db_module.close_im_db()
+
+    assert im_db_module._im_db is None
+    assert db.stats["touch_rows"] == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        db._writer.execute("SELECT 1")
+
+
+def test_lru_cache_evicts_and_expires():
+    now = [0.0]
+    cache = LRUCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is _MISSING
+    assert cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is _MISSING
+
+
+def test_stale_read_is_not_cached_after_concurrent_write():
+    cache = LRUCache()
+    generation = cache.generation
+    cache.invalidate("k")  # a write lands between the read and the put
+    cache.put("k", "old", generation)
+
+    assert cache.get("k") is _MISSING
+
+
+async def test_concurrent_messages_from_new_user_share_one_session(db):
+    manager = SessionManager(db)
+
+    session_ids = await asyncio.gather(
+        *(
+            manager.afind_or_create_session("feishu", "new-user", "agent", "chat")
+            for _ in range(10)
+        )
+    )
+
+    assert len(set(session_ids)) == 1
+    assert len(db.list_bindings(provider="feishu")) == 1
+
+
+async def test_async_lookups_do_not_block_the_event_loop(db, monkeypatch):
+    manager = SessionManager(db)
+    session_id = await manager.afind_or_create_session("feishu", "u1", "agent")
+    release = threading.Event()
+    original = db.get_binding
+
+    def slow_get_binding(sid):
+        release.wait(1)
+        return original(sid)
+
+    monkeypatch.setattr(db, "get_binding", slow_get_binding)
+    lookup = asyncio.create_task(manager.aget_binding(session_id))
+    await asyncio.sleep(0.01)
+
+    assert not lookup.done()  # the loop kept running while the lookup waited
+    release.set()
+    assert (await lookup)["session_id"] == session_id
@@ -0,0 +1,223 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp_servers.search import unified_search_server
+from mcp_servers.search.search_providers.base import BaseSearchProvider, SearchResult
+from mcp_servers.search.search_router import (
+    SearchResultCache,
+    SearchRouter,
+    TokenBucket,
+    normalize_query,
+    percentile,
+)
+from sagents.utils.logger import logger
+
+
+@pytest.fixture(autouse=True, scope="module")
+def warm_logger():
+    # The first log call lazily imports the session runtime; keep it out of timings.
+    logger.debug("search router tests")
+
+
+class FakeProvider(BaseSearchProvider):
+    """Local provider that injects latency, failures and empty results."""
+
+    rate_limit_per_second = 0.0
+
+    def __init__(self, name, latency=0.0, fail=False, empty=False):
+        super().__init__("fake-key")
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.empty = empty
+        self.calls = 0
+        self.cancelled = 0
+
+    async def search_web(self, query, count, time_range=""):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} exploded")
+        if self.empty:
+            return []
+        return [
+            SearchResult(title=f"{self.name}:{query}", url="https://a.test", snippet="")
+        ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _call(query="q"):
+    return lambda provider: provider.search_web(query, 10, "")
+
+
+async def test_slow_primary_is_hedged_and_cancelled():
+    router = SearchRouter(default_hedge_delay=0.05, min_hedge_delay=0.01)
+    slow = FakeProvider("slow", latency=1.0)
+    fast = FakeProvider("fast", latency=0.01)
+
+    started = time.monotonic()
+    outcome = await router.hedged_search([slow, fast], _call())
+    elapsed = time.monotonic() - started
+
+    assert outcome.provider == "fast"
+    assert elapsed < 0.5
+    assert slow.cancelled == 1
+    assert router.stats("fast").hedges == 1
+    assert router.stats("slow").cancelled == 1
+
+
+async def test_failure_fails_over_without_waiting_for_hedge_delay():
+    router = SearchRouter(default_hedge_delay=5.0)
+    broken = FakeProvider("broken", latency=0.01, fail=True)
+    empty = FakeProvider("empty", latency=0.01, empty=True)
+    healthy = FakeProvider("healthy", latency=0.01)
+
+    started = time.monotonic()
+    outcome = await router.hedged_search([broken, empty, healthy], _call())
+
+    assert outcome.provider == "healthy"
+    assert time.monotonic() - started < 0.5
+    assert router.stats("broken").failures == 1
+    assert router.stats("empty").empty == 1
+
+
+async def test_all_providers_failing_reports_last_error():
+    router = SearchRouter(default_hedge_delay=0.01, min_hedge_delay=0.01)
+    outcome = await router.hedged_search(
+        [FakeProvider("a", fail=True), FakeProvider("b", fail=True)], _call()
+    )
+
+    assert outcome.results == []
+    assert outcome.error.startswith("所有搜索引擎都失败了")
+    assert "b exploded" in outcome.error
+
+
+def test_hedge_delay_tracks_p95_of_recent_latencies():
+    router = SearchRouter(
+        default_hedge_delay=1.5,
+        min_hedge_delay=0.05,
+        max_hedge_delay=2.0,
+        min_samples=5,
+    )
+    stats = router.stats("p")
+    for latency in (0.1, 0.1, 0.1):
+        stats.record(latency, "success")
+    assert router.hedge_delay("p") == 1.5  # not enough samples yet
+
+    for latency in [0.1] * 16 + [0.9]:
+        stats.record(latency, "success")
+    assert router.hedge_delay("p") == percentile(list(stats.latencies), 95) == 0.1
+
+    for latency in [9.0] * 20:
+        stats.record(latency, "success")
+    assert router.hedge_delay("p") == 2.0
+
+
+async def test_cache_uses_normalized_query_and_serves_fresh_hits():
+    router = SearchRouter()
+    provider = FakeProvider("p")
+
+    first = await router.search("web", "Hello   World", 10, "", [provider], _call())
+    second = await router.search("web", "  hello world ", 10, "", [provider], _call())
+
+    assert provider.calls == 1
+    assert first.from_cache is False
+    assert second.from_cache is True
+    assert second.results == first.results
+    assert normalize_query("ＡＢＣ  d") == "abc d"
+
+
+async def test_stale_entries_are_served_while_revalidating():
+    clock = FakeClock()
+    router = SearchRouter(cache=SearchResultCache(ttl=10, stale_ttl=10, clock=clock))
+    provider = FakeProvider("p")
+
+    await router.search("web", "q", 10, "", [provider], _call("old"))
+    clock.now = 15
+    stale = await router.search("web", "q", 10, "", [provider], _call("new"))
+
+    assert stale.stale is True
+    assert stale.results[0].title == "p:old"
+    await asyncio.gather(*list(router._background))
+    clock.now = 16
+    refreshed = await router.search("web", "q", 10, "", [provider], _call("new"))
+    assert refreshed.stale is False
+    assert refreshed.results[0].title == "p:new"
+
+    clock.now = 100  # beyond the stale window: a blocking refetch
+    await router.search("web", "q", 10, "", [provider], _call())
+    assert provider.calls == 3
+
+
+async def test_concurrent_identical_misses_share_one_search():
+    router = SearchRouter()
+    provider = FakeProvider("p", latency=0.05)
+
+    outcomes = await asyncio.gather(
+        *(router.search("web", "q", 10, "", [provider], _call()) for _ in range(5))
+    )
+
+    assert provider.calls == 1
+    assert all(outcome.results for outcome in outcomes)
+
+
+async def test_rate_limited_provider_is_skipped():
+    router = SearchRouter(default_hedge_delay=5.0)
+    limited = FakeProvider("limited")
+    limited.rate_limit_per_second = 0.001
+    limited.rate_limit_burst = 1
+    backup = FakeProvider("backup")
+
+    first = await router.hedged_search([limited, backup], _call())
+    second = await router.hedged_search([limited, backup], _call())
+
+    assert first.provider == "limited"
+    assert second.provider == "backup"
+    assert limited.calls == 1
+    assert router.stats("limited").rate_limited == 1
+
+
+def test_token_bucket_refills_over_time():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=1, clock=clock)
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 0.5
+    assert bucket.try_acquire()
+
+
+async def test_search_web_routes_through_shared_router(monkeypatch):
+    slow = FakeProvider("slow", latency=1.0)
+    fast = FakeProvider("fast", latency=0.01)
+    monkeypatch.setattr(
+        unified_search_server, "get_available_providers", lambda: [slow, fast]
+    )
+    monkeypatch.setattr(
+        unified_search_server,
+        "search_router",
+        SearchRouter(default_hedge_delay=0.02, min_hedge_delay=0.01),
+    )
+
+    results, error = await unified_search_server.search_web("docs", 5)
+
+    assert error is None
+    assert results[0].title == "fast:docs"
+
+
+@pytest.mark.parametrize("pct,expected", [(50, 2), (95, 4), (100, 4)])
+def test_percentile_nearest_rank(pct, expected):
+    assert percentile([4, 1, 3, 2], pct) == expected
@@ -0,0 +1,341 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+
+from mcp_servers.task_scheduler import task_scheduler_server
+from mcp_servers.task_scheduler.timer_wheel import (
+    SPAWN_TIMER_KEY,
+    HierarchicalTimerWheel,
+    TimerWheelScheduler,
+    parse_execute_at,
+)
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTaskStore:
+    """In-memory stand-in for the backend /tasks API with claim semantics."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.tasks = {}
+        self.executed = []
+        self.running = 0
+        self.peak_running = 0
+        self.peak_by_agent = {}
+        self.running_by_agent = {}
+        self.release = asyncio.Event()
+        self.release.set()
+        self.load_calls = 0
+        self.recurring = []  # (agent_id, next_run_at)
+        self._next_id = 1
+
+    def add(self, execute_at, agent_id="agent-a", status="pending"):
+        task_id = self._next_id
+        self._next_id += 1
+        self.tasks[task_id] = {
+            "id": task_id,
+            "agent_id": agent_id,
+            "execute_at": datetime.fromtimestamp(execute_at).isoformat(),
+            "status": status,
+        }
+        return task_id
+
+    async def load_pending(self, horizon_seconds, limit):
+        self.load_calls += 1
+        cutoff = self.clock() + horizon_seconds
+        items = [
+            dict(task)
+            for task in self.tasks.values()
+            if task["status"] == "pending"
+            and parse_execute_at(task["execute_at"]) <= cutoff
+        ]
+        items.sort(key=lambda task: parse_execute_at(task["execute_at"]))
+        return items[:limit]
+
+    async def spawn_due(self):
+        spawned = []
+        upcoming = []
+        for agent_id, next_run_at in self.recurring:
+            while next_run_at <= self.clock():
+                task_id = self.add(next_run_at, agent_id=agent_id)
+                spawned.append(dict(self.tasks[task_id]))
+                next_run_at += 60
+            upcoming.append((agent_id, next_run_at))
+        self.recurring = upcoming
+        next_run = min((run for _, run in upcoming), default=None)
+        return spawned, next_run
+
+    async def execute(self, task):
+        stored = self.tasks.get(task["id"])
+        if not stored or stored["status"] != "pending":
+            return  # claim failed
+        stored["status"] = "processing"
+        agent_id = task["agent_id"]
+        self.running += 1
+        self.running_by_agent[agent_id] = self.running_by_agent.get(agent_id, 0) + 1
+        self.peak_running = max(self.peak_running, self.running)
+        self.peak_by_agent[agent_id] = max(
+            self.peak_by_agent.get(agent_id, 0), self.running_by_agent[agent_id]
+        )
+        try:
+            await self.release.wait()
+            self.executed.append((task["id"], self.clock()))
+            stored["status"] = "completed"
+        finally:
+            self.running -= 1
+            self.running_by_agent[agent_id] -= 1
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _scheduler(store, clock, **kwargs):
+    return TimerWheelScheduler(store, clock=clock, **kwargs)
+
+
+def test_wheel_fires_100k_timers_in_order_exactly_once():
+    rng = random.Random(3)
+    wheel = HierarchicalTimerWheel(tick_seconds=1.0, start=START)
+    # Spread over ~2 days so several wheel levels and cascades are exercised.
+    due = {i: START + rng.uniform(0, 2 * 86400) for i in range(100_000)}
+    for key, when in due.items():
+        wheel.schedule(key, when)
+    cancelled = set(rng.sample(range(100_000), 5_000))
+    for key in cancelled:
+        wheel.cancel(key)
+
+    fired = []
+    now = START
+    while len(wheel):
+        now += rng.uniform(30, 900)
+        for key, when, _ in wheel.advance(now):
+            assert when <= now
+            assert now - when < 900 + 1
+            fired.append((when, key))
+
+    keys = [key for _, key in fired]
+    assert len(keys) == len(set(keys)) == 95_000
+    assert not cancelled.intersection(keys)
+    assert [when for when, _ in fired] == sorted(when for when, _ in fired)
+
+
+def test_wheel_handles_far_future_overflow_and_reschedule():
+    wheel = HierarchicalTimerWheel(tick_seconds=1.0, slot_bits=2, levels=2, start=0)
+    wheel.schedule("far", 1000.0)  # beyond 4**2 ticks, lives in overflow
+    wheel.schedule("moved", 50.0)
+    wheel.schedule("moved", 5.0)
+
+    assert wheel.advance(4.0) == []
+    assert [key for key, _, _ in wheel.advance(5.0)] == ["moved"]
+    assert wheel.advance(999.0) == []
+    assert [key for key, _, _ in wheel.advance(1000.0)] == ["far"]
+    assert wheel.next_deadline() is None
+
+
+def test_wheel_next_deadline_never_overshoots():
+    wheel = HierarchicalTimerWheel(tick_seconds=1.0, start=0)
+    wheel.schedule("a", 10_000.0)
+    now = 0.0
+    while True:
+        deadline = wheel.next_deadline()
+        assert deadline is not None and deadline <= 10_000.0
+        now = deadline
+        if wheel.advance(now):
+            break
+    assert now == 10_000.0
+
+
+async def test_due_tasks_run_on_time_without_polling():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    first = store.add(START + 10)
+    second = store.add(START + 5)
+    scheduler = _scheduler(store, clock)
+
+    await scheduler.sync()
+    clock.now = START + 4
+    await scheduler.poll()
+    assert store.executed == []
+
+    clock.now = START + 10
+    await scheduler.poll()
+    await scheduler.drain()
+    assert [task_id for task_id, _ in store.executed] == [second, first]
+    assert store.load_calls == 1
+
+
+async def test_global_and_per_agent_limits_apply_backpressure():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    store.release.clear()
+    for _ in range(6):
+        store.add(START, agent_id="busy")
+    for _ in range(2):
+        store.add(START, agent_id="quiet")
+    scheduler = _scheduler(store, clock, max_concurrency=3, per_agent_limit=2)
+
+    await scheduler.sync()
+    await scheduler.poll()
+    await _settle()
+
+    assert scheduler.running_count == 3
+    assert scheduler.running_for_agent("busy") == 2
+    assert scheduler.running_for_agent("quiet") == 1
+    assert scheduler.ready_count == 5
+    # Unstarted tasks are still pending in the store: nothing claimed ahead of capacity.
+    assert sum(task["status"] == "pending" for task in store.tasks.values()) == 5
+
+    store.release.set()
+    await scheduler.drain()
+    assert len(store.executed) == 8
+    assert store.peak_running == 3
+    assert store.peak_by_agent == {"busy": 2, "quiet": 1}
+
+
+async def test_notification_resync_picks_up_writes_and_deletions():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    doomed = store.add(START + 30)
+    scheduler = _scheduler(store, clock)
+    await scheduler.sync()
+
+    store.tasks[doomed]["status"] = "deleted"
+    added = store.add(START + 20)
+    scheduler.notify_changed()
+    await scheduler.sync()
+
+    clock.now = START + 60
+    await scheduler.poll()
+    await scheduler.drain()
+    assert [task_id for task_id, _ in store.executed] == [added]
+    assert scheduler.stats["cancelled"] == 1
+
+
+async def test_run_forever_wakes_on_notification_from_another_thread():
+    store = FakeTaskStore(FakeClock())
+    scheduler = TimerWheelScheduler(store, resync_interval=3600)
+    runner = asyncio.create_task(scheduler.run_forever())
+    try:
+        while store.load_calls == 0:
+            await asyncio.sleep(0.01)
+        store.clock = scheduler.clock
+        task_id = store.add(scheduler.clock() - 1)
+        await asyncio.to_thread(scheduler.notify_changed)
+        for _ in range(100):
+            if store.executed:
+                break
+            await asyncio.sleep(0.01)
+        assert [executed for executed, _ in store.executed] == [task_id]
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+async def test_restart_runs_missed_tasks_once_in_schedule_order():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    store.release.clear()
+    early = store.add(START + 10)
+    late = store.add(START + 20)
+    crashed = _scheduler(store, clock, max_concurrency=1)
+    await crashed.sync()
+    clock.now = START + 10
+    await crashed.poll()
+    await _settle()
+    # The process dies: the running task stays claimed, the queued one is untouched.
+    for runner in list(crashed._running.values()):
+        runner.cancel()
+    await asyncio.gather(*crashed._running.values(), return_exceptions=True)
+    assert store.tasks[early]["status"] == "processing"
+    assert store.tasks[late]["status"] == "pending"
+
+    clock.now = START + 600
+    store.release.set()
+    restarted = _scheduler(store, clock, misfire_grace_seconds=60)
+    await restarted.sync()
+    await restarted.poll()
+    await restarted.drain()
+
+    assert [task_id for task_id, _ in store.executed] == [late]
+    assert restarted.stats["misfired"] == 1
+
+
+async def test_recurring_spawn_timer_fires_at_next_cron_time():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    store.recurring = [("cron-agent", START + 60)]
+    scheduler = _scheduler(store, clock)
+
+    await scheduler.sync()
+    assert scheduler.wheel.when(SPAWN_TIMER_KEY) == START + 60
+
+    for minute in range(1, 4):
+        clock.now = START + minute * 60
+        await scheduler.poll()
+        await scheduler.drain()
+    assert len(store.executed) == 3
+    assert scheduler.wheel.when(SPAWN_TIMER_KEY) == START + 240
+
+
+async def test_max_tracked_bounds_memory_and_loads_rest_later():
+    clock = FakeClock()
+    store = FakeTaskStore(clock)
+    for offset in range(50):
+        store.add(START + offset)
+    scheduler = _scheduler(store, clock, max_tracked=10)
+
+    await scheduler.sync()
+    assert len(scheduler.wheel) == 10
+
+    clock.now = START + 100
+    for _ in range(5):
+        await scheduler.poll()
+        await scheduler.drain()
+        await scheduler.sync()
+    assert len(store.executed) == 50
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["2026-04-13 18:37:42", "2026-04-13T18:37:42", datetime(2026, 4, 13, 18, 37, 42)],
+)
+def test_parse_execute_at_accepts_backend_formats(value):
+    assert parse_execute_at(value) == datetime(2026, 4, 13, 18, 37, 42).timestamp()
+
+
+async def test_backend_source_parses_spawn_response(monkeypatch):
+    calls = []
+
+    async def fake_request_json(method, path, **kwargs):
+        calls.append((method, path, kwargs.get("params")))
+        if path.endswith("spawn-due"):
+            return {"items": [{"id": 1}], "next_run_at": "2026-04-13T09:00:00"}
+        return {"items": [{"id": 2}]}
+
+    monkeypatch.setattr(task_scheduler_server, "_request_json", fake_request_json)
+    source = task_scheduler_server._BackendTaskSource()
+
+    items, next_run_at = await source.spawn_due()
+    pending = await source.load_pending(3600, 900)
+
+    assert items == [{"id": 1}]
+    assert next_run_at == datetime(2026, 4, 13, 9, 0, 0).timestamp()
+    assert pending == [{"id": 2}]
+    assert calls[-1] == (
+        "GET",
+        "/tasks/internal/due",
+        {"limit": 500, "horizon_seconds": 3600},
+    )
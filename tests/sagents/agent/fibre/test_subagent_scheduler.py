@@ -0,0 +1,139 @@
+import asyncio
+
+import sagents.session_runtime  # noqa: F401
+from sagents.agent.fibre import scheduler as scheduler_module
+from sagents.agent.fibre.scheduler import SubAgentJob, SubAgentScheduler
+
+
+def _queue_wait_count():
+    samples = scheduler_module._QUEUE_WAIT.collect().samples
+    return next((s.value for s in samples if s.name.endswith("_count")), 0)
+
+
+class FakeAgents:
+    """Fake sub-agents that record start order and peak concurrency."""
+
+    def __init__(self):
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self.stop = {}
+
+    def job(self, name, parent="parent", root=None, delay=0.01, **kwargs):
+        stop = self.stop.setdefault(name, asyncio.Event())
+
+        async def run():
+            self.started.append(name)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+                return f"{name} stopped"
+            except asyncio.TimeoutError:
+                return f"{name} done"
+            finally:
+                self.running -= 1
+
+        return SubAgentJob(
+            run=run,
+            parent_session_id=parent,
+            session_id=name,
+            root_session_id=root or parent,
+            name=name,
+            on_cancel=stop.set,
+            **kwargs,
+        )
+
+
+async def test_global_limit_priority_and_completion_order():
+    agents = FakeAgents()
+    scheduler = SubAgentScheduler(max_concurrency=2, per_parent_limit=4)
+    observed = _queue_wait_count()
+    jobs = [
+        agents.job("slow", delay=0.05),
+        agents.job("fast", delay=0.01),
+        agents.job("low", priority=5),
+        agents.job("high", priority=-1),
+    ]
+
+    batch = scheduler.submit(jobs)
+    finished = [job.name async for job in batch.as_completed()]
+
+    assert agents.peak == 2
+    assert agents.started == ["high", "slow", "fast", "low"]
+    assert finished[-1] == "slow"
+    assert jobs[0].future.result() == "slow done"
+    assert jobs[3].queue_wait > 0
+    assert scheduler.stats["completed"] == 4 and scheduler.stats["running"] == 0
+    assert _queue_wait_count() == observed + 4
+
+
+async def test_fair_share_across_root_sessions_and_per_parent_limit():
+    agents = FakeAgents()
+    scheduler = SubAgentScheduler(max_concurrency=2, per_parent_limit=2)
+    busy = scheduler.submit([agents.job(f"a{n}", parent="a") for n in range(4)])
+    other = scheduler.submit([agents.job(f"b{n}", parent="b") for n in range(2)])
+
+    await asyncio.gather(*(job.future for job in busy.jobs + other.jobs))
+
+    # a 先占满两个槽位，之后空出的槽位在两个根会话之间轮换
+    assert agents.started == ["a0", "a1", "b0", "a2", "b1", "a3"]
+
+
+async def test_token_budget_admits_one_large_job_when_idle():
+    agents = FakeAgents()
+    scheduler = SubAgentScheduler(max_concurrency=4, token_budget=100)
+    batch = scheduler.submit(
+        [
+            agents.job("big", token_cost=500),
+            agents.job("small-1", token_cost=60),
+            agents.job("small-2", token_cost=60),
+        ]
+    )
+
+    await asyncio.gather(*(job.future for job in batch.jobs))
+
+    assert agents.peak == 1
+    assert scheduler.stats["tokens_in_flight"] == 0
+
+
+async def test_cancel_stops_running_siblings_and_drops_queued_ones():
+    agents = FakeAgents()
+    scheduler = SubAgentScheduler(max_concurrency=1)
+    batch = scheduler.submit(
+        [agents.job("running", delay=1.0), agents.job("queued", delay=1.0)]
+    )
+    await asyncio.sleep(0)
+
+    batch.cancel("parent interrupted")
+    results = {job.name: job.future async for job in batch.as_completed()}
+
+    assert results["running"].result() == "running stopped"
+    assert results["queued"].cancelled()
+    assert agents.started == ["running"]
+
+
+async def test_parent_waiting_on_children_releases_its_slot():
+    agents = FakeAgents()
+    scheduler = SubAgentScheduler(max_concurrency=1)
+
+    async def parent():
+        with scheduler.waiting_on_children("parent-session"):
+            children = scheduler.submit(
+                [agents.job("child", parent="parent-session", root="root")]
+            )
+            return [job.future.result() async for job in children.as_completed()]
+
+    batch = scheduler.submit(
+        [
+            SubAgentJob(
+                run=parent,
+                parent_session_id="root",
+                session_id="parent-session",
+            )
+        ]
+    )
+
+    result = await asyncio.wait_for(batch.jobs[0].future, timeout=1)
+    assert result == ["child done"]
+    assert scheduler.running == 0
@@ -0,0 +1,202 @@
+import asyncio
+
+from sagents.context.user_memory import (
+    IMemoryDriver,
+    MemoryEntry,
+    MemoryType,
+    UserMemoryManager,
+    UserMemoryRecallCache,
+)
+from sagents.context.user_memory.cache import USER_MEMORY_RECALL_CACHE
+from sagents.tool.tool_manager import ToolManager
+from sagents.tool.tool_schema import ToolSpec
+
+
+class CountingDriver(IMemoryDriver):
+    def __init__(self):
+        self.memories = {}
+        self.recall_by_type_calls = 0
+
+    def is_available(self):
+        return True
+
+    async def remember(
+        self,
+        user_id,
+        memory_key,
+        content,
+        memory_type,
+        tags,
+        session_id=None,
+        session_context=None,
+    ):
+        self.memories[memory_key] = (memory_type, content)
+        return "ok"
+
+    async def recall(
+        self, user_id, query, limit, session_id=None, session_context=None
+    ):
+        return []
+
+    async def recall_by_type(
+        self, user_id, memory_type, query, limit, session_id=None, session_context=None
+    ):
+        self.recall_by_type_calls += 1
+        return [
+            MemoryEntry(key=key, content=content, memory_type=MemoryType(kind))
+            for key, (kind, content) in self.memories.items()
+            if kind == memory_type
+        ]
+
+    async def forget(self, user_id, memory_key, session_id=None, session_context=None):
+        self.memories.pop(memory_key, None)
+        return "ok"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _manager(monkeypatch, tmp_path, clock):
+    monkeypatch.setenv("MEMORY_ROOT_PATH", str(tmp_path))
+    driver = CountingDriver()
+    cache = UserMemoryRecallCache(ttl=300, negative_ttl=30, clock=clock)
+    return UserMemoryManager(str(tmp_path), driver=driver, recall_cache=cache), driver
+
+
+def test_system_memories_are_cached_until_a_write(monkeypatch, tmp_path):
+    clock = FakeClock()
+    manager, driver = _manager(monkeypatch, tmp_path, clock)
+
+    async def scenario():
+        await manager.remember("u1", "lang", "中文回答", memory_type="preference")
+        first = await manager.get_system_memories("u1")
+        assert first == {"preference": "- lang: 中文回答"}
+        assert driver.recall_by_type_calls == 4
+
+        assert await manager.get_system_memories("u1") == first
+        assert driver.recall_by_type_calls == 4
+
+        # 写入让该用户的缓存失效，下一轮重新读取
+        await manager.remember("u1", "tests", "先写测试", memory_type="requirement")
+        second = await manager.get_system_memories("u1")
+        assert second["requirement"] == "- tests: 先写测试"
+        assert driver.recall_by_type_calls == 8
+
+        await manager.forget("u1", "lang")
+        assert "preference" not in await manager.get_system_memories("u1")
+        assert driver.recall_by_type_calls == 12
+
+    asyncio.run(scenario())
+
+
+def test_negative_results_expire_quickly_and_prefetch_warms_cache(
+    monkeypatch, tmp_path
+):
+    clock = FakeClock()
+    manager, driver = _manager(monkeypatch, tmp_path, clock)
+
+    async def scenario():
+        await manager.prefetch_system_memories("u2")
+        assert driver.recall_by_type_calls == 4
+        assert await manager.get_system_memories("u2") == {}
+        assert driver.recall_by_type_calls == 4
+
+        # 其他进程写入了记忆：空结果缓存过期后即可看到
+        driver.memories["tone"] = ("persona", "简洁")
+        clock.now = 31
+        assert await manager.get_system_memories("u2") == {"persona": "- tone: 简洁"}
+        assert driver.recall_by_type_calls == 8
+
+        clock.now = 50
+        await manager.get_system_memories("u2")
+        assert driver.recall_by_type_calls == 8
+
+        # 空结果过期只重新查询空的类型，有结果的类型仍然命中
+        clock.now = 100
+        await manager.get_system_memories("u2")
+        assert driver.recall_by_type_calls == 11
+
+    asyncio.run(scenario())
+
+
+def test_drivers_of_the_same_class_do_not_share_cached_memories(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEMORY_ROOT_PATH", str(tmp_path))
+    cache = UserMemoryRecallCache(ttl=300, negative_ttl=30, clock=FakeClock())
+    first_driver, second_driver = CountingDriver(), CountingDriver()
+    first_driver.memories["lang"] = ("preference", "中文")
+    second_driver.memories["lang"] = ("preference", "English")
+    first = UserMemoryManager(str(tmp_path), driver=first_driver, recall_cache=cache)
+    second = UserMemoryManager(str(tmp_path), driver=second_driver, recall_cache=cache)
+
+    async def scenario():
+        assert await first.get_system_memories("u1") == {"preference": "- lang: 中文"}
+        assert await second.get_system_memories("u1") == {
+            "preference": "- lang: English"
+        }
+        assert await first.get_system_memories("u1") == {"preference": "- lang: 中文"}
+        assert first_driver.recall_by_type_calls == 4
+        assert second_driver.recall_by_type_calls == 4
+
+    asyncio.run(scenario())
+
+
+def test_agent_memory_tool_write_invalidates_cached_recall(monkeypatch, tmp_path):
+    monkeypatch.setenv("MEMORY_ROOT_PATH", str(tmp_path))
+    USER_MEMORY_RECALL_CACHE.clear()
+    driver = CountingDriver()
+    manager = UserMemoryManager(str(tmp_path), driver=driver)
+
+    async def remember_user_memory(memory_key, content, memory_type):
+        driver.memories[memory_key] = (memory_type, content)
+        return {"success": True}
+
+    async def forget_user_memory(memory_key):
+        driver.memories.pop(memory_key, None)
+        return {"success": True}
+
+    tool_manager = ToolManager(is_auto_discover=False, isolated=True)
+    tool_manager.tools = {}
+    for func in (remember_user_memory, forget_user_memory):
+        tool_manager.tools[func.__name__] = ToolSpec(
+            name=func.__name__,
+            description=func.__name__,
+            description_i18n={},
+            func=func,
+            parameters={
+                "memory_key": {"type": "string"},
+                "content": {"type": "string"},
+                "memory_type": {"type": "string"},
+            },
+            required=["memory_key"],
+        )
+
+    async def scenario():
+        assert await manager.get_system_memories("u-tool") == {}
+
+        # 智能体直接调用记忆工具，不经过 UserMemoryManager
+        await tool_manager.run_tool_async(
+            "remember_user_memory",
+            user_id="u-tool",
+            memory_key="lang",
+            content="中文",
+            memory_type="preference",
+        )
+        assert await manager.get_system_memories("u-tool") == {
+            "preference": "- lang: 中文"
+        }
+
+        await tool_manager.run_tool_async(
+            "forget_user_memory", user_id="u-tool", memory_key="lang"
+        )
+        assert await manager.get_system_memories("u-tool") == {}
+        assert driver.recall_by_type_calls == 12
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        USER_MEMORY_RECALL_CACHE.clear()
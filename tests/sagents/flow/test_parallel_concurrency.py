@@ -0,0 +1,295 @@
+import asyncio
+
+import httpx
+from openai import RateLimitError
+from openai.types.chat import chat_completion_chunk
+
+import sagents.session_runtime  # noqa: F401
+from sagents.agent import agent_base
+from sagents.agent.agent_base import AgentBase
+from sagents.context.messages.message import MessageChunk, MessageRole
+from sagents.context.session_context import SessionStatus
+from sagents.flow.concurrency import AdaptiveLimiter, ResourcePools
+from sagents.flow.executor import FlowExecutor
+from sagents.flow.schema import AgentNode, ParallelNode, SequenceNode
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _FakeContext:
+    audit_status = {}
+    system_context = {}
+
+    def add_messages(self, _messages):
+        pass
+
+
+class _FakeSession:
+    def __init__(self):
+        self.context = _FakeContext()
+
+    def should_interrupt(self):
+        return False
+
+    def get_status(self):
+        return SessionStatus.RUNNING
+
+    def get_context(self):
+        return self.context
+
+
+class _FakeSessionManager:
+    def __init__(self):
+        self.session = _FakeSession()
+
+    def get_live_session(self, _session_id):
+        return self.session
+
+
+class _FakeAgent:
+    def __init__(self, name):
+        self.agent_name = name
+
+
+class FakeRuntime:
+    """Agents named ``<kind>-<delay ms>``; ``fail-*`` raise after the delay."""
+
+    def __init__(self):
+        self.running = {}
+        self.peak = {}
+        self.cancelled = []
+
+    def _get_agent(self, agent_key):
+        return _FakeAgent(agent_key)
+
+    async def _execute_agent_phase(self, session_id, agent, phase_name):
+        kind, delay = agent.agent_name.rsplit("-", 1)
+        self.running[kind] = self.running.get(kind, 0) + 1
+        self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+        try:
+            await asyncio.sleep(int(delay) / 1000)
+        except asyncio.CancelledError:
+            self.cancelled.append(agent.agent_name)
+            raise
+        finally:
+            self.running[kind] -= 1
+        if kind == "fail":
+            raise RuntimeError(agent.agent_name)
+        yield [MessageChunk(role=MessageRole.ASSISTANT.value, content=agent.agent_name)]
+
+
+def _executor(runtime, pools):
+    return FlowExecutor(
+        tool_manager=None,
+        session_runtime=runtime,
+        session_id="parallel-session",
+        session_manager=_FakeSessionManager(),
+        resource_pools=pools,
+    )
+
+
+def _pools(**limits):
+    return ResourcePools(
+        {name: AdaptiveLimiter(name, initial=limit) for name, limit in limits.items()}
+    )
+
+
+async def _contents(executor, node):
+    return [
+        chunk.content async for chunks in executor.execute(node) for chunk in chunks
+    ]
+
+
+def test_adaptive_limiter_grows_on_success_and_backs_off_once_per_batch():
+    clock = _FakeClock()
+    limiter = AdaptiveLimiter("llm", initial=2, max_limit=4, clock=clock)
+
+    def finish(started, ok=True):
+        limiter._in_flight += 1
+        limiter.release(started, ok)
+
+    for _ in range(6):
+        clock.now += 0.25
+        finish(clock.now - 0.25)
+    assert limiter.limit == 4.0
+
+    # 同一时刻发出的一批请求同时失败，只收缩一次
+    started = clock.now
+    clock.now += 0.25
+    finish(started, ok=False)
+    finish(started, ok=False)
+    assert limiter.limit == 2.0
+
+    # 收缩之后发出的请求再失败，继续收缩
+    started = clock.now
+    clock.now += 0.25
+    finish(started, ok=False)
+    assert limiter.limit == 1.0
+    assert limiter.in_flight == 0
+
+
+def test_slow_successful_branches_do_not_shrink_the_limit():
+    clock = _FakeClock()
+    limiter = AdaptiveLimiter("llm", initial=4, max_limit=16, clock=clock)
+
+    # 分支工作量差别很大：5 秒到 60 秒不等，但都成功
+    for seconds in [5, 60, 12, 45, 5, 30, 60, 8, 50, 20] * 2:
+        limiter._in_flight += 1
+        started = clock.now
+        clock.now += seconds
+        limiter.release(started, True)
+
+    assert limiter.limit > 4
+
+
+class _RetryingAgent(AgentBase):
+    async def run_stream(self, session_context):
+        if False:
+            yield []
+
+
+def _ok_chunk():
+    return chat_completion_chunk.ChatCompletionChunk(
+        id="chunk",
+        object="chat.completion.chunk",
+        created=0,
+        model="gpt-test",
+        choices=[
+            chat_completion_chunk.Choice(
+                index=0,
+                delta=chat_completion_chunk.ChoiceDelta(content="ok"),
+                finish_reason="stop",
+            )
+        ],
+    )
+
+
+async def test_rate_limit_swallowed_by_agent_retry_shrinks_the_llm_pool(
+    monkeypatch,
+):
+    attempts = []
+
+    async def fake_create(client, **_kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+            raise RateLimitError(
+                "rate limited",
+                response=httpx.Response(429, request=request),
+                body=None,
+            )
+
+        async def stream():
+            yield _ok_chunk()
+
+        return stream()
+
+    real_sleep = asyncio.sleep
+
+    async def no_backoff(_seconds, *args, **kwargs):
+        await real_sleep(0)
+
+    monkeypatch.setattr(agent_base, "create_chat_completion_with_fallback", fake_create)
+    monkeypatch.setattr(agent_base.asyncio, "sleep", no_backoff)
+    agent = _RetryingAgent(
+        model=object(),  # pyright: ignore[reportArgumentType]
+        model_config={"model": "gpt-test"},
+    )
+    pools = _pools(llm=4)
+
+    async with pools.hold("llm"):
+        chunks = [
+            chunk
+            async for chunk in agent._call_llm_streaming(
+                [MessageChunk(role=MessageRole.USER.value, content="hi")],  # pyright: ignore[reportArgumentType]
+                enable_thinking=False,
+            )
+        ]
+
+    limiter = pools.get("llm")
+    assert len(attempts) == 2
+    assert len(chunks) == 1
+    # 429 收缩到 2，重试成功再加 1/2；分支整体成功不重复计入
+    assert limiter.limit == 2.5
+    assert limiter.in_flight == 0
+
+
+def test_flow_executors_do_not_share_resource_pools():
+    first = FlowExecutor(None, FakeRuntime(), "session-a", _FakeSessionManager())
+    second = FlowExecutor(None, FakeRuntime(), "session-b", _FakeSessionManager())
+
+    assert first.resource_pools is not second.resource_pools
+
+
+async def test_branches_share_per_resource_pools():
+    runtime = FakeRuntime()
+    node = ParallelNode(
+        branches=[
+            AgentNode(agent_key="llm-20"),
+            AgentNode(agent_key="llm-20"),
+            AgentNode(agent_key="llm-20"),
+            AgentNode(agent_key="io-20", resource="io"),
+            AgentNode(agent_key="io-20", resource="io"),
+        ]
+    )
+
+    contents = await _contents(_executor(runtime, _pools(llm=1, io=4)), node)
+
+    assert runtime.peak == {"llm": 1, "io": 2}
+    assert contents == ["llm-20"] * 3 + ["io-20"] * 2
+
+
+async def test_node_max_concurrency_caps_unpooled_branches():
+    runtime = FakeRuntime()
+    node = ParallelNode(
+        max_concurrency=2,
+        branches=[SequenceNode(steps=[AgentNode(agent_key="seq-10")])] * 4,
+    )
+
+    contents = await _contents(_executor(runtime, _pools(llm=8)), node)
+
+    assert runtime.peak == {"seq": 2}
+    assert len(contents) == 4
+
+
+async def test_any_join_returns_first_success_and_cancels_the_rest():
+    runtime = FakeRuntime()
+    node = ParallelNode(
+        join="any",
+        branches=[
+            AgentNode(agent_key="slow-500"),
+            AgentNode(agent_key="fail-5"),
+            AgentNode(agent_key="fast-20"),
+        ],
+    )
+
+    contents = await _contents(_executor(runtime, _pools(llm=4)), node)
+
+    assert contents == ["fast-20"]
+    assert runtime.cancelled == ["slow-500"]
+
+
+async def test_first_n_join_keeps_branch_order():
+    runtime = FakeRuntime()
+    pools = _pools(llm=4)
+    node = ParallelNode(
+        join="first_n",
+        first_n=2,
+        branches=[
+            AgentNode(agent_key="c-30"),
+            AgentNode(agent_key="d-500"),
+            AgentNode(agent_key="a-10"),
+        ],
+    )
+
+    contents = await _contents(_executor(runtime, pools), node)
+
+    assert contents == ["c-30", "a-10"]
+    assert runtime.cancelled == ["d-500"]
+    assert pools.get("llm").in_flight == 0
@@ -0,0 +1,204 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from sagents.llm import replay
+from sagents.llm.chat import OpenAIChat
+from sagents.llm.replay import (
+    Cassette,
+    LLMReplayMissError,
+    ReplayClient,
+    canonical_request,
+    request_fingerprint,
+)
+
+
+def _chunk(text, finish_reason=None):
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "object": "chat.completion.chunk",
+            "created": 1,
+            "model": "fake-model",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": text},
+                    "finish_reason": finish_reason,
+                }
+            ],
+        }
+    )
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if not kwargs.get("stream"):
+            return ChatCompletion.model_validate(
+                {
+                    "id": "chatcmpl-2",
+                    "object": "chat.completion",
+                    "created": 1,
+                    "model": "fake-model",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "plain"},
+                        }
+                    ],
+                }
+            )
+
+        async def _stream():
+            for text in ("Hel", "lo"):
+                yield _chunk(text)
+            yield _chunk("", finish_reason="stop")
+
+        return _stream()
+
+
+class _FakeAsyncOpenAI:
+    def __init__(self, **kwargs):
+        self.base_url = kwargs.get("base_url")
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _FakeCompletions()
+
+    async def close(self):
+        return None
+
+
+def _request(system="You are Sage. Current time: 2026-10-19 08:30:00", user="hi"):
+    return {
+        "model": "fake-model",
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user, "_sage_message_id": "m1"},
+        ],
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+
+
+async def _collect(stream):
+    return "".join([chunk.choices[0].delta.content or "" async for chunk in stream])
+
+
+def test_record_then_replay_stream_and_completion(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    inner = _FakeAsyncOpenAI()
+
+    async def record():
+        client = ReplayClient(inner, Cassette(path), "record")
+        stream = await client.chat.completions.create(**_request())
+        assert await _collect(stream) == "Hello"
+        response = await client.chat.completions.create(
+            **{**_request(), "stream": False}
+        )
+        assert response.choices[0].message.content == "plain"
+
+    asyncio.run(record())
+    assert len(inner.chat.completions.calls) == 2
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [line["stream"] for line in lines] == [True, False]
+    assert len(lines[0]["chunks"]) == len(lines[0]["offsets"]) == 3
+    assert "_sage_message_id" not in json.dumps(lines[0]["request"])
+
+    async def replay_run():
+        client = ReplayClient(_FakeAsyncOpenAI(), Cassette(path), "replay")
+        # 传输层参数和 Sage 内部字段不影响指纹
+        request = _request()
+        request.pop("stream_options")
+        stream = await client.chat.completions.create(**request)
+        assert await _collect(stream) == "Hello"
+        response = await client.chat.completions.create(
+            **{**_request(), "stream": False}
+        )
+        assert response.choices[0].message.content == "plain"
+        assert client.inner.chat.completions.calls == []
+
+    asyncio.run(replay_run())
+
+
+def test_fuzzy_match_ignores_volatile_system_sections_and_misses_raise(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    asyncio.run(
+        _collect_recorded(ReplayClient(_FakeAsyncOpenAI(), Cassette(path), "record"))
+    )
+
+    shifted = _request(system="You are Sage. Current time: 2026-10-20 09:45:12")
+    assert request_fingerprint(canonical_request(shifted)) != request_fingerprint(
+        canonical_request(_request())
+    )
+
+    def with_tool_call(call_id):
+        request = _request()
+        request["messages"] += [
+            {
+                "role": "assistant",
+                "tool_calls": [
+                    {
+                        "id": call_id,
+                        "type": "function",
+                        "function": {"name": "recall", "arguments": "{}"},
+                    }
+                ],
+            },
+            {"role": "tool", "tool_call_id": call_id, "content": "none"},
+        ]
+        return canonical_request(request)
+
+    assert request_fingerprint(
+        with_tool_call("call_recall_1a2b"), fuzzy=True
+    ) == request_fingerprint(with_tool_call("call_recall_9f8e"), fuzzy=True)
+
+    async def replay_run():
+        client = ReplayClient(_FakeAsyncOpenAI(), Cassette(path), "replay")
+        assert (
+            await _collect(await client.chat.completions.create(**shifted)) == "Hello"
+        )
+        with pytest.raises(LLMReplayMissError):
+            await client.chat.completions.create(**_request(user="something else"))
+
+    asyncio.run(replay_run())
+
+
+async def _collect_recorded(client):
+    return await _collect(await client.chat.completions.create(**_request()))
+
+
+def test_openai_chat_uses_replay_layer_from_env(monkeypatch, tmp_path):
+    path = tmp_path / "env.jsonl"
+    monkeypatch.setenv("SAGE_LLM_CASSETTE", str(path))
+    monkeypatch.setattr(replay, "_CASSETTES", {})
+
+    async def run(mode):
+        monkeypatch.setenv("SAGE_LLM_REPLAY_MODE", mode)
+        with patch("sagents.llm.chat.AsyncOpenAI", _FakeAsyncOpenAI):
+            chat = OpenAIChat(api_key="k", base_url="http://fake/v1", model_name="m")
+        stream = await chat.raw_client.chat.completions.create(
+            model="fake-model",
+            messages=[{"role": "user", "content": "hi"}],
+            stream=True,
+        )
+        text = await _collect(stream)
+        return text, chat._standard_client.inner.chat.completions.calls
+
+    assert asyncio.run(run("auto")) == (
+        "Hello",
+        [
+            {
+                "model": "fake-model",
+                "messages": [{"role": "user", "content": "hi"}],
+                "stream": True,
+            }
+        ],
+    )
+    assert asyncio.run(run("auto")) == ("Hello", [])
@@ -0,0 +1,90 @@
+from sagents.observability import (
+    EventDispatcher,
+    HandlerPolicy,
+    InMemoryTraceHandler,
+    ObservabilityManager,
+)
+from sagents.observability.opentelemetry_handler import OpenTelemetryTraceHandler
+
+
+class _InlineHandler(InMemoryTraceHandler):
+    async_safe = False
+
+
+def test_queued_handlers_receive_batches_after_inline_handlers():
+    inline, queued = _InlineHandler(), InMemoryTraceHandler()
+    manager = ObservabilityManager(
+        handlers=[inline, queued],
+        dispatcher=EventDispatcher(flush_interval=60),
+    )
+    messages = [{"role": "user", "content": "hi"}]
+
+    manager.on_llm_start("s1", "model", messages, step_name="plan")
+    manager.on_llm_end({"ok": True}, session_id="s1")
+    messages.append({"role": "assistant", "content": "later"})
+
+    assert inline.names() == ["on_llm_start", "on_llm_end"]
+    assert queued.events == []
+
+    manager.flush()
+    assert queued.names() == ["on_llm_start", "on_llm_end"]
+    start = queued.events[0]
+    assert start.session_id == "s1" and start.args[2] == [messages[0]]
+    assert manager.dispatcher.stats["exported"] == 2
+
+
+def test_overflow_overwrites_oldest_events_and_is_counted():
+    handler = InMemoryTraceHandler()
+    dispatcher = EventDispatcher(capacity=3, flush_interval=60)
+    dispatcher.add_handler(handler)
+
+    for n in range(5):
+        dispatcher.publish("on_tool_end", (f"out-{n}",), {"session_id": "s1"})
+    assert dispatcher.stats["dropped_overflow"] == 2
+
+    dispatcher.flush()
+    assert [event.args[0] for event in handler.events] == ["out-2", "out-3", "out-4"]
+    assert dispatcher.stats["dropped_overflow"] == 2
+
+
+def test_sampling_keeps_whole_sessions_and_rate_limit_is_counted():
+    sampled, limited = InMemoryTraceHandler(), InMemoryTraceHandler()
+    dispatcher = EventDispatcher(flush_interval=60)
+    dispatcher.add_handler(sampled, HandlerPolicy(sample_rate=0.5))
+    dispatcher.add_handler(limited, HandlerPolicy(max_events_per_second=3))
+
+    for n in range(40):
+        dispatcher.publish("on_tool_start", (f"s{n}", "grep", {}), {})
+        dispatcher.publish("on_tool_end", ("ok",), {"session_id": f"s{n}"})
+    dispatcher.flush()
+
+    kept = [event.session_id for event in sampled.events]
+    assert 0 < len(kept) < 80
+    assert all(kept.count(session_id) == 2 for session_id in kept)
+    assert len(limited.events) == 3
+    assert dispatcher.stats["rate_limited"] == 77
+
+
+class _SilentSpan:
+    def __init__(self):
+        self.attributes = {}
+
+    def is_recording(self):
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+
+def test_opentelemetry_skips_payload_serialization_for_silent_spans(monkeypatch):
+    handler = OpenTelemetryTraceHandler()
+    span = _SilentSpan()
+    monkeypatch.setattr(handler.tracer, "start_span", lambda **_: span)
+    monkeypatch.setattr(handler, "_push_span", lambda _span: None)
+
+    handler.on_llm_start("s1", "model", [{"role": "user"}], "plan")
+    handler.on_tool_start("s1", "grep", {"pattern": "x"})
+
+    assert "llm.messages" not in span.attributes
+    assert "tool.input" not in span.attributes
+    assert span.attributes["llm.model"] == "model"
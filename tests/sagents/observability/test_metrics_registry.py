@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from sagents.observability.metrics_registry import (
+    MetricsRegistry,
+    _ShardedMetric,
+    encode_openmetrics,
+    encode_prometheus_text,
+)
+
+
+def test_counter_merges_live_and_exited_thread_shards():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs.", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(("a",))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(("b",), 2.5)
+
+    assert counter.get(("a",)) == 4000
+    assert len(counter._shards) == 1
+    assert registry.counter("jobs_total", "Jobs.", ("kind",)) is counter
+    body = encode_prometheus_text(registry.collect())
+    assert 'jobs_total{kind="a"} 4000.000000' in body
+    assert 'jobs_total{kind="b"} 2.500000' in body
+
+
+def test_exponential_histogram_buckets_and_downscaling():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("lag_seconds", "Lag.", schema=0, max_buckets=2)
+    for value in (0.0, 0.75, 3.0, 3.5, 12.0):
+        histogram.observe((), value)
+
+    samples = {
+        dict(sample.labels).get("le"): sample.value
+        for sample in histogram.collect().samples
+        if sample.name == "lag_seconds_bucket"
+    }
+    # schema 0 的桶 (0.5,1] (2,4] (8,16] 超过 2 个，降两级到 schema -2: (1/16,1] (1,16]
+    assert samples == {"0.0": 1, "1": 2, "16": 5, "+Inf": 5}
+
+
+def test_openmetrics_exposes_exemplars_and_eof():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls.", ("tool",))
+    histogram = registry.histogram(
+        "call_seconds", "Call latency.", ("tool",), buckets=(0.1, 1.0)
+    )
+    counter.inc(("grep",), exemplar={"trace_id": "abc"})
+    histogram.observe(("grep",), 0.5, exemplar={"trace_id": "abc"})
+
+    body = encode_openmetrics(registry.collect())
+
+    assert "# TYPE calls counter" in body
+    assert 'calls_total{tool="grep"} 1 # {trace_id="abc"} 1 ' in body
+    assert 'call_seconds_bucket{tool="grep",le="0.1"} 0\n' in body
+    assert 'call_seconds_bucket{tool="grep",le="1.0"} 1 # {trace_id="abc"} 0.5 ' in body
+    assert body.endswith("# EOF\n")
+
+
+def test_sharded_metric_subclasses_must_implement_merge_and_collect():
+    class Incomplete(_ShardedMetric):
+        def _merge_into(self, target, shard):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Missing collect.")
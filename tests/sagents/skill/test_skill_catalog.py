@@ -0,0 +1,152 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+# 日志在首次输出时才导入 session_runtime，提前导入以免计入单测超时
+import sagents.session_runtime  # noqa: F401
+from common.services import skill_service
+from sagents.skill.skill_catalog import SkillCatalog, get_skill_catalog
+from sagents.skill.skill_manager import SkillManager
+
+
+def _age(path, seconds=60):
+    past = time.time_ns() - seconds * 1_000_000_000
+    os.utime(path, ns=(past, past))
+
+
+def _write_skill(root, name, description):
+    skill_dir = root / name
+    (skill_dir / "scripts").mkdir(parents=True, exist_ok=True)
+    (skill_dir / "SKILL.md").write_text(
+        f"---\nname: {name}\ndescription: {description}\n---\n# {name}\n",
+        encoding="utf-8",
+    )
+    (skill_dir / "scripts" / "run.py").write_text("print('v1')\n", encoding="utf-8")
+    for path in (
+        skill_dir / "SKILL.md",
+        skill_dir / "scripts" / "run.py",
+        skill_dir / "scripts",
+        skill_dir,
+    ):
+        _age(path)
+    return skill_dir
+
+
+def test_same_size_edit_is_detected(tmp_path):
+    catalog = SkillCatalog()
+    skill_dir = _write_skill(tmp_path, "demo", "first")
+    script = skill_dir / "scripts" / "run.py"
+
+    before = catalog.file_hashes(str(skill_dir))
+    assert catalog.file_hashes(str(skill_dir)) == before
+    assert catalog.stats["hash_misses"] == 2 and catalog.stats["hash_hits"] == 2
+
+    stat = script.stat()
+    script.write_text("print('v2')\n", encoding="utf-8")
+    os.utime(script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert script.stat().st_size == stat.st_size
+    assert catalog.file_hashes(str(skill_dir)) != before
+
+
+def test_caches_evict_least_recently_used_entries(tmp_path):
+    catalog = SkillCatalog(skill_md_cache_size=2, hash_cache_size=3)
+    skills = [str(_write_skill(tmp_path, f"s{n}", "first")) for n in range(3)]
+
+    for skill in skills:
+        catalog.read_skill_md(skill)
+        catalog.file_hashes(skill)
+    assert len(catalog._skill_md) == 2 and len(catalog._hashes) == 3
+
+    catalog.read_skill_md(skills[2])
+    catalog.read_skill_md(skills[0])
+    assert catalog.stats["metadata_hits"] == 1
+    # s0 重新载入后淘汰最久未用的 s1，s2 仍在缓存中
+    catalog.read_skill_md(skills[2])
+    assert catalog.stats["metadata_hits"] == 2
+
+
+def test_recent_files_are_not_cached_so_same_tick_edits_are_seen(tmp_path):
+    catalog = SkillCatalog()
+    skill_dir = _write_skill(tmp_path, "demo", "first")
+    script = skill_dir / "scripts" / "run.py"
+    script.write_text("print('v1')\n", encoding="utf-8")
+    mtime_ns = script.stat().st_mtime_ns
+
+    first = catalog.file_hashes(str(skill_dir))["scripts/run.py"]
+    script.write_text("print('v2')\n", encoding="utf-8")
+    os.utime(script, ns=(mtime_ns, mtime_ns))
+
+    assert catalog.file_hashes(str(skill_dir))["scripts/run.py"] != first
+
+
+def test_skill_manager_reuses_parsed_front_matter(tmp_path):
+    catalog = get_skill_catalog()
+    catalog.invalidate(str(tmp_path))
+    skill_dir = _write_skill(tmp_path, "demo", "first")
+
+    SkillManager(skill_dirs=[str(tmp_path)], isolated=True)
+    hits = catalog.stats["metadata_hits"]
+    manager = SkillManager(skill_dirs=[str(tmp_path)], isolated=True)
+    assert catalog.stats["metadata_hits"] == hits + 1
+    assert (
+        manager.skills["demo"].file_list == "demo/\n  SKILL.md\n  scripts/\n    run.py"
+    )
+
+    md = skill_dir / "SKILL.md"
+    md.write_text(md.read_text(encoding="utf-8").replace("first", "again"))
+    manager.reload()
+    assert manager.skills["demo"].description == "again"
+
+
+def test_need_update_compares_cached_hashes(tmp_path):
+    source = _write_skill(tmp_path / "source", "demo", "first")
+    agent = _write_skill(tmp_path / "agent", "demo", "first")
+    assert skill_service._is_skill_need_update(str(source), str(agent)) is False
+
+    script = agent / "scripts" / "run.py"
+    script.write_text("print('vX')\n", encoding="utf-8")
+    assert skill_service._is_skill_need_update(str(source), str(agent)) is True
+
+    script.unlink()
+    assert skill_service._is_skill_need_update(str(source), str(agent)) is True
+
+
+def test_watcher_refreshes_only_the_changed_skill(tmp_path):
+    pytest.importorskip("watchdog")
+    _write_skill(tmp_path, "alpha", "first")
+    _write_skill(tmp_path, "beta", "first")
+    manager = SkillManager(skill_dirs=[str(tmp_path)], isolated=True)
+    try:
+        assert manager.watch() is True
+        time.sleep(0.1)
+        _write_skill(tmp_path, "alpha", "changed")
+        deadline = time.monotonic() + 1.5
+        while manager.skills["alpha"].description != "changed":
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        assert manager.skills["beta"].description == "first"
+    finally:
+        manager.stop_watching()
+
+
+async def test_watch_events_update_skills_on_the_event_loop(tmp_path):
+    pytest.importorskip("watchdog")
+    skill_dir = _write_skill(tmp_path, "alpha", "first")
+    manager = SkillManager(skill_dirs=[str(tmp_path)], isolated=True)
+    try:
+        assert manager.watch() is True
+        _write_skill(tmp_path, "alpha", "changed")
+        # 模拟 watchdog 线程的通知：事件循环运行之前技能表保持不变
+        worker = threading.Thread(
+            target=manager._on_skill_changed, args=(str(skill_dir),)
+        )
+        worker.start()
+        worker.join()
+        assert manager.skills["alpha"].description == "first"
+        await asyncio.sleep(0)
+        assert manager.skills["alpha"].description == "changed"
+    finally:
+        manager.stop_watching()
@@ -1,3 +1,7 @@
+import json
+
+import pytest
+
 from sagents.context.messages.message import MessageChunk, MessageRole
 from sagents import session_runtime
 
@@ -121,3 +125,144 @@ def test_conversation_messages_view_filters_every_client_visibility_flag(
         "sse-hidden",
         "visible",
     ]
+
+
+def _chat(count, start=0):
+    return [
+        MessageChunk(
+            role=MessageRole.ASSISTANT.value if n % 2 else MessageRole.USER.value,
+            content=f"m{n}",
+            message_id=f"m{n}",
+            type="assistant_text" if n % 2 else "user_input",
+        )
+        for n in range(start, start + count)
+    ]
+
+
+def _ids(page):
+    return [message["message_id"] for message in page["messages"]]
+
+
+def test_conversation_messages_page_cursors_stay_stable_while_appending(
+    monkeypatch,
+):
+    messages = _chat(10)
+    messages.insert(
+        3,
+        MessageChunk(
+            role=MessageRole.USER.value,
+            content="hidden",
+            message_id="hidden",
+            metadata={"hidden_from_chat": True},
+        ),
+    )
+    monkeypatch.setattr(
+        session_runtime, "_global_session_manager", FakeSessionManager(messages)
+    )
+    build_page = session_runtime.build_conversation_messages_page
+
+    latest = build_page("sess-1", limit=4)
+    assert _ids(latest) == ["m6", "m7", "m8", "m9"]
+    assert latest["has_more_before"] and not latest["has_more_after"]
+
+    messages.extend(_chat(3, start=10))
+    # An in-place update keeps the message's position in the view.
+    messages[0] = MessageChunk(
+        role=MessageRole.USER.value, content="edited", message_id="m0"
+    )
+
+    older = build_page("sess-1", before=latest["before_cursor"], limit=4)
+    assert _ids(older) == ["m2", "m3", "m4", "m5"] and older["has_more_after"]
+    oldest = build_page("sess-1", before=older["before_cursor"], limit=4)
+    assert _ids(oldest) == ["m0", "m1"] and not oldest["has_more_before"]
+    assert oldest["messages"][0]["content"] == "edited"
+
+    newer = build_page("sess-1", after=latest["after_cursor"], limit=2)
+    assert _ids(newer) == ["m10", "m11"] and newer["has_more_after"]
+    tail = build_page("sess-1", after=newer["after_cursor"], limit=2)
+    assert _ids(tail) == ["m12"] and not tail["has_more_after"]
+    idle = build_page("sess-1", after=tail["after_cursor"], limit=2)
+    assert _ids(idle) == [] and idle["after_cursor"] == "m12"
+
+
+def test_conversation_messages_page_filters_types_and_summarizes_tool_output(
+    monkeypatch,
+):
+    messages = _chat(6) + [
+        MessageChunk(
+            role=MessageRole.TOOL.value,
+            content="x" * 5000,
+            tool_call_id="call-1",
+            message_id="tool-1",
+            type="tool_call_result",
+        )
+    ]
+    monkeypatch.setattr(
+        session_runtime, "_global_session_manager", FakeSessionManager(messages)
+    )
+    build_page = session_runtime.build_conversation_messages_page
+
+    page = build_page("sess-1", limit=2, message_types={"assistant_text"})
+    assert _ids(page) == ["m3", "m5"] and page["has_more_before"]
+    assert not page["has_more_after"]
+
+    # Cursors refer to view positions, so they work across filters.
+    older = build_page("sess-1", before="m2", limit=5, message_types={"user_input"})
+    assert _ids(older) == ["m0"] and older["has_more_after"]
+
+    tool = build_page("sess-1", after="m5", limit=1, summary=True)["messages"][0]
+    assert tool["content_truncated"] is True and tool["content_length"] == 5000
+    assert len(tool["content"]) == session_runtime.CONVERSATION_SUMMARY_TOOL_CHARS
+    full = build_page("sess-1", after="m5", limit=1)["messages"][0]
+    assert full["content"] == "x" * 5000 and "content_truncated" not in full
+
+    with pytest.raises(KeyError):
+        build_page("sess-1", before="missing")
+
+
+def test_restored_session_messages_are_reused_until_the_ledger_changes(tmp_path):
+    workspace = tmp_path / "sessions" / "done-session"
+    workspace.mkdir(parents=True)
+    messages_path = workspace / "messages.json"
+    messages_path.write_text(
+        json.dumps([message.to_dict() for message in _chat(2)]), encoding="utf-8"
+    )
+    manager = session_runtime.SessionManager(
+        str(tmp_path / "sessions"), enable_obs=False
+    )
+
+    first = manager.get_session_messages("done-session")
+    second = manager.get_session_messages("done-session")
+    assert [message.message_id for message in second] == ["m0", "m1"]
+    assert second[0] is not first[0] and second is not first
+
+    messages_path.write_text(
+        json.dumps([message.to_dict() for message in _chat(3)]), encoding="utf-8"
+    )
+    reloaded = manager.get_session_messages("done-session")
+    assert [message.message_id for message in reloaded] == ["m0", "m1", "m2"]
+
+
+def test_mutating_restored_messages_does_not_leak_into_the_cache(tmp_path):
+    workspace = tmp_path / "sessions" / "done-session"
+    workspace.mkdir(parents=True)
+    (workspace / "messages.json").write_text(
+        json.dumps([message.to_dict() for message in _chat(2)]), encoding="utf-8"
+    )
+    manager = session_runtime.SessionManager(
+        str(tmp_path / "sessions"), enable_obs=False
+    )
+
+    first = manager.get_session_messages("done-session")
+    first[0].content = "edited"
+    first[0].metadata["redacted"] = True
+    first.append(first[1])
+
+    second = manager.get_session_messages("done-session")
+    assert [message.message_id for message in second] == ["m0", "m1"]
+    assert second[0].content != "edited"
+    assert "redacted" not in second[0].metadata
+
+    second[1].metadata["seen"] = True
+    third = manager.get_session_messages("done-session")
+    assert "seen" not in third[1].metadata
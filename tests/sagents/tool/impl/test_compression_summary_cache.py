@@ -0,0 +1,199 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from sagents.context.messages.message import MessageChunk, MessageRole, MessageType
+from sagents.tool.impl import _summary_cache
+from sagents.tool.impl._summary_cache import SummaryCache, chain_keys
+from sagents.tool.impl.compress_history_tool import (
+    CompressionBudget,
+    CompressionLLMResult,
+    CompressHistoryTool,
+)
+
+
+class FakeSession:
+    def __init__(self, model="gpt-4o"):
+        self.model_config = {"model": model, "base_url": "http://llm.local/v1"}
+
+
+class CountingLLM:
+    """Fake compression model that records every prompt it is asked to summarize."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def __call__(self, messages_text, session_id, **kwargs):
+        self.prompts.append(messages_text)
+        summary = {"summary": f"summary #{len(self.prompts)}"}
+        return CompressionLLMResult(
+            content=json.dumps(summary),
+            finish_reason="stop",
+            prompt_tokens=None,
+            completion_tokens=None,
+            configured_output_limit=None,
+        )
+
+
+@pytest.fixture
+def session(monkeypatch, tmp_path):
+    monkeypatch.setenv("SAGE_COMPRESSION_SUMMARY_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("SAGE_COMPRESSION_SUMMARY_CACHE_ENTRIES", raising=False)
+    fake = FakeSession()
+    monkeypatch.setattr(
+        "sagents.utils.agent_session_helper.get_live_session",
+        lambda session_id, log_prefix=None: fake,
+    )
+    yield fake
+    cache = _summary_cache._default_cache
+    if cache is not None:
+        cache.close()
+    monkeypatch.setattr(_summary_cache, "_default_cache", None)
+
+
+def _tool(llm):
+    tool = CompressHistoryTool()
+    tool._get_compression_budget = lambda session_id: CompressionBudget(
+        max_model_len=128000,
+        window_target_tokens=8192,
+        configured_output_limit=16384,
+        target_tokens=8192,
+        configured_output_config={"max_tokens": 16384},
+    )
+    # 每个 user turn 单独成批，便于观察前缀复用
+    tool._compression_batches = lambda messages, session_id: (
+        CompressHistoryTool._compression_units(messages)
+    )
+    tool._call_llm_for_compression = llm
+    return tool
+
+
+def _turns(*texts):
+    messages = []
+    for index, text in enumerate(texts):
+        messages.append(
+            MessageChunk(
+                role=MessageRole.USER.value,
+                content=f"question {index}: {text}",
+                message_id=f"u{index}",
+                message_type=MessageType.USER_INPUT.value,
+            )
+        )
+        messages.append(
+            MessageChunk(
+                role=MessageRole.ASSISTANT.value,
+                content=f"answer {index}: {text}",
+                message_id=f"a{index}",
+                message_type=MessageType.ASSISTANT_TEXT.value,
+            )
+        )
+    return messages
+
+
+def _summarize(tool, messages):
+    return asyncio.run(tool._summarize_batches(messages, "cached_session"))
+
+
+def test_repeat_hits_and_grown_history_extends_cached_prefix(session):
+    llm = CountingLLM()
+    tool = _tool(llm)
+    history = _turns("alpha", "beta")
+
+    payload, _, _, batch_count, stats = _summarize(tool, history)
+    assert len(llm.prompts) == 2 and batch_count == 2
+    assert stats["summary_cache"] == {"result": "miss", "cached_message_count": 0}
+
+    repeat, _, _, batch_count, stats = _summarize(tool, history)
+    assert repeat == payload
+    assert len(llm.prompts) == 2 and batch_count == 0
+    assert stats["summary_cache"] == {"result": "hit", "cached_message_count": 4}
+
+    # 多出一个 turn：只压缩新 turn，并带上缓存摘要作为滚动摘要
+    grown, _, _, _, stats = _summarize(
+        tool, history + _turns("alpha", "beta", "gamma")[4:]
+    )
+    assert len(llm.prompts) == 3
+    assert stats["summary_cache"] == {"result": "partial", "cached_message_count": 4}
+    assert "summary #2" in llm.prompts[-1] and "gamma" in llm.prompts[-1]
+    assert "beta" not in llm.prompts[-1]
+    assert grown["summary"] == "summary #3"
+
+    # 前缀相同、后续分叉的历史同样复用第一个 turn 的摘要
+    _summarize(tool, _turns("alpha", "delta"))
+    assert len(llm.prompts) == 4
+    assert "summary #1" in llm.prompts[-1]
+
+
+def test_model_or_prompt_change_misses(session, monkeypatch):
+    llm = CountingLLM()
+    tool = _tool(llm)
+    history = _turns("alpha")
+    _summarize(tool, history)
+
+    session.model_config = {"model": "other-model"}
+    _summarize(tool, history)
+    assert len(llm.prompts) == 2
+
+    monkeypatch.setattr(
+        CompressHistoryTool,
+        "_build_compression_prompt",
+        staticmethod(lambda text, target, retry_after_truncation=False: "v2" + text),
+    )
+    _summarize(tool, history)
+    assert len(llm.prompts) == 3
+
+    # 没有模型标识时不读写缓存
+    session.model_config = {}
+    _summarize(tool, history)
+    _, _, _, _, stats = _summarize(tool, history)
+    assert len(llm.prompts) == 5
+    assert stats["summary_cache"]["result"] == "disabled"
+
+
+def test_cache_reads_and_writes_run_off_the_event_loop(session, monkeypatch):
+    calls = []
+
+    def recording(method):
+        def wrapper(self, *args):
+            calls.append((method.__name__, threading.get_ident()))
+            return method(self, *args)
+
+        return wrapper
+
+    monkeypatch.setattr(
+        SummaryCache, "longest_prefix", recording(SummaryCache.longest_prefix)
+    )
+    monkeypatch.setattr(SummaryCache, "put", recording(SummaryCache.put))
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await _tool(CountingLLM())._summarize_batches(
+            _turns("alpha", "beta"), "cached_session"
+        )
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert [name for name, _ in calls] == ["longest_prefix", "put", "put"]
+    assert all(thread != loop_thread for _, thread in calls)
+
+
+def test_cache_evicts_least_recently_used_and_tracks_hit_rate(tmp_path):
+    cache = SummaryCache(str(tmp_path), max_entries=2)
+    keys = chain_keys("seed", ["m1", "m2", "m3"])
+    for count in (1, 2, 3):
+        cache.put(keys[count], {"summary": str(count)}, "json", {})
+    assert cache.stats["evicted"] == 1
+
+    assert cache.longest_prefix(keys[:2], [1]) == (0, None)
+    count, cached = cache.longest_prefix(keys, [1, 2, 3])
+    assert count == 3 and cached.payload == {"summary": "3"}
+    count, cached = cache.longest_prefix(keys[:3], [1, 2])
+    assert count == 2 and cached.payload == {"summary": "2"}
+    assert cache.hit_rate == pytest.approx(2 / 3)
+    cache.close()
+
+    reopened = SummaryCache(str(tmp_path), max_entries=2)
+    assert reopened.longest_prefix(keys, [3])[0] == 3
+    reopened.close()
@@ -0,0 +1,397 @@
+import asyncio
+import sqlite3
+import sys
+import threading
+import types
+from email.utils import formatdate
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from sagents.tool.impl import _web_cache, web_fetcher_tool
+from sagents.tool.impl._web_cache import (
+    CachingFetcher,
+    HttpCache,
+    TransportResponse,
+    freshness_lifetime,
+    is_storable,
+    normalize_headers,
+)
+from sagents.tool.impl.web_fetcher_tool import WebFetcherTool
+
+
+ARTICLE_HTML = (
+    "<html><head><title>Docs</title></head><body><article>"
+    "<p>This documentation page is long enough to pass the content filter.</p>"
+    "</article></body></html>"
+)
+
+
+class OriginServer:
+    """Local origin that counts full responses and conditional hits per path."""
+
+    def __init__(self):
+        self.hits = {}
+        self.not_modified = {}
+        self.conditional_headers = []
+        self.last_modified = formatdate(0, usegmt=True)
+        self.app = web.Application()
+        self.app.router.add_get("/cacheable.txt", self.cacheable)
+        self.app.router.add_get("/no-store.txt", self.no_store)
+        self.app.router.add_get("/etag.txt", self.etag)
+        self.app.router.add_get("/last-modified.txt", self.last_modified_handler)
+        self.app.router.add_get("/slow.txt", self.slow)
+        self.app.router.add_get("/docs", self.docs)
+
+    def _count(self, request):
+        self.hits[request.path] = self.hits.get(request.path, 0) + 1
+
+    async def cacheable(self, request):
+        self._count(request)
+        return web.Response(
+            body=b"cacheable body", headers={"Cache-Control": "max-age=60"}
+        )
+
+    async def no_store(self, request):
+        self._count(request)
+        return web.Response(body=b"fresh body", headers={"Cache-Control": "no-store"})
+
+    async def etag(self, request):
+        self.conditional_headers.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            self.not_modified[request.path] = self.not_modified.get(request.path, 0) + 1
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        self._count(request)
+        return web.Response(
+            body=b"etag body", headers={"ETag": '"v1"', "Cache-Control": "max-age=0"}
+        )
+
+    async def last_modified_handler(self, request):
+        self.conditional_headers.append(request.headers.get("If-Modified-Since"))
+        if request.headers.get("If-Modified-Since") == self.last_modified:
+            self.not_modified[request.path] = self.not_modified.get(request.path, 0) + 1
+            return web.Response(status=304)
+        self._count(request)
+        return web.Response(
+            body=b"last-modified body",
+            headers={"Last-Modified": self.last_modified, "Cache-Control": "no-cache"},
+        )
+
+    async def slow(self, request):
+        self._count(request)
+        await asyncio.sleep(0.1)
+        return web.Response(body=b"slow body", headers={"Cache-Control": "no-store"})
+
+    async def docs(self, request):
+        if request.headers.get("If-None-Match") == '"docs"':
+            self.not_modified[request.path] = self.not_modified.get(request.path, 0) + 1
+            return web.Response(status=304, headers={"ETag": '"docs"'})
+        self._count(request)
+        return web.Response(
+            text=ARTICLE_HTML,
+            content_type="text/html",
+            headers={"ETag": '"docs"', "Cache-Control": "max-age=0"},
+        )
+
+
+@pytest.fixture
+async def origin():
+    server = OriginServer()
+    test_server = TestServer(server.app)
+    await test_server.start_server()
+    server.url = lambda path: str(test_server.make_url(path))
+    try:
+        yield server
+    finally:
+        await web_fetcher_tool._shared_session.aclose()
+        await test_server.close()
+
+
+@pytest.fixture
+def fetcher(monkeypatch, tmp_path):
+    fetcher = CachingFetcher(HttpCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(WebFetcherTool, "_web_fetcher", lambda self: fetcher)
+    yield fetcher
+    fetcher.cache.close()
+
+
+async def _download(tool, url, save_dir):
+    return await tool._download_file(url, str(save_dir), 5, 0)
+
+
+async def test_cacheable_response_is_served_from_disk(origin, fetcher, tmp_path):
+    tool = WebFetcherTool()
+    url = origin.url("/cacheable.txt")
+
+    first = await _download(tool, url, tmp_path)
+    second = await _download(tool, url, tmp_path)
+
+    assert first["status"] == second["status"] == "success"
+    assert origin.hits["/cacheable.txt"] == 1
+    assert fetcher.cache.stats["hits"] == 1
+    for result in (first, second):
+        with open(result["metadata"]["save_path"], "rb") as f:
+            assert f.read() == b"cacheable body"
+
+
+async def test_no_store_response_is_always_refetched(origin, fetcher, tmp_path):
+    tool = WebFetcherTool()
+    url = origin.url("/no-store.txt")
+
+    await _download(tool, url, tmp_path)
+    await _download(tool, url, tmp_path)
+
+    assert origin.hits["/no-store.txt"] == 2
+    assert fetcher.cache.lookup(url) is None
+    assert [p.name for p in (tmp_path / "cache" / "bodies").iterdir()] == []
+
+
+async def test_stale_entry_revalidates_with_etag(origin, fetcher, tmp_path):
+    tool = WebFetcherTool()
+    url = origin.url("/etag.txt")
+
+    await _download(tool, url, tmp_path)
+    result = await _download(tool, url, tmp_path)
+
+    assert origin.hits["/etag.txt"] == 1
+    assert origin.not_modified["/etag.txt"] == 1
+    assert origin.conditional_headers == [None, '"v1"']
+    with open(result["metadata"]["save_path"], "rb") as f:
+        assert f.read() == b"etag body"
+
+
+async def test_no_cache_entry_revalidates_with_last_modified(origin, fetcher, tmp_path):
+    tool = WebFetcherTool()
+    url = origin.url("/last-modified.txt")
+
+    await _download(tool, url, tmp_path)
+    await _download(tool, url, tmp_path)
+
+    assert origin.hits["/last-modified.txt"] == 1
+    assert origin.not_modified["/last-modified.txt"] == 1
+    assert origin.conditional_headers == [None, origin.last_modified]
+    assert fetcher.cache.stats["revalidated"] == 1
+
+
+async def test_concurrent_fetch_webpages_share_one_download(
+    origin, fetcher, monkeypatch, tmp_path
+):
+    tool = WebFetcherTool()
+    monkeypatch.setattr(tool, "_get_workspace_path", lambda session_id: str(tmp_path))
+    url = origin.url("/slow.txt")
+
+    results = await asyncio.gather(*(tool.fetch_webpages([url]) for _ in range(5)))
+
+    assert origin.hits["/slow.txt"] == 1
+    assert fetcher.coalesced == 4
+    assert all(result["status"] == "success" for result in results)
+    assert [p.name for p in (tmp_path / "cache" / "bodies").iterdir()] == []
+
+
+async def test_html_pages_revalidate_and_reuse_extracted_text(
+    origin, fetcher, monkeypatch
+):
+    from scrapling.engines.toolbelt.custom import Response
+
+    class LocalAsyncFetcher:
+        @classmethod
+        async def get(cls, url, headers=None, **kwargs):
+            session = web_fetcher_tool._shared_session.get()
+            async with session.get(url, headers=headers or {}) as response:
+                return Response(
+                    url=str(response.url),
+                    content=await response.read(),
+                    status=response.status,
+                    reason=response.reason,
+                    cookies={},
+                    headers=dict(response.headers),
+                    request_headers={},
+                )
+
+    fetchers_module = types.ModuleType("scrapling.fetchers")
+    fetchers_module.AsyncFetcher = LocalAsyncFetcher
+    monkeypatch.setitem(sys.modules, "scrapling.fetchers", fetchers_module)
+
+    tool = WebFetcherTool()
+    extractions = []
+    original_extract = tool._extract_markdown_content_uncached
+
+    def counting_extract(page, base_url):
+        extractions.append(base_url)
+        return original_extract(page, base_url)
+
+    monkeypatch.setattr(tool, "_extract_markdown_content_uncached", counting_extract)
+    url = origin.url("/docs")
+
+    first = await tool._fetch_single_html(url, 5000, 5, 0)
+    second = await tool._fetch_single_html(url, 5000, 5, 0)
+
+    assert origin.hits["/docs"] == 1
+    assert origin.not_modified["/docs"] == 1
+    assert first["content"] == second["content"]
+    assert "documentation page" in second["content"]
+    assert second["metadata"]["title"] == "Docs"
+    assert len(extractions) == 1
+    assert fetcher.cache.stats["text_hits"] == 1
+
+
+def _store(cache, url, body, headers):
+    path = cache.new_body_path()
+    with open(path, "wb") as f:
+        f.write(body)
+    return cache.store(
+        url,
+        TransportResponse(status=200, headers=headers),
+        path,
+        request_time=0.0,
+        response_time=0.0,
+    )
+
+
+def test_lru_eviction_keeps_total_size_bounded(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=250)
+    headers = {"Cache-Control": "max-age=60"}
+    _store(cache, "https://a.test/1", b"1" * 100, headers)
+    _store(cache, "https://a.test/2", b"2" * 100, headers)
+    assert cache.lookup("https://a.test/1") is not None  # 1 is now most recent
+    _store(cache, "https://a.test/3", b"3" * 100, headers)
+
+    assert cache.lookup("https://a.test/2") is None
+    assert cache.lookup("https://a.test/1") is not None
+    assert cache.lookup("https://a.test/3") is not None
+    assert cache.total_bytes() == 200
+    assert cache.stats["evicted"] == 1
+    cache.close()
+
+
+def test_pinned_entries_survive_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=150)
+    headers = {"Cache-Control": "max-age=60"}
+    first = _store(cache, "https://a.test/1", b"1" * 100, headers)
+    cache.pin(first.key)
+    _store(cache, "https://a.test/2", b"2" * 100, headers)
+
+    assert cache.lookup("https://a.test/1") is not None
+    cache.unpin(first.key)
+    cache.close()
+
+
+async def test_replaced_default_cache_closes_after_in_flight_fetches(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr(_web_cache, "_default_fetcher", None)
+    monkeypatch.setenv("SAGE_WEB_FETCHER_CACHE_DIR", str(tmp_path / "first"))
+    old = _web_cache.get_default_fetcher()
+    release = asyncio.Event()
+
+    async def transport(url, headers, body_path):
+        await release.wait()
+        with open(body_path, "wb") as f:
+            f.write(b"body")
+        return TransportResponse(status=200, headers={"Cache-Control": "max-age=60"})
+
+    async def read():
+        async with old.fetch("https://a.test/doc", transport) as result:
+            with open(result.body_path, "rb") as f:
+                return f.read()
+
+    pending = asyncio.create_task(read())
+    await asyncio.sleep(0)
+    monkeypatch.setenv("SAGE_WEB_FETCHER_CACHE_DIR", str(tmp_path / "second"))
+    current = _web_cache.get_default_fetcher()
+    assert current is not old
+    old.cache.lookup("https://a.test/doc")  # still open for the in-flight fetch
+
+    release.set()
+    assert await pending == b"body"
+    with pytest.raises(sqlite3.ProgrammingError):
+        old.cache.lookup("https://a.test/doc")
+    current.close()
+
+
+def test_running_byte_total_tracks_replace_invalidate_and_eviction(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=250)
+    headers = {"Cache-Control": "max-age=60"}
+
+    def summed():
+        return cache._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM http_entries"
+        ).fetchone()[0]
+
+    _store(cache, "https://a.test/1", b"1" * 100, headers)
+    _store(cache, "https://a.test/1", b"1" * 60, headers)
+    _store(cache, "https://a.test/2", b"2" * 100, headers)
+    _store(cache, "https://a.test/3", b"3" * 100, headers)
+    assert cache.stats["evicted"] == 1
+    assert cache.total_bytes() == summed() == 200
+    cache.invalidate("https://a.test/2")
+    assert cache.total_bytes() == summed() == 100
+    cache.close()
+
+    reopened = HttpCache(str(tmp_path / "cache"), max_bytes=250)
+    assert reopened.total_bytes() == 100
+    reopened.close()
+
+
+async def test_fetch_runs_cache_disk_io_off_the_event_loop(
+    monkeypatch, fetcher, tmp_path
+):
+    threads = {}
+
+    def recording(name):
+        method = getattr(HttpCache, name)
+
+        def wrapper(self, *args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return method(self, *args, **kwargs)
+
+        return wrapper
+
+    for name in ("lookup", "store", "freshen"):
+        monkeypatch.setattr(HttpCache, name, recording(name))
+
+    async def transport(url, headers, body_path):
+        if headers:
+            return TransportResponse(status=304, headers={"ETag": '"v1"'})
+        with open(body_path, "wb") as f:
+            f.write(b"body")
+        return TransportResponse(
+            status=200, headers={"Cache-Control": "no-cache", "ETag": '"v1"'}
+        )
+
+    for _ in range(2):
+        async with fetcher.fetch("https://a.test/doc", transport) as result:
+            with open(result.body_path, "rb") as f:
+                assert f.read() == b"body"
+
+    assert set(threads) == {"lookup", "store", "freshen"}
+    assert threading.get_ident() not in set().union(*threads.values())
+
+
+def test_freshness_policy():
+    date = "Thu, 01 Jan 1970 00:01:40 GMT"  # 100s
+    assert freshness_lifetime({"cache-control": "max-age=30"}, 0.0) == 30.0
+    assert (
+        freshness_lifetime(
+            {"date": date, "expires": "Thu, 01 Jan 1970 00:02:00 GMT"}, 0.0
+        )
+        == 20.0
+    )
+    assert freshness_lifetime({"date": date, "expires": "0"}, 0.0) == 0.0
+    # 10% heuristic over Date - Last-Modified.
+    assert (
+        freshness_lifetime(
+            {"date": date, "last-modified": "Thu, 01 Jan 1970 00:00:00 GMT"}, 0.0
+        )
+        == 10.0
+    )
+    assert freshness_lifetime({"cache-control": "no-cache, max-age=30"}, 0.0) == 0.0
+
+    assert is_storable(200, {"cache-control": "max-age=30"})
+    assert is_storable(200, {"etag": '"x"'})
+    assert not is_storable(200, {"cache-control": "no-store", "etag": '"x"'})
+    assert not is_storable(200, {"vary": "*", "etag": '"x"'})
+    assert not is_storable(200, {})
+    assert not is_storable(500, {"cache-control": "max-age=30"})
+    assert normalize_headers({"Set-Cookie": "a=b", "ETag": "x"}) == {"etag": "x"}
@@ -9,6 +9,14 @@ from sagents.tool.impl.web_fetcher_tool import WebFetcherTool, _HttpStatusError
 from sagents.utils.i18n import tool_language
 
 
+@pytest.fixture(autouse=True)
+def isolated_web_cache(monkeypatch, tmp_path_factory):
+    # Keep the HTTP cache out of ~/.sage and out of the per-test tmp_path
+    # that some tests assert to be empty.
+    cache_dir = tmp_path_factory.mktemp("web-cache")
+    monkeypatch.setenv("SAGE_WEB_FETCHER_CACHE_DIR", str(cache_dir))
+
+
 class CssResult(list):
     def get(self, default=""):
         return self[0] if self else default
@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+from sagents.agent.tool_suggestion_agent import ToolSuggestionAgent
+from sagents.context.messages.message import MessageChunk, MessageRole, MessageType
+from sagents.tool.tool_ranker import (
+    ToolCoUsageStats,
+    ToolRanker,
+    tokenize_tool_text,
+)
+
+
+def _tool(name, description, **params):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    key: {"type": "string", "description": value}
+                    for key, value in params.items()
+                },
+            },
+        },
+    }
+
+
+TOOLS = [
+    _tool("file_read", "读取文件内容", file_path="要读取的文件路径"),
+    _tool("file_write", "写入文件内容", file_path="要写入的文件路径"),
+    _tool("search_web_page", "在互联网上搜索网页", query="搜索关键词"),
+    _tool("fetch_webpages", "抓取网页正文", urls="网页链接列表"),
+    _tool("generate_image", "根据描述生成图片", prompt="图片描述"),
+    _tool("add_task", "添加定时任务到调度器", schedule="cron 表达式"),
+    _tool("list_tasks", "列出调度器中的定时任务"),
+    _tool("execute_shell_command", "Run a shell command", command="Shell command"),
+]
+
+
+def test_tokenizer_splits_identifiers_and_cjk_bigrams():
+    assert tokenize_tool_text("searchWebPage file_read") == [
+        "search",
+        "web",
+        "page",
+        "searchwebpage",
+        "file",
+        "read",
+    ]
+    assert tokenize_tool_text("搜索网页") == [
+        "搜",
+        "索",
+        "网",
+        "页",
+        "搜索",
+        "索网",
+        "网页",
+    ]
+
+
+def test_ranker_matches_chinese_query_and_parameter_docs():
+    ranker = ToolRanker(TOOLS, co_usage=ToolCoUsageStats())
+
+    assert ranker.rank("帮我搜索一下最新的网页新闻")[0][0] == "search_web_page"
+    assert ranker.rank("写一个 cron 定时任务")[0][0] == "add_task"
+
+
+def test_co_usage_boost_and_confidence_gate():
+    stats = ToolCoUsageStats()
+    for n in range(4):
+        stats.update(f"s{n}", {"add_task": 2, "list_tasks": 1})
+    stats.update("s-other", {"add_task": 1})
+    ranker = ToolRanker(TOOLS, co_usage=stats)
+
+    boosted = {name: score for name, score, _ in ranker.rank("生成", ["add_task"])}
+    assert stats.conditional("list_tasks", "add_task") == 0.8
+    assert boosted["list_tasks"] > boosted["file_write"]
+
+    selected, confident = ranker.select("根据描述生成一张图片", top_k=3)
+    assert confident and selected[0] == "generate_image"
+
+    # 没有任何词命中，或命中的工具太多时都交给 LLM
+    assert ranker.select("hello there")[1] is False
+    assert ranker.select("文件内容", top_k=1)[1] is False
+
+    stats.update("s0", {})
+    assert len(stats) == 4
+    assert stats.conditional("list_tasks", "add_task") == 0.75
+
+
+def test_gated_mode_skips_llm_when_local_ranking_is_confident(monkeypatch):
+    monkeypatch.setenv("SAGE_TOOL_SUGGESTION_MODE", "gated")
+    agent = ToolSuggestionAgent(model=SimpleNamespace(), model_config={})
+    llm_calls = []
+
+    async def _fake_get_tool_suggestions(*args, **kwargs):
+        llm_calls.append(args)
+        return [1]
+
+    monkeypatch.setattr(agent, "_get_tool_suggestions", _fake_get_tool_suggestions)
+    tool_manager = SimpleNamespace(
+        get_openai_tools=lambda lang: TOOLS,
+        list_tools_simplified=lambda lang: [
+            {"name": tool["function"]["name"], "description": ""} for tool in TOOLS
+        ],
+    )
+    session_context = SimpleNamespace(
+        agent_config={},
+        effective_skill_manager=None,
+        session_id="s1",
+        tool_manager=tool_manager,
+        get_language=lambda: "zh",
+    )
+
+    def run(text):
+        message = MessageChunk(
+            role=MessageRole.USER.value,
+            content=text,
+            message_type=MessageType.USER_INPUT.value,
+        )
+        return asyncio.run(agent._analyze_tool_suggestions([message], session_context))  # pyright: ignore[reportArgumentType]
+
+    assert "generate_image" in run("根据描述生成一张图片")
+    assert llm_calls == []
+
+    assert run("hello there")
+    assert len(llm_calls) == 1
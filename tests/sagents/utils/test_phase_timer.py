@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import time
+
+import pytest
+
+from sagents.session_runtime import Session
+from sagents.storage import create_session_store
+from sagents.utils import phase_timer
+from sagents.utils.phase_timer import (
+    enable_phase_timing,
+    finish_turn,
+    phase,
+    record_phase,
+    recent_turn_timings,
+    slowest_turn_profiles,
+    start_turn,
+    timed_phase,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_phase_timer():
+    phase_timer.reset_phase_timings()
+    yield
+    enable_phase_timing(False, profile_slowest=0)
+    phase_timer.reset_phase_timings()
+
+
+class _Worker:
+    @timed_phase("build")
+    def build(self):
+        return "built"
+
+    @timed_phase("fetch")
+    async def fetch(self):
+        await asyncio.sleep(0.01)
+        return "fetched"
+
+    @timed_phase("prepare")
+    async def prepare(self):
+        for index in range(2):
+            await asyncio.sleep(0.01)
+            yield index
+
+
+def _phases(record):
+    return {item["phase"]: item for item in record["phases"]}
+
+
+def test_disabled_timer_returns_untouched_results():
+    enable_phase_timing(False)
+    worker = _Worker()
+
+    assert start_turn("s1") is None
+    assert finish_turn(None) is None
+    assert phase("anything") is phase("other")
+    record_phase("llm_wait", 1.0)
+    coro = worker.fetch()
+    assert asyncio.iscoroutine(coro)
+    assert asyncio.run(coro) == "fetched"
+    assert recent_turn_timings() == []
+
+
+def test_turn_breakdown_covers_sync_async_generators_and_child_tasks():
+    enable_phase_timing(True)
+    worker = _Worker()
+
+    async def turn():
+        timer = start_turn("s1")
+        assert worker.build() == "built"
+        items = []
+        async for item in worker.prepare():
+            # 消费者持有数据的时间不计入 prepare
+            time.sleep(0.05)
+            items.append(item)
+        await asyncio.gather(
+            asyncio.create_task(worker.fetch()), asyncio.create_task(worker.fetch())
+        )
+        with phase("tool_exec"):
+            await asyncio.sleep(0.01)
+        record_phase("llm_wait", 0.25)
+        return items, finish_turn(timer, request_id="req_1")
+
+    items, record = asyncio.run(turn())
+
+    assert items == [0, 1]
+    phases = _phases(record)
+    assert phases["build"]["count"] == 1
+    assert phases["fetch"]["count"] == 2
+    assert 20 <= phases["prepare"]["duration_ms"] < 90
+    assert phases["llm_wait"]["duration_ms"] == 250.0
+    assert record["phases"][0]["phase"] == "llm_wait"
+    assert record["session_id"] == "s1"
+    assert record["request_id"] == "req_1"
+    assert record["duration_ms"] >= 100
+    assert recent_turn_timings("s1") == [record]
+    assert recent_turn_timings("other") == []
+    # 回合结束后不再计时
+    assert phase("late") is phase("other")
+
+
+def test_profile_sampling_keeps_only_the_slowest_turns():
+    enable_phase_timing(True, profile_slowest=1)
+
+    def run_turn(seconds):
+        timer = start_turn("s1")
+        time.sleep(seconds)
+        return finish_turn(timer)
+
+    fast = run_turn(0.001)
+    slow = run_turn(0.03)
+    run_turn(0.002)
+
+    profiles = slowest_turn_profiles()
+    assert len(profiles) == 1
+    assert profiles[0]["started_at"] == slow["started_at"]
+    assert "Ordered by: cumulative time" in profiles[0]["profile"]
+    assert slow.get("profiled") is True
+    assert "profile" not in fast
+
+
+def test_finishing_a_turn_from_another_context_keeps_the_current_turn():
+    enable_phase_timing(True)
+    stray = contextvars.copy_context().run(start_turn, "stray")
+    current = start_turn("s1")
+
+    assert finish_turn(stray)["session_id"] == "stray"
+    with phase("tool_exec"):
+        pass
+    record = finish_turn(current)
+
+    assert _phases(record)["tool_exec"]["count"] == 1
+
+
+def test_failed_session_cleanup_still_releases_the_profiler(monkeypatch):
+    enable_phase_timing(True, profile_slowest=1)
+    session = Session("s1", enable_obs=False)
+
+    async def run_stream_with_flow(**kwargs):
+        yield []
+
+    async def cleanup(session_id):
+        raise RuntimeError("cleanup failed")
+
+    monkeypatch.setattr(session, "run_stream_with_flow", run_stream_with_flow)
+    monkeypatch.setattr(session, "_cleanup_session_resources", cleanup)
+
+    async def consume():
+        async for _ in session.run_stream_safe(session_id="s1", flow=object()):
+            pass
+
+    with pytest.raises(RuntimeError, match="cleanup failed"):
+        asyncio.run(consume())
+
+    assert phase_timer._profiler_busy is False
+    assert recent_turn_timings("s1")[0]["status"] == "completed"
+
+
+def test_filesystem_store_round_trips_turn_timings(tmp_path):
+    store = create_session_store(session_root=str(tmp_path))
+    workspace = store.create_session_workspace("timed-session")
+    store.register_session("timed-session", workspace)
+
+    for index in range(3):
+        store.append_turn_timing(
+            "timed-session", {"request_id": f"req_{index}", "phases": []}
+        )
+
+    records = store.load_turn_timings("timed-session", limit=2)
+    assert [record["request_id"] for record in records] == ["req_2", "req_1"]
+    assert store.load_turn_timings("missing-session") == []
@@ -0,0 +1,122 @@
+import io
+import logging
+import types
+
+import sagents.session_runtime
+from sagents.utils import logger as logger_module
+from sagents.utils.session_log_writer import SessionLogWriter
+
+
+class _RecordingStore:
+    def __init__(self, streamable=True):
+        self.streamable = streamable
+        self.appends = []
+        self.streams = {}
+
+    def append_session_log(self, session_id, text):
+        self.appends.append((session_id, text))
+        return ""
+
+    def open_session_log(self, session_id):
+        if not self.streamable:
+            return None
+        stream = _KeepOpenStream()
+        self.streams.setdefault(session_id, []).append(stream)
+        return stream
+
+
+class _KeepOpenStream(io.StringIO):
+    def close(self):
+        self.closed_by_writer = True
+
+
+def _handler():
+    handler = logging.Handler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def _record(message):
+    return logging.LogRecord("t", logging.INFO, __file__, 1, message, None, None)
+
+
+def test_records_are_batched_per_session_and_streams_closed():
+    writer = SessionLogWriter(flush_interval=0.05, max_open_files=1)
+    store, handler = _RecordingStore(), _handler()
+    try:
+        for n in range(3):
+            writer.submit(store, "a", handler, _record(f"a{n}"))
+            writer.submit(store, "b", handler, _record(f"b{n}"))
+        assert writer.flush(timeout=1.0)
+        assert writer.stats["written"] == 6 and writer.stats["batches"] == 1
+
+        # max_open_files=1: "a" 的流在打开 "b" 时被淘汰
+        stream_a, stream_b = store.streams["a"][0], store.streams["b"][0]
+        assert stream_a.getvalue() == "a0\na1\na2\n"
+        assert stream_a.closed_by_writer
+        assert stream_b.getvalue() == "b0\nb1\nb2\n"
+
+        writer.close_session("b")
+        assert writer.flush(timeout=1.0)
+        assert stream_b.closed_by_writer
+    finally:
+        writer.shutdown()
+
+
+def test_store_without_streams_gets_one_append_per_batch():
+    writer = SessionLogWriter(flush_interval=0.05)
+    store, handler = _RecordingStore(streamable=False), _handler()
+    try:
+        for n in range(4):
+            writer.submit(store, "a", handler, _record(f"line{n}"))
+        assert writer.flush(timeout=1.0)
+        assert store.appends == [("a", "line0\nline1\nline2\nline3\n")]
+    finally:
+        writer.shutdown()
+
+
+def test_overflow_drops_are_counted_and_marked():
+    store, handler = _RecordingStore(streamable=False), _handler()
+    for policy, kept in (("drop_new", "m0\nm1\n"), ("drop_old", "m2\nm3\n")):
+        writer = SessionLogWriter(max_queue=2, flush_interval=5, overflow=policy)
+        store.appends.clear()
+        try:
+            # 写线程在第一条记录后等待攒批，期间队列保持满载
+            results = [
+                writer.submit(store, "a", handler, _record(f"m{n}")) for n in range(4)
+            ]
+            assert writer.stats["dropped"] == 2
+            assert results == (
+                [True, True, False, False] if policy == "drop_new" else [True] * 4
+            )
+            assert writer.flush(timeout=1.0)
+            text = "".join(text for _, text in store.appends)
+            assert text == kept + "[session log] 2 records dropped: queue full\n"
+        finally:
+            writer.shutdown()
+
+
+def test_disabled_level_skips_caller_lookup(monkeypatch, tmp_path):
+    monkeypatch.setenv("SAGE_DISABLE_SAGENTS_FILE_LOGGING", "1")
+    monkeypatch.setattr(logger_module.Logger, "_instance", None)
+    monkeypatch.setattr(logger_module.Logger, "_initialized", False)
+    monkeypatch.setattr(
+        sagents.session_runtime,
+        "get_global_session_manager",
+        lambda: types.SimpleNamespace(get_live_session=lambda _sid: None),
+    )
+    sage_logger = logger_module.Logger(log_dir=str(tmp_path))
+    lookups = []
+    original = sage_logger._caller_filename
+    monkeypatch.setattr(
+        sage_logger,
+        "_caller_filename",
+        lambda path: lookups.append(path) or original(path),
+    )
+    try:
+        sage_logger.debug("hidden", session_id="s1")
+        assert lookups == []
+        sage_logger.info("shown", session_id="s1")
+        assert lookups == [__file__]
+    finally:
+        logger_module.Logger._close_handlers(sage_logger.logger)
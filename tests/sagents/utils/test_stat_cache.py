@@ -0,0 +1,35 @@
+import os
+import time
+from collections import OrderedDict
+
+from sagents.utils.stat_cache import dirs_unchanged, is_racy, lru_put
+
+
+def test_is_racy_covers_the_last_second_only():
+    now = time.time_ns()
+
+    assert is_racy(now)
+    assert is_racy(now - 500_000_000)
+    assert not is_racy(now - 2_000_000_000)
+
+
+def test_lru_put_evicts_least_recently_written():
+    cache = OrderedDict()
+    for key in "abc":
+        lru_put(cache, key, key.upper(), 2)
+    lru_put(cache, "b", "B2", 2)
+    lru_put(cache, "d", "D", 2)
+
+    assert list(cache.items()) == [("b", "B2"), ("d", "D")]
+
+
+def test_dirs_unchanged_detects_mtime_changes_and_missing_dirs(tmp_path):
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    recorded = [(str(path), os.stat(path).st_mtime_ns) for path in (tmp_path, sub)]
+    assert dirs_unchanged(recorded)
+
+    os.utime(sub, ns=(0, recorded[1][1] + 1_000_000_000))
+    assert not dirs_unchanged(recorded)
+
+    assert not dirs_unchanged([(str(tmp_path / "missing"), 0)])